@@ -19,6 +19,11 @@ class ACLMiddleware(object):
         """Attach authentication/permission helpers to request."""
         request.check_ownership = partial(acl.check_ownership, request)
 
+        # Lean API requests are anonymous, there's no one to look up.
+        if getattr(request, 'LEAN', False):
+            request.amo_user = None
+            return
+
         # figure out our list of groups...
         if request.user.is_authenticated():
             try:
@@ -30,9 +35,13 @@ class ACLMiddleware(object):
 
             amo.set_user(amo_user)
             request.user._profile_cache = request.amo_user = amo_user
+            # This is lazy, the groups are only loaded if a permission check
+            # needs them.
             request.groups = request.amo_user.groups.all()
 
-            if acl.action_allowed(request, 'Admin', '%'):
+            # Only the admin site looks at is_staff and the API never does.
+            if (not getattr(request, 'API', False) and
+                acl.action_allowed(request, 'Admin', '%')):
                 request.user.is_staff = True
         else:
             request.amo_user = None
@@ -12,6 +12,7 @@ from users.models import UserProfile
 
 from .acl import (action_allowed, check_addon_ownership, check_ownership,
                   check_reviewer, match_rules)
+from .middleware import ACLMiddleware
 
 
 def test_match_rules():
@@ -236,3 +237,33 @@ class TestCheckReviewer(TestCase):
         assert not check_reviewer(req, only='app')
         assert not check_reviewer(req, only='addon')
         assert check_reviewer(req, only='persona')
+
+
+class TestACLMiddleware(TestCase):
+    fixtures = ['base/users']
+
+    def request(self, api=False):
+        request = HttpRequest()
+        request.API = api
+        request.user = User.objects.get(pk=4043307)
+        request.user.is_staff = False
+        ACLMiddleware().process_request(request)
+        return request
+
+    def test_staff(self):
+        request = self.request()
+        assert request.user.is_staff
+
+    def test_api_groups_lazy(self):
+        request = self.request(api=True)
+        assert request.groups._result_cache is None
+        assert not request.user.is_staff
+        assert action_allowed(request, 'Admin', '%')
+
+    def test_lean(self):
+        request = HttpRequest()
+        request.API = request.LEAN = True
+        request.user = mock.Mock()
+        ACLMiddleware().process_request(request)
+        assert not request.user.is_authenticated.called
+        assert request.amo_user is None
@@ -24,6 +24,7 @@ import amo.tests
 from amo import set_user
 from amo.helpers import absolutify
 from amo.signals import _connect, _disconnect
+from amo.tasks import process_front_end_purges
 from addons.models import (Addon, AddonCategory, AddonDependency,
                            AddonDeviceType, AddonRecommendation, AddonType,
                            AddonUpsell, AddonUser, AppSupport, BlacklistedGuid,
@@ -1796,25 +1797,38 @@ class TestFlushURLs(amo.tests.TestCase):
     def is_url_hashed(self, url):
         return urlparse(url).query.find('modified') > -1
 
-    @patch('amo.tasks.flush_front_end_cache_urls.apply_async')
+    @patch('amo.tasks.queue_front_end_purge')
     def test_addon_flush(self, flush):
         addon = Addon.objects.get(pk=159)
         addon.icon_type = "image/png"
         addon.save()
 
         for url in (addon.thumbnail_url, addon.icon_url):
-            assert url in flush.call_args[1]['args'][0]
+            assert url in flush.call_args[0][0]
             assert self.is_url_hashed(url), url
 
-    @patch('amo.tasks.flush_front_end_cache_urls.apply_async')
+    @patch('amo.tasks.queue_front_end_purge')
     def test_preview_flush(self, flush):
         addon = Addon.objects.get(pk=4664)
         preview = addon.previews.all()[0]
         preview.save()
         for url in (preview.thumbnail_url, preview.image_url):
-            assert url in flush.call_args[1]['args'][0]
+            assert url in flush.call_args[0][0]
             assert self.is_url_hashed(url), url
 
+    @patch('amo.tasks.flush_urls')
+    def test_saves_flushed_once(self, flush_urls):
+        addon = Addon.objects.get(pk=159)
+        for x in range(1000):
+            addon.save()
+        ok_(not flush_urls.called)
+        process_front_end_purges()
+        eq_(flush_urls.call_count, 1)
+        urls = flush_urls.call_args[0][0]
+        eq_(len(urls), len(set(urls)))
+        eq_(process_front_end_purges(), 0)
+        eq_(flush_urls.call_count, 1)
+
 
 class TestAddonFromUpload(UploadTest):
     fixtures = ('base/apps', 'base/users')
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import json
+import time
 from StringIO import StringIO
+from wsgiref.handlers import format_date_time
 
 from django.conf import settings
 from django.db import connection
@@ -11,6 +13,7 @@ from nose.tools import eq_
 
 import amo.tests
 from addons.models import Addon
+from mkt.api import profiler
 from versions.models import Version
 from services import theme_update
 
@@ -60,6 +63,14 @@ class TestWSGIApplication(amo.tests.TestCase):
             assert not ThemeUpdate_mock.called
             self.start_response.assert_called_with('404 Not Found', [])
 
+    @mock.patch('services.theme_update.ThemeUpdate')
+    def test_wsgi_application_304(self, ThemeUpdate_mock):
+        ThemeUpdate_mock.return_value.is_modified.return_value = False
+        environ = dict(self.environ, PATH_INFO='/themes/update-check/5',
+                       HTTP_IF_NONE_MATCH='"abc"')
+        eq_(theme_update.application(environ, self.start_response), [''])
+        self.start_response.assert_called_with('304 Not Modified', mock.ANY)
+
 
 class TestThemeUpdate(amo.tests.TestCase):
     fixtures = ['addons/persona']
@@ -137,3 +148,71 @@ class TestThemeUpdate(amo.tests.TestCase):
 
         self.check_good(
             json.loads(self.get_update('en-US', 813, 'src=gp').get_json()))
+
+
+class TestThemeUpdateCaching(amo.tests.TestCase):
+    fixtures = ['addons/persona']
+
+    def setUp(self):
+        theme_update.local_cache.clear()
+        self.addon = Addon.objects.get()
+        self.addon.summary = 'yolo'
+        self.addon.current_version = Version.objects.get()
+        self.addon.save()
+
+    def get_update(self, locale='en-US', id_=15663, qs=None):
+        update = theme_update.ThemeUpdate(locale, id_, qs)
+        update.cursor = connection.cursor()
+        return update
+
+    def test_one_query_per_request(self):
+        requests = 20
+        with profiler.profile() as p:
+            with mock.patch.object(theme_update.ThemeUpdate,
+                                   'base64_icon') as icon:
+                icon.return_value = ''
+                for x in range(requests):
+                    json.loads(self.get_update().get_json())
+        assert p.query_count <= requests, (
+            '%s queries for %s requests' % (p.query_count, requests))
+        # The rendered JSON was cached, so the icon was only read once.
+        eq_(icon.call_count, 1)
+
+    def test_locale_fallback_one_query(self):
+        with profiler.profile() as p:
+            update = self.get_update('fr')
+            data = json.loads(update.get_json())
+        eq_(p.query_count, 1)
+        eq_(data['name'], 'My Persona')
+        eq_(update.data['locale'], 'en-US')
+
+    def test_cached_on_modified(self):
+        eq_(json.loads(self.get_update().get_json())['description'], 'yolo')
+        self.addon.summary = 'swag'
+        self.addon.save()
+        eq_(json.loads(self.get_update().get_json())['description'], 'swag')
+
+    def test_headers(self):
+        update = self.get_update()
+        output = update.get_json()
+        headers = dict(update.get_headers(len(output), output))
+        eq_(headers['ETag'], update.etag(output))
+        eq_(headers['Last-Modified'], format_date_time(update.modified()))
+        eq_(headers['Content-Length'], str(len(output)))
+
+    def test_if_none_match(self):
+        update = self.get_update()
+        output = update.get_json()
+        etag = update.etag(output)
+        assert not update.is_modified({'HTTP_IF_NONE_MATCH': etag}, output)
+        assert update.is_modified({'HTTP_IF_NONE_MATCH': '"old"'}, output)
+
+    def test_if_modified_since(self):
+        update = self.get_update()
+        output = update.get_json()
+        now = {'HTTP_IF_MODIFIED_SINCE': format_date_time(time.time())}
+        assert not update.is_modified(now, output)
+        old = {'HTTP_IF_MODIFIED_SINCE':
+               format_date_time(update.modified() - 60)}
+        assert update.is_modified(old, output)
+        assert update.is_modified({}, output)
@@ -115,6 +115,13 @@ def gc(test_result=True):
             log.debug(line)
 
 
+@cronjobs.register
+def flush_front_end_purges():
+    """Flush the URLs spooled for purging from the front end cache."""
+    total = tasks.process_front_end_purges()
+    log.info('Flushed %s URLs from the front end cache.' % total)
+
+
 @cronjobs.register
 def expired_resetcode():
     """
@@ -1,8 +1,15 @@
+import hashlib
 import logging
+import smtplib
 
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
 from django.core.mail.backends.base import BaseEmailBackend
 
+import redisutils
+
 from amo.models import FakeEmail
+from amo.utils import chunked, get_email_backend
 
 log = logging.getLogger('z.amo.mail')
 
@@ -28,3 +35,131 @@ class FakeEmailBackend(BaseEmailBackend):
 
     def clear(self):
         return FakeEmail.objects.all().delete()
+
+
+# Open connections kept by `get_bulk_connection`, keyed by backend.
+_connections = {}
+
+
+def _connection_key(real_email):
+    return bool(real_email or settings.SEND_REAL_EMAIL), settings.EMAIL_BACKEND
+
+
+def get_bulk_connection(real_email=False):
+    """An open connection that is reused for the life of the process."""
+    key = _connection_key(real_email)
+    if key not in _connections:
+        connection = get_email_backend(real_email)
+        connection.open()
+        _connections[key] = connection
+    return _connections[key]
+
+
+def close_bulk_connection(real_email=False):
+    connection = _connections.pop(_connection_key(real_email), None)
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class BulkMailer(object):
+    """
+    Sends one message to a lot of recipients, each getting their own copy.
+
+    The message is rendered once by the caller. If `tokens` is given it is
+    called with each recipient and returns a dict of {placeholder: value} to
+    substitute in the bodies. Messages are built `batch_size` at a time and
+    go out over the process's persistent connection.
+
+    Progress is recorded in redis after each message, keyed by `campaign`,
+    so sending to the same recipients again after an interruption picks up
+    after the last message delivered, even part way through a batch. The
+    record is removed once every recipient has been sent to.
+    """
+
+    def __init__(self, subject, message, from_email=None, html_message=None,
+                 tokens=None, campaign=None, batch_size=None,
+                 real_email=False, headers=None):
+        self.subject = subject
+        self.message = message
+        self.from_email = from_email or settings.DEFAULT_FROM_EMAIL
+        self.html_message = html_message
+        self.tokens = tokens
+        self.campaign = campaign
+        self.batch_size = batch_size or settings.BULK_MAIL_BATCH_SIZE
+        self.real_email = real_email
+        self.headers = headers or {}
+
+    def recipients(self, recipients):
+        """Blacklisted addresses removed, in a stable order."""
+        return sorted(set(r for r in recipients
+                          if r and r.lower() not in settings.EMAIL_BLACKLIST))
+
+    def key(self, recipients):
+        campaign = self.campaign
+        if campaign is None:
+            parts = [self.from_email, self.subject, self.message,
+                     self.html_message or ''] + recipients
+            campaign = hashlib.md5(
+                u'\n'.join(parts).encode('utf8')).hexdigest()
+        return 'amo:bulk-mail:%s' % campaign
+
+    def get_progress(self, key):
+        try:
+            return int(redisutils.connections['master'].get(key) or 0)
+        except Exception, e:
+            log.error(u'Could not read bulk mail progress %s (%s).'
+                      % (key, e))
+            return 0
+
+    def set_progress(self, key, sent):
+        try:
+            redis = redisutils.connections['master']
+            if sent is None:
+                redis.delete(key)
+            else:
+                redis.set(key, sent)
+        except Exception, e:
+            log.error(u'Could not record bulk mail progress %s (%s).'
+                      % (key, e))
+
+    def build(self, recipient):
+        message, html_message = self.message, self.html_message
+        if self.tokens:
+            for placeholder, value in self.tokens(recipient).items():
+                message = message.replace(placeholder, value)
+                if html_message:
+                    html_message = html_message.replace(placeholder, value)
+        msg = EmailMultiAlternatives(self.subject, message, self.from_email,
+                                     [recipient], headers=self.headers)
+        if html_message:
+            msg.attach_alternative(html_message, 'text/html')
+        return msg
+
+    def send_message(self, message):
+        try:
+            get_bulk_connection(self.real_email).send_messages([message])
+        except smtplib.SMTPServerDisconnected:
+            # The server hung up on the idle connection, try a fresh one.
+            close_bulk_connection(self.real_email)
+            get_bulk_connection(self.real_email).send_messages([message])
+
+    def send(self, recipients):
+        """Send to `recipients`, returns how many were sent to in total."""
+        recipients = self.recipients(recipients)
+        key = self.key(recipients)
+        sent = self.get_progress(key)
+        if sent:
+            log.info(u'Resuming bulk mail %s after %s of %s recipients.'
+                     % (key, sent, len(recipients)))
+        for batch in chunked(recipients[sent:], self.batch_size):
+            for message in [self.build(r) for r in batch]:
+                self.send_message(message)
+                # Checkpoint every message: the backend stops at the first
+                # failure, so a batch can be half delivered.
+                sent += 1
+                self.set_progress(key, sent)
+        self.set_progress(key, None)
+        return sent
@@ -20,6 +20,7 @@ import MySQLdb as mysql
 import tower
 
 import amo
+import amo.models
 from . import urlresolvers
 from .helpers import urlparams
 
@@ -166,6 +167,25 @@ class CommonMiddleware(common.CommonMiddleware):
             return super(CommonMiddleware, self).process_request(request)
 
 
+class CoalesceInvalidationMiddleware(object):
+    """
+    Sends the cache-machine invalidations of a request together once it's
+    done, see `amo.models.coalesce_invalidation`.
+    """
+
+    def process_request(self, request):
+        # Whatever a request that went wrong left behind goes out now.
+        amo.models.flush_invalidation()
+        amo.models.start_coalescing()
+        request._coalescing_invalidation = True
+
+    def process_response(self, request, response):
+        if getattr(request, '_coalescing_invalidation', False):
+            request._coalescing_invalidation = False
+            amo.models.stop_coalescing()
+        return response
+
+
 class ReadOnlyMiddleware(object):
 
     def process_request(self, request):
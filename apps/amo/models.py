@@ -9,6 +9,8 @@ import caching.base
 import multidb.pinning
 import pyes.exceptions
 import queryset_transform
+from celery.app.task import Task
+from celery.signals import task_postrun, task_prerun
 
 from . import search
 from . import signals  # Needed to set up url prefix signals.
@@ -40,6 +42,107 @@ def skip_cache():
         _locals.skip_cache = old
 
 
+@contextlib.contextmanager
+def coalesce_invalidation():
+    """
+    Within this context, cache-machine invalidations are collected and only
+    sent when the outermost context exits, with a single round of cache calls
+    for all the flush lists instead of a round for every save. Until then,
+    queries skip the cache once something is waiting to be invalidated, so
+    nothing stale is read back.
+    """
+    start_coalescing()
+    try:
+        yield
+    finally:
+        stop_coalescing()
+
+
+def start_coalescing():
+    _locals.coalesce_depth = getattr(_locals, 'coalesce_depth', 0) + 1
+    if _locals.coalesce_depth == 1:
+        _locals.pending_invalidation = set()
+        _locals.deferred = {}
+
+
+def stop_coalescing():
+    depth = getattr(_locals, 'coalesce_depth', 0)
+    if depth > 1:
+        _locals.coalesce_depth = depth - 1
+    elif depth == 1:
+        flush_invalidation()
+
+
+def flush_invalidation():
+    """
+    Sends whatever invalidation is waiting, stops coalescing and runs what
+    was deferred until then.
+    """
+    keys = getattr(_locals, 'pending_invalidation', None)
+    deferred = getattr(_locals, 'deferred', None)
+    _locals.coalesce_depth = 0
+    _locals.pending_invalidation = None
+    _locals.deferred = None
+    if keys:
+        _invalidate_keys(keys)
+    for func, items in (deferred or {}).items():
+        func(items)
+
+
+def send_invalidation():
+    """Sends whatever invalidation is waiting, but keeps coalescing."""
+    keys = getattr(_locals, 'pending_invalidation', None)
+    if keys:
+        _locals.pending_invalidation = set()
+        _invalidate_keys(keys)
+
+
+def defer(func, item):
+    """
+    Calls `func` with the set of every `item` deferred to it once the
+    outermost coalesce_invalidation() block exits, so it runs once per
+    request or task. Outside of one, `func` is called right away.
+    """
+    if getattr(_locals, 'coalesce_depth', 0):
+        _locals.deferred.setdefault(func, set()).add(item)
+    else:
+        func(set([item]))
+
+
+_invalidate_keys = caching.base.invalidator.invalidate_keys
+
+
+def invalidate_keys(keys):
+    if getattr(_locals, 'coalesce_depth', 0):
+        _locals.pending_invalidation.update(keys)
+    else:
+        _invalidate_keys(keys)
+
+caching.base.invalidator.invalidate_keys = invalidate_keys
+
+
+@task_prerun.connect(dispatch_uid='coalesce_task_invalidation')
+def start_task_coalescing(**kw):
+    start_coalescing()
+
+
+@task_postrun.connect(dispatch_uid='flush_task_invalidation')
+def stop_task_coalescing(**kw):
+    stop_coalescing()
+
+
+_apply_async = Task.apply_async
+
+
+def apply_async(self, *args, **kw):
+    # The worker could pick the task up before this request or task is
+    # over, so it has to find the cache already invalidated.
+    send_invalidation()
+    return _apply_async(self, *args, **kw)
+
+Task.apply_async = apply_async
+
+
 # This is sadly a copy and paste of annotate to get around this
 # ticket http://code.djangoproject.com/ticket/14707
 def annotate(self, *args, **kwargs):
@@ -165,7 +268,8 @@ class ManagerBase(caching.base.CachingManager, UncachedManagerBase):
 
     def get_query_set(self):
         qs = super(ManagerBase, self).get_query_set()
-        if getattr(_locals, 'skip_cache', False):
+        if (getattr(_locals, 'skip_cache', False) or
+            getattr(_locals, 'pending_invalidation', None)):
             qs = qs.no_cache()
         return self._with_translations(qs)
 
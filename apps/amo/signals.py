@@ -13,7 +13,7 @@ def flush_front_end_cache(sender, instance, **kwargs):
 
     urls = furls() if hasattr(furls, '__call__') else furls
     if urls:
-        tasks.flush_front_end_cache_urls.apply_async(args=[urls])
+        tasks.queue_front_end_purge(urls)
 
 
 def _connect():
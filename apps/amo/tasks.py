@@ -1,10 +1,13 @@
 import datetime
+import re
+import time
 
 from django.conf import settings
 from django.core.mail import EmailMessage, EmailMultiAlternatives
 
 import commonware.log
 import phpserialize
+import redisutils
 from celeryutils import task
 from hera.contrib.django_utils import flush_urls
 
@@ -12,7 +15,7 @@ import amo
 from abuse.models import AbuseReport
 from addons.models import Addon
 from amo.decorators import set_task_user
-from amo.utils import get_email_backend
+from amo.utils import chunked, get_email_backend
 from bandwagon.models import Collection
 from devhub.models import ActivityLog, AppLog
 from editors.models import EscalationQueue, EventLog
@@ -23,14 +26,19 @@ from stats.models import Contribution
 
 log = commonware.log.getLogger('z.task')
 
+PURGE_QUEUE = 'amo:front-end-purge:queue'
+PURGE_SINCE = 'amo:front-end-purge:since'
+PURGE_SCHEDULED = 'amo:front-end-purge:scheduled'
+
 
 @task
 def send_email(recipient, subject, message, from_email=None,
                html_message=None, attachments=None, real_email=False,
                cc=None, headers=None, fail_silently=False, async=False,
-               max_retries=None, **kwargs):
+               max_retries=None, connection=None, **kwargs):
     backend = EmailMultiAlternatives if html_message else EmailMessage
-    connection = get_email_backend(real_email)
+    if connection is None:
+        connection = get_email_backend(real_email)
     result = backend(subject, message,
                      from_email, recipient, cc=cc, connection=connection,
                      headers=headers, attachments=attachments)
@@ -73,6 +81,72 @@ def flush_front_end_cache_urls(urls, **kw):
     flush_urls(urls)
 
 
+def queue_front_end_purge(urls):
+    """
+    Spool `urls` to be purged from the front end cache.
+
+    Saving a lot of objects would otherwise queue a task for each of them,
+    mostly purging the same URLs. They go in a redis set instead, which
+    `process_front_end_purges` empties every minute. Should that fall behind
+    FRONT_END_PURGE_MAX_DELAY seconds, it's queued from here.
+    """
+    try:
+        redis = redisutils.connections['master']
+        pipe = redis.pipeline()
+        pipe.sadd(PURGE_QUEUE, *urls)
+        pipe.get(PURGE_SINCE)
+        since = pipe.execute()[-1]
+        if since is None:
+            redis.set(PURGE_SINCE, int(time.time()))
+        elif (time.time() - int(since) > settings.FRONT_END_PURGE_MAX_DELAY
+              and redis.get(PURGE_SCHEDULED) is None):
+            redis.set(PURGE_SCHEDULED, 1)
+            process_front_end_purges.delay()
+    except Exception, e:
+        log.error(u'Could not queue front end purge, flushing now (%s).' % e)
+        flush_front_end_cache_urls.delay(list(urls))
+
+
+def coalesce_purges(urls):
+    """
+    `urls` without the ones a wildcard in another one already purges, so
+    `*/addon/a/*` takes care of `*/addon/a/eula/*` and `/en-US/addon/a/`.
+    """
+    urls = set(urls)
+    wildcards, patterns = [], []
+    # Shorter wildcards first, they're the ones likely to cover the others.
+    for url in sorted((url for url in urls if '*' in url),
+                      key=lambda url: (len(url), url)):
+        if not any(pattern.match(url) for pattern in patterns):
+            wildcards.append(url)
+            patterns.append(re.compile('%s$' % '.*'.join(
+                re.escape(part) for part in url.split('*'))))
+    plain = [url for url in urls if '*' not in url]
+    if patterns:
+        # One alternation checks the plain URLs against every wildcard.
+        covered = re.compile('|'.join('(?:%s)' % pattern.pattern
+                                      for pattern in patterns))
+        plain = [url for url in plain if not covered.match(url)]
+    return sorted(wildcards + plain)
+
+
+@task
+def process_front_end_purges(size=None, **kw):
+    """
+    Flush the URLs spooled by `queue_front_end_purge`, `size` at a time.
+    Returns how many were flushed.
+    """
+    redis = redisutils.connections['master']
+    # Read and clear in one MULTI so URLs queued in between aren't lost.
+    pipe = redis.pipeline()
+    pipe.smembers(PURGE_QUEUE)
+    pipe.delete(PURGE_QUEUE, PURGE_SINCE, PURGE_SCHEDULED)
+    urls = coalesce_purges(pipe.execute()[0])
+    for chunk in chunked(urls, size or settings.FRONT_END_PURGE_BATCH_SIZE):
+        flush_front_end_cache_urls(chunk)
+    return len(urls)
+
+
 @task
 def set_modified_on_object(obj, **kw):
     """Sets modified on one object at a time."""
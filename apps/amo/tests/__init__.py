@@ -58,6 +58,7 @@ from versions.models import ApplicationsVersions, Version
 from users.models import RequestUser, UserProfile
 
 import mkt
+from mkt.api import profiler
 from mkt.constants import regions
 from mkt.webapps.models import (update_search_index as app_update_search_index,
                                 WebappIndexer, Webapp)
@@ -313,6 +314,20 @@ class TestCase(MockEsMixin, RedisTest, test_utils.TestCase):
         set_url_prefix(old_prefix)
         translation.activate(old_locale)
 
+    @contextmanager
+    def assertMaxQueries(self, num):
+        """
+        Fail if the block runs more than `num` queries, listing the ones that
+        were repeated since that's usually the problem.
+        """
+        with profiler.profile() as p:
+            yield p
+        if p.query_count > num:
+            repeated = ''.join('\n  %s x %s' % (n, sig) for sig, n
+                               in p.duplicates().items())
+            raise AssertionError('%s queries run, expected at most %s.%s'
+                                 % (p.query_count, num, repeated))
+
     def assertNoFormErrors(self, response):
         """Asserts that no form in the context has errors.
 
@@ -870,25 +885,27 @@ class ESTestCase(TestCase):
             'spanish': ['es'],
         }
 
-        for index in set(settings.ES_INDEXES.values()):
-            # Get the index that's pointed to by the alias.
+        for alias in set(settings.ES_INDEXES.values()):
+            # Get the indices that are pointed to by the alias, there's one
+            # per month for the monthly stats indices.
+            indices = [alias]
             try:
-                indices = cls.es.get_alias(index)
-                index = indices[0]
-            except IndexError:
-                # There's no alias, just use the index.
-                print 'Found no alias for %s.' % index
-                index = index
+                indices = cls.es.get_alias(alias)
+                if not indices:
+                    # There's no alias, just use the index.
+                    print 'Found no alias for %s.' % alias
+                    indices = [alias]
             except (pyes.IndexMissingException,
                     pyelasticsearch.ElasticHttpNotFoundError):
                 pass
 
             # Remove any alias as well.
-            try:
-                cls.es.delete_index(index)
-            except (pyes.IndexMissingException,
-                    pyelasticsearch.ElasticHttpNotFoundError) as exc:
-                print 'Could not delete index %r: %s' % (index, exc)
+            for index in indices:
+                try:
+                    cls.es.delete_index(index)
+                except (pyes.IndexMissingException,
+                        pyelasticsearch.ElasticHttpNotFoundError) as exc:
+                    print 'Could not delete index %r: %s' % (index, exc)
 
         addons.search.setup_mapping()
         stats.search.setup_indexes()
@@ -0,0 +1,161 @@
+import asyncore
+import logging
+import smtpd
+import threading
+import time
+
+from django.conf import settings
+from django.core import mail
+
+import mock
+import redisutils
+from nose.tools import eq_
+
+import amo.tests
+from amo.mail import (BulkMailer, close_bulk_connection,
+                      get_bulk_connection)
+from zadmin.tasks import admin_email
+
+
+log = logging.getLogger('z.amo.mail')
+
+
+class SMTPSink(smtpd.SMTPServer):
+    """Accepts mail on localhost and keeps count of what it's sent."""
+
+    def __init__(self):
+        smtpd.SMTPServer.__init__(self, ('127.0.0.1', 0), None)
+        self.port = self.socket.getsockname()[1]
+        self.connections = 0
+        self.messages = []
+
+    def handle_accept(self):
+        self.connections += 1
+        smtpd.SMTPServer.handle_accept(self)
+
+    def process_message(self, peer, mailfrom, rcpttos, data):
+        self.messages.append((rcpttos, data))
+
+    def start(self):
+        self.thread = threading.Thread(target=asyncore.loop,
+                                       kwargs={'timeout': 0.05})
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.close()
+        self.thread.join(5)
+
+
+class TestBulkMailer(amo.tests.TestCase):
+
+    def setUp(self):
+        self.sink = SMTPSink()
+        self.sink.start()
+        patches = {'EMAIL_BACKEND':
+                       'django.core.mail.backends.smtp.EmailBackend',
+                   'EMAIL_HOST': '127.0.0.1',
+                   'EMAIL_PORT': self.sink.port,
+                   'EMAIL_USE_TLS': False,
+                   'SEND_REAL_EMAIL': True}
+        self.patches = [mock.patch.object(settings, k, v)
+                        for k, v in patches.items()]
+        for patch in self.patches:
+            patch.start()
+        self.recipients = ['dev%s@example.com' % i for i in range(250)]
+
+    def tearDown(self):
+        close_bulk_connection()
+        for patch in self.patches:
+            patch.stop()
+        self.sink.stop()
+
+    def mailer(self, **kw):
+        kw.setdefault('batch_size', 50)
+        return BulkMailer('subject', 'Hi {email}', **kw)
+
+    def test_send(self):
+        start = time.time()
+        eq_(self.mailer().send(self.recipients), 250)
+        took = time.time() - start
+        log.info('Sent 250 messages in %.3fs (%.0f/s).'
+                 % (took, 250 / took))
+        eq_(len(self.sink.messages), 250)
+        eq_(self.sink.connections, 1)
+        eq_(sorted(to[0] for to, data in self.sink.messages),
+            sorted(self.recipients))
+
+    def test_connection_reused(self):
+        self.mailer().send(self.recipients[:10])
+        self.mailer().send(self.recipients[10:20])
+        eq_(len(self.sink.messages), 20)
+        eq_(self.sink.connections, 1)
+
+    def test_tokens(self):
+        mailer = self.mailer(tokens=lambda r: {'{email}': r})
+        mailer.send(['a@example.com'])
+        to, data = self.sink.messages[0]
+        assert 'Hi a@example.com' in data, data
+
+    def test_blacklist(self):
+        self.mailer().send(['nobody@mozilla.org', 'a@example.com'])
+        eq_([to for to, data in self.sink.messages], [['a@example.com']])
+
+    def test_resume(self):
+        mailer = self.mailer(campaign='resume')
+        real_send = mailer.send_message
+        messages = []
+
+        def send_message(message):
+            # Fail part way through the third batch.
+            if len(messages) == 120:
+                raise IOError('interrupted')
+            messages.append(message)
+            real_send(message)
+
+        with mock.patch.object(mailer, 'send_message', send_message):
+            with self.assertRaises(IOError):
+                mailer.send(self.recipients)
+        eq_(len(self.sink.messages), 120)
+
+        eq_(mailer.send(self.recipients), 250)
+        # Nobody in the half sent batch gets a second copy.
+        eq_(len(self.sink.messages), 250)
+        eq_(len(set(to[0] for to, data in self.sink.messages)), 250)
+        # Finished campaigns don't leave their progress behind.
+        eq_(redisutils.connections['master'].get('amo:bulk-mail:resume'),
+            None)
+
+    def test_reconnect(self):
+        self.mailer().send(self.recipients[:1])
+        # Drop the socket under the connection, like an idle timeout would.
+        get_bulk_connection().connection.close()
+        self.mailer().send(self.recipients[1:2])
+        eq_(len(self.sink.messages), 2)
+        eq_(self.sink.connections, 2)
+
+    def test_locmem(self):
+        locmem = 'django.core.mail.backends.locmem.EmailBackend'
+        with mock.patch.object(settings, 'EMAIL_BACKEND', locmem):
+            self.mailer().send(self.recipients[:3])
+            close_bulk_connection()
+        eq_(len(mail.outbox), 3)
+        eq_(mail.outbox[0].body, 'Hi {email}')
+
+    def test_admin_email(self):
+        admin_email(self.recipients, 'subject', 'body',
+                    from_email='admin@example.com')
+        eq_(len(self.sink.messages), 250)
+        eq_(self.sink.connections, 1)
+        eq_(sorted(to[0] for to, data in self.sink.messages),
+            sorted(self.recipients))
+        assert 'body' in self.sink.messages[0][1]
+
+    @mock.patch('zadmin.tasks.admin_email.retry')
+    def test_admin_email_retry(self, retry):
+        with mock.patch.object(BulkMailer, 'send_message') as send_message:
+            send_message.side_effect = IOError('interrupted')
+            admin_email(self.recipients, 'subject', 'body')
+        eq_(retry.call_count, 1)
+        eq_(str(retry.call_args[1]['exc']), 'interrupted')
+        eq_(len(self.sink.messages), 0)
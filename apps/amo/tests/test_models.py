@@ -1,12 +1,16 @@
 
-from mock import Mock
+import caching.invalidation
+from mock import Mock, patch
 from nose.tools import eq_
 
 import amo.models
-from amo.models import manual_order
+from amo.middleware import CoalesceInvalidationMiddleware
+from amo.models import coalesce_invalidation, manual_order
+from amo.tasks import set_modified_on_object
 from amo.tests import TestCase
 from amo import models as context
 from addons.models import Addon
+from tags.models import Tag
 
 
 class ManualOrderTest(TestCase):
@@ -43,6 +47,93 @@ def test_use_master():
     eq_(local.pinned, False)
 
 
+class TestCoalesceInvalidation(TestCase):
+    fixtures = ['base/addon_3615']
+
+    def cache_calls(self, func):
+        """How many round trips cache-machine makes while `func` runs."""
+        cache = caching.invalidation.cache
+        with patch.object(cache, 'get_many', wraps=cache.get_many) as get:
+            with patch.object(cache, 'delete_many',
+                              wraps=cache.delete_many) as delete:
+                func()
+        return get.call_count + delete.call_count
+
+    def test_bulk_update(self):
+        tags = [Tag.objects.create(tag_text='tag-%s' % x) for x in range(10)]
+
+        def save_all():
+            for tag in tags:
+                tag.save()
+
+        def save_coalesced():
+            with coalesce_invalidation():
+                save_all()
+
+        single = self.cache_calls(tags[0].save)
+        eq_(self.cache_calls(save_all), 10 * single)
+        eq_(self.cache_calls(save_coalesced), single)
+
+    def test_invalidated_on_exit(self):
+        eq_(Addon.objects.get(pk=3615).site_specific, True)
+        with coalesce_invalidation():
+            with coalesce_invalidation():
+                addon = Addon.objects.get(pk=3615)
+                addon.site_specific = False
+                addon.save()
+            assert context._locals.pending_invalidation
+            # Nothing stale is read while invalidation is waiting.
+            eq_(Addon.objects.get(pk=3615).site_specific, False)
+        eq_(context._locals.pending_invalidation, None)
+        eq_(Addon.objects.get(pk=3615).site_specific, False)
+
+    def test_middleware(self):
+        middleware = CoalesceInvalidationMiddleware()
+        request, response = Mock(), Mock()
+        middleware.process_request(request)
+        eq_(context._locals.coalesce_depth, 1)
+        eq_(middleware.process_response(request, response), response)
+        eq_(context._locals.coalesce_depth, 0)
+        # A second response for the same request changes nothing.
+        middleware.process_response(request, response)
+        eq_(context._locals.coalesce_depth, 0)
+
+    def test_middleware_left_behind(self):
+        middleware = CoalesceInvalidationMiddleware()
+        context.start_coalescing()
+        middleware.process_request(Mock())
+        eq_(context._locals.coalesce_depth, 1)
+        context.flush_invalidation()
+
+    def test_sent_before_task(self):
+        pending = []
+
+        def apply_async(task, *args, **kw):
+            pending.append(set(context._locals.pending_invalidation))
+
+        with patch.object(context, '_invalidate_keys') as invalidate:
+            with patch.object(context, '_apply_async', apply_async):
+                with coalesce_invalidation():
+                    Addon.objects.get(pk=3615).save()
+                    set_modified_on_object.delay(Addon.objects.get(pk=3615))
+                    assert context._locals.coalesce_depth
+        # The worker finds the cache already invalidated.
+        eq_(pending, [set()])
+        eq_(invalidate.call_count, 1)
+        assert invalidate.call_args[0][0]
+
+    def test_defer(self):
+        calls = []
+        with coalesce_invalidation():
+            context.defer(calls.append, 1)
+            context.defer(calls.append, 2)
+            context.defer(calls.append, 1)
+            eq_(calls, [])
+        eq_(calls, [set([1, 2])])
+        context.defer(calls.append, 3)
+        eq_(calls, [set([1, 2]), set([3])])
+
+
 class TestModelBase(TestCase):
     fixtures = ['base/addon_3615']
 
@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+
+import mock
+import redisutils
+from nose.tools import eq_, ok_
+
+import amo.tests
+from amo.tasks import (coalesce_purges, process_front_end_purges,
+                       queue_front_end_purge, PURGE_SINCE)
+
+
+class TestCoalescePurges(amo.tests.TestCase):
+
+    def test_wildcards(self):
+        eq_(coalesce_purges(['*/addon/a/*', '*/addon/a/eula/*',
+                             '/en-US/firefox/addon/a/', '*/addon/b/']),
+            ['*/addon/a/*', '*/addon/b/'])
+
+    def test_duplicates(self):
+        eq_(coalesce_purges(['/a', '/a', '*/b/', '*/b/']), ['*/b/', '/a'])
+
+    def test_literal(self):
+        # Only * is a wildcard.
+        eq_(coalesce_purges(['*/a.b?x=*', '/en-US/aXb?x=1', '/a.b?x=1']),
+            ['*/a.b?x=*', '/en-US/aXb?x=1'])
+
+
+@mock.patch('amo.tasks.flush_urls')
+class TestFrontEndPurges(amo.tests.TestCase):
+
+    def test_batches(self, flush_urls):
+        for x in range(5):
+            queue_front_end_purge(['/a/%s' % x, '*/b/*'])
+        queue_front_end_purge(['/c/b/d'])
+        eq_(process_front_end_purges(size=2), 6)
+        eq_(flush_urls.call_count, 3)
+        eq_(process_front_end_purges(), 0)
+
+    def test_max_delay(self, flush_urls):
+        queue_front_end_purge(['/a'])
+        ok_(not flush_urls.called)
+        since = time.time() - settings.FRONT_END_PURGE_MAX_DELAY - 1
+        redisutils.connections['master'].set(PURGE_SINCE, int(since))
+        queue_front_end_purge(['/b'])
+        eq_(flush_urls.call_count, 1)
+        eq_(sorted(flush_urls.call_args[0][0]),
+            [settings.SITE_URL + '/a', settings.SITE_URL + '/b'])
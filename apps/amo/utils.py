@@ -150,11 +150,15 @@ def send_mail(subject, message, from_email=None, recipient_list=None,
               fail_silently=False, use_blacklist=True, perm_setting=None,
               manage_url=None, headers=None, cc=None, real_email=False,
               html_message=None, attachments=None, async=False,
-              max_retries=None):
+              max_retries=None, recipient_headers=None):
     """
     A wrapper around django.core.mail.EmailMessage.
 
     Adds blacklist checking and error logging.
+
+    `recipient_headers` maps an email to extra headers for that recipient
+    only. Mails with a `perm_setting` go out one per recipient, so that's
+    where they are used.
     """
     from amo.helpers import absolutify
     from amo.tasks import send_email
@@ -228,41 +232,57 @@ def send_mail(subject, message, from_email=None, recipient_list=None,
                 manage_url = urlparams(absolutify(
                     reverse('users.edit', add_prefix=False)),
                     'acct-notify')
-            for recipient in white_list:
-                # Add unsubscribe link to footer.
-                token, hash = UnsubscribeCode.create(recipient)
-                unsubscribe_url = absolutify(reverse('users.unsubscribe',
-                    args=[token, hash, perm_setting.short],
-                    add_prefix=False))
-
-                context_options = {
-                    'message': message,
-                    'manage_url': manage_url,
-                    'unsubscribe_url': unsubscribe_url,
-                    'perm_setting': perm_setting.label,
-                    'SITE_URL': settings.SITE_URL,
-                    'mandatory': perm_setting.mandatory,
-                    # Hide "Unsubscribe" links in Marketplace emails
-                    # (bug 802379).
-                    'show_unsubscribe': not settings.MARKETPLACE
-                }
-                # Render this template in the default locale until
-                # bug 635840 is fixed.
-                with no_translation():
-                    context = Context(context_options, autoescape=False)
-                    message_with_unsubscribe = text_template.render(context)
 
+            # The footer only differs by the unsubscribe link, so render the
+            # templates once around a placeholder and fill it in per
+            # recipient.
+            placeholder = 'unsubscribe-%s' % uuid.uuid4().hex
+            context_options = {
+                'message': message,
+                'manage_url': manage_url,
+                'unsubscribe_url': placeholder,
+                'perm_setting': perm_setting.label,
+                'SITE_URL': settings.SITE_URL,
+                'mandatory': perm_setting.mandatory,
+                # Hide "Unsubscribe" links in Marketplace emails
+                # (bug 802379).
+                'show_unsubscribe': not settings.MARKETPLACE
+            }
+            # Render this template in the default locale until
+            # bug 635840 is fixed.
+            with no_translation():
+                context = Context(context_options, autoescape=False)
+                text_with_placeholder = text_template.render(context)
                 if html_message:
                     context_options['message'] = html_message
-                    with no_translation():
-                        context = Context(context_options, autoescape=False)
-                        html_with_unsubscribe = html_template.render(context)
-                        result = send([recipient], message_with_unsubscribe,
-                                      html_message=html_with_unsubscribe,
-                                      attachments=attachments)
-                else:
-                    result = send([recipient], message_with_unsubscribe,
-                                  attachments=attachments)
+                    context = Context(context_options, autoescape=False)
+                    html_with_placeholder = html_template.render(context)
+
+            # Share one connection between the recipients when sending
+            # synchronously.
+            options = {}
+            if not async and len(white_list) > 1:
+                options['connection'] = get_email_backend(real_email)
+                options['connection'].open()
+            try:
+                for recipient in white_list:
+                    # Add unsubscribe link to footer.
+                    token, hash = UnsubscribeCode.create(recipient)
+                    unsubscribe_url = absolutify(reverse('users.unsubscribe',
+                        args=[token, hash, perm_setting.short],
+                        add_prefix=False))
+                    fill = lambda s: s.replace(placeholder, unsubscribe_url)
+                    if html_message:
+                        options['html_message'] = fill(html_with_placeholder)
+                    if recipient_headers:
+                        options['headers'] = dict(headers)
+                        options['headers'].update(
+                            recipient_headers.get(recipient, {}))
+                    result = send([recipient], fill(text_with_placeholder),
+                                  attachments=attachments, **options)
+            finally:
+                if 'connection' in options:
+                    options['connection'].close()
         else:
             result = send(recipient_list, message=message,
                           html_message=html_message, attachments=attachments)
@@ -125,6 +125,13 @@ def _cleanup_synced_collections(**kw):
         _cleanup_synced_collections.delay()
 
 
+@cronjobs.register
+def process_synced_collections():
+    """Apply the synced collection counts spooled by the discovery pane."""
+    total = SyncedCollection.process_queue()
+    task_log.info('Processed %s synced collection events.' % total)
+
+
 @cronjobs.register
 def drop_collection_recs():
     _drop_collection_recs.delay()
@@ -1,5 +1,6 @@
 import collections
 import hashlib
+import json
 import os
 import re
 import time
@@ -9,8 +10,11 @@ from datetime import datetime
 from django.conf import settings
 from django.core.cache import cache
 from django.db import connection, models, transaction
+from django.db.models import F
 
 import caching.base as caching
+import commonware.log
+import redisutils
 
 import amo
 import amo.models
@@ -29,6 +33,8 @@ from versions import compare
 
 SPECIAL_SLUGS = amo.COLLECTION_SPECIAL_SLUGS
 
+log = commonware.log.getLogger('z.collections')
+
 
 class TopTags(object):
     """Descriptor to manage a collection's top tags in cache."""
@@ -533,6 +539,8 @@ class SyncedCollection(CollectionBase, amo.models.ModelBase):
     count = models.IntegerField("Number of users with this collection.",
                                 default=0)
 
+    QUEUE = 'synced-collections:queue'
+
     class Meta:
         db_table = 'synced_collections'
 
@@ -552,6 +560,88 @@ class SyncedCollection(CollectionBase, amo.models.ModelBase):
             self.save()
         transaction.commit_unless_managed()
 
+    @classmethod
+    def queue(cls, addon_index, addon_ids, delta):
+        """
+        Spool a count change for the collection matching `addon_index`.
+
+        The discovery pane sees far more traffic than we can write to the db,
+        so requests only append to a redis list and `process_queue` applies
+        the events in bulk later on.
+        """
+        event = json.dumps([addon_index, addon_ids, delta])
+        try:
+            redisutils.connections['master'].rpush(cls.QUEUE, event)
+        except Exception, e:
+            log.error(u'Could not queue synced collection "%s" (%s).'
+                      % (addon_index, e))
+
+    @classmethod
+    def process_queue(cls, size=1000):
+        """
+        Drain the queue `size` events at a time. Returns events seen.
+
+        Events are only trimmed from the queue once `apply_counts` has
+        committed, so a failed write leaves them to be retried on the next
+        run. Producers only append, and the cron lock keeps this the only
+        consumer, so the head of the list can't change in between.
+        """
+        redis = redisutils.connections['master']
+        total = 0
+        while True:
+            events = redis.lrange(cls.QUEUE, 0, size - 1)
+            if not events:
+                return total
+            cls.apply_counts(json.loads(e) for e in events)
+            redis.ltrim(cls.QUEUE, len(events), -1)
+            total += len(events)
+
+    @classmethod
+    @transaction.commit_on_success
+    def apply_counts(cls, events):
+        """
+        Collapse (addon_index, addon_ids, delta) events and write them out.
+
+        New collections are created with a single bulk insert (plus one for
+        their add-ons) and existing ones get one UPDATE per distinct delta.
+        """
+        counts = collections.defaultdict(int)
+        addons = {}
+        for index, addon_ids, delta in events:
+            counts[index] += delta
+            if addon_ids:
+                addons[index] = addon_ids
+
+        existing = dict(cls.objects.no_cache()
+                        .filter(addon_index__in=counts.keys())
+                        .values_list('addon_index', 'id'))
+
+        # Decrements for collections we never stored are dropped.
+        new = [cls(addon_index=index, count=count)
+               for index, count in counts.items()
+               if index not in existing and count > 0 and index in addons]
+        if new:
+            cls.objects.bulk_create(new)
+            created = (cls.objects.no_cache()
+                       .filter(addon_index__in=[c.addon_index for c in new])
+                       .values_list('addon_index', 'id'))
+            values = ['(%s,%s)' % (int(addon), pk)
+                      for index, pk in created for addon in addons[index]]
+            if values:
+                cursor = connection.cursor()
+                cursor.execute("""
+                    INSERT INTO synced_addons_collections
+                        (addon_id, collection_id)
+                    VALUES %s""" % ','.join(values))
+
+        by_delta = collections.defaultdict(list)
+        for index, pk in existing.items():
+            if counts[index]:
+                by_delta[counts[index]].append(pk)
+        for delta, pks in by_delta.items():
+            (cls.objects.no_cache().filter(id__in=pks)
+             .update(count=F('count') + delta))
+
 
 class SyncedCollectionAddon(models.Model):
     addon = models.ForeignKey(Addon)
@@ -2,6 +2,8 @@ import datetime
 import itertools
 import random
 
+from django.db import DatabaseError
+
 import mock
 from nose.tools import eq_
 
@@ -10,7 +12,8 @@ import amo.tests
 from access.models import Group
 from addons.models import Addon, AddonRecommendation
 from bandwagon.models import (Collection, CollectionAddon, CollectionUser,
-                              CollectionWatcher, RecommendedCollection)
+                              CollectionWatcher, RecommendedCollection,
+                              SyncedCollection)
 from devhub.models import ActivityLog
 from bandwagon import tasks
 from users.models import UserProfile
@@ -227,3 +230,54 @@ class TestRecommendations(amo.tests.TestCase):
         recs = RecommendedCollection.build_recs([7, 3, 8])
         # 3 should not be in the list since we already have it.
         eq_(recs, [1, 2])
+
+
+class TestSyncedCollectionQueue(amo.tests.TestCase):
+    fixtures = ['base/addon-recs']
+    ids = [5299, 1843, 2464, 7661, 5369]
+
+    def setUp(self):
+        self.index = SyncedCollection.make_index(self.ids)
+
+    def test_duplicates_collapsed(self):
+        for x in range(5):
+            SyncedCollection.queue(self.index, self.ids, 1)
+        eq_(SyncedCollection.process_queue(), 5)
+        c = SyncedCollection.objects.get()
+        eq_(c.addon_index, self.index)
+        eq_(c.count, 5)
+        eq_(sorted(c.addons.values_list('id', flat=True)), sorted(self.ids))
+
+    def test_existing_updated(self):
+        c = SyncedCollection.objects.create(addon_index=self.index, count=3)
+        SyncedCollection.queue(self.index, self.ids, 1)
+        SyncedCollection.queue(self.index, None, -1)
+        SyncedCollection.queue(self.index, self.ids, 1)
+        SyncedCollection.process_queue()
+        eq_(SyncedCollection.objects.no_cache().get(id=c.id).count, 4)
+
+    def test_unknown_decrement_dropped(self):
+        SyncedCollection.queue(self.index, None, -1)
+        SyncedCollection.process_queue()
+        eq_(SyncedCollection.objects.count(), 0)
+
+    def test_batches(self):
+        other = SyncedCollection.make_index(self.ids[:2])
+        SyncedCollection.queue(self.index, self.ids, 1)
+        SyncedCollection.queue(other, self.ids[:2], 1)
+        SyncedCollection.queue(self.index, self.ids, 1)
+        eq_(SyncedCollection.process_queue(size=2), 3)
+        eq_(dict(SyncedCollection.objects.values_list('addon_index', 'count')),
+            {self.index: 2, other: 1})
+
+    def test_failed_apply_kept(self):
+        SyncedCollection.queue(self.index, self.ids, 1)
+        SyncedCollection.queue(self.index, self.ids, 1)
+        with mock.patch.object(SyncedCollection, 'apply_counts') as apply:
+            apply.side_effect = DatabaseError('gone away')
+            with self.assertRaises(DatabaseError):
+                SyncedCollection.process_queue()
+        eq_(SyncedCollection.objects.count(), 0)
+        # The events are still queued for the next run.
+        eq_(SyncedCollection.process_queue(), 2)
+        eq_(SyncedCollection.objects.get().count, 2)
@@ -9,9 +9,11 @@ import amo
 import amo.search
 import amo.utils
 from addons.models import Addon
+from files.models import File
 from search.utils import floor_version
 from stats.models import UpdateCount
 from versions.compare import version_int as vint
+from versions.models import ApplicationsVersions, Version
 from lib.es.utils import get_indices
 
 from .models import AppCompat, CompatReport, CompatTotals
@@ -21,8 +23,20 @@ log = logging.getLogger('z.compat')
 
 @cronjobs.register
 def compatibility_report(index=None, aliased=True):
-    docs = defaultdict(dict)
     indices = get_indices(index)
+    docs = compat_docs()
+
+    # Send it all to the index.
+    for chunk in amo.utils.chunked(docs.values(), 150):
+        for doc in chunk:
+            for index in indices:
+                AppCompat.index(doc, id=doc['id'], bulk=True, index=index)
+        amo.search.get_es().flush_bulk(forced=True)
+
+
+def compat_docs(chunk_size=1000):
+    """Build the AppCompat documents for every add-on with update counts."""
+    docs = defaultdict(dict)
 
     # Gather all the data for the index.
     for app in amo.APP_USAGE:
@@ -37,55 +51,8 @@ def compatibility_report(index=None, aliased=True):
                                         date=latest)
 
         updates = dict(qs.values_list('addon', 'count'))
-        for chunk in amo.utils.chunked(updates.items(), 50):
-            chunk = dict(chunk)
-            for addon in Addon.objects.filter(id__in=chunk):
-                doc = docs[addon.id]
-                doc.update(id=addon.id, slug=addon.slug, guid=addon.guid,
-                           binary=addon.binary_components,
-                           name=unicode(addon.name), created=addon.created,
-                           current_version=addon.current_version.version,
-                           current_version_id=addon.current_version.pk)
-                doc['count'] = chunk[addon.id]
-                doc.setdefault('top_95',
-                               defaultdict(lambda: defaultdict(dict)))
-                doc.setdefault('top_95_all', {})
-                doc.setdefault('usage', {})[app.id] = updates[addon.id]
-                doc.setdefault('works', {}).setdefault(app.id, {})
-
-                # Populate with default counts for all app versions.
-                for ver in versions:
-                    doc['works'][app.id][vint(ver['main'])] = {
-                        'success': 0,
-                        'failure': 0,
-                        'total': 0,
-                        'failure_ratio': 0.0,
-                    }
-
-                # Group reports by `major`.`minor` app version.
-                reports = (CompatReport.objects
-                           .filter(guid=addon.guid, app_guid=app.guid)
-                           .values_list('app_version', 'works_properly')
-                           .annotate(Count('id')))
-                for ver, works_properly, cnt in reports:
-                    ver = vint(floor_version(ver))
-                    major = [v['main'] for v in versions
-                             if vint(v['previous']) < ver <= vint(v['main'])]
-                    if major:
-                        w = doc['works'][app.id][vint(major[0])]
-                        # Tally number of success and failure reports.
-                        w['success' if works_properly else 'failure'] += cnt
-                        w['total'] += cnt
-                        # Calculate % of incompatibility reports.
-                        w['failure_ratio'] = w['failure'] / float(w['total'])
-
-                if app not in addon.compatible_apps:
-                    continue
-                compat = addon.compatible_apps[app]
-                d = {'min': compat.min.version_int,
-                     'max': compat.max.version_int}
-                doc.setdefault('support', {})[app.id] = d
-                doc.setdefault('max_version', {})[app.id] = compat.max.version
+        for chunk in amo.utils.chunked(updates.keys(), chunk_size):
+            add_app_docs(docs, app, versions, chunk, updates)
 
         total = sum(updates.values())
         # Remember the total so we can show % of usage later.
@@ -119,9 +86,80 @@ def compatibility_report(index=None, aliased=True):
             running_total += doc['count']
             doc['top_95'][app][ver] = running_total < (.95 * total)
 
-    # Send it all to the index.
-    for chunk in amo.utils.chunked(docs.values(), 150):
-        for doc in chunk:
-            for index in indices:
-                AppCompat.index(doc, id=doc['id'], bulk=True, index=index)
-        amo.search.get_es().flush_bulk(forced=True)
+    return docs
+
+
+def add_app_docs(docs, app, versions, ids, updates):
+    """
+    Fill in `docs` for a chunk of add-on ids and one app. Everything is
+    fetched with a handful of queries for the whole chunk rather than a few
+    per add-on.
+    """
+    addons = list(Addon.objects.no_cache().filter(id__in=ids)
+                  .only_translations())
+    version_ids = [a._current_version_id for a in addons]
+    current = dict(Version.objects.no_cache().filter(id__in=version_ids)
+                   .values_list('id', 'version'))
+    binary = set(File.objects.no_cache()
+                 .filter(version__in=version_ids, binary_components=True)
+                 .values_list('version', flat=True))
+    support = dict(
+        (version, (min_int, max_int, max_version))
+        for version, min_int, max_int, max_version in
+        ApplicationsVersions.objects.no_cache()
+        .filter(version__in=version_ids, application=app.id)
+        .values_list('version', 'min__version_int', 'max__version_int',
+                     'max__version'))
+
+    # Group reports by add-on and app version, we'll roll the app versions up
+    # to `major`.`minor` below.
+    reports = defaultdict(list)
+    for guid, ver, works_properly, cnt in (
+            CompatReport.objects.no_cache()
+            .filter(guid__in=[a.guid for a in addons if a.guid],
+                    app_guid=app.guid)
+            .values_list('guid', 'app_version', 'works_properly')
+            .annotate(Count('id')).order_by()):
+        reports[guid].append((ver, works_properly, cnt))
+
+    for addon in addons:
+        version_id = addon._current_version_id
+        doc = docs[addon.id]
+        doc.update(id=addon.id, slug=addon.slug, guid=addon.guid,
+                   binary=version_id in binary,
+                   name=unicode(addon.name), created=addon.created,
+                   current_version=current.get(version_id),
+                   current_version_id=version_id)
+        doc['count'] = updates[addon.id]
+        doc.setdefault('top_95', defaultdict(lambda: defaultdict(dict)))
+        doc.setdefault('top_95_all', {})
+        doc.setdefault('usage', {})[app.id] = updates[addon.id]
+        doc.setdefault('works', {}).setdefault(app.id, {})
+
+        # Populate with default counts for all app versions.
+        for ver in versions:
+            doc['works'][app.id][vint(ver['main'])] = {
+                'success': 0,
+                'failure': 0,
+                'total': 0,
+                'failure_ratio': 0.0,
+            }
+
+        for ver, works_properly, cnt in reports.get(addon.guid, []):
+            ver = vint(floor_version(ver))
+            major = [v['main'] for v in versions
+                     if vint(v['previous']) < ver <= vint(v['main'])]
+            if major:
+                w = doc['works'][app.id][vint(major[0])]
+                # Tally number of success and failure reports.
+                w['success' if works_properly else 'failure'] += cnt
+                w['total'] += cnt
+                # Calculate % of incompatibility reports.
+                w['failure_ratio'] = w['failure'] / float(w['total'])
+
+        if version_id not in support:
+            continue
+        min_int, max_int, max_version = support[version_id]
+        doc.setdefault('support', {})[app.id] = {'min': min_int,
+                                                 'max': max_int}
+        doc.setdefault('max_version', {})[app.id] = max_version
@@ -1,4 +1,8 @@
 import json
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Count, Max
 
 from nose.tools import eq_
 from pyquery import PyQuery as pq
@@ -6,8 +10,13 @@ from pyquery import PyQuery as pq
 import amo
 import amo.tests
 from amo.urlresolvers import reverse
-from addons.models import Addon
+from addons.models import Addon, AppSupport
+from compat.cron import compat_docs
 from compat.models import CompatReport
+from mkt.api import profiler
+from search.utils import floor_version
+from stats.models import UpdateCount
+from versions.compare import version_int as vint
 
 
 # This is the structure sent to /compatibility/incoming from the ACR.
@@ -230,3 +239,130 @@ class TestReporterDetail(amo.tests.TestCase):
         r = self.check_table(good=1, bad=0, appver='', report_pks=[0])
         msg = 'Unknown (%s)' % app_guid
         assert msg in r.content, 'Expected %s in body' % msg
+
+
+def per_addon_docs():
+    """The original one add-on at a time compat_docs, to compare against."""
+    docs = defaultdict(dict)
+    for app in amo.APP_USAGE:
+        versions = [c for c in amo.COMPAT if c['app'] == app.id]
+        latest = UpdateCount.objects.aggregate(d=Max('date'))['d']
+        qs = UpdateCount.objects.filter(addon__appsupport__app=app.id,
+                                        addon__disabled_by_user=False,
+                                        addon__status__in=amo.VALID_STATUSES,
+                                        addon___current_version__isnull=False,
+                                        date=latest)
+        updates = dict(qs.values_list('addon', 'count'))
+        for addon in Addon.objects.filter(id__in=updates):
+            doc = docs[addon.id]
+            doc.update(id=addon.id, slug=addon.slug, guid=addon.guid,
+                       binary=addon.binary_components,
+                       name=unicode(addon.name), created=addon.created,
+                       current_version=addon.current_version.version,
+                       current_version_id=addon.current_version.pk)
+            doc['count'] = updates[addon.id]
+            doc.setdefault('top_95', defaultdict(lambda: defaultdict(dict)))
+            doc.setdefault('top_95_all', {})
+            doc.setdefault('usage', {})[app.id] = updates[addon.id]
+            doc.setdefault('works', {}).setdefault(app.id, {})
+            for ver in versions:
+                doc['works'][app.id][vint(ver['main'])] = {
+                    'success': 0, 'failure': 0, 'total': 0,
+                    'failure_ratio': 0.0}
+            reports = (CompatReport.objects
+                       .filter(guid=addon.guid, app_guid=app.guid)
+                       .values_list('app_version', 'works_properly')
+                       .annotate(Count('id')))
+            for ver, works_properly, cnt in reports:
+                ver = vint(floor_version(ver))
+                major = [v['main'] for v in versions
+                         if vint(v['previous']) < ver <= vint(v['main'])]
+                if major:
+                    w = doc['works'][app.id][vint(major[0])]
+                    w['success' if works_properly else 'failure'] += cnt
+                    w['total'] += cnt
+                    w['failure_ratio'] = w['failure'] / float(w['total'])
+            if app not in addon.compatible_apps:
+                continue
+            compat = addon.compatible_apps[app]
+            doc.setdefault('support', {})[app.id] = {
+                'min': compat.min.version_int, 'max': compat.max.version_int}
+            doc.setdefault('max_version', {})[app.id] = compat.max.version
+
+        total = sum(updates.values())
+        running_total = 0
+        for addon, count in sorted(updates.items(), key=lambda x: x[1],
+                                   reverse=True):
+            running_total += count
+            docs[addon]['top_95_all'][app.id] = running_total < (.95 * total)
+
+    for compat in amo.COMPAT:
+        app, ver = compat['app'], vint(compat['previous'])
+        supported = [doc for doc in docs.values()
+                     if app in doc.get('support', {})
+                        and doc['support'][app]['max'] >= ver]
+        supported = sorted(supported, key=lambda d: d['count'], reverse=True)
+        total = sum(doc['count'] for doc in supported)
+        running_total = 0
+        for doc in supported:
+            running_total += doc['count']
+            doc['top_95'][app][ver] = running_total < (.95 * total)
+    return docs
+
+
+class TestCompatDocs(amo.tests.TestCase):
+
+    def setUp(self):
+        self.today = date.today()
+        main = [c['main'] for c in amo.COMPAT if c['app'] == amo.FIREFOX.id]
+        self.addons = []
+        for x, (max_version, count) in enumerate([(main[0], 1000),
+                                                  (main[2], 500),
+                                                  (main[-1], 10),
+                                                  ('5.0', 1)]):
+            addon = amo.tests.addon_factory(
+                version_kw={'min_app_version': '4.0',
+                            'max_app_version': max_version},
+                file_kw={'binary_components': x == 1})
+            AppSupport.objects.create(addon=addon, app_id=amo.FIREFOX.id)
+            UpdateCount.objects.create(addon=addon, count=count,
+                                       date=self.today)
+            for ver, works in [(main[0], True), (main[0] + 'a1', False),
+                               (main[1], False), ('3.6', True)][x:]:
+                CompatReport.objects.create(guid=addon.guid,
+                                            app_guid=amo.FIREFOX.guid,
+                                            app_version=ver,
+                                            works_properly=works)
+            self.addons.append(addon)
+        # Reports for other apps and unknown add-ons are ignored.
+        CompatReport.objects.create(guid=self.addons[0].guid,
+                                    app_guid=amo.THUNDERBIRD.guid,
+                                    app_version=main[0], works_properly=True)
+        CompatReport.objects.create(guid='unknown', app_version=main[0],
+                                    app_guid=amo.FIREFOX.guid)
+
+    def test_matches_per_addon(self):
+        eq_(compat_docs(chunk_size=3), per_addon_docs())
+
+    def test_fewer_queries(self):
+        with profiler.profile() as before:
+            per_addon_docs()
+        with profiler.profile() as after:
+            docs = compat_docs()
+        eq_(len(docs), len(self.addons))
+        assert after.query_count < before.query_count, (
+            '%s queries, %s per add-on' % (after.query_count,
+                                           before.query_count))
+
+    def test_queries_per_chunk(self):
+        # The number of queries depends on the number of apps, not add-ons.
+        with profiler.profile() as p:
+            compat_docs()
+        for x in range(5):
+            addon = amo.tests.addon_factory()
+            AppSupport.objects.create(addon=addon, app_id=amo.FIREFOX.id)
+            UpdateCount.objects.create(addon=addon, count=x + 1,
+                                       date=self.today)
+        with self.assertMaxQueries(p.query_count):
+            docs = compat_docs()
+        eq_(len(docs), len(self.addons) + 5)
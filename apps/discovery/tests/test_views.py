@@ -5,7 +5,6 @@ from django.core.cache import cache
 
 from nose.tools import eq_
 from pyquery import PyQuery as pq
-import waffle
 
 import amo
 import amo.tests
@@ -163,8 +162,6 @@ class TestRecs(amo.tests.TestCase):
         eq_(one, two)
 
     def test_update_new_index(self):
-        waffle.models.Sample.objects.create(
-            name='disco-pane-store-collections', percent='100.0')
         response = self.client.post(self.url, self.json,
                                     content_type='application/json')
         one = json.loads(response.content)
@@ -179,11 +176,24 @@ class TestRecs(amo.tests.TestCase):
         # Tokens are based on guid list, so these should be different.
         assert one['token2'] != two['token2']
         assert one['addons'] != two['addons']
+        SyncedCollection.process_queue()
         eq_(SyncedCollection.objects.filter(addon_index=one['token2']).count(),
             1)
         eq_(SyncedCollection.objects.filter(addon_index=two['token2']).count(),
             1)
 
+    def test_new_index_decrements_old_token(self):
+        self.client.post(self.url, self.json, content_type='application/json')
+        SyncedCollection.process_queue()
+        old = SyncedCollection.objects.get()
+        eq_(old.count, 1)
+
+        post_data = json.dumps(dict(guids=self.guids[:1],
+                                    token2=old.addon_index))
+        self.client.post(self.url, post_data, content_type='application/json')
+        SyncedCollection.process_queue()
+        eq_(SyncedCollection.objects.no_cache().get(id=old.id).count, 0)
+
 
 class TestModuleAdmin(amo.tests.TestCase):
     fixtures = ['base/apps']
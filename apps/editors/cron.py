@@ -0,0 +1,16 @@
+import commonware.log
+import cronjobs
+
+from editors.models import EditorQueue
+
+
+log = commonware.log.getLogger('z.cron')
+
+
+@cronjobs.register
+def reconcile_editor_queue():
+    """Fix up editor_queue rows that have drifted from the queue queries."""
+    stale = EditorQueue.reconcile()
+    if stale:
+        log.info('Refreshed the review queues of %s add-ons: %s'
+                 % (len(stale), stale[:100]))
@@ -154,6 +154,13 @@ class QueueSearchForm(happyforms.Form):
 
     def filter_qs(self, qs):
         data = self.cleaned_data
+        if (data['application_id'] or data['platform_ids'] or
+            data['text_query']):
+            # The materialized queues only join add-ons and versions for the
+            # searches that need them, and those joins can repeat rows.
+            qs.base_query['from'].extend(qs.base_query.pop('search_from', []))
+            qs.base_query.setdefault('group_by',
+                                     qs.base_query['select']['id'])
         if data['admin_review']:
             qs = qs.filter(admin_review=data['admin_review'])
         if data['addon_type_ids']:
@@ -19,9 +19,9 @@ from addons.models import Addon
 from amo.helpers import absolutify, breadcrumbs, page_title
 from amo.urlresolvers import reverse
 from amo.utils import send_mail as amo_send_mail
-from editors.models import (EscalationQueue, ReviewerScore, ViewFastTrackQueue,
-                            ViewFullReviewQueue, ViewPendingQueue,
-                            ViewPreliminaryQueue)
+from editors.models import (EscalationQueue, FastTrackQueue, FullReviewQueue,
+                            MATERIALIZED, PendingQueue, PreliminaryQueue,
+                            ReviewerScore)
 from editors.sql_table import SQLTable
 from versions.models import Version
 
@@ -287,25 +287,25 @@ class EditorQueueTable(SQLTable, ItemStateTable):
 class ViewPendingQueueTable(EditorQueueTable):
 
     class Meta(EditorQueueTable.Meta):
-        model = ViewPendingQueue
+        model = PendingQueue
 
 
 class ViewFullReviewQueueTable(EditorQueueTable):
 
     class Meta(EditorQueueTable.Meta):
-        model = ViewFullReviewQueue
+        model = FullReviewQueue
 
 
 class ViewPreliminaryQueueTable(EditorQueueTable):
 
     class Meta(EditorQueueTable.Meta):
-        model = ViewPreliminaryQueue
+        model = PreliminaryQueue
 
 
 class ViewFastTrackQueueTable(EditorQueueTable):
 
     class Meta(EditorQueueTable.Meta):
-        model = ViewFastTrackQueue
+        model = FastTrackQueue
 
 
 log = commonware.log.getLogger('z.mailer')
@@ -402,6 +402,7 @@ def get_position(addon):
         q = version.current_queue
         if not q:
             return False
+        q = MATERIALIZED[q]
 
         mins_query = q.objects.filter(id=addon.id)
         if mins_query.count() > 0:
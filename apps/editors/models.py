@@ -3,7 +3,7 @@ import datetime
 
 from django.conf import settings
 from django.core.cache import cache
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Sum
 from django.template import Context, loader
 from django.utils.datastructures import SortedDict
@@ -16,13 +16,14 @@ import amo.models
 from access.models import Group
 from amo.helpers import absolutify
 from amo.urlresolvers import reverse
-from amo.utils import cache_ns_key, send_mail
+from amo.utils import cache_ns_key, chunked, send_mail
 from addons.models import Addon, Persona
 from devhub.models import ActivityLog
 from editors.sql_model import RawSQLModel
+from files.models import File
 from translations.fields import save_signal, TranslatedField
 from users.models import UserForeignKey, UserProfile
-from versions.models import version_uploaded
+from versions.models import ApplicationsVersions, Version, version_uploaded
 
 
 user_log = commonware.log.getLogger('z.users')
@@ -108,6 +109,8 @@ class ViewQueue(RawSQLModel):
     waiting_time_days = models.IntegerField()
     waiting_time_hours = models.IntegerField()
     waiting_time_min = models.IntegerField()
+    waiting_since = models.DateTimeField()
+    version_id = models.IntegerField()
     is_version_specific = False
 
     def base_query(self):
@@ -125,6 +128,7 @@ class ViewQueue(RawSQLModel):
                 ('binary_components', 'files.binary_components'),
                 ('premium_type', 'addons.premium_type'),
                 ('latest_version', 'versions.version'),
+                ('version_id', 'versions.id'),
                 ('has_editor_comment', 'versions.has_editor_comment'),
                 ('has_info_request', 'versions.has_info_request'),
                 ('_file_platform_ids', """GROUP_CONCAT(DISTINCT
@@ -189,6 +193,7 @@ class ViewFullReviewQueue(ViewQueue):
     def base_query(self):
         q = super(ViewFullReviewQueue, self).base_query()
         q['select'].update({
+            'waiting_since': 'MAX(versions.nomination)',
             'waiting_time_days':
                 'TIMESTAMPDIFF(DAY, MAX(versions.nomination), NOW())',
             'waiting_time_hours':
@@ -209,6 +214,7 @@ class VersionSpecificQueue(ViewQueue):
     def base_query(self):
         q = copy.deepcopy(super(VersionSpecificQueue, self).base_query())
         q['select'].update({
+            'waiting_since': 'MAX(files.created)',
             'waiting_time_days':
                 'TIMESTAMPDIFF(DAY, MAX(files.created), NOW())',
             'waiting_time_hours':
@@ -255,6 +261,222 @@ class ViewFastTrackQueue(VersionSpecificQueue):
         return q
 
 
+class EditorQueue(models.Model):
+    """
+    The rows of the `ViewQueue` queries, stored ahead of time so the queue
+    pages don't join and group for every page and every count.
+
+    Kept up to date by `update_editor_queue` as add-ons, versions and files
+    change, and by the `reconcile_editor_queue` cron for anything that
+    changes behind their backs, like translations or `.update()` on a
+    queryset.
+    """
+    # Copied as is from the queue rows.
+    COPIED = ('addon_name', 'addon_slug', 'addon_status', 'addon_type_id',
+              'admin_review', 'is_site_specific', 'external_software',
+              'binary', 'binary_components', 'premium_type', 'is_restartless',
+              'is_jetpack', 'latest_version', 'has_info_request',
+              'has_editor_comment', 'waiting_since')
+
+    queue = models.CharField(max_length=20)
+    addon = models.ForeignKey(Addon, related_name='+')
+    version = models.ForeignKey(Version, related_name='+')
+    addon_name = models.CharField(max_length=255, null=True)
+    addon_slug = models.CharField(max_length=30, null=True)
+    addon_status = models.IntegerField()
+    addon_type_id = models.IntegerField()
+    admin_review = models.BooleanField()
+    is_site_specific = models.BooleanField()
+    external_software = models.BooleanField()
+    binary = models.BooleanField()
+    binary_components = models.BooleanField()
+    premium_type = models.IntegerField()
+    is_restartless = models.BooleanField()
+    is_jetpack = models.BooleanField()
+    latest_version = models.CharField(max_length=255)
+    has_info_request = models.BooleanField()
+    has_editor_comment = models.BooleanField()
+    file_platform_ids = models.CharField(max_length=255, null=True)
+    application_ids = models.CharField(max_length=255, null=True)
+    waiting_since = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'editor_queue'
+        unique_together = ('queue', 'addon')
+
+    def values(self):
+        return tuple(getattr(self, f.attname) for f in self._meta.fields
+                     if f.name != 'id')
+
+    @classmethod
+    def expected(cls, addons=None):
+        """
+        The rows the `ViewQueue` queries give right now, for `addons` or
+        every add-on if that's None.
+        """
+        rows = []
+        for queue, view in QUEUES.items():
+            qs = view.objects.all()
+            if addons is not None:
+                qs = qs.filter_raw('addons.id IN', addons)
+            for row in qs:
+                values = dict((k, getattr(row, k)) for k in cls.COPIED)
+                rows.append(cls(queue=queue, addon_id=row.id,
+                                version_id=row.version_id,
+                                file_platform_ids=row._file_platform_ids,
+                                application_ids=row._application_ids,
+                                **values))
+        return rows
+
+    @classmethod
+    def refresh(cls, addons):
+        """Replace the rows of `addons` with what the queries give now."""
+        addons = sorted(addons)
+        if not addons:
+            return
+        rows = cls.expected(addons)
+        cls._replace(addons, rows)
+
+    @classmethod
+    @transaction.commit_on_success
+    def _replace(cls, addons, rows):
+        # In one transaction, so that a refresh of the same add-ons running
+        # at the same time waits for this one instead of inserting twice.
+        cls.objects.filter(addon__in=addons).delete()
+        cls.objects.bulk_create(rows)
+
+    @classmethod
+    def reconcile(cls):
+        """
+        Refresh every add-on whose rows don't match the queries. Returns the
+        ids of the add-ons that were out of date.
+        """
+        expected = set(((r.queue, r.addon_id), r.values())
+                       for r in cls.expected())
+        stored = set(((r.queue, r.addon_id), r.values())
+                     for r in cls.objects.all())
+        stale = sorted(set(key[1] for key, values in expected ^ stored))
+        for chunk in chunked(stale, 100):
+            cls.refresh(chunk)
+        return stale
+
+
+class MaterializedQueue(ViewQueue):
+    """
+    A review queue read straight from `editor_queue`. Sorting by waiting
+    time goes by the indexed `waiting_since` column.
+    """
+    queue = None
+
+    def base_query(self):
+        select = SortedDict([
+            ('id', 'editor_queue.addon_id'),
+            ('version_id', 'editor_queue.version_id'),
+            ('_file_platform_ids', 'editor_queue.file_platform_ids'),
+            ('_application_ids', 'editor_queue.application_ids'),
+        ])
+        for name in EditorQueue.COPIED:
+            select[name] = 'editor_queue.%s' % name
+        select.update({
+            'waiting_time_days':
+                'TIMESTAMPDIFF(DAY, editor_queue.waiting_since, NOW())',
+            'waiting_time_hours':
+                'TIMESTAMPDIFF(HOUR, editor_queue.waiting_since, NOW())',
+            'waiting_time_min':
+                'TIMESTAMPDIFF(MINUTE, editor_queue.waiting_since, NOW())',
+        })
+        return {
+            'select': select,
+            'from': ['editor_queue'],
+            'where': ["editor_queue.queue = '%s'" % self.queue],
+            # What QueueSearchForm needs to filter on, only joined then.
+            'search_from': [
+                'JOIN addons ON (addons.id = editor_queue.addon_id)',
+                'JOIN versions ON (versions.id = editor_queue.version_id)',
+                'JOIN files ON (files.version_id = versions.id)'],
+            # The longer the wait, the earlier waiting_since.
+            'sort': {'waiting_time_days': ('waiting_since', True),
+                     'waiting_time_hours': ('waiting_since', True),
+                     'waiting_time_min': ('waiting_since', True)}}
+
+
+class FullReviewQueue(MaterializedQueue):
+    queue = 'nominated'
+
+
+class PendingQueue(MaterializedQueue):
+    queue = 'pending'
+    is_version_specific = True
+
+
+class PreliminaryQueue(MaterializedQueue):
+    queue = 'prelim'
+    is_version_specific = True
+
+
+class FastTrackQueue(MaterializedQueue):
+    queue = 'fast_track'
+    is_version_specific = True
+
+
+# The queries each queue is materialized from.
+QUEUES = SortedDict([('pending', ViewPendingQueue),
+                     ('nominated', ViewFullReviewQueue),
+                     ('prelim', ViewPreliminaryQueue),
+                     ('fast_track', ViewFastTrackQueue)])
+
+# The materialized queue to use for each of the queries.
+MATERIALIZED = {ViewPendingQueue: PendingQueue,
+                ViewFullReviewQueue: FullReviewQueue,
+                ViewPreliminaryQueue: PreliminaryQueue,
+                ViewFastTrackQueue: FastTrackQueue}
+
+
+def queue_editor_refresh(addons):
+    from editors.tasks import refresh_editor_queue
+    refresh_editor_queue.delay(sorted(addons))
+
+
+def update_editor_queue(sender, instance, **kw):
+    """
+    Refresh the queue rows of the add-on `instance` belongs to. That's done
+    by a task queued once the request or task saving it is over, with every
+    add-on it saved.
+    """
+    if kw.get('raw') or settings.MARKETPLACE:
+        return
+    try:
+        if sender is Addon:
+            addon = instance.id
+        elif sender is Version:
+            addon = instance.addon_id
+        else:
+            addon = instance.version.addon_id
+    except models.ObjectDoesNotExist:
+        return
+    amo.models.defer(queue_editor_refresh, addon)
+
+
+models.signals.post_save.connect(update_editor_queue, sender=Addon,
+                                 dispatch_uid='editor_queue_addon_save')
+models.signals.post_delete.connect(update_editor_queue, sender=Addon,
+                                   dispatch_uid='editor_queue_addon_delete')
+models.signals.post_save.connect(update_editor_queue, sender=Version,
+                                 dispatch_uid='editor_queue_version_save')
+models.signals.post_delete.connect(update_editor_queue, sender=Version,
+                                   dispatch_uid='editor_queue_version_delete')
+models.signals.post_save.connect(update_editor_queue, sender=File,
+                                 dispatch_uid='editor_queue_file_save')
+models.signals.post_delete.connect(update_editor_queue, sender=File,
+                                   dispatch_uid='editor_queue_file_delete')
+models.signals.post_save.connect(update_editor_queue,
+                                 sender=ApplicationsVersions,
+                                 dispatch_uid='editor_queue_apps_save')
+models.signals.post_delete.connect(update_editor_queue,
+                                   sender=ApplicationsVersions,
+                                   dispatch_uid='editor_queue_apps_delete')
+
+
 class PerformanceGraph(ViewQueue):
     id = models.IntegerField()
     yearmonth = models.CharField(max_length=7)
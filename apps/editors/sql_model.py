@@ -187,7 +187,16 @@ class RawSQLManager(object):
         return clone[0]
 
     def order_by(self, spec):
-        """Order by column (ascending) or -column (descending)."""
+        """Order by column (ascending) or -column (descending).
+
+        A base query can map a column to another one to sort by instead in
+        its 'sort' dictionary, eg: an expression to the indexed column it is
+        worked out from::
+
+            'sort': {'age': ('created', True)}
+
+        The second item says whether to reverse the direction.
+        """
         if not ORDER_PATTERN.match(spec):
             raise ValueError('Invalid order by value: %r' % spec)
         if spec.startswith('-'):
@@ -196,6 +205,10 @@ class RawSQLManager(object):
         else:
             dir = 'ASC'
             field = spec
+        if field in self.base_query.get('sort', {}):
+            field, reverse = self.base_query['sort'][field]
+            if reverse:
+                dir = 'ASC' if dir == 'DESC' else 'DESC'
         clone = self._clone()
         clone.base_query['order_by'].append('%s %s' %
                                             (clone._resolve_alias(field), dir))
@@ -13,13 +13,20 @@ from amo.decorators import write
 from amo.storage_utils import copy_stored_file, move_stored_file
 from amo.utils import LocalFileStorage, send_mail_jinja
 from devhub.models import ActivityLog, CommentLog, VersionLog
-from editors.models import ReviewerScore
+from editors.models import EditorQueue, ReviewerScore
 from versions.models import Version
 
 
 log = commonware.log.getLogger('z.task')
 
 
+@task
+def refresh_editor_queue(addons, **kw):
+    log.info('[%s] Refreshing the editor queue rows of add-ons: %s' %
+             (len(addons), addons))
+    EditorQueue.refresh(addons)
+
+
 @task
 def add_commentlog(items, **kw):
     log.info('[%s@%s] Adding CommentLog starting with ActivityLog: %s' %
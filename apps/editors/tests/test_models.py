@@ -4,19 +4,24 @@ import time
 
 from django.core import mail
 
-from nose.tools import eq_
+import mock
+from nose.tools import eq_, ok_
 
 import amo
 import amo.tests
+from amo.models import coalesce_invalidation
 from amo.tests import addon_factory
 from addons.models import Addon
 from versions.models import Version, version_uploaded, ApplicationsVersions
 from files.models import Platform, File
 from applications.models import Application, AppVersion
-from editors.models import (EditorSubscription, RereviewQueue, RereviewQueueTheme,
-                            ReviewerScore, send_notifications,
-                            ViewFastTrackQueue, ViewFullReviewQueue,
-                            ViewPendingQueue, ViewPreliminaryQueue)
+from editors.forms import QueueSearchForm
+from editors.models import (EditorQueue, EditorSubscription, MATERIALIZED,
+                            PendingQueue, QUEUES, RereviewQueue,
+                            RereviewQueueTheme, ReviewerScore,
+                            send_notifications, ViewFastTrackQueue,
+                            ViewFullReviewQueue, ViewPendingQueue,
+                            ViewPreliminaryQueue)
 from users.models import UserProfile
 
 
@@ -327,6 +332,161 @@ class TestFastTrackQueue(TestQueue):
         eq_(self.query(), ['full'])
 
 
+class TestEditorQueue(amo.tests.TestCase):
+    """The materialized queues must match the queries after every change."""
+
+    def rows(self, queue):
+        return sorted((r.id, r.version_id, sorted(r.file_platform_ids),
+                       sorted(r.application_ids)) +
+                      tuple(getattr(r, k) for k in EditorQueue.COPIED)
+                      for r in queue.objects.all())
+
+    def check(self):
+        for name, view in QUEUES.items():
+            eq_(self.rows(MATERIALIZED[view]), self.rows(view), name)
+
+    def queues(self, addon):
+        return sorted(EditorQueue.objects.filter(addon=addon)
+                                         .values_list('queue', flat=True))
+
+    def test_nominated(self):
+        addon = create_addon_file('Nominated', '0.1', amo.STATUS_NOMINATED,
+                                  amo.STATUS_UNREVIEWED)['addon']
+        self.check()
+        eq_(self.queues(addon), ['nominated'])
+
+    def test_search_by_platform(self):
+        for name, platform in (('Mac', amo.PLATFORM_MAC),
+                               ('Linux', amo.PLATFORM_LINUX)):
+            create_addon_file(name, '0.1', amo.STATUS_NOMINATED,
+                              amo.STATUS_UNREVIEWED, platform=platform)
+        form = QueueSearchForm({'platform_ids': [amo.PLATFORM_MAC.id]})
+        ok_(form.is_valid())
+        qs = form.filter_qs(MATERIALIZED[ViewFullReviewQueue].objects.all())
+        rows = list(qs)
+        eq_([r.addon_name for r in rows], ['Mac'])
+        eq_(rows[0].file_platform_ids, [amo.PLATFORM_MAC.id])
+
+    def test_addon_status(self):
+        res = create_addon_file('Prelim', '0.1', amo.STATUS_LITE,
+                                amo.STATUS_UNREVIEWED)
+        self.check()
+        eq_(self.queues(res['addon']), ['prelim'])
+        res['addon'].update(status=amo.STATUS_LITE_AND_NOMINATED)
+        self.check()
+        eq_(self.queues(res['addon']), ['nominated'])
+        res['file'].update(status=amo.STATUS_PUBLIC)
+        Addon.objects.get(pk=res['addon'].pk).update(status=amo.STATUS_PUBLIC)
+        self.check()
+        eq_(self.queues(res['addon']), [])
+
+    def test_file_status(self):
+        res = create_addon_file('Pending', '0.1', amo.STATUS_PUBLIC,
+                                amo.STATUS_UNREVIEWED)
+        self.check()
+        eq_(self.queues(res['addon']), ['pending'])
+        res['file'].update(status=amo.STATUS_PUBLIC)
+        self.check()
+        eq_(self.queues(res['addon']), [])
+
+    def test_new_version(self):
+        create_addon_file('Update', '0.1', amo.STATUS_PUBLIC,
+                          amo.STATUS_PUBLIC)
+        self.check()
+        res = create_addon_file('Update', '0.2', amo.STATUS_PUBLIC,
+                                amo.STATUS_UNREVIEWED)
+        self.check()
+        eq_(EditorQueue.objects.get(addon=res['addon']).version_id,
+            res['version'].id)
+
+    def test_version_deleted(self):
+        create_addon_file('Update', '0.1', amo.STATUS_PUBLIC,
+                          amo.STATUS_PUBLIC)
+        res = create_addon_file('Update', '0.2', amo.STATUS_PUBLIC,
+                                amo.STATUS_UNREVIEWED)
+        res['version'].delete()
+        self.check()
+        eq_(self.queues(res['addon']), [])
+
+    def test_file_deleted(self):
+        create_addon_file('Platforms', '0.1', amo.STATUS_PUBLIC,
+                          amo.STATUS_UNREVIEWED, platform=amo.PLATFORM_MAC)
+        res = create_addon_file('Platforms', '0.1', amo.STATUS_PUBLIC,
+                                amo.STATUS_UNREVIEWED,
+                                platform=amo.PLATFORM_LINUX)
+        res['file'].delete()
+        self.check()
+        eq_(self.rows(PendingQueue)[0][2], [amo.PLATFORM_MAC.id])
+
+    def test_disabled_by_user(self):
+        addon = create_addon_file('Disabled', '0.1', amo.STATUS_NOMINATED,
+                                  amo.STATUS_UNREVIEWED)['addon']
+        addon.update(disabled_by_user=True)
+        self.check()
+        eq_(self.queues(addon), [])
+        addon.update(disabled_by_user=False)
+        self.check()
+        eq_(self.queues(addon), ['nominated'])
+
+    def test_flags(self):
+        res = create_addon_file('Flags', '0.1', amo.STATUS_LITE,
+                                amo.STATUS_UNREVIEWED)
+        res['addon'].update(admin_review=True)
+        res['version'].update(has_info_request=True)
+        res['file'].update(no_restart=True, jetpack_version='1.1')
+        self.check()
+        eq_(self.queues(res['addon']), ['fast_track', 'prelim'])
+
+    def test_applications(self):
+        create_addon_file('Apps', '0.1', amo.STATUS_NOMINATED,
+                          amo.STATUS_UNREVIEWED)
+        create_addon_file('Apps', '0.1', amo.STATUS_NOMINATED,
+                          amo.STATUS_UNREVIEWED,
+                          application=amo.THUNDERBIRD)
+        self.check()
+
+    def test_reconcile(self):
+        res = create_addon_file('Sneaky', '0.1', amo.STATUS_PUBLIC,
+                                amo.STATUS_UNREVIEWED)
+        eq_(EditorQueue.reconcile(), [])
+        # Updates on querysets don't send signals.
+        File.objects.filter(pk=res['file'].pk).update(
+            status=amo.STATUS_PUBLIC)
+        eq_(self.queues(res['addon']), ['pending'])
+        eq_(EditorQueue.reconcile(), [res['addon'].pk])
+        self.check()
+        eq_(self.queues(res['addon']), [])
+
+    def test_refresh_deferred(self):
+        one = create_addon_file('One', '0.1', amo.STATUS_NOMINATED,
+                                amo.STATUS_UNREVIEWED)['addon']
+        two = create_addon_file('Two', '0.1', amo.STATUS_NOMINATED,
+                                amo.STATUS_UNREVIEWED)['addon']
+        with mock.patch('editors.tasks.refresh_editor_queue.delay') as delay:
+            with coalesce_invalidation():
+                for x in range(3):
+                    one.update(admin_review=not one.admin_review)
+                two.update(disabled_by_user=True)
+                ok_(not delay.called)
+        # One task for the request, with every add-on it changed.
+        delay.assert_called_once_with(sorted([one.pk, two.pk]))
+        eq_(self.queues(two), ['nominated'])
+        EditorQueue.refresh(delay.call_args[0][0])
+        self.check()
+        eq_(self.queues(two), [])
+
+    def test_order_by_waiting_time(self):
+        create_addon_file('Old', '0.1', amo.STATUS_PUBLIC,
+                          amo.STATUS_UNREVIEWED, created=self.days_ago(2))
+        create_addon_file('New', '0.1', amo.STATUS_PUBLIC,
+                          amo.STATUS_UNREVIEWED, created=self.days_ago(1))
+        qs = PendingQueue.objects.order_by('-waiting_time_min')
+        assert 'ORDER BY\neditor_queue.waiting_since ASC' in qs.as_sql()
+        eq_([r.addon_name for r in qs.all()], ['Old', 'New'])
+        qs = PendingQueue.objects.order_by('waiting_time_min')
+        eq_([r.addon_name for r in qs.all()], ['New', 'Old'])
+
+
 class TestEditorSubscription(amo.tests.TestCase):
     fixtures = ['base/addon_3615', 'base/users']
 
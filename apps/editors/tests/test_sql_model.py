@@ -178,6 +178,12 @@ class TestSQLModel(unittest.TestCase):
         c = ProductDetail.objects.all().order_by('-product')[0]
         eq_(c.product, 'snake skin jacket')
 
+    def test_order_by_sort(self):
+        qs = ProductDetail.objects.all()
+        qs.base_query['sort'] = {'reversed': ('product', True)}
+        eq_(qs.order_by('reversed')[0].product, 'snake skin jacket')
+        eq_(qs.order_by('-reversed')[0].product, 'defilbrilator')
+
     @raises(ValueError)
     def test_order_by_injection(self):
         qs = Summary.objects.order_by('category; drop table foo;')[0]
@@ -26,9 +26,8 @@ from amo.urlresolvers import reverse
 from devhub.models import ActivityLog, CommentLog
 from editors import forms
 from editors.models import (AddonCannedResponse, EditorSubscription, EventLog,
-                            PerformanceGraph, ReviewerScore,
-                            ViewFastTrackQueue, ViewFullReviewQueue,
-                            ViewPendingQueue, ViewPreliminaryQueue,
+                            FastTrackQueue, FullReviewQueue, PendingQueue,
+                            PerformanceGraph, PreliminaryQueue, ReviewerScore,
                             ViewQueue)
 from editors.helpers import (ViewFastTrackQueueTable, ViewFullReviewQueueTable,
                              ViewPendingQueueTable, ViewPreliminaryQueueTable)
@@ -394,10 +393,10 @@ def queue_counts(type=None, **kw):
 
         return query.count
 
-    counts = {'pending': construct_query(ViewPendingQueue, **kw),
-              'nominated': construct_query(ViewFullReviewQueue, **kw),
-              'prelim': construct_query(ViewPreliminaryQueue, **kw),
-              'fast_track': construct_query(ViewFastTrackQueue, **kw),
+    counts = {'pending': construct_query(PendingQueue, **kw),
+              'nominated': construct_query(FullReviewQueue, **kw),
+              'prelim': construct_query(PreliminaryQueue, **kw),
+              'fast_track': construct_query(FastTrackQueue, **kw),
               'moderated': (
                   Review.objects.exclude(addon__type=amo.ADDON_WEBAPP)
                                 .filter(reviewflag__isnull=False,
@@ -0,0 +1,322 @@
+"""
+A content-addressed cache of add-on packages, shared by the file viewer, the
+diff view and install.rdf parsing.
+
+Packages are keyed by the sha256 of their contents, so every file or upload
+with the same bytes shares one entry under `TMP_PATH/file_viewer/<sha256>`.
+The listing of a package is built from the zip central directory and stored
+next to it as `index.json`, with nested .jar and .xpi files listed as
+directories like `extract_xpi(expand=True)` does. Files are compared by the
+crc32 and size from the central directory; their md5 is only worked out for
+the file being looked at. Members are only written out under `files/` when
+someone asks for them.
+
+`evict()` removes the least recently used packages once the cache goes over
+`settings.FILE_VIEWER_CACHE_SIZE` bytes.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+import zlib
+from cStringIO import StringIO
+
+from django import forms
+from django.conf import settings
+from django.core.files.storage import default_storage as storage
+from django.utils.encoding import smart_str, smart_unicode
+
+import commonware.log
+from tower import ugettext as _
+
+from amo.utils import rm_local_tmp_dir
+from files.utils import SafeUnzip
+
+log = commonware.log.getLogger('z.files')
+
+# Nested packages that are listed as directories.
+EXPAND = ('.jar', '.xpi')
+# How many levels of nested packages are followed.
+MAX_DEPTH = 10
+# Bumped when the format of index.json changes.
+VERSION = 2
+
+
+def cache_root():
+    return os.path.join(settings.TMP_PATH, 'file_viewer')
+
+
+def package_key(src, hash=None):
+    """
+    The cache key for the package at `src`: the hex sha256 of its contents.
+    Pass the `File.hash` when there is one to save reading the package.
+    """
+    if isinstance(hash, basestring) and hash.startswith('sha256:'):
+        return hash[len('sha256:'):]
+    sha = hashlib.sha256()
+    with storage.open(src, 'rb') as fobj:
+        for chunk in iter(lambda: fobj.read(64 * 1024), ''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def read_member(zip, info, callback):
+    """
+    Decompress `info` from `zip` in chunks, passing each to `callback`.
+    Refuses members that turn out bigger than the central directory says.
+    """
+    size = 0
+    member = zip.open(info)
+    for chunk in iter(lambda: member.read(64 * 1024), ''):
+        size += len(chunk)
+        if size > info.file_size:
+            log.error('Extraction error, %s is bigger than %s bytes.'
+                      % (info.filename, info.file_size))
+            raise forms.ValidationError(_('Invalid archive.'))
+        callback(chunk)
+
+
+class Package(object):
+    """
+    One package in the cache. Packages that aren't zips, like search engine
+    xml files, are listed as a single file called `filename`.
+    """
+
+    def __init__(self, src, key=None, filename=None):
+        self.src = src
+        self.key = key or package_key(src)
+        self.filename = filename
+        if filename:
+            # A single file is listed under its name, so that's part of what
+            # the package is.
+            name = hashlib.md5(smart_str(filename)).hexdigest()
+            self.key = '%s-%s' % (self.key, name)
+        self.path = os.path.join(cache_root(), self.key)
+        self.dest = os.path.join(self.path, 'files')
+        self.index_path = os.path.join(self.path, 'index-%s.json' % VERSION)
+
+    def touch(self):
+        """Mark the package as just used, for eviction."""
+        try:
+            os.utime(self.path, None)
+        except OSError:
+            pass
+
+    def is_indexed(self):
+        return os.path.exists(self.index_path)
+
+    def index(self):
+        """The entries of the package, in file viewer order."""
+        if not self.is_indexed():
+            self.build()
+        with open(self.index_path) as fobj:
+            entries = json.load(fobj)
+        self.touch()
+        return entries
+
+    def open_zip(self, fileobj, fatal=True):
+        """A validated ZipFile for `fileobj`, or None if it isn't a zip."""
+        unzip = SafeUnzip(fileobj)
+        if unzip.is_valid(fatal=fatal):
+            return unzip.zip
+
+    def build(self):
+        """Read the package and write out its index."""
+        if self.filename:
+            entries = {}
+            with storage.open(self.src, 'rb') as fobj:
+                data = fobj.read()
+            self._add_file(entries, self.filename, len(data),
+                           zlib.crc32(data), data[:4],
+                           os.path.getmtime(self.src), None)
+        else:
+            with storage.open(self.src, 'rb') as fobj:
+                entries = self._list(self.open_zip(fobj), [], u'', 0)
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        tmp = tempfile.NamedTemporaryFile(dir=self.path, delete=False)
+        with tmp:
+            json.dump(self._ordered(entries), tmp)
+        os.rename(tmp.name, self.index_path)
+
+    def _add_dir(self, entries, short, modified):
+        parts = short.split(u'/')
+        for depth in range(len(parts)):
+            parent = u'/'.join(parts[:depth + 1])
+            if parent not in entries:
+                entries[parent] = {'short': parent, 'directory': True,
+                                   'size': 0, 'modified': modified,
+                                   'crc': '', 'head': [], 'chain': None}
+
+    def _add_file(self, entries, short, size, crc, head, modified, chain):
+        if u'/' in short:
+            self._add_dir(entries, short.rsplit(u'/', 1)[0], modified)
+        entries[short] = {'short': short, 'directory': False,
+                          'size': size, 'modified': modified,
+                          'crc': '%08x' % (crc & 0xffffffff),
+                          'head': map(ord, head), 'chain': chain}
+
+    def _list(self, zip, chain, prefix, depth):
+        entries = {}
+        for pos, info in enumerate(zip.infolist()):
+            name = smart_unicode(info.filename, errors='replace')
+            short = prefix + name.rstrip(u'/')
+            modified = time.mktime(info.date_time + (0, 0, -1))
+            if not short:
+                continue
+            if name.endswith(u'/'):
+                self._add_dir(entries, short, modified)
+                continue
+
+            nested = None
+            if depth < MAX_DEPTH and os.path.splitext(name)[1] in EXPAND:
+                # Nested packages have to be read to be listed.
+                data = []
+                read_member(zip, info, data.append)
+                nested = self.open_zip(StringIO(''.join(data)), fatal=False)
+            if nested:
+                self._add_dir(entries, short, modified)
+                entries.update(self._list(nested, chain + [pos],
+                                          short + u'/', depth + 1))
+            else:
+                # Everything else comes from the central directory, but for
+                # the magic number, which only needs the first few bytes.
+                head = zip.open(info).read(4)
+                self._add_file(entries, short, info.file_size, info.CRC,
+                               head, modified, chain + [pos])
+        return entries
+
+    def _ordered(self, entries):
+        """
+        Each directory, then its contents, then the files next to it, all
+        sorted by name. That's how the file viewer shows them.
+        """
+        children = {}
+        for short, entry in entries.items():
+            parent = short.rsplit(u'/', 1)[0] if u'/' in short else u''
+            children.setdefault(parent, []).append(entry)
+
+        result = []
+
+        def walk(parent):
+            items = children.get(parent, [])
+            for entry in sorted((e for e in items if e['directory']),
+                                key=lambda e: e['short']):
+                result.append(entry)
+                walk(entry['short'])
+            result.extend(sorted((e for e in items if not e['directory']),
+                                 key=lambda e: e['short']))
+
+        walk(u'')
+        return result
+
+    def names(self):
+        """The names of the top level members, without indexing."""
+        with storage.open(self.src, 'rb') as fobj:
+            return self.open_zip(fobj).namelist()
+
+    def member(self, name):
+        """
+        An entry for the top level member `name`, without indexing the whole
+        package. Raises IOError if there's no such member.
+        """
+        names = self.names()
+        if name not in names:
+            raise IOError('%s not found in %s' % (name, self.src))
+        return {'short': smart_unicode(name), 'directory': False,
+                'chain': [names.index(name)]}
+
+    def read(self, entry):
+        """The contents of a file entry."""
+        with storage.open(self.src, 'rb') as fobj:
+            if entry['chain'] is None:
+                return fobj.read()
+            zip = zipfile.ZipFile(fobj)
+            for depth, pos in enumerate(entry['chain']):
+                if depth:
+                    zip = zipfile.ZipFile(StringIO(data))
+                data = []
+                read_member(zip, zip.infolist()[pos], data.append)
+                data = ''.join(data)
+            return data
+
+    def md5(self, entry):
+        """The md5 of a file entry, from its copy under `dest` if any."""
+        md5 = hashlib.md5()
+        full = os.path.join(self.dest, smart_str(entry['short']))
+        if os.path.exists(full):
+            with open(full, 'rb') as fobj:
+                for chunk in iter(lambda: fobj.read(64 * 1024), ''):
+                    md5.update(chunk)
+        else:
+            md5.update(self.read(entry))
+        return md5.hexdigest()
+
+    def extract(self, entry):
+        """Write `entry` out under `dest` if needed, returns its path."""
+        full = os.path.join(self.dest, smart_str(entry['short']))
+        if not os.path.exists(full):
+            if entry['directory']:
+                os.makedirs(full)
+            else:
+                if not os.path.exists(os.path.dirname(full)):
+                    os.makedirs(os.path.dirname(full))
+                tmp = tempfile.NamedTemporaryFile(
+                    dir=os.path.dirname(full), delete=False)
+                with tmp:
+                    tmp.write(self.read(entry))
+                os.rename(tmp.name, full)
+        self.touch()
+        return full
+
+    def remove(self):
+        """
+        Only for tests and maintenance, since files with the same contents
+        share this package. The file viewer leaves removal to `evict()`.
+        """
+        if os.path.exists(self.path):
+            rm_local_tmp_dir(self.path)
+
+
+def evict(budget=None):
+    """
+    Remove the least recently used packages until the cache is no bigger than
+    `budget` bytes. Returns how many packages were removed.
+    """
+    if budget is None:
+        budget = settings.FILE_VIEWER_CACHE_SIZE
+    root = cache_root()
+    if not os.path.exists(root):
+        return 0
+
+    packages, total = [], 0
+    for key in os.listdir(root):
+        path = os.path.join(root, key)
+        try:
+            used = os.stat(path).st_mtime
+            size = 0
+            for dirpath, dirnames, filenames in os.walk(path):
+                for filename in filenames:
+                    size += os.lstat(os.path.join(dirpath, filename)).st_size
+        except OSError:
+            # Removed while we were looking at it.
+            continue
+        packages.append((used, size, path))
+        total += size
+
+    removed = 0
+    for used, size, path in sorted(packages):
+        if total <= budget:
+            break
+        log.debug('Evicting %s (%s bytes) from the file viewer cache.'
+                  % (path, size))
+        if os.path.isdir(path):
+            rm_local_tmp_dir(path)
+        else:
+            os.remove(path)
+        total -= size
+        removed += 1
+    return removed
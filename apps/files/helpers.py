@@ -2,24 +2,22 @@ import codecs
 import json
 import mimetypes
 import os
-import stat
 
 from django.conf import settings
 from django.core.files.storage import default_storage as storage
 from django.utils.datastructures import SortedDict
-from django.utils.encoding import smart_unicode
+from django.utils.encoding import smart_str
 from django.template.defaultfilters import filesizeformat
 
 import jinja2
 import commonware.log
-from cache_nuggets.lib import memoize, Message
+from cache_nuggets.lib import Message
 from jingo import register, env
 from tower import ugettext as _
 
 import amo
-from amo.utils import rm_local_tmp_dir
 from amo.urlresolvers import reverse
-from files.utils import extract_xpi, get_md5
+from files import archive
 from validator.testcases.packagelayout import (blacklisted_extensions,
                                                blacklisted_magic_numbers)
 
@@ -63,9 +61,9 @@ def file_tree(files, selected):
 
 class FileViewer(object):
     """
-    Provide access to a storage-managed file by copying it locally and
-    extracting info from it. `src` is a storage-managed path and `dest` is a
-    local temp path.
+    Provide access to a storage-managed file through the package cache in
+    `files.archive`. `src` is a storage-managed path and `dest` is the local
+    path the package's files are written out to when needed.
     """
 
     def __init__(self, file_obj, is_webapp=False):
@@ -75,65 +73,79 @@ class FileViewer(object):
         self.src = (file_obj.guarded_file_path
                     if file_obj.status == amo.STATUS_DISABLED
                     else file_obj.file_path)
-        self.dest = os.path.join(settings.TMP_PATH, 'file_viewer',
-                                 str(file_obj.pk))
+        self._package = None
         self._files, self.selected = None, None
 
     def __str__(self):
         return str(self.file.id)
 
+    @property
+    def package(self):
+        if self._package is None or self._package.src != self.src:
+            # The file's hash only describes the file's own path.
+            own = self.src in (self.file.file_path,
+                               self.file.guarded_file_path)
+            key = archive.package_key(self.src,
+                                      self.file.hash if own else None)
+            filename = None
+            if self.is_search_engine() and self.src.endswith('.xml'):
+                filename = self.file.filename
+            self._package = archive.Package(self.src, key, filename=filename)
+        return self._package
+
+    @property
+    def dest(self):
+        return self.package.dest
+
     def _extraction_cache_key(self):
         return ('%s:file-viewer:extraction-in-progress:%s' %
-                (settings.CACHE_PREFIX, self.file.id))
+                (settings.CACHE_PREFIX, self.package.key))
 
     def extract(self):
         """
-        Will make all the directories and expand the files.
-        Raises error on nasty files.
+        Indexes the package, unless another file with the same contents
+        already has. Raises error on nasty files.
         """
+        if self.package.is_indexed():
+            return
         try:
-            os.makedirs(os.path.dirname(self.dest))
-        except OSError, err:
-            pass
-
-        if self.is_search_engine() and self.src.endswith('.xml'):
-            try:
-                os.makedirs(self.dest)
-            except OSError, err:
-                pass
-            copyfileobj(storage.open(self.src),
-                        open(os.path.join(self.dest,
-                                          self.file.filename), 'w'))
-        else:
-            try:
-                extract_xpi(self.src, self.dest, expand=True)
-            except Exception, err:
-                task_log.error('Error (%s) extracting %s' % (err, self.src))
-                raise
+            self.package.build()
+        except Exception, err:
+            task_log.error('Error (%s) extracting %s' % (err, self.src))
+            raise
 
     def cleanup(self):
-        if os.path.exists(self.dest):
-            rm_local_tmp_dir(self.dest)
+        """
+        Nothing to do: packages are shared by every file with the same
+        contents and another viewer could be reading this one, so only
+        `files.archive.evict` removes them.
+        """
 
     def is_search_engine(self):
         """Is our file for a search engine?"""
         return self.file.version.addon.type == amo.ADDON_SEARCH
 
     def is_extracted(self):
-        """If the file has been extracted or not."""
-        return (os.path.exists(self.dest) and not
+        """If the file has been indexed or not."""
+        return (self.package.is_indexed() and not
                 Message(self._extraction_cache_key()).get())
 
-    def _is_binary(self, mimetype, path):
-        """Uses the filename to see if the file can be shown in HTML or not."""
+    def _is_binary(self, mimetype, path, head=None):
+        """
+        Uses the filename to see if the file can be shown in HTML or not.
+        `head` is the first bytes of the file, otherwise they are read from
+        `path`.
+        """
         # Re-use the blacklisted data from amo-validator to spot binaries.
         ext = os.path.splitext(path)[1][1:]
         if ext in blacklisted_extensions:
             return True
 
-        if os.path.exists(path) and not os.path.isdir(path):
+        if head is None and os.path.exists(path) and not os.path.isdir(path):
             with storage.open(path, 'r') as rfile:
-                bytes = tuple(map(ord, rfile.read(4)))
+                head = map(ord, rfile.read(4))
+        if head:
+            bytes = tuple(head)
             if any(bytes[:len(x)] == x for x in blacklisted_magic_numbers):
                 return True
 
@@ -174,6 +186,8 @@ class FileViewer(object):
             self.selected['msg'] = msg
             return ''
 
+        if not os.path.exists(self.selected['full']):
+            self.package.extract(self.selected)
         with storage.open(self.selected['full'], 'r') as opened:
             cont = opened.read()
             codec = 'utf-16' if cont.startswith(codecs.BOM_UTF16) else 'utf-8'
@@ -222,6 +236,16 @@ class FileViewer(object):
 
     def select(self, file_):
         self.selected = self.get_files().get(file_)
+        if self.selected and 'md5' not in self.selected:
+            # Only worked out for the file being looked at, the listing
+            # compares the crc32 from the central directory.
+            md5 = ''
+            if not self.selected['directory']:
+                try:
+                    md5 = self.package.md5(self.selected)
+                except (IOError, OSError):
+                    pass
+            self.selected['md5'] = md5
 
     def is_binary(self):
         if self.selected:
@@ -305,45 +329,30 @@ class FileViewer(object):
                 return short
         return 'plain'
 
-    @memoize(prefix='file-viewer', time=60 * 60)
     def _get_files(self):
-        all_files, res = [], SortedDict()
-        # Not using os.path.walk so we get just the right order.
-
-        def iterate(path):
-            path_dirs, path_files = storage.listdir(path)
-            for dirname in sorted(path_dirs):
-                full = os.path.join(path, dirname)
-                all_files.append(full)
-                iterate(full)
-
-            for filename in sorted(path_files):
-                full = os.path.join(path, filename)
-                all_files.append(full)
-
-        iterate(self.dest)
-
+        res = SortedDict()
         url_prefix = 'mkt.%s' if self.is_webapp else '%s'
-        for path in all_files:
-            filename = smart_unicode(os.path.basename(path), errors='replace')
-            short = smart_unicode(path[len(self.dest) + 1:], errors='replace')
+        for entry in self.package.index():
+            short = entry['short']
+            filename = os.path.basename(short)
+            path = os.path.join(self.dest, smart_str(short))
             mime, encoding = mimetypes.guess_type(filename)
             if not mime and filename == 'manifest.webapp':
                 mime = 'application/x-web-app-manifest+json'
-            directory = os.path.isdir(path)
 
             res[short] = {
-                'binary': self._is_binary(mime, path),
+                'binary': self._is_binary(mime, path, entry['head']),
+                'chain': entry['chain'],
+                'crc': entry['crc'],
                 'depth': short.count(os.sep),
-                'directory': directory,
+                'directory': entry['directory'],
                 'filename': filename,
                 'full': path,
-                'md5': get_md5(path) if not directory else '',
                 'mimetype': mime or 'application/octet-stream',
                 'syntax': self.get_syntax(filename),
-                'modified': os.stat(path)[stat.ST_MTIME],
+                'modified': entry['modified'],
                 'short': short,
-                'size': os.stat(path)[stat.ST_SIZE],
+                'size': entry['size'],
                 'truncated': self.truncate(filename),
                 'url': reverse(url_prefix % 'files.list',
                                args=[self.file.id, 'file', short]),
@@ -395,7 +404,9 @@ class DiffHelper(object):
         different = []
         for key, file in left_files.items():
             file['url'] = self.get_url(file['short'])
-            diff = file['md5'] != right_files.get(key, {}).get('md5')
+            right = right_files.get(key, {})
+            diff = (file['crc'], file['size']) != (right.get('crc'),
+                                                   right.get('size'))
             file['diff'] = diff
             if diff:
                 different.append(file)
@@ -0,0 +1,122 @@
+"""
+Measures the upload pipeline for a packaged app: writing it, hashing it,
+checking the archive and reading its manifest, the way it was done in
+separate passes against the single pass `FileUpload.add_file` makes.
+
+    ./manage.py benchmark_upload --size=50 --runs=5 --dir=/dev/shm
+
+The package is a synthetic zip of random (so incompressible) files plus a
+manifest, written under `--dir`, which is tmpfs by default so the numbers
+cover our own code rather than the disk. The validator, which reads the
+package itself, isn't included.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from files.models import File
+from files.utils import PackageStream, SafeUnzip, WebAppParser
+
+
+MANIFEST = json.dumps({'name': 'Benchmark', 'version': '1.0',
+                       'launch_path': '/index.html',
+                       'developer': {'name': 'Benchmark'}})
+CHUNK = 64 * 1024
+
+
+def make_package(path, size):
+    """A packaged app of about `size` megabytes at `path`."""
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip:
+        zip.writestr('manifest.webapp', MANIFEST)
+        for x in xrange(size):
+            zip.writestr('assets/%s.bin' % x, os.urandom(1024 * 1024))
+
+
+def chunks(path):
+    with open(path, 'rb') as fobj:
+        for chunk in iter(lambda: fobj.read(CHUNK), ''):
+            yield chunk
+
+
+def separate(src, dest):
+    """Write and hash, then check and read the manifest, then measure."""
+    hash = hashlib.sha256()
+    with open(dest, 'wb') as fobj:
+        for chunk in chunks(src):
+            hash.update(chunk)
+            fobj.write(chunk)
+    zf = SafeUnzip(dest)
+    zf.is_valid()
+    WebAppParser.decode_manifest(zf.extract_path('manifest.webapp'))
+    zf.close()
+    return os.path.getsize(dest), File().generate_hash(dest)
+
+
+def single(src, dest):
+    """Write, hash, check and read the manifest in one pass."""
+    stream = PackageStream('manifest.webapp')
+    with open(dest, 'wb') as fobj:
+        for chunk in chunks(src):
+            stream.feed(chunk)
+            fobj.write(chunk)
+    stream.close()
+    assert stream.member is not None, 'The manifest was not found.'
+    WebAppParser.decode_manifest(stream.member)
+    return stream.size, stream.hash
+
+
+class Command(BaseCommand):
+    help = 'Measure the packaged app upload pipeline, in passes and in one.'
+    option_list = BaseCommand.option_list + (
+        make_option('--size', action='store', type='int', default=50,
+                    help='Size of the package in megabytes.'),
+        make_option('--runs', action='store', type='int', default=5,
+                    help='Number of timed uploads per pipeline.'),
+        make_option('--dir', action='store', default='/dev/shm',
+                    help='Where to write the packages, ideally tmpfs.'),
+        make_option('--output', action='store',
+                    help='Write the JSON results here instead of stdout.'),
+    )
+
+    def measure(self, func, src, dest, runs):
+        times, results = [], set()
+        for x in range(runs):
+            start = time.time()
+            results.add(func(src, dest))
+            times.append(time.time() - start)
+            os.remove(dest)
+        assert len(results) == 1, 'The uploads came out different.'
+        best = min(times)
+        size = os.path.getsize(src) / 1024.0 / 1024
+        return {'runs': runs,
+                'best': round(best, 3),
+                'mean': round(sum(times) / runs, 3),
+                'mb_per_second': round(size / best, 1) if best else None}
+
+    def handle(self, *args, **kw):
+        tmp = tempfile.mkdtemp(dir=kw['dir'])
+        try:
+            src = os.path.join(tmp, 'package.zip')
+            dest = os.path.join(tmp, 'upload.zip')
+            make_package(src, kw['size'])
+            results = {'separate': self.measure(separate, src, dest,
+                                                kw['runs']),
+                       'single': self.measure(single, src, dest, kw['runs'])}
+        finally:
+            shutil.rmtree(tmp)
+
+        output = json.dumps({'size': kw['size'],
+                             'dir': kw['dir'],
+                             'results': results}, indent=2, sort_keys=True)
+        if kw['output']:
+            with open(kw['output'], 'w') as fh:
+                fh.write(output)
+        else:
+            self.stdout.write(output + '\n')
@@ -30,7 +30,7 @@ from amo.storage_utils import copy_stored_file, move_stored_file
 from amo.urlresolvers import reverse
 from applications.models import Application, AppVersion
 import devhub.signals
-from files.utils import SafeUnzip
+from files.utils import PackageStream, SafeUnzip
 from tags.models import Tag
 from versions.compare import version_int as vint
 
@@ -152,8 +152,10 @@ class File(amo.models.OnChangeMixin, amo.models.ModelBase):
         if ext == '.jar':
             ext = '.xpi'
         f.filename = f.generate_filename(extension=ext or '.xpi')
-        # Size in bytes.
-        f.size = storage.size(upload.path)
+        # Size in bytes. Uploads written by `add_file` know their size and
+        # hash already.
+        streamed = upload.size is not None
+        f.size = upload.size if streamed else storage.size(upload.path)
         data = cls.get_jetpack_metadata(upload.path)
         f.jetpack_version = data['sdkVersion']
         if f.jetpack_version:
@@ -171,7 +173,7 @@ class File(amo.models.OnChangeMixin, amo.models.ModelBase):
         elif (version.addon.status in amo.LITE_STATUSES
               and version.addon.trusted):
             f.status = version.addon.status
-        f.hash = f.generate_hash(upload.path)
+        f.hash = upload.hash if streamed else f.generate_hash(upload.path)
         if upload.validation:
             validation = json.loads(upload.validation)
             if validation['metadata'].get('requires_chrome'):
@@ -556,6 +558,9 @@ class FileUpload(amo.models.ModelBase):
     compat_with_appver = models.ForeignKey(AppVersion, null=True,
                                     related_name='uploads_compat_for_appver')
     task_error = models.TextField(null=True)
+    # Worked out while the upload was written, see `add_file`.
+    size = models.PositiveIntegerField(null=True)
+    manifest = models.TextField(null=True)
 
     objects = amo.models.UncachedManagerBase()
 
@@ -581,14 +586,25 @@ class FileUpload(amo.models.ModelBase):
         if ext in EXTENSIONS:
             loc += ext
         log.info('UPLOAD: %r (%s bytes) to %r' % (filename, size, loc))
-        hash = hashlib.sha256()
+        # Hash, measure and check the package in the same pass that writes
+        # it, so the later steps don't have to read it again.
+        stream = PackageStream('manifest.webapp' if is_webapp else None)
         with storage.open(loc, 'wb') as fd:
             for chunk in chunks:
-                hash.update(chunk)
+                stream.feed(chunk)
                 fd.write(chunk)
+        stream.close()
         self.path = loc
         self.name = filename
-        self.hash = 'sha256:%s' % hash.hexdigest()
+        self.hash = stream.hash
+        self.size = stream.size
+        self.manifest = None
+        if stream.member is not None:
+            try:
+                self.manifest = stream.member.decode('utf-8')
+            except UnicodeDecodeError:
+                # WebAppParser will say what's wrong with it.
+                pass
         self.is_webapp = is_webapp
         self.save()
 
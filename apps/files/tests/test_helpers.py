@@ -1,19 +1,20 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import os
 import mimetypes
-import shutil
+import tempfile
 import zipfile
 
 from django.conf import settings
-from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
 from django import forms
 
 from mock import Mock, patch
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 import amo.tests
 from amo.urlresolvers import reverse
+from files import archive
 from files.helpers import FileViewer, DiffHelper
 from files.models import File
 from files.utils import SafeUnzip
@@ -34,13 +35,32 @@ def make_file(pk, file_path, **kwargs):
     return obj
 
 
+def repack(src, add=None, remove=()):
+    """
+    Copy the package at `src` with the members in `add`, a dict of
+    {name: contents}, added or replaced and those in `remove` left out.
+    Returns the path of the copy.
+    """
+    add = add or {}
+    fd, dest = tempfile.mkstemp(suffix='.xpi', dir=settings.TMP_PATH)
+    os.close(fd)
+    with zipfile.ZipFile(src) as old:
+        with zipfile.ZipFile(dest, 'w') as new:
+            for info in old.infolist():
+                if info.filename not in add and info.filename not in remove:
+                    new.writestr(info, old.read(info))
+            for name, contents in add.items():
+                new.writestr(name, contents)
+    return dest
+
+
 class TestFileHelper(amo.tests.TestCase):
 
     def setUp(self):
         self.viewer = FileViewer(make_file(1, get_file('dictionary-test.xpi')))
 
     def tearDown(self):
-        self.viewer.cleanup()
+        self.viewer.package.remove()
 
     def test_files_not_extracted(self):
         eq_(self.viewer.is_extracted(), False)
@@ -64,9 +84,16 @@ class TestFileHelper(amo.tests.TestCase):
         for name in nm:
             eq_(name in files, True, 'File %r not extracted' % name)
 
-    def test_cleanup(self):
+    def test_cleanup_shared(self):
         self.viewer.extract()
-        self.viewer.cleanup()
+        other = FileViewer(make_file(2, get_file('dictionary-test.xpi')))
+        other.cleanup()
+        # Both files have the same contents, so share the package.
+        eq_(self.viewer.is_extracted(), True)
+
+    def test_remove(self):
+        self.viewer.extract()
+        self.viewer.package.remove()
         eq_(self.viewer.is_extracted(), False)
 
     def test_isbinary(self):
@@ -148,14 +175,11 @@ class TestFileHelper(amo.tests.TestCase):
             eq_(self.viewer.get_syntax(filename), syntax)
 
     def test_file_order(self):
+        self.viewer.src = repack(self.viewer.src,
+                                 add={'chrome.manifest': '', 'chrome/foo': ''})
         self.viewer.extract()
-        dest = self.viewer.dest
-        open(os.path.join(dest, 'chrome.manifest'), 'w')
-        subdir = os.path.join(dest, 'chrome')
-        os.mkdir(subdir)
-        open(os.path.join(subdir, 'foo'), 'w')
-        cache.clear()
         files = self.viewer.get_files().keys()
+        os.remove(self.viewer.src)
         rt = files.index(u'chrome')
         eq_(files[rt:rt + 3], [u'chrome', u'chrome/foo', u'dictionaries'])
 
@@ -186,19 +210,60 @@ class TestFileHelper(amo.tests.TestCase):
         eq_(self.viewer.get_default(None), 'install.rdf')
 
     def test_delete_mid_read(self):
+        self.viewer.src = repack(self.viewer.src)
         self.viewer.extract()
         self.viewer.select('install.js')
-        os.remove(os.path.join(self.viewer.dest, 'install.js'))
+        os.remove(self.viewer.src)
         res = self.viewer.read_file()
         eq_(res, '')
         assert self.viewer.selected['msg'].startswith('That file no')
 
-    @patch('files.helpers.get_md5')
-    def test_delete_mid_tree(self, get_md5):
-        get_md5.side_effect = IOError('ow')
+    @patch('files.archive.Package.index')
+    def test_delete_mid_tree(self, index):
+        index.side_effect = IOError('ow')
         self.viewer.extract()
         eq_({}, self.viewer.get_files())
 
+    def test_files_not_written_out(self):
+        self.viewer.extract()
+        self.viewer.get_files()
+        assert not os.path.exists(self.viewer.dest)
+
+    def test_read_writes_out(self):
+        self.viewer.extract()
+        self.viewer.select('install.js')
+        assert self.viewer.read_file()
+        eq_(os.listdir(self.viewer.dest), ['install.js'])
+
+    def test_shared_by_hash(self):
+        self.viewer.extract()
+        other = FileViewer(make_file(2, self.viewer.src))
+        eq_(other.dest, self.viewer.dest)
+        assert other.is_extracted()
+
+    def test_file_hash(self):
+        viewer = FileViewer(make_file(1, self.viewer.src, hash='sha256:abc'))
+        eq_(viewer.package.key, 'abc')
+        viewer.src = get_file('recurse.xpi')
+        assert viewer.package.key != 'abc'
+
+    def test_md5(self):
+        self.viewer.extract()
+        ok_('md5' not in self.viewer.get_files()['install.js'])
+        self.viewer.select('install.js')
+        with zipfile.ZipFile(self.viewer.src) as zip:
+            eq_(self.viewer.selected['md5'],
+                hashlib.md5(zip.read('install.js')).hexdigest())
+        # Worked out without writing the file out.
+        assert not os.path.exists(self.viewer.dest)
+
+    def test_crc(self):
+        self.viewer.extract()
+        files = self.viewer.get_files()
+        with zipfile.ZipFile(self.viewer.src) as zip:
+            eq_(files['install.js']['crc'],
+                '%08x' % zip.getinfo('install.js').CRC)
+
 
 class TestSearchEngineHelper(amo.tests.TestCase):
     fixtures = ['base/addon_4594_a9', 'base/apps']
@@ -213,14 +278,15 @@ class TestSearchEngineHelper(amo.tests.TestCase):
                 f.write('some data\n')
 
     def tearDown(self):
-        self.viewer.cleanup()
+        self.viewer.package.remove()
 
     def test_is_search_engine(self):
         assert self.viewer.is_search_engine()
 
     def test_extract_search_engine(self):
         self.viewer.extract()
-        assert os.path.exists(self.viewer.dest)
+        assert self.viewer.is_extracted()
+        eq_(self.viewer.get_files().keys(), ['a9.xml'])
 
     def test_default(self):
         self.viewer.extract()
@@ -228,8 +294,8 @@ class TestSearchEngineHelper(amo.tests.TestCase):
 
     def test_default_no_files(self):
         self.viewer.extract()
-        os.remove(os.path.join(self.viewer.dest, 'a9.xml'))
-        eq_(self.viewer.get_default(None), None)
+        with patch.object(self.viewer, 'get_files', lambda: {}):
+            eq_(self.viewer.get_default(None), None)
 
 
 class TestDiffSearchEngine(amo.tests.TestCase):
@@ -240,17 +306,16 @@ class TestDiffSearchEngine(amo.tests.TestCase):
             with storage.open(src, 'w') as f:
                 f.write(open(src).read())
         self.helper = DiffHelper(make_file(1, src, filename='search.xml'),
-                                 make_file(2, src, filename='search.xml'))
+                                 make_file(2, src, filename='s-20010101.xml'))
 
     def tearDown(self):
-        self.helper.cleanup()
+        self.helper.left.package.remove()
+        self.helper.right.package.remove()
 
     @patch('files.helpers.FileViewer.is_search_engine')
     def test_diff_search(self, is_search_engine):
         is_search_engine.return_value = True
         self.helper.extract()
-        shutil.copyfile(os.path.join(self.helper.left.dest, 'search.xml'),
-                        os.path.join(self.helper.right.dest, 's-20010101.xml'))
         assert self.helper.select('search.xml')
         eq_(len(self.helper.get_deleted_files()), 0)
 
@@ -260,9 +325,27 @@ class TestDiffHelper(amo.tests.TestCase):
     def setUp(self):
         src = os.path.join(settings.ROOT, get_file('dictionary-test.xpi'))
         self.helper = DiffHelper(make_file(1, src), make_file(2, src))
+        self.repacked = []
 
     def tearDown(self):
-        self.helper.cleanup()
+        self.helper.left.package.remove()
+        self.helper.right.package.remove()
+        for path in self.repacked:
+            os.remove(path)
+
+    def repack(self, side, **kw):
+        viewer = getattr(self.helper, side)
+        viewer.src = repack(viewer.src, **kw)
+        self.repacked.append(viewer.src)
+
+    def change(self, side, text, filename='install.js'):
+        with zipfile.ZipFile(getattr(self.helper, side).src) as zip:
+            contents = zip.read(filename)
+        self.repack(side, add={filename: contents + text})
+
+    def test_shared(self):
+        self.helper.extract()
+        eq_(self.helper.left.dest, self.helper.right.dest)
 
     def test_files_not_extracted(self):
         eq_(self.helper.is_extracted(), False)
@@ -281,8 +364,8 @@ class TestDiffHelper(amo.tests.TestCase):
         assert self.helper.is_diffable()
 
     def test_diffable_one_missing(self):
+        self.repack('right', remove=['install.js'])
         self.helper.extract()
-        os.remove(os.path.join(self.helper.right.dest, 'install.js'))
         self.helper.select('install.js')
         assert self.helper.is_diffable()
 
@@ -297,8 +380,8 @@ class TestDiffHelper(amo.tests.TestCase):
         assert not self.helper.is_diffable()
 
     def test_diffable_deleted_files(self):
+        self.repack('left', remove=['install.js'])
         self.helper.extract()
-        os.remove(os.path.join(self.helper.left.dest, 'install.js'))
         eq_('install.js' in self.helper.get_deleted_files(), True)
 
     def test_diffable_one_binary_same(self):
@@ -308,18 +391,16 @@ class TestDiffHelper(amo.tests.TestCase):
         assert self.helper.is_binary()
 
     def test_diffable_one_binary_diff(self):
+        self.change('left', 'asd')
         self.helper.extract()
-        self.change(self.helper.left.dest, 'asd')
-        cache.clear()
         self.helper.select('install.js')
         self.helper.left.selected['binary'] = True
         assert self.helper.is_binary()
 
     def test_diffable_two_binary_diff(self):
+        self.change('left', 'asd')
+        self.change('right', 'asd123')
         self.helper.extract()
-        self.change(self.helper.left.dest, 'asd')
-        self.change(self.helper.right.dest, 'asd123')
-        cache.clear()
         self.helper.select('install.js')
         self.helper.left.selected['binary'] = True
         self.helper.right.selected['binary'] = True
@@ -333,19 +414,72 @@ class TestDiffHelper(amo.tests.TestCase):
         assert self.helper.left.selected['msg'].startswith('This file')
 
     def test_diffable_parent(self):
+        self.change('left', 'asd', filename='__MACOSX/._dictionaries')
         self.helper.extract()
-        self.change(self.helper.left.dest, 'asd',
-                    filename='__MACOSX/._dictionaries')
-        cache.clear()
         files = self.helper.get_files()
         eq_(files['__MACOSX/._dictionaries']['diff'], True)
         eq_(files['__MACOSX']['diff'], True)
 
-    def change(self, file, text, filename='install.js'):
-        path = os.path.join(file, filename)
-        data = open(path, 'r').read()
-        data += text
-        open(path, 'w').write(data)
+
+class TestPackageCache(amo.tests.TestCase):
+
+    def setUp(self):
+        self.old = archive.Package(get_file('dictionary-test.xpi'))
+        self.new = archive.Package(get_file('recurse.xpi'))
+        self.old.build()
+        self.new.build()
+        os.utime(self.old.path, (1, 1))
+
+    def tearDown(self):
+        self.old.remove()
+        self.new.remove()
+
+    def size(self, package):
+        return sum(os.path.getsize(os.path.join(path, name))
+                   for path, dirs, names in os.walk(package.path)
+                   for name in names)
+
+    def test_evict_least_recent(self):
+        archive.evict(budget=self.size(self.new))
+        assert not os.path.exists(self.old.path)
+        assert os.path.exists(self.new.path)
+
+    def test_evict_under_budget(self):
+        archive.evict(budget=self.size(self.old) + self.size(self.new))
+        assert os.path.exists(self.old.path)
+        assert os.path.exists(self.new.path)
+
+    def test_use_counts(self):
+        os.utime(self.new.path, (2, 2))
+        self.old.index()
+        archive.evict(budget=self.size(self.old))
+        assert os.path.exists(self.old.path)
+        assert not os.path.exists(self.new.path)
+
+    def test_nested(self):
+        short = 'recurse/somejar.jar/recurse/recurse.xpi/chrome/test-root.txt'
+        entry = dict((e['short'], e) for e in self.new.index())[short]
+        eq_(len(entry['chain']), 3)
+        full = self.new.extract(entry)
+        eq_(full, os.path.join(self.new.dest, short))
+        eq_(os.path.getsize(full), entry['size'])
+
+    def test_member(self):
+        path = self.old.extract(self.old.member('install.rdf'))
+        eq_(path, os.path.join(self.old.dest, 'install.rdf'))
+        with self.assertRaises(IOError):
+            self.old.member('nope.rdf')
+
+    def test_names(self):
+        ok_('dictionaries/ar.dic' in self.old.names())
+
+    def test_listing_not_read(self):
+        self.old.remove()
+        with patch('files.archive.read_member') as read_member:
+            self.old.build()
+        ok_(not read_member.called)
+        entries = dict((e['short'], e) for e in self.old.index())
+        eq_(entries['install.rdf']['head'], map(ord, '<?xm'))
 
 
 class TestSafeUnzipFile(amo.tests.TestCase, amo.tests.AMOPaths):
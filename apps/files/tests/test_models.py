@@ -25,7 +25,8 @@ from addons.models import Addon
 from applications.models import Application, AppVersion
 from files.models import File, FileUpload, FileValidation, nfd_str, Platform
 from files.helpers import copyfileobj
-from files.utils import check_rdf, JetpackUpgrader, parse_addon, parse_xpi
+from files.utils import (check_rdf, JetpackUpgrader, parse_addon, parse_xpi,
+                         WebAppParser)
 from versions.models import Version
 
 
@@ -597,6 +598,65 @@ class TestFileUpload(UploadTest):
         fu = FileUpload.from_post('', u'\u05d0\u05d5\u05e1\u05e3.xpi', 0)
         assert 'xpi' in fu.name
 
+    def packaged_app(self):
+        path = os.path.join(settings.ROOT, 'mkt', 'submit', 'tests',
+                            'packaged', 'mozball.zip')
+        with open(path, 'rb') as fobj:
+            self.data = fobj.read()
+        data = [''.join(x) for x in amo.utils.chunked(self.data, 1000)]
+        return FileUpload.from_post(data, 'mozball.zip', len(self.data),
+                                    is_webapp=True)
+
+    def test_from_post_size(self):
+        eq_(self.upload().size, len(self.data))
+
+    def test_from_post_not_a_zip(self):
+        upload = FileUpload.from_post([self.data], 'manifest.webapp',
+                                      len(self.data), is_webapp=True)
+        eq_(upload.size, len(self.data))
+        eq_(upload.manifest, None)
+
+    def test_from_post_manifest(self):
+        upload = self.packaged_app()
+        eq_(upload.hash,
+            'sha256:%s' % hashlib.sha256(self.data).hexdigest())
+        eq_(upload.size, len(self.data))
+        manifest = zipfile.ZipFile(upload.path).read('manifest.webapp')
+        eq_(upload.manifest, manifest.decode('utf-8'))
+
+    def test_from_post_manifest_only_webapps(self):
+        self.packaged_app()
+        upload = FileUpload.from_post([self.data], 'mozball.zip',
+                                      len(self.data))
+        eq_(upload.manifest, None)
+
+    @mock.patch.object(settings, 'FILE_UNZIP_SIZE_LIMIT', 5)
+    def test_from_post_manifest_invalid(self):
+        eq_(self.packaged_app().manifest, None)
+
+    def test_manifest_reused(self):
+        upload = self.packaged_app()
+        with mock.patch('files.utils.SafeUnzip') as unzip:
+            data = WebAppParser().get_json_data(upload)
+        assert not unzip.called
+        eq_(data['name'], u'Packaged MozillaBall \u3087')
+
+    def test_manifest_fallback(self):
+        upload = self.packaged_app()
+        upload.manifest = None
+        eq_(WebAppParser().get_json_data(upload)['name'],
+            u'Packaged MozillaBall \u3087')
+
+    def test_from_upload_reuses_hash(self):
+        upload = self.upload()
+        version = Version.objects.filter(addon__pk=3615)[0]
+        plat = Platform.objects.get(pk=amo.PLATFORM_LINUX.id)
+        with mock.patch.object(File, 'generate_hash') as generate_hash:
+            file_ = File.from_upload(upload, version, plat)
+        assert not generate_hash.called
+        eq_(file_.hash, upload.hash)
+        eq_(file_.size, len(self.data))
+
     def test_validator_sets_binary_via_extensions(self):
         validation = json.dumps({
             "errors": 0,
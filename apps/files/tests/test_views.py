@@ -19,8 +19,10 @@ import amo
 import amo.tests
 from amo.urlresolvers import reverse
 from addons.models import Addon
+from files.archive import evict
 from files.helpers import DiffHelper, FileViewer
 from files.models import File, Platform
+from files.tests.test_helpers import repack
 from users.models import UserProfile
 
 dictionary = 'apps/files/fixtures/files/dictionary-test.xpi'
@@ -75,7 +77,8 @@ class FilesBase:
         Switch.objects.get_or_create(name='delay-file-viewer', active=True)
 
     def tearDown(self):
-        self.file_viewer.cleanup()
+        # Packages are shared, so cleanup() leaves them to evict().
+        evict(0)
 
     def files_redirect(self, file):
         return reverse('files.redirect', args=[self.file.pk, file])
@@ -325,8 +328,11 @@ class TestFileViewer(FilesBase, amo.tests.TestCase):
             eq_(self.client.get(url).status_code, status)
 
     def add_file(self, name, contents):
-        dest = os.path.join(self.file_viewer.dest, name)
-        open(dest, 'w').write(contents)
+        shutil.move(repack(self.file.file_path, add={name: contents}),
+                    self.file.file_path)
+        self.file.update(hash=self.file.generate_hash())
+        self.file_viewer = FileViewer(self.file)
+        self.file_viewer.extract()
 
     def test_files_xss(self):
         self.file_viewer.extract()
@@ -366,7 +372,8 @@ class TestFileViewer(FilesBase, amo.tests.TestCase):
         self.add_file('file.php', '<script>alert("foo")</script>')
         res = self.client.get(self.file_url('file.php'))
         eq_(res.status_code, 200)
-        assert self.file_viewer.get_files()['file.php']['md5'] in res.content
+        self.file_viewer.select('file.php')
+        assert self.file_viewer.selected['md5'] in res.content
 
     def test_tree_no_file(self):
         self.file_viewer.extract()
@@ -379,7 +386,10 @@ class TestFileViewer(FilesBase, amo.tests.TestCase):
         eq_(res.status_code, 404)
 
     def test_unicode(self):
-        self.file_viewer.src = unicode_filenames
+        shutil.copyfile(os.path.join(settings.ROOT, unicode_filenames),
+                        self.file.file_path)
+        self.file.update(hash=self.file.generate_hash())
+        self.file_viewer = FileViewer(self.file)
         self.file_viewer.extract()
         res = self.client.get(self.file_url(iri_to_uri(u'\u1109\u1161\u11a9')))
         eq_(res.status_code, 200)
@@ -471,9 +481,11 @@ class TestDiffViewer(FilesBase, amo.tests.TestCase):
         return reverse('files.compare.poll', args=[self.files[0].pk,
                                                    self.files[1].pk])
 
-    def add_file(self, file_obj, name, contents):
-        dest = os.path.join(file_obj.dest, name)
-        open(dest, 'w').write(contents)
+    def repack(self, file_obj, **kw):
+        shutil.move(repack(file_obj.file_path, **kw), file_obj.file_path)
+        file_obj.update(hash=file_obj.generate_hash())
+        self.file_viewer = DiffHelper(self.files[0], self.files[1])
+        self.file_viewer.extract()
 
     def file_url(self, file=None):
         args = [self.files[0].pk, self.files[1].pk]
@@ -512,31 +524,25 @@ class TestDiffViewer(FilesBase, amo.tests.TestCase):
         eq_(len(doc('#content-wrapper p')), 2)
 
     def test_view_one_missing(self):
-        self.file_viewer.extract()
-        os.remove(os.path.join(self.file_viewer.right.dest, 'install.js'))
+        self.repack(self.files[1], remove=['install.js'])
         res = self.client.get(self.file_url(not_binary))
         doc = pq(res.content)
         eq_(len(doc('pre')), 3)
         eq_(len(doc('#content-wrapper p')), 1)
 
     def test_view_left_binary(self):
-        self.file_viewer.extract()
-        filename = os.path.join(self.file_viewer.left.dest, 'install.js')
-        open(filename, 'w').write('MZ')
+        self.repack(self.files[0], add={'install.js': 'MZ'})
         res = self.client.get(self.file_url(not_binary))
         assert 'This file is not viewable online' in res.content
 
     def test_view_right_binary(self):
-        self.file_viewer.extract()
-        filename = os.path.join(self.file_viewer.right.dest, 'install.js')
-        open(filename, 'w').write('MZ')
+        self.repack(self.files[1], add={'install.js': 'MZ'})
         assert not self.file_viewer.is_diffable()
         res = self.client.get(self.file_url(not_binary))
         assert 'This file is not viewable online' in res.content
 
     def test_different_tree(self):
-        self.file_viewer.extract()
-        os.remove(os.path.join(self.file_viewer.left.dest, not_binary))
+        self.repack(self.files[0], remove=[not_binary])
         res = self.client.get(self.file_url(not_binary))
         doc = pq(res.content)
         eq_(doc('h4:last').text(), 'Deleted files:')
@@ -1,4 +1,5 @@
 import collections
+import fnmatch
 import glob
 import hashlib
 import json
@@ -8,8 +9,10 @@ import re
 import shutil
 import stat
 import StringIO
+import struct
 import tempfile
 import zipfile
+import zlib
 
 from cStringIO import StringIO as cStringIO
 from datetime import datetime
@@ -83,8 +86,10 @@ class Extractor(object):
     App = collections.namedtuple('App', 'appdata id min max')
     manifest = u'urn:mozilla:install-manifest'
 
-    def __init__(self, path):
+    def __init__(self, path, names=None):
         self.path = path
+        # The members of the package, when they aren't all under `path`.
+        self.names = names
         self.rdf = rdflib.Graph().parse(open(os.path.join(path,
                                                           'install.rdf')))
         self.find_root()
@@ -102,8 +107,8 @@ class Extractor(object):
         }
 
     @classmethod
-    def parse(cls, install_rdf):
-        return cls(install_rdf).data
+    def parse(cls, install_rdf, names=None):
+        return cls(install_rdf, names).data
 
     def find_type(self):
         # If the extension declares a type that we know about, use
@@ -118,9 +123,14 @@ class Extractor(object):
             return amo.ADDON_THEME
 
         # Look for dictionaries.
-        dic = os.path.join(self.path, 'dictionaries')
-        if os.path.exists(dic) and glob.glob('%s/*.dic' % dic):
-            return amo.ADDON_DICT
+        if self.names is not None:
+            if any(fnmatch.fnmatch(name, 'dictionaries/*.dic') and
+                   name.count('/') == 1 for name in self.names):
+                return amo.ADDON_DICT
+        else:
+            dic = os.path.join(self.path, 'dictionaries')
+            if os.path.exists(dic) and glob.glob('%s/*.dic' % dic):
+                return amo.ADDON_DICT
 
         # Consult <em:type>.
         return self.TYPES.get(declared_type, amo.ADDON_EXTENSION)
@@ -213,6 +223,10 @@ class WebAppParser(object):
         return ex
 
     def get_json_data(self, fileorpath):
+        manifest = getattr(fileorpath, 'manifest', None)
+        if manifest:
+            # Picked out of the package while it was uploaded.
+            return WebAppParser.decode_manifest(manifest.encode('utf-8'))
         path = get_filepath(fileorpath)
         if zipfile.is_zipfile(path):
             zf = SafeUnzip(path)
@@ -460,12 +474,14 @@ def extract_xpi(xpi, path, expand=False):
 
 def parse_xpi(xpi, addon=None):
     """Extract and parse an XPI."""
-    # Extract to /tmp
-    path = tempfile.mkdtemp()
+    from files.archive import Package
     try:
-        xpi = get_file(xpi)
-        extract_xpi(xpi, path)
-        rdf = Extractor.parse(path)
+        # Only install.rdf is written out, into the package cache shared
+        # with the file viewer.
+        package = Package(get_file(xpi))
+        package.extract(package.member('install.rdf'))
+        # The rest isn't written out, so its type comes from the listing.
+        rdf = Extractor.parse(package.dest, names=package.names())
     except forms.ValidationError:
         raise
     except IOError as e:
@@ -478,8 +494,6 @@ def parse_xpi(xpi, addon=None):
     except Exception:
         log.error('XPI parse error', exc_info=True)
         raise forms.ValidationError(_('Could not parse install.rdf.'))
-    finally:
-        rm_local_tmp_dir(path)
 
     return check_rdf(rdf, addon)
 
@@ -543,6 +557,179 @@ def get_sha256(filename, **kw):
     return _get_hash(filename, hash=hashlib.sha256, **kw)
 
 
+class PackageStream(object):
+    """
+    Looks at an upload while it's being written, so that nothing has to read
+    it back afterwards. Feed it every chunk, then `close()` it to get:
+
+    - `hash`: 'sha256:<hex>' of the contents.
+    - `size`: how many bytes there were.
+    - `valid`: whether the central directory passes the `SafeUnzip.is_valid`
+      checks. None when that couldn't be told from the stream, eg: it isn't
+      a zip or the directory is too big to keep around.
+    - `member`: the contents of the top level file called `member`, eg:
+      'manifest.webapp', picked out of the local headers as they go by. None
+      unless the package is valid and the central directory agrees with it.
+    """
+    # Local file header, central directory record and end of central
+    # directory record, as in zipfile.
+    LOCAL = struct.Struct('<4s2B4HL2L2H')
+    CENTRAL = struct.Struct('<4s4B4HL2L5H2L')
+    END = struct.Struct('<4s4H2LH')
+    # How much of the end of the file is kept to find the directory in.
+    TAIL = 4 * 1024 * 1024
+    # The biggest `member` that is kept in memory.
+    MEMBER = 1024 * 1024
+
+    def __init__(self, member=None):
+        self.member_name = member
+        self.member = None
+        self.valid = None
+        self.hash = None
+        self.size = 0
+        self._sha = hashlib.sha256()
+        self._tail = collections.deque()
+        self._tail_size = 0
+        # The bytes of a local header waiting for the rest of it, and how
+        # much of the current member's data is still to come.
+        self._pending = ''
+        self._data_left = 0
+        self._local = True
+        self._reading = None
+        self._captured = None
+
+    def feed(self, chunk):
+        self._sha.update(chunk)
+        self.size += len(chunk)
+        self._tail.append(chunk)
+        self._tail_size += len(chunk)
+        while self._tail_size - len(self._tail[0]) >= self.TAIL:
+            self._tail_size -= len(self._tail.popleft())
+        if self._local:
+            self._parse(chunk)
+
+    def _parse(self, chunk):
+        data = self._pending + chunk if self._pending else chunk
+        # Where `data` starts in the file.
+        base = self.size - len(data)
+        pos = 0
+        while pos < len(data):
+            if self._data_left:
+                skip = min(self._data_left, len(data) - pos)
+                self._data_left -= skip
+                if self._reading:
+                    self._read(data[pos:pos + skip])
+                pos += skip
+                continue
+
+            if len(data) - pos < self.LOCAL.size:
+                break
+            header = self.LOCAL.unpack_from(data, pos)
+            if header[0] != zipfile.stringFileHeader or header[3] & 0x9:
+                # The local headers are over, it isn't a zip, or the member
+                # is encrypted or has its sizes after the data so there's
+                # no telling where it ends. The directory will do.
+                self._local = False
+                self._reading = None
+                break
+            name_length, extra_length = header[10], header[11]
+            start = pos + self.LOCAL.size
+            if len(data) < start + name_length + extra_length:
+                break
+            if (data[start:start + name_length] == self.member_name and
+                self._captured is None):
+                self._start(base + pos, method=header[4], crc=header[7],
+                            size=header[9])
+            pos = start + name_length + extra_length
+            self._data_left = header[8]
+            if not self._data_left and self._reading:
+                self._read('')
+        self._pending = data[pos:] if self._local else ''
+
+    def _start(self, offset, method, crc, size):
+        if (method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) or
+            size > min(self.MEMBER, settings.FILE_UNZIP_SIZE_LIMIT)):
+            return
+        self._reading = {
+            'offset': offset, 'crc': crc, 'size': size, 'chunks': [],
+            'read': 0, 'zlib': (zlib.decompressobj(-15)
+                                if method == zipfile.ZIP_DEFLATED else None)}
+
+    def _read(self, piece):
+        member = self._reading
+        inflate = member['zlib']
+        try:
+            if inflate:
+                # Never inflate more than it says it is, plus one byte to
+                # tell if it lied.
+                piece = inflate.decompress(
+                    piece, member['size'] - member['read'] + 1)
+                if not self._data_left and not inflate.unconsumed_tail:
+                    piece += inflate.flush()
+        except zlib.error:
+            self._reading = None
+            return
+        member['read'] += len(piece)
+        if member['read'] > member['size'] or (inflate and
+                                               inflate.unconsumed_tail):
+            # Leave it to SafeUnzip to complain about.
+            self._reading = None
+            return
+        member['chunks'].append(piece)
+        if not self._data_left:
+            self._reading = None
+            contents = ''.join(member['chunks'])
+            if (len(contents) == member['size'] and
+                zlib.crc32(contents) & 0xffffffff == member['crc']):
+                self._captured = (member['offset'], member['crc'], contents)
+
+    def close(self):
+        self.hash = 'sha256:%s' % self._sha.hexdigest()
+        tail = ''.join(self._tail)
+        self._tail.clear()
+        self._check(tail)
+
+    def _check(self, tail):
+        """Find the central directory at the end of `tail` and check it."""
+        end = tail.rfind(zipfile.stringEndArchive,
+                         max(0, len(tail) - self.END.size - 65535))
+        if end < 0 or len(tail) - end < self.END.size:
+            return
+        record = self.END.unpack_from(tail, end)
+        count, length, offset, comment = record[4:8]
+        # Where the directory starts in `tail`.
+        start = offset - (self.size - len(tail))
+        if (count == 0xffff or 0xffffffff in (length, offset) or
+            end + self.END.size + comment != len(tail) or
+            start < 0 or start + length != end):
+            # Zip64, junk at either end or too big to have been kept.
+            return
+
+        pos, member = start, None
+        for x in xrange(count):
+            if pos + self.CENTRAL.size > end:
+                return
+            record = self.CENTRAL.unpack_from(tail, pos)
+            if record[0] != zipfile.stringCentralDir:
+                return
+            name_length, extra_length, comment_length = record[12:15]
+            name = tail[pos + self.CENTRAL.size:
+                        pos + self.CENTRAL.size + name_length]
+            pos += (self.CENTRAL.size + name_length + extra_length +
+                    comment_length)
+            if ('..' in name or name.startswith('/') or
+                record[11] > settings.FILE_UNZIP_SIZE_LIMIT):
+                self.valid = False
+                return
+            if name == self.member_name:
+                # ZipFile goes by the last one with that name.
+                member = (record[18], record[9])
+
+        self.valid = True
+        if self._captured and self._captured[:2] == member:
+            self.member = self._captured[2]
+
+
 def find_jetpacks(minver, maxver, from_builder_only=False):
     """
     Find all jetpack files that aren't disabled.
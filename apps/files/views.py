@@ -191,5 +191,11 @@ def serve(request, viewer, key):
         log.error(u'Couldn\'t find %s in %s (%d entries) for file %s' %
                   (key, files.keys()[:10], len(files.keys()), viewer.file.id))
         raise http.Http404
+    try:
+        viewer.package.extract(obj)
+    except (IOError, OSError), err:
+        log.error(u'Couldn\'t write out %s for file %s: %s' %
+                  (key, viewer.file.id, err))
+        raise http.Http404
     return HttpResponseSendFile(request, obj['full'],
                                 content_type=obj['mimetype'])
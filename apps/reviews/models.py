@@ -97,10 +97,10 @@ class Review(amo.models.ModelBase):
         from . import tasks
 
         if update_denorm:
-            pair = self.addon_id, self.user_id
-            # Do this immediately so is_latest is correct. Use default
-            # to avoid slave lag.
-            tasks.update_denorm(pair, using='default')
+            # Do this immediately so is_latest is correct, and in the current
+            # transaction so it isn't committed halfway. Use default to avoid
+            # slave lag.
+            tasks.set_denorm([self.addon_id], [self.user_id], using='default')
 
         # Review counts have changed, so run the task and trigger a reindex.
         tasks.addon_review_aggregates.delay(self.addon_id, using='default')
@@ -185,6 +185,19 @@ class GroupedRating(object):
         cache.set(cls.key(addon), ratings)
         return ratings
 
+    @classmethod
+    def set_many(cls, addons, using=None):
+        """Like `set` for a bunch of add-ons, with one query."""
+        q = (Review.objects.valid().using(using)
+             .filter(addon__in=addons, is_latest=True)
+             .values_list('addon', 'rating')
+             .annotate(models.Count('rating')).order_by())
+        counts = dict(((addon, rating), count) for addon, rating, count in q)
+        cache.set_many(dict(
+            (cls.key(addon), [(rating, counts.get((addon, rating), 0))
+                              for rating in range(1, 6)])
+            for addon in addons))
+
 
 class Spam(object):
 
@@ -1,15 +1,24 @@
 import logging
 
-from django.db.models import Count, Avg, F
+from django.db import connections, transaction
+from django.db.models import Avg
 
 import caching.base as caching
 from celeryutils import task
 
+import amo.utils
 from addons.models import Addon
 from .models import Review, GroupedRating
 
 log = logging.getLogger('z.task')
 
+# How many add-ons to update with each set of queries.
+CHUNK_SIZE = 100
+
+
+def _in(ids):
+    return ','.join(['%s'] * len(ids))
+
 
 @task(rate_limit='50/m')
 def update_denorm(*pairs, **kw):
@@ -20,19 +29,54 @@ def update_denorm(*pairs, **kw):
     log.info('[%s@%s] Updating review denorms.' %
              (len(pairs), update_denorm.rate_limit))
     using = kw.get('using')
-    for addon, user in pairs:
-        reviews = list(Review.objects.valid().no_cache().using(using)
-                       .filter(addon=addon, user=user).order_by('created'))
-        if not reviews:
-            continue
+    for chunk in amo.utils.chunked(pairs, CHUNK_SIZE):
+        addons = list(set(addon for addon, user in chunk))
+        users = list(set(user for addon, user in chunk))
+        with transaction.commit_on_success(using=using):
+            set_denorm(addons, users, using)
 
-        for idx, review in enumerate(reviews):
-            review.previous_count = idx
-            review.is_latest = False
-        reviews[-1].is_latest = True
 
-        for review in reviews:
-            review.save()
+def set_denorm(addons, users, using=None):
+    """
+    Sets the denormalized review fields for the given add-ons and users.
+    This runs in the caller's transaction; `update_denorm` commits each chunk.
+    """
+    # This may touch a few more pairs than we were given, but recomputing the
+    # fields for any pair is harmless and keeps the query simple. Reviews are
+    # ordered by `created`, with the id to break ties.
+    sql = """
+        UPDATE reviews AS r
+        INNER JOIN (
+            SELECT r1.id, COUNT(r2.id) AS previous
+            FROM reviews AS r1
+            LEFT JOIN reviews AS r2
+                ON r2.addon_id = r1.addon_id AND r2.user_id = r1.user_id
+                AND r2.reply_to IS NULL
+                AND (r2.created < r1.created OR
+                     (r2.created = r1.created AND r2.id < r1.id))
+            WHERE r1.reply_to IS NULL
+                AND r1.addon_id IN ({addons}) AND r1.user_id IN ({users})
+            GROUP BY r1.id
+        ) AS counts ON counts.id = r.id
+        INNER JOIN (
+            SELECT addon_id, user_id, COUNT(*) AS total
+            FROM reviews
+            WHERE reply_to IS NULL
+                AND addon_id IN ({addons}) AND user_id IN ({users})
+            GROUP BY addon_id, user_id
+        ) AS totals
+            ON totals.addon_id = r.addon_id AND totals.user_id = r.user_id
+        SET r.previous_count = counts.previous,
+            r.is_latest = (counts.previous = totals.total - 1)
+    """.format(addons=_in(addons), users=_in(users))
+    cursor = connections[using or 'default'].cursor()
+    cursor.execute(sql, (addons + users) * 2)
+
+    # Nothing was saved through the ORM, so invalidate the reviews once
+    # instead of sending post_save for each of them.
+    Review.objects.invalidate(*Review.objects.no_cache().using(using)
+                              .filter(addon__in=addons, user__in=users)
+                              .no_transforms())
 
 
 @task
@@ -40,21 +84,42 @@ def addon_review_aggregates(*addons, **kw):
     log.info('[%s@%s] Updating total reviews and average ratings.' %
              (len(addons), addon_review_aggregates.rate_limit))
     using = kw.get('using')
-    addon_objs = list(Addon.objects.filter(pk__in=addons))
-    stats = dict((x[0], x[1:]) for x in
-                 Review.objects.valid().no_cache().using(using)
-                 .filter(addon__in=addons, is_latest=True)
-                 .values_list('addon')
-                 .annotate(Avg('rating'), Count('addon')))
-    for addon in addon_objs:
-        rating, reviews = stats.get(addon.id, [0, 0])
-        addon.update(total_reviews=reviews, average_rating=rating)
+    for chunk in amo.utils.chunked(addons, CHUNK_SIZE):
+        _update_aggregates(chunk, using)
 
     # Delay bayesian calculations to avoid slave lag.
     addon_bayesian_rating.apply_async(args=addons, countdown=5)
     addon_grouped_rating.apply_async(args=addons, kwargs={'using': using})
 
 
+@transaction.commit_on_success
+def _update_aggregates(addons, using=None):
+    sql = """
+        UPDATE addons AS a
+        LEFT JOIN (
+            SELECT addon_id, AVG(rating) AS rating, COUNT(addon_id) AS total
+            FROM reviews
+            WHERE reply_to IS NULL AND is_latest = 1
+                AND addon_id IN ({addons})
+            GROUP BY addon_id
+        ) AS r ON r.addon_id = a.id
+        SET a.totalreviews = COALESCE(r.total, 0),
+            a.averagerating = COALESCE(r.rating, 0)
+        WHERE a.id IN ({addons})
+    """.format(addons=_in(addons))
+    cursor = connections[using or 'default'].cursor()
+    cursor.execute(sql, list(addons) * 2)
+    _refresh_addons(addons)
+
+
+def _refresh_addons(addons):
+    # All our updates were sql, so invalidate and reindex manually, once.
+    from addons.tasks import index_addons
+    Addon.objects.invalidate(*Addon.objects.no_cache()
+                             .filter(id__in=addons).no_transforms())
+    index_addons.delay(list(addons))
+
+
 @task
 def addon_bayesian_rating(*addons, **kw):
     log.info('[%s@%s] Updating bayesian ratings.' %
@@ -66,18 +131,18 @@ def addon_bayesian_rating(*addons, **kw):
     if avg['rating'] is None:
         return
     mc = avg['reviews'] * avg['rating']
-    for addon in Addon.objects.no_cache().filter(id__in=addons):
-        if addon.average_rating is None:
-            # Ignoring addons with no average rating.
-            continue
-
-        q = Addon.objects.filter(id=addon.id)
-        if addon.total_reviews:
-            num = mc + F('total_reviews') * F('average_rating')
-            denom = avg['reviews'] + F('total_reviews')
-            q.update(bayesian_rating=num / denom)
-        else:
-            q.update(bayesian_rating=0)
+    for chunk in amo.utils.chunked(addons, CHUNK_SIZE):
+        # Ignoring addons with no average rating.
+        sql = """
+            UPDATE addons
+            SET bayesianrating = IF(totalreviews,
+                (%s + totalreviews * averagerating) / (%s + totalreviews), 0)
+            WHERE averagerating IS NOT NULL AND id IN ({addons})
+        """.format(addons=_in(chunk))
+        cursor = connections['default'].cursor()
+        cursor.execute(sql, [mc, avg['reviews']] + list(chunk))
+        Addon.objects.invalidate(*Addon.objects.no_cache()
+                                 .filter(id__in=chunk).no_transforms())
 
 
 @task
@@ -87,5 +152,5 @@ def addon_grouped_rating(*addons, **kw):
     log.info('[%s@%s] Updating addon grouped ratings.' %
              (len(addons), addon_grouped_rating.rate_limit))
     using = kw.get('using')
-    for addon in addons:
-        GroupedRating.set(addon, using=using)
+    for chunk in amo.utils.chunked(addons, CHUNK_SIZE):
+        GroupedRating.set_many(chunk, using=using)
@@ -1,5 +1,10 @@
+from datetime import datetime, timedelta
+
+from django.db.models import Avg
+from django.db.models.signals import post_save
 from django.utils import translation
 
+import mock
 from nose.tools import eq_
 import test_utils
 
@@ -107,3 +112,136 @@ class TestRefreshTest(amo.tests.ESTestCase):
         self.refresh()
 
         eq_(self.get_bayesian_rating(), 0.0)
+
+
+class TestSetBasedTasks(amo.tests.TestCase):
+    fixtures = ['base/users']
+
+    def setUp(self):
+        self.addons = [amo.tests.addon_factory() for x in range(3)]
+        users = list(UserProfile.objects.all()[:3])
+        start = datetime.now() - timedelta(days=30)
+        for x, (addon, user, rating) in enumerate([
+                (0, 0, 5), (0, 0, 3), (0, 0, 1), (0, 1, 4), (1, 0, 2),
+                (1, 2, 5), (1, 2, 4), (0, 2, 3)]):
+            review = Review.objects.create(addon=self.addons[addon],
+                                           user=users[user], rating=rating)
+            # Created out of order so the ids don't match the ordering.
+            Review.objects.filter(pk=review.pk).update(
+                created=start + timedelta(days=(x * 7) % 10))
+        first = Review.objects.filter(addon=self.addons[0])[0]
+        Review.objects.create(addon=self.addons[0], user=users[1],
+                              reply_to=first, rating=None)
+        self.pairs = set(Review.objects.values_list('addon', 'user'))
+
+    def expected_denorm(self):
+        expected = {}
+        for addon, user in self.pairs:
+            reviews = sorted(Review.objects.valid().no_cache()
+                             .filter(addon=addon, user=user),
+                             key=lambda r: (r.created, r.id))
+            for idx, review in enumerate(reviews):
+                expected[review.id] = (idx, review == reviews[-1])
+        return expected
+
+    def denorm(self):
+        return dict((pk, (previous, latest)) for pk, previous, latest in
+                    Review.objects.valid().no_cache()
+                    .values_list('id', 'previous_count', 'is_latest'))
+
+    def test_update_denorm(self):
+        expected = self.expected_denorm()
+        Review.objects.update(is_latest=False, previous_count=9)
+        tasks.update_denorm(*self.pairs)
+        eq_(self.denorm(), expected)
+
+    def test_update_denorm_leaves_replies(self):
+        Review.objects.update(is_latest=False, previous_count=9)
+        tasks.update_denorm(*self.pairs)
+        eq_(list(Review.objects.filter(reply_to__isnull=False)
+                 .values_list('previous_count', 'is_latest')), [(9, False)])
+
+    def test_update_denorm_no_signals(self):
+        receiver = mock.Mock()
+        post_save.connect(receiver, sender=Review)
+        try:
+            tasks.update_denorm(*self.pairs)
+        finally:
+            post_save.disconnect(receiver, sender=Review)
+        assert not receiver.called
+
+    def test_update_denorm_invalidates(self):
+        review = Review.objects.valid().filter(is_latest=True)[0]
+        Review.objects.filter(pk=review.pk).update(is_latest=False)
+        tasks.update_denorm((review.addon_id, review.user_id))
+        eq_(Review.objects.get(pk=review.pk).is_latest, True)
+
+    @mock.patch('reviews.tasks.transaction')
+    def test_refresh_uses_caller_transaction(self, transaction):
+        review = Review.objects.valid().filter(is_latest=True)[0]
+        review.refresh(update_denorm=True)
+        assert not transaction.commit_on_success.called
+
+    def test_aggregates(self):
+        ids = [a.id for a in self.addons]
+        expected = {}
+        for addon in ids:
+            ratings = [r.rating for r in Review.objects.valid().no_cache()
+                       .filter(addon=addon, is_latest=True)]
+            expected[addon] = (len(ratings),
+                               (float(sum(ratings)) / len(ratings)
+                                if ratings else 0))
+        Addon.objects.filter(id__in=ids).update(total_reviews=99,
+                                                average_rating=1)
+        tasks.addon_review_aggregates(*ids)
+        for addon in Addon.objects.no_cache().filter(id__in=ids):
+            total, average = expected[addon.id]
+            eq_(addon.total_reviews, total)
+            eq_(round(addon.average_rating, 4), round(average, 4))
+            eq_(GroupedRating.get(addon.id, update_none=False),
+                GroupedRating.set(addon.id))
+
+    def test_bayesian_rating(self):
+        ids = [a.id for a in self.addons]
+        tasks.addon_review_aggregates(*ids)
+        avg = Addon.objects.aggregate(rating=Avg('average_rating'),
+                                      reviews=Avg('total_reviews'))
+        with mock.patch('reviews.tasks.caching.cached', lambda f, *a: f()):
+            tasks.addon_bayesian_rating(*ids)
+        for addon in Addon.objects.no_cache().filter(id__in=ids):
+            if addon.total_reviews:
+                expected = ((avg['reviews'] * avg['rating'] +
+                             addon.total_reviews * addon.average_rating) /
+                            (avg['reviews'] + addon.total_reviews))
+            else:
+                expected = 0
+            eq_(round(addon.bayesian_rating, 4), round(expected, 4))
+
+
+class TestDenormTransaction(amo.tests.MockEsMixin,
+                            test_utils.TransactionTestCase):
+    fixtures = ['base/users']
+
+    def setUp(self):
+        self.addon = amo.tests.addon_factory()
+        self.user = UserProfile.objects.all()[0]
+        for rating in (5, 3):
+            Review.objects.create(addon=self.addon, user=self.user,
+                                  rating=rating)
+        Review.objects.update(is_latest=False, previous_count=9)
+
+    def denorm(self):
+        return sorted(Review.objects.no_cache()
+                      .values_list('previous_count', 'is_latest'))
+
+    def test_update_denorm(self):
+        tasks.update_denorm((self.addon.id, self.user.id))
+        eq_(self.denorm(), [(0, False), (1, True)])
+
+    def test_update_denorm_rolls_back(self):
+        # Fail after the UPDATE has run, the chunk shouldn't be committed.
+        with mock.patch.object(Review.objects, 'invalidate') as invalidate:
+            invalidate.side_effect = RuntimeError('invalidate failed')
+            with self.assertRaises(RuntimeError):
+                tasks.update_denorm((self.addon.id, self.user.id))
+        eq_(self.denorm(), [(9, False), (9, False)])
@@ -0,0 +1,21 @@
+import time
+
+from django.conf import settings
+
+import commonware.log
+import cronjobs
+
+from search.suggest import catalogue, SuggestionIndex
+
+log = commonware.log.getLogger('z.cron')
+
+
+@cronjobs.register
+def build_suggestions():
+    """Rebuild the prefix index that search suggestions come from."""
+    start = time.time()
+    index = SuggestionIndex(catalogue())
+    index.save(settings.SEARCH_SUGGESTIONS_PATH)
+    log.info('Built the suggestion index of %s add-ons and %s words in '
+             '%.1fs.' % (len(index.entries), len(index.words),
+                         time.time() - start))
@@ -0,0 +1,85 @@
+"""
+Measures how many suggestion lookups per second the prefix index answers.
+
+    ./manage.py benchmark_suggestions --addons=200000 --lookups=20000
+
+The index is built from made up names unless `--index` points to one the
+build_suggestions cron wrote. Queries are prefixes of 3 to 8 characters of
+words from the names, and a few two word ones.
+"""
+import json
+import random
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+import amo
+from search.suggest import SuggestionIndex
+
+WORDS = ('ad', 'block', 'fire', 'fox', 'tab', 'mix', 'plus', 'sync', 'down',
+         'them', 'dark', 'light', 'video', 'helper', 'page', 'search', 'web',
+         'dev', 'tool', 'book', 'mark', 'note', 'mail', 'news', 'color')
+
+
+def catalogue(count):
+    rand = random.Random(0)
+    types = [amo.ADDON_EXTENSION, amo.ADDON_PERSONA]
+    for id_ in xrange(1, count + 1):
+        name = u' '.join(rand.choice(WORDS) + rand.choice(WORDS)
+                         for x in range(rand.randint(1, 4)))
+        names = {'en-US': name}
+        if not id_ % 10:
+            names['fr'] = name[::-1]
+        yield {'id': id_, 'type': rand.choice(types),
+               'url': '/addon/%s/' % id_,
+               'icons': {'32': 'icon-32', '64': 'icon-64'}, 'names': names,
+               'default_locale': 'en-US', 'rank': rand.randint(0, 100000)}
+
+
+class Command(BaseCommand):
+    help = 'Measure the throughput of the search suggestion index.'
+    option_list = BaseCommand.option_list + (
+        make_option('--addons', action='store', type='int', default=200000,
+                    help='Number of made up add-ons to index.'),
+        make_option('--lookups', action='store', type='int', default=20000,
+                    help='Number of lookups.'),
+        make_option('--index', action='store',
+                    help='Use the index in this file.'),
+    )
+
+    def handle(self, *args, **kw):
+        start = time.time()
+        if kw['index']:
+            index = SuggestionIndex.load(kw['index'])
+        else:
+            index = SuggestionIndex(catalogue(kw['addons']))
+        built = time.time() - start
+
+        rand = random.Random(1)
+        queries = []
+        for x in xrange(kw['lookups']):
+            word = rand.choice(index.words)
+            query = word[:rand.randint(3, 8)]
+            if not x % 5:
+                query = u'%s %s' % (rand.choice(index.words), query)
+            queries.append(query)
+
+        results = {}
+        for locale in ('en-us', 'fr'):
+            found = 0
+            start = time.time()
+            for query in queries:
+                found += len(index.lookup(query, locale,
+                                          types=[amo.ADDON_EXTENSION]))
+            took = time.time() - start
+            results[locale] = {'seconds': round(took, 3),
+                               'lookups_per_second': int(len(queries) / took),
+                               'results_per_lookup':
+                                   round(float(found) / len(queries), 1)}
+
+        self.stdout.write(json.dumps({'addons': len(index.entries),
+                                      'words': len(index.words),
+                                      'build_seconds': round(built, 1),
+                                      'results': results},
+                                     indent=2, sort_keys=True) + '\n')
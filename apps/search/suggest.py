@@ -0,0 +1,280 @@
+"""
+An in-memory prefix index of the names of public add-ons and themes, so that
+search suggestions don't go to ES or the database for every keystroke.
+
+The `build_suggestions` cron writes the index to
+`settings.SEARCH_SUGGESTIONS_PATH` and every process loads it from there,
+picking up a new one at most `settings.SEARCH_SUGGESTIONS_RELOAD` seconds
+after it's written. Without an index the suggesters fall back to ES.
+
+Every word of every name is indexed, in each locale the name is translated
+to. A name in the requested locale is used when there is one, else the name
+in the add-on's default locale, like translated fields do. Names starting
+with the query come first, then names with a word starting with it, each by
+average daily users.
+
+The index is a sorted list of words, searched with bisect. Short prefixes
+match so many words that their `CAP` most popular matches of each type in
+each locale are kept in a dict instead. A lookup looks at no more than
+`CAP` matches, most popular first.
+"""
+import bisect
+import cPickle as pickle
+import heapq
+import os
+import re
+import tempfile
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.utils import translation
+
+import commonware.log
+
+import amo
+from addons.models import Addon
+from amo.urlresolvers import get_url_prefix
+from amo.utils import chunked
+from translations.models import Translation
+
+log = commonware.log.getLogger('z.search')
+
+# Suggestions start at 3 characters, prefixes up to SHORT_PREFIX characters
+# keep their CAP most popular matches of each type in each locale.
+MIN_PREFIX = 3
+SHORT_PREFIX = 5
+CAP = 100
+# Bumped when the format of the file changes.
+VERSION = 1
+
+# The names in the add-on's default locale are indexed under this locale.
+DEFAULT = ''
+
+words_re = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(name):
+    return u' '.join(words_re.findall(name.lower()))
+
+
+class SuggestionIndex(object):
+    """
+    Built from catalogue entries, dicts with the `id`, `type`, `url`,
+    `icons`, `names` ({locale: name}), `default_locale` and `rank` of an
+    add-on. The url is without the locale and app prefix.
+    """
+
+    def __init__(self, entries):
+        self.built = time.time()
+        entries = sorted(entries, key=lambda e: (-e['rank'], e['id']))
+
+        self.locales = [DEFAULT]
+        locale_index = {DEFAULT: 0}
+        postings = {}
+        self.entries, self.ids = [], {}
+        for pos, entry in enumerate(entries):
+            default = entry['default_locale'].lower()
+            names = {}
+            for locale, name in entry['names'].items():
+                locale = locale.lower()
+                if not name or not name.strip():
+                    continue
+                if locale == default:
+                    tag = 0
+                else:
+                    if locale not in locale_index:
+                        locale_index[locale] = len(self.locales)
+                        self.locales.append(locale)
+                    tag = locale_index[locale]
+                names[tag] = (name, normalize(name))
+                for word in set(names[tag][1].split()):
+                    postings.setdefault(word, []).append(pos << 8 | tag)
+            if 0 not in names:
+                # Without a default name there is nothing to fall back to.
+                names[0] = names.values()[0] if names else (u'', u'')
+            self.ids[entry['id']] = pos
+            self.entries.append((entry['id'], entry['type'], entry['url'],
+                                 entry['icons']['32'], entry['icons']['64'],
+                                 names))
+
+        self.words = sorted(postings)
+        self.postings = [array('i', postings[word]) for word in self.words]
+
+        short = {}
+        for word, items in zip(self.words, self.postings):
+            for length in range(MIN_PREFIX, min(len(word), SHORT_PREFIX) + 1):
+                short.setdefault(word[:length], []).extend(items)
+        self.short = {}
+        for prefix, items in short.iteritems():
+            kept, counts = [], {}
+            for posting in sorted(set(items)):
+                # Capped by type as well, so that the themes aren't crowded
+                # out by extensions and the other way around.
+                key = (posting & 0xff, self.entries[posting >> 8][1])
+                if counts.get(key, 0) < CAP:
+                    counts[key] = counts.get(key, 0) + 1
+                    kept.append(posting)
+            self.short[prefix] = array('i', kept)
+
+    def matching(self, word):
+        """
+        Postings of the words starting with `word`, by popularity. The same
+        posting can come more than once, one after the other.
+        """
+        if len(word) <= SHORT_PREFIX:
+            return self.short.get(word, ())
+        start = end = bisect.bisect_left(self.words, word)
+        while end < len(self.words) and self.words[end].startswith(word):
+            end += 1
+        return heapq.merge(*self.postings[start:end])
+
+    def payload(self, pos, name):
+        id_, type_, url, icon32, icon64, names = self.entries[pos]
+        prefixer = get_url_prefix()
+        if prefixer:
+            url = prefixer.fix(url)
+        return {'id': unicode(id_), 'name': name, 'url': url,
+                'icons': {'32': icon32, '64': icon64}}
+
+    def lookup(self, q, locale=None, types=None, limit=10, excluded_ids=()):
+        """
+        Payloads like BaseAjaxSearch builds for the add-ons matching `q`,
+        with names in `locale`, or the current language.
+        """
+        locale = (locale or translation.get_language() or '').lower()
+        tag = self.locales.index(locale) if locale in self.locales else None
+
+        try:
+            pk = int(q)
+        except ValueError:
+            pk = None
+        if pk:
+            pos = self.ids.get(pk)
+            if pos is None:
+                return []
+            id_, type_, url, icon32, icon64, names = self.entries[pos]
+            if types and type_ not in types or id_ in excluded_ids:
+                return []
+            return [self.payload(pos, names.get(tag, names[0])[0])]
+
+        query = normalize(q)
+        words = query.split()
+        if len(query) < MIN_PREFIX or not words:
+            return []
+
+        # Names starting with the query, and the others. We're done once
+        # there are `limit` of the first, or CAP matches were looked at.
+        first, rest, seen, last = [], [], 0, None
+        for posting in self.matching(max(words, key=len)):
+            if posting == last:
+                continue
+            last = posting
+            pos, name_tag = posting >> 8, posting & 0xff
+            id_, type_, url, icon32, icon64, names = self.entries[pos]
+            if name_tag == 0:
+                # The default name only counts without a translation.
+                if tag and tag in names:
+                    continue
+            elif name_tag != tag:
+                continue
+            if types and type_ not in types or id_ in excluded_ids:
+                continue
+            name, normalized = names[name_tag]
+            if len(words) > 1:
+                name_words = normalized.split()
+                if not all(any(w.startswith(word) for w in name_words)
+                           for word in words):
+                    continue
+            if normalized.startswith(query):
+                first.append((pos, name))
+                if len(first) == limit:
+                    break
+            elif len(rest) < limit:
+                rest.append((pos, name))
+            seen += 1
+            if seen == CAP:
+                break
+
+        return [self.payload(pos, name)
+                for pos, name in (first + rest)[:limit]]
+
+    def save(self, path):
+        """Write the index to `path`, replacing what's there atomically."""
+        dirname = os.path.dirname(path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        tmp = tempfile.NamedTemporaryFile(dir=dirname, delete=False)
+        with tmp:
+            pickle.dump((VERSION, self), tmp, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp.name, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as fobj:
+            version, index = pickle.load(fobj)
+        if version != VERSION:
+            raise ValueError('Suggestion index %s is version %s, not %s.'
+                             % (path, version, VERSION))
+        return index
+
+
+def catalogue(types=None):
+    """The entries of the public add-ons of `types`, from the database."""
+    types = types or [t for t in amo.ADDON_SEARCH_TYPES
+                      if t != amo.ADDON_WEBAPP]
+    ids = (Addon.objects.filter(type__in=types, disabled_by_user=False,
+                                status__in=amo.REVIEWED_STATUSES)
+           .values_list('id', flat=True))
+    for chunk in chunked(list(ids), 1000):
+        addons = list(Addon.objects.no_cache().filter(id__in=chunk))
+        names = {}
+        for id_, locale, name in (Translation.objects
+                                  .filter(id__in=[a.name_id for a in addons])
+                                  .values_list('id', 'locale',
+                                               'localized_string')):
+            names.setdefault(id_, {})[locale] = name
+        for addon in addons:
+            yield {'id': addon.id, 'type': addon.type,
+                   'url': addon.get_url_path(add_prefix=False),
+                   'icons': {'32': addon.get_icon_url(32),
+                             '64': addon.get_icon_url(64)},
+                   'names': names.get(addon.name_id, {}),
+                   'default_locale': addon.default_locale,
+                   'rank': addon.average_daily_users or 0}
+
+
+_loaded = {'index': None, 'mtime': None, 'checked': 0}
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    The index from SEARCH_SUGGESTIONS_PATH, reloaded when a new one has been
+    written, or None when there isn't one.
+    """
+    now = time.time()
+    if now - _loaded['checked'] < settings.SEARCH_SUGGESTIONS_RELOAD:
+        return _loaded['index']
+    with _lock:
+        _loaded['checked'] = now
+        path = settings.SEARCH_SUGGESTIONS_PATH
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            _loaded.update(index=None, mtime=None)
+            return None
+        if mtime != _loaded['mtime']:
+            try:
+                _loaded['index'] = SuggestionIndex.load(path)
+                _loaded['mtime'] = mtime
+            except Exception:
+                log.exception('Could not load the suggestion index %s.'
+                              % path)
+        return _loaded['index']
+
+
+def reset():
+    """Forget the loaded index, so the next get_index() reads the file."""
+    _loaded.update(index=None, mtime=None, checked=0)
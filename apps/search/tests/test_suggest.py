@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+from django.conf import settings
+
+import mock
+from nose.tools import eq_, ok_
+
+import amo
+import amo.tests
+from amo.urlresolvers import reverse
+from addons.models import Addon
+from search import suggest
+from search.cron import build_suggestions
+from search.suggest import get_index, SuggestionIndex
+
+
+def entry(id_, names, rank=0, type_=amo.ADDON_EXTENSION,
+          default_locale='en-US'):
+    if not isinstance(names, dict):
+        names = {default_locale: names}
+    return {'id': id_, 'type': type_, 'url': '/addon/%s/' % id_,
+            'icons': {'32': 'icon-%s-32' % id_, '64': 'icon-%s-64' % id_},
+            'names': names, 'default_locale': default_locale, 'rank': rank}
+
+
+CATALOGUE = [
+    entry(1, u'Adblock Plus', rank=1000),
+    entry(2, u'Tab Mix Plus', rank=500),
+    entry(3, u'Plus Tabs', rank=10),
+    entry(4, u'Firefox Sync Plus', rank=100),
+    entry(5, {'en-US': u'Fox Tabs', 'fr': u'Onglets Renard'}, rank=50),
+    entry(6, {'de': u'Füchse Lesezeichen'}, rank=20, default_locale='de'),
+    entry(7, u'Plush Fox', rank=5000, type_=amo.ADDON_PERSONA),
+    entry(8, u'Firefox Sync Helper', rank=200),
+]
+
+
+class TestSuggestionIndex(amo.tests.TestCase):
+
+    def setUp(self):
+        self.index = SuggestionIndex(CATALOGUE)
+
+    def ids(self, q, locale='en-us', **kw):
+        return [int(d['id']) for d in self.index.lookup(q, locale, **kw)]
+
+    def test_ranking(self):
+        # Names starting with the query first, then by average daily users.
+        eq_(self.ids('plus'), [7, 3, 1, 2, 4])
+        eq_(self.ids('tab'), [2, 5, 3])
+
+    def test_long_prefix(self):
+        # Longer than SHORT_PREFIX, so the words are searched with bisect.
+        eq_(self.ids('firefo'), [8, 4])
+        eq_(self.ids('firefox sync h'), [8])
+
+    def test_all_words(self):
+        eq_(self.ids('plus tab'), [3, 2])
+        eq_(self.ids('adblock tab'), [])
+
+    def test_types(self):
+        eq_(self.ids('plus', types=[amo.ADDON_PERSONA]), [7])
+        eq_(self.ids('plus', types=[amo.ADDON_EXTENSION]), [3, 1, 2, 4])
+
+    def test_excluded(self):
+        eq_(self.ids('plus', excluded_ids=[7, 1]), [3, 2, 4])
+
+    def test_limit(self):
+        eq_(self.ids('plus', limit=2), [7, 3])
+
+    def test_too_short(self):
+        eq_(self.ids('pl'), [])
+        eq_(self.ids(u'²²'), [])
+
+    def test_by_id(self):
+        eq_(self.ids('5'), [5])
+        eq_(self.ids('7', types=[amo.ADDON_EXTENSION]), [])
+        eq_(self.ids('99'), [])
+
+    def test_locale(self):
+        eq_(self.index.lookup('ong', 'fr')[0]['name'], u'Onglets Renard')
+        # The French name is the only one in French.
+        eq_(self.ids('fox tabs', 'fr'), [])
+        eq_(self.ids('ong', 'en-us'), [])
+
+    def test_locale_fallback(self):
+        # No German name, so the default one is used.
+        eq_(self.index.lookup('fox tabs', 'de')[0]['name'], u'Fox Tabs')
+        eq_(self.ids('ong', 'de'), [])
+        # Names in other default locales are found everywhere.
+        eq_(self.index.lookup(u'füch', 'en-US')[0]['name'],
+            u'Füchse Lesezeichen')
+        eq_(self.index.lookup('5', 'fr')[0]['name'], u'Onglets Renard')
+        eq_(self.index.lookup('5', 'ja')[0]['name'], u'Fox Tabs')
+
+    def test_current_language(self):
+        with self.activate(locale='fr'):
+            eq_(self.index.lookup('ong')[0]['name'], u'Onglets Renard')
+
+    @mock.patch('search.suggest.get_url_prefix', lambda: None)
+    def test_payload(self):
+        eq_(self.index.lookup('adblock', 'en-us'),
+            [{'id': u'1', 'name': u'Adblock Plus', 'url': '/addon/1/',
+              'icons': {'32': 'icon-1-32', '64': 'icon-1-64'}}])
+
+    def test_cap(self):
+        catalogue = [entry(i, u'Plus %s' % i, rank=i) for i in range(150)]
+        catalogue.append(entry(150, u'Plus', rank=0, type_=amo.ADDON_PERSONA))
+        index = SuggestionIndex(catalogue)
+        eq_(len(index.short['plus']), suggest.CAP + 1)
+        eq_([d['id'] for d in index.lookup('plu', 'en-us', limit=3)],
+            [u'149', u'148', u'147'])
+        eq_([d['id'] for d in index.lookup('plu', 'en-us',
+                                           types=[amo.ADDON_PERSONA])],
+            [u'150'])
+
+    def test_save_load(self):
+        path = os.path.join(settings.TMP_PATH, 'suggest', 'index.pickle')
+        self.index.save(path)
+        eq_(SuggestionIndex.load(path).lookup('plus', 'en-us'),
+            self.index.lookup('plus', 'en-us'))
+
+
+class TestGetIndex(amo.tests.TestCase):
+
+    def setUp(self):
+        suggest.reset()
+
+    def tearDown(self):
+        if os.path.exists(settings.SEARCH_SUGGESTIONS_PATH):
+            os.remove(settings.SEARCH_SUGGESTIONS_PATH)
+        suggest.reset()
+
+    def test_no_index(self):
+        eq_(get_index(), None)
+
+    def test_reload(self):
+        SuggestionIndex(CATALOGUE[:1]).save(settings.SEARCH_SUGGESTIONS_PATH)
+        eq_(len(get_index().entries), 1)
+
+        SuggestionIndex(CATALOGUE).save(settings.SEARCH_SUGGESTIONS_PATH)
+        os.utime(settings.SEARCH_SUGGESTIONS_PATH, (1, 1))
+        # Not looked at again until SEARCH_SUGGESTIONS_RELOAD has passed.
+        eq_(len(get_index().entries), 1)
+        with mock.patch.object(settings, 'SEARCH_SUGGESTIONS_RELOAD', 0):
+            eq_(len(get_index().entries), len(CATALOGUE))
+
+
+class TestSuggestionsView(amo.tests.TestCase):
+
+    def setUp(self):
+        suggest.reset()
+        self.url = reverse('search.suggestions')
+        self.addon = amo.tests.addon_factory(name='uniqueaddon')
+        self.persona = amo.tests.addon_factory(name='uniquepersona',
+                                               type=amo.ADDON_PERSONA)
+        amo.tests.addon_factory(name='uniqueunreviewed',
+                                status=amo.STATUS_UNREVIEWED)
+        build_suggestions()
+
+    def tearDown(self):
+        os.remove(settings.SEARCH_SUGGESTIONS_PATH)
+        suggest.reset()
+
+    @mock.patch.object(Addon, 'search')
+    def test_suggestions(self, search):
+        res = self.client.get(self.url, {'q': 'unique'})
+        eq_(res.status_code, 200)
+        data = json.loads(res.content)
+        eq_(len(data), 1)
+        eq_(int(data[0]['id']), self.addon.id)
+        eq_(data[0]['name'], u'uniqueaddon')
+        eq_(data[0]['url'], self.addon.get_url_path() + '?src=ss')
+        eq_(data[0]['icons'], {'32': self.addon.get_icon_url(32),
+                               '64': self.addon.get_icon_url(64)})
+        res = self.client.get(self.url, {'q': 'unique', 'cat': 'themes'})
+        eq_([int(d['id']) for d in json.loads(res.content)],
+            [self.persona.id])
+        ok_(not search.called)
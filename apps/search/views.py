@@ -20,6 +20,7 @@ from amo.utils import sorted_groupby
 from bandwagon.models import Collection
 from versions.compare import dict_from_int, version_dict, version_int
 
+from . import suggest
 from .forms import ESSearchForm, SecondarySearchForm
 
 
@@ -129,6 +130,8 @@ class BaseAjaxSearch(object):
     ]
 
     """
+    # Whether names come from the suggestion index, when there is one.
+    use_index = False
 
     def __init__(self, request, excluded_ids=(), ratings=False):
         self.request = request
@@ -195,6 +198,9 @@ class BaseAjaxSearch(object):
 
     def build_list(self):
         """Populate a list of dictionaries based on label => property."""
+        index = self.use_index and not self.ratings and suggest.get_index()
+        if index:
+            return self.build_list_from_index(index)
         results = []
         for item in self.queryset()[:self.limit]:
             if item.id in self.excluded_ids:
@@ -205,6 +211,16 @@ class BaseAjaxSearch(object):
             results.append(d)
         return results
 
+    def build_list_from_index(self, index):
+        """Like build_list(), without going to ES or the database."""
+        results = index.lookup(self.request.GET.get(self.key, ''),
+                               types=self.types, limit=self.limit,
+                               excluded_ids=self.excluded_ids)
+        if self.src:
+            for d in results:
+                d['url'] = urlparams(d['url'], src=self.src)
+        return results
+
     @property
     def items(self):
         return self.build_list()
@@ -212,6 +228,7 @@ class BaseAjaxSearch(object):
 
 class SearchSuggestionsAjax(BaseAjaxSearch):
     src = 'mkt-ss' if settings.MARKETPLACE else 'ss'
+    use_index = not settings.MARKETPLACE
 
 
 class AddonSuggestionsAjax(SearchSuggestionsAjax):
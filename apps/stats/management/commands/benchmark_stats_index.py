@@ -0,0 +1,130 @@
+"""
+Measures how fast update counts are turned into documents and bulk indexed,
+one row at a time like the celery tasks against the pooled pipeline used by
+`index_stats --bulk`.
+
+    ./manage.py benchmark_stats_index --addons=10000 --days=365
+
+The rows are a synthetic year of php serialized counts generated in memory,
+and ES is replaced by a stub that only counts what it is sent, so the numbers
+cover the unserializing, document building and bulk batching.
+"""
+import datetime
+import json
+import random
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+import mock
+import phpserialize as php
+
+import amo
+from stats import search
+from stats.models import UpdateCount
+
+
+class FakeES(object):
+    """Counts the documents it's asked to index."""
+
+    def __init__(self):
+        self.docs = 0
+        self.flushes = 0
+
+    def index(self, *args, **kw):
+        self.docs += 1
+
+    def flush_bulk(self, *args, **kw):
+        self.flushes += 1
+
+    def create_index_if_missing(self, *args, **kw):
+        pass
+
+    def put_mapping(self, *args, **kw):
+        pass
+
+    def add_alias(self, *args, **kw):
+        pass
+
+
+def update_rows(addons, days, size):
+    """Yield chunks of raw update_counts rows, in add-on id order."""
+    start = datetime.date.today() - datetime.timedelta(days=days)
+    apps = [a.guid for a in amo.APP_USAGE]
+    platforms = [p.api_name for p in amo.PLATFORMS.values()]
+    locales = ['en-US', 'de', 'fr', 'ja', 'pt-BR', 'es-ES']
+    pk = 0
+    chunk = []
+    for addon in xrange(1, addons + 1):
+        for day in xrange(days):
+            pk += 1
+            count = random.randint(1, 10000)
+            chunk.append((
+                pk, addon, count, start + datetime.timedelta(days=day),
+                php.serialize({'1.0': count / 2, '1.1': count / 2}),
+                php.serialize({'userEnabled': count, 'userDisabled': 1}),
+                php.serialize(dict((guid, {'20.0': count / 2,
+                                           '21.0': count / 2})
+                                   for guid in apps)),
+                php.serialize(dict((p, count / len(platforms))
+                                   for p in platforms)),
+                php.serialize(dict((l, count / len(locales))
+                                   for l in locales))))
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Measure update count indexing, serially and in a pool.'
+    option_list = BaseCommand.option_list + (
+        make_option('--addons', action='store', type='int', default=10000,
+                    help='Number of add-ons to generate counts for.'),
+        make_option('--days', action='store', type='int', default=365,
+                    help='Number of days of counts per add-on.'),
+        make_option('--processes', action='store', type='int',
+                    help='Pool size, defaults to the number of CPUs.'),
+        make_option('--size', action='store', type='int', default=2000,
+                    help='Rows per chunk.'),
+        make_option('--output', action='store',
+                    help='Write the JSON results here instead of stdout.'),
+    )
+
+    def measure(self, docs, **kw):
+        es = FakeES()
+        start = time.time()
+        with mock.patch('amo.search.get_es', lambda *a, **k: es):
+            months = set()
+            for chunk in docs:
+                search.index_docs(UpdateCount, chunk, index='benchmark',
+                                  months=months)
+        took = time.time() - start
+        return {'docs': es.docs,
+                'flushes': es.flushes,
+                'seconds': round(took, 3),
+                'docs_per_second': round(es.docs / took, 1) if took else None}
+
+    def handle(self, *args, **kw):
+        rows = lambda: update_rows(kw['addons'], kw['days'], kw['size'])
+
+        # The celery tasks build a model and extract a document per row.
+        serial = ([search.extract_update_count(UpdateCount(*row))
+                   for row in chunk] for chunk in rows())
+        pooled = search.decode_rows(UpdateCount, rows(),
+                                    processes=kw['processes'])
+
+        with mock.patch.object(search, 'get_indices', lambda i: [i]):
+            results = {'serial': self.measure(serial),
+                       'pool': self.measure(pooled)}
+
+        output = json.dumps({'addons': kw['addons'],
+                             'days': kw['days'],
+                             'results': results}, indent=2, sort_keys=True)
+        if kw['output']:
+            with open(kw['output'], 'w') as fh:
+                fh.write(output)
+        else:
+            self.stdout.write(output + '\n')
@@ -8,6 +8,7 @@ from django.db.models import Max, Min
 from celery.task.sets import TaskSet
 
 from amo.utils import chunked
+from stats import search
 from stats.models import (CollectionCount, DownloadCount, ThemeUserCount,
                           UpdateCount)
 from stats.tasks import (index_collection_counts, index_download_counts,
@@ -29,6 +30,11 @@ To limit the add-ons:
 To limit the  date range:
 
     `--date=2011-08-15` or `--date=2011-08-15:2011-08-22`
+
+To stream update and download counts straight into their monthly indices
+from here instead of through celery, unserializing them in a pool:
+
+    `--bulk --processes=8`
 """
 
 
@@ -44,6 +50,13 @@ class Command(BaseCommand):
                          '(inclusive).'),
         make_option('--fixup', action='store_true',
                     help='Find and index rows we missed.'),
+        make_option('--bulk', action='store_true',
+                    help='Stream update and download counts into ES from '
+                         'this process.'),
+        make_option('--processes', type='int',
+                    help='Number of processes to unserialize counts with '
+                         'when using --bulk. Defaults to the number of '
+                         'CPUs.'),
     )
     help = HELP
 
@@ -62,6 +75,15 @@ class Command(BaseCommand):
                 {'date': 'date'})
         ]
 
+        if kw.get('bulk'):
+            queries = queries[2:]
+            pks = addons and [int(a.strip()) for a in addons.split(',')]
+            date_range = dates and (dates.split(':') * 2)[:2]
+            for model in UpdateCount, DownloadCount:
+                total = search.bulk_index(model, addons=pks, dates=date_range,
+                                          processes=kw.get('processes'))
+                log.info('Indexed %s %s.' % (total, model._meta.db_table))
+
         if not addons:
             # We can't filter this by addons, so if that is specified,
             # we'll skip that.
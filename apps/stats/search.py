@@ -1,9 +1,16 @@
 import collections
+import datetime
+import itertools
+import multiprocessing
+
+from django.conf import settings
+from django.db import connection
 
 import amo
 import amo.search
 from amo.utils import create_es_index_if_missing
 from applications.models import AppVersion
+from lib.es.utils import get_indices
 from stats.models import CollectionCount, DownloadCount, UpdateCount
 
 
@@ -123,24 +130,171 @@ def get_all_app_versions():
     return dict(rv)
 
 
+def get_mapping():
+    return {
+        'properties': {
+            'id': {'type': 'long'},
+            'count': {'type': 'long'},
+            'data': {'dynamic': 'true',
+                     'properties': {
+                        'v': {'type': 'long'},
+                        'k': {'type': 'string'}
+                    }
+            },
+            'date': {'format': 'dateOptionalTime',
+                     'type': 'date'}
+        }
+    }
+
+
+# The monthly indices this process has already set up, so the indexing tasks
+# only create and map each month once.
+_months = set()
+
+
 def setup_indexes(index=None, aliased=True):
     es = amo.search.get_es()
+    # The indices may have been deleted, set up every month again.
+    _months.clear()
     for model in CollectionCount, DownloadCount, UpdateCount:
-        index = index or model._get_index()
-        index = create_es_index_if_missing(index, aliased=aliased)
-
-        mapping = {
-            'properties': {
-                'id': {'type': 'long'},
-                'count': {'type': 'long'},
-                'data': {'dynamic': 'true',
-                         'properties': {
-                            'v': {'type': 'long'},
-                            'k': {'type': 'string'}
-                        }
-                },
-                'date': {'format': 'dateOptionalTime',
-                         'type': 'date'}
-            }
-        }
-        es.put_mapping(model._meta.db_table, mapping, index)
+        if not index and model._meta.db_table in settings.ES_MONTHLY_INDEXES:
+            # Make sure there's something behind the alias to search.
+            setup_month_index(model._get_index(), datetime.date.today())
+            continue
+        name = create_es_index_if_missing(index or model._get_index(),
+                                          aliased=aliased)
+        es.put_mapping(model._meta.db_table, get_mapping(), name)
+
+
+def month_index(alias, date):
+    """The index the counts for `date` live in, eg: addons_counts-201401."""
+    return '%s-%s' % (alias, date.strftime('%Y%m'))
+
+
+def setup_month_index(alias, date):
+    """Create the index for the month of `date` and add it to `alias`."""
+    es = amo.search.get_es()
+    index = create_es_index_if_missing(month_index(alias, date))
+    for model in DownloadCount, UpdateCount:
+        es.put_mapping(model._meta.db_table, get_mapping(), index)
+    es.add_alias(alias, [index])
+    return index
+
+
+def index_docs(model, docs, index=None, months=None, aliases=None):
+    """
+    Bulk index update or download count `docs` into the monthly indices
+    behind `index`, the model's alias by default. `months` is the set of
+    monthly indices that have already been set up, it is updated as new
+    months are seen. It defaults to the ones set up by this process.
+
+    `aliases` are the indices to write to, looked up from `index` if not
+    given. Pass them in while a server side cursor is open on the
+    connection, since the lookup needs the database.
+
+    Returns the number of documents indexed.
+    """
+    es = amo.search.get_es()
+    if aliases is None:
+        aliases = get_indices(index or model._get_index())
+    months = _months if months is None else months
+    count = 0
+    for doc in docs:
+        for alias in aliases:
+            name = month_index(alias, doc['date'])
+            if name not in months:
+                setup_month_index(alias, doc['date'])
+                months.add(name)
+            model.index(doc, bulk=True, index=name,
+                        id='%s-%s' % (doc['addon'], doc['date']))
+        count += 1
+    es.flush_bulk(forced=True)
+    return count
+
+
+# How to turn a row of each monthly model into a document. Keyed by table so
+# the pool workers only need to be sent a string.
+extractors = {
+    UpdateCount._meta.db_table: (UpdateCount, extract_update_count),
+    DownloadCount._meta.db_table: (DownloadCount, extract_download_count),
+}
+
+
+def stream_rows(model, addons=None, dates=None, size=2000):
+    """
+    Yield lists of `size` raw rows of `model` in add-on id order, optionally
+    limited to some `addons` or a (start, end) range of `dates`. On MySQL a
+    server side cursor is used so the table is never held in memory.
+    """
+    qs = model.objects.order_by('addon', 'date')
+    if addons:
+        qs = qs.filter(addon__in=addons)
+    if dates:
+        qs = qs.filter(date__range=dates)
+    fields = [f.attname for f in model._meta.fields]
+    sql, params = qs.values_list(*fields).query.sql_with_params()
+
+    cursor = connection.cursor()
+    if connection.vendor == 'mysql':
+        from MySQLdb.cursors import SSCursor
+        cursor = connection.connection.cursor(SSCursor)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _decode(job):
+    table, rows = job
+    model, extract = extractors[table]
+    # The StatsDictFields are unserialized as the model is created.
+    return [extract(model(*row)) for row in rows]
+
+
+def decode_rows(model, chunks, processes=None):
+    """
+    Turn chunks of raw rows into lists of documents. Unserializing the
+    StatsDictField blobs is the slow part, so unless `processes` is 1 it is
+    spread over a pool, a few chunks at a time to bound memory.
+    """
+    jobs = ((model._meta.db_table, rows) for rows in chunks)
+    if processes == 1:
+        for docs in itertools.imap(_decode, jobs):
+            yield docs
+        return
+
+    pool = multiprocessing.Pool(processes)
+    window = 2 * (processes or multiprocessing.cpu_count())
+    try:
+        while True:
+            batch = list(itertools.islice(jobs, window))
+            if not batch:
+                break
+            for docs in pool.map(_decode, batch):
+                yield docs
+    finally:
+        pool.terminate()
+
+
+def bulk_index(model, addons=None, dates=None, index=None, processes=None,
+               size=2000):
+    """
+    Stream every `model` row matching `addons` and `dates` into the monthly
+    indices. Only the months in `dates` are written to, so a backfill
+    leaves the rest alone.
+
+    Returns the number of documents indexed.
+    """
+    # Look the aliases up before streaming, the MySQL connection can't run
+    # other queries until the server side cursor has been read to the end.
+    aliases = get_indices(index or model._get_index())
+    total = 0
+    for docs in decode_rows(model, stream_rows(model, addons, dates, size),
+                            processes=processes):
+        total += index_docs(model, docs, aliases=aliases)
+    return total
@@ -283,19 +283,14 @@ def _get_metrics_jobs(date=None):
 @task
 def index_update_counts(ids, **kw):
     index = kw.pop('index', None)
-    indices = get_indices(index)
 
-    es = amo.search.get_es()
     qs = UpdateCount.objects.filter(id__in=ids)
     if qs:
         log.info('Indexing %s updates for %s.' % (qs.count(), qs[0].date))
     try:
-        for update in qs:
-            key = '%s-%s' % (update.addon_id, update.date)
-            data = search.extract_update_count(update)
-            for index in indices:
-                UpdateCount.index(data, bulk=True, id=key, index=index)
-        es.flush_bulk(forced=True)
+        search.index_docs(UpdateCount,
+                          (search.extract_update_count(u) for u in qs),
+                          index=index)
     except Exception, exc:
         index_update_counts.retry(args=[ids], exc=exc, **kw)
         raise
@@ -304,20 +299,14 @@ def index_update_counts(ids, **kw):
 @task
 def index_download_counts(ids, **kw):
     index = kw.pop('index', None)
-    indices = get_indices(index)
 
-    es = amo.search.get_es()
     qs = DownloadCount.objects.filter(id__in=ids)
     if qs:
         log.info('Indexing %s downloads for %s.' % (qs.count(), qs[0].date))
     try:
-        for dl in qs:
-            key = '%s-%s' % (dl.addon_id, dl.date)
-            data = search.extract_download_count(dl)
-            for index in indices:
-                DownloadCount.index(data, bulk=True, id=key, index=index)
-
-        es.flush_bulk(forced=True)
+        search.index_docs(DownloadCount,
+                          (search.extract_download_count(dl) for dl in qs),
+                          index=index)
     except Exception, exc:
         index_download_counts.retry(args=[ids], exc=exc)
         raise
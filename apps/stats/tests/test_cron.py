@@ -4,14 +4,14 @@ from django.conf import settings
 from django.core.management import call_command
 
 import mock
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 import amo.tests
 from addons.models import Addon, AddonUser
 from bandwagon.models import Collection, CollectionAddon
 from mkt.constants.regions import REGIONS_CHOICES_SLUG
 from reviews.models import Review
-from stats import cron, tasks
+from stats import cron, search, tasks
 from stats.models import (AddonCollectionCount, Contribution, DownloadCount,
                           GlobalStat, ThemeUserCount, UpdateCount)
 from users.models import UserProfile
@@ -158,6 +158,91 @@ class TestIndexStats(amo.tests.TestCase):
         eq_(len([c for c in calls if c[0][0] == tasks.index_download_counts]),
             1 + (downloads[0] - downloads[-1]).days / 5)
 
+    @mock.patch('stats.search.bulk_index')
+    def test_bulk(self, bulk_index, tasks_mock):
+        bulk_index.return_value = 0
+        call_command('index_stats', addons='4, 5', date='2009-06-01',
+                     bulk=True, processes=2)
+        eq_(bulk_index.call_args_list, [
+            mock.call(model, addons=[4, 5],
+                      dates=['2009-06-01', '2009-06-01'], processes=2)
+            for model in (UpdateCount, DownloadCount)])
+        # Theme user counts still go through celery.
+        eq_([c[0][0] for c in tasks_mock.call_args_list],
+            [tasks.index_theme_user_counts])
+
+
+class TestBulkIndex(amo.tests.TestCase):
+    fixtures = ['stats/test_models']
+
+    def docs(self, model, processes=1, **kw):
+        chunks = search.stream_rows(model, size=2, **kw)
+        return [doc for docs in search.decode_rows(model, chunks, processes)
+                for doc in docs]
+
+    def test_stream_rows(self):
+        expected = list(DownloadCount.objects.order_by('addon', 'date')
+                        .values_list('id', flat=True))
+        eq_([doc['id'] for doc in self.docs(DownloadCount)], expected)
+
+    def test_same_as_tasks(self):
+        eq_(self.docs(UpdateCount),
+            [search.extract_update_count(u) for u in
+             UpdateCount.objects.order_by('addon', 'date')])
+
+    def test_pool(self):
+        eq_(self.docs(DownloadCount, processes=2), self.docs(DownloadCount))
+
+    def test_filters(self):
+        qs = DownloadCount.objects.filter(addon=4, date='2009-06-01')
+        eq_([doc['id'] for doc in self.docs(DownloadCount, addons=[4],
+                                            dates=('2009-06-01',
+                                                   '2009-06-01'))],
+            list(qs.values_list('id', flat=True)))
+
+    @mock.patch.object(search, '_months', set())
+    @mock.patch.object(search, 'setup_month_index')
+    @mock.patch.object(DownloadCount, 'index')
+    def test_monthly_indices(self, index, setup_month_index):
+        eq_(search.bulk_index(DownloadCount, processes=1, size=2),
+            DownloadCount.objects.count())
+        alias = DownloadCount._get_index()
+        months = set()
+        for dl in DownloadCount.objects.all():
+            name = search.month_index(alias, dl.date)
+            months.add(name)
+            index.assert_any_call(mock.ANY, bulk=True, index=name,
+                                  id='%s-%s' % (dl.addon_id, dl.date))
+        # Each month is only set up once.
+        eq_(setup_month_index.call_count, len(months))
+
+    @mock.patch.object(search, 'get_indices')
+    @mock.patch.object(search, 'setup_month_index')
+    @mock.patch.object(DownloadCount, 'index')
+    def test_aliases_before_streaming(self, index, setup_month_index,
+                                      get_indices):
+        # The connection is busy with the server side cursor while the
+        # chunks are indexed.
+        get_indices.return_value = [DownloadCount._get_index()]
+        search.bulk_index(DownloadCount, processes=1, size=1)
+        eq_(get_indices.call_count, 1)
+
+    @mock.patch.object(search, '_months', set())
+    @mock.patch.object(search, 'setup_month_index')
+    @mock.patch.object(DownloadCount, 'index')
+    def test_tasks_set_up_months_once(self, index, setup_month_index):
+        docs = [search.extract_download_count(dl)
+                for dl in DownloadCount.objects.all()]
+        search.index_docs(DownloadCount, docs)
+        calls = setup_month_index.call_count
+        ok_(calls)
+        search.index_docs(DownloadCount, docs)
+        eq_(setup_month_index.call_count, calls)
+
+    def test_month_index(self):
+        eq_(search.month_index('counts', datetime.date(2009, 6, 1)),
+            'counts-200906')
+
 
 class TestIndexLatest(amo.tests.ESTestCase):
     test_es = True
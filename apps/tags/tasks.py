@@ -1,12 +1,18 @@
+from django.db import connection, transaction
+
 from celeryutils import task
 import commonware.log
 
-from amo.utils import slugify
+import amo
+from amo.utils import chunked, slugify
 from tags.models import AddonTag, Tag
 
 
 task_log = commonware.log.getLogger('z.task')
 
+# How many tags each set of queries recounts.
+CHUNK_SIZE = 1000
+
 
 @task(rate_limit='1000/m')
 def clean_tag(pk, **kw):
@@ -52,8 +58,52 @@ def clean_tag(pk, **kw):
 def update_all_tag_stats(pks, **kw):
     task_log.info("[%s@%s] Calculating stats for tags starting with %s" %
                   (len(pks), update_all_tag_stats.rate_limit, pks[0]))
-    for tag in Tag.objects.filter(pk__in=pks):
-        tag.update_stat()
+    for chunk in chunked(sorted(pks), CHUNK_SIZE):
+        _update_tag_stats(chunk[0], chunk[-1])
+
+
+@transaction.commit_on_success
+def _update_tag_stats(first, last):
+    """
+    Recount num_addons for the tags with ids from `first` to `last`, like
+    Tag.update_stat() does for one. This may recount a few more tags than we
+    were given, which is harmless and keeps the query simple.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT t.id
+        FROM tags AS t
+        LEFT JOIN (
+            SELECT at.tag_id, COUNT(*) AS total
+            FROM users_tags_addons AS at
+            INNER JOIN addons AS a ON a.id = at.addon_id
+            WHERE a.status != %s AND at.tag_id BETWEEN %s AND %s
+            GROUP BY at.tag_id
+        ) AS c ON c.tag_id = t.id
+        WHERE t.blacklisted = 0 AND t.id BETWEEN %s AND %s
+            AND t.num_addons != COALESCE(c.total, 0)
+    """, [amo.STATUS_DELETED, first, last, first, last])
+    changed = [row[0] for row in cursor.fetchall()]
+    if not changed:
+        return
+
+    cursor.execute("""
+        UPDATE tags AS t
+        LEFT JOIN (
+            SELECT at.tag_id, COUNT(*) AS total
+            FROM users_tags_addons AS at
+            INNER JOIN addons AS a ON a.id = at.addon_id
+            WHERE a.status != %s AND at.tag_id IN ({ids})
+            GROUP BY at.tag_id
+        ) AS c ON c.tag_id = t.id
+        SET t.num_addons = COALESCE(c.total, 0), t.modified = NOW()
+        WHERE t.id IN ({ids})
+    """.format(ids=','.join(['%s'] * len(changed))),
+        [amo.STATUS_DELETED] + changed + changed)
+
+    # Nothing was saved through the ORM, so invalidate the tags whose count
+    # changed, and only those.
+    Tag.objects.invalidate(*Tag.objects.no_cache().filter(pk__in=changed))
 
 
 @task(rate_limit='1000/m')
@@ -3,7 +3,7 @@ from nose.tools import eq_
 import amo.tests
 from addons.models import Addon
 from tags.models import AddonTag, Tag
-from tags.tasks import clean_tag
+from tags.tasks import clean_tag, update_all_tag_stats
 
 
 class TestTagManager(amo.tests.TestCase):
@@ -154,3 +154,44 @@ class TestCount(amo.tests.TestCase):
         self.tag.update_stat()
         self.tag.delete()
         eq_(Tag.objects.filter(pk=pk).count(), 0)
+
+
+class TestUpdateAllTagStats(amo.tests.TestCase):
+    fixtures = ['base/addon_3615',
+                'base/addon_5369',
+                'tags/tags.json']
+    exempt_from_fixture_bundling = True
+
+    def setUp(self):
+        AddonTag.objects.create(addon_id=5369, tag_id=2652)
+        self.empty = Tag.objects.create(tag_text='empty')
+        self.pks = list(Tag.objects.values_list('pk', flat=True))
+
+    def counts(self):
+        return dict(Tag.objects.no_cache().values_list('pk', 'num_addons'))
+
+    def test_same_as_update_stat(self):
+        for tag in Tag.objects.all():
+            tag.update_stat()
+        expected = self.counts()
+
+        Tag.objects.update(num_addons=42)
+        Tag.objects.filter(blacklisted=True).update(num_addons=7)
+        expected.update(dict((tag.pk, 7) for tag in
+                             Tag.objects.filter(blacklisted=True)))
+        update_all_tag_stats(self.pks)
+        eq_(self.counts(), expected)
+        eq_(Tag.objects.get(pk=2652).num_addons, 2)
+        eq_(Tag.objects.get(pk=self.empty.pk).num_addons, 0)
+        eq_(Tag.objects.get(pk=2654).num_addons, 7)
+
+    def test_deleted_addons(self):
+        Addon.objects.filter(pk=5369).update(status=amo.STATUS_DELETED)
+        update_all_tag_stats(self.pks)
+        eq_(Tag.objects.get(pk=2652).num_addons, 1)
+
+    def test_unchanged_untouched(self):
+        update_all_tag_stats(self.pks)
+        Tag.objects.filter(pk=111).update(modified='2010-01-02 12:34:56')
+        update_all_tag_stats(self.pks)
+        eq_(str(Tag.objects.get(pk=111).modified), '2010-01-02 12:34:56')
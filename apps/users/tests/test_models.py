@@ -365,11 +365,11 @@ class TestFlushURLs(amo.tests.TestCase):
     def tearDown(self):
         _disconnect()
 
-    @patch('amo.tasks.flush_front_end_cache_urls.apply_async')
+    @patch('amo.tasks.queue_front_end_purge')
     def test_flush(self, flush):
         user = UserProfile.objects.get(pk=2519)
         user.save()
-        assert user.picture_url in flush.call_args[1]['args'][0]
+        assert user.picture_url in flush.call_args[0][0]
         assert urlparse(user.picture_url).query.find('modified') > -1
 
 
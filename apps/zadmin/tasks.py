@@ -24,6 +24,7 @@ from addons.models import Addon, AddonUser
 from amo import set_user
 from amo.decorators import write
 from amo.helpers import absolutify
+from amo.mail import BulkMailer
 from amo.urlresolvers import reverse
 from amo.utils import send_mail
 from devhub.tasks import run_validator
@@ -38,18 +39,25 @@ from zadmin.models import (EmailPreviewTopic, ValidationJob,
 log = logging.getLogger('z.task')
 
 
-@task(rate_limit='3/s')
+@task
 def admin_email(all_recipients, subject, body, preview_only=False,
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 preview_topic='admin_email', **kw):
-    log.info('[%s@%s] admin_email about %r'
-             % (len(all_recipients), admin_email.rate_limit, subject))
+    log.info('[%s] admin_email about %r' % (len(all_recipients), subject))
     if preview_only:
         send = EmailPreviewTopic(topic=preview_topic).send_mail
-    else:
-        send = send_mail
-    for recipient in all_recipients:
-        send(subject, body, recipient_list=[recipient], from_email=from_email)
+        for recipient in all_recipients:
+            send(subject, body, recipient_list=[recipient],
+                 from_email=from_email)
+        return
+    mailer = BulkMailer(subject, body, from_email=from_email)
+    try:
+        mailer.send(all_recipients)
+    except Exception, e:
+        # The retry has the same arguments, so it skips the recipients that
+        # were already sent to.
+        log.error('admin_email about %r failed: %s' % (subject, e))
+        return admin_email.retry(exc=e)
 
 
 def tally_job_results(job_id, **kw):
@@ -643,7 +643,7 @@ def email_devs(request):
             preview.filter().delete()
         total = 0
         for emails in chunked(set(qs.values_list('user__email', flat=True)),
-                              100):
+                              settings.BULK_MAIL_TASK_SIZE):
             total += len(emails)
             tasks.admin_email.delay(emails, data['subject'], data['message'],
                                     preview_only=data['preview_only'],
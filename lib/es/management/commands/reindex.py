@@ -28,6 +28,10 @@ from users.cron import reindex_users
 _INDEXES = {}
 _ALIASES = django_settings.ES_INDEXES.copy()
 _ALIASES.pop('webapp')  # Don't index webapps here.
+# Monthly indices are rebuilt in place by `index_stats`, there's no single
+# index to swap the alias over to.
+for k in django_settings.ES_MONTHLY_INDEXES:
+    _ALIASES.pop(k, None)
 # Remove stats indexes. They may be added later via the --with-stats option.
 _STATS_ALIASES = {}
 for k, v in _ALIASES.items():
@@ -4,6 +4,11 @@ A Marketplace only reindexing that indexes only apps.
 This avoids a lot of complexity for now. We might want an all encompassing
 reindex command that has args for AMO and MKT.
 
+Apps are indexed in chunks of ids, each in its own task, and every chunk is
+recorded in the database when it's planned and when it's done or failed. If
+any chunk fails the alias isn't switched, and `--resume` only indexes the
+chunks that failed or never ran before finishing the reindexing.
+
 """
 
 import logging
@@ -13,16 +18,18 @@ import time
 from optparse import make_option
 
 import pyelasticsearch
-from celery import task
+from celery import chord, task
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
 from amo.utils import chunked, timestamp_index
 from addons.models import Webapp  # To avoid circular import.
+from lib.es.models import Reindexing, ReindexingChunk
 from lib.es.utils import (flag_reindexing_mkt, is_reindexing_mkt,
                           unflag_reindexing_mkt)
 
+from mkt.search.utils import bump_generation, delete_docs
 from mkt.webapps.models import WebappIndexer
 
 
@@ -49,6 +56,10 @@ ES = pyelasticsearch.ElasticSearch(ES_URL)
 job = 'lib.es.management.commands.reindex_mkt.run_indexing'
 time_limits = settings.CELERY_TIME_LIMITS[job]
 
+# Our ES doc sizes are about 5k in size. Chunking by 100 sends ~500kb of data
+# to ES at a time.
+CHUNK_SIZE = 100
+
 
 @task
 def delete_index(old_index):
@@ -100,26 +111,72 @@ def index_webapp(ids, **kw):
             sys.stdout.write('Failed to index obj: {0}. {1}'.format(obj.id, e))
 
     WebappIndexer.bulk_index(docs, es=ES, index=index)
+    delete_docs(ids)
+
+
+def plan_chunks(reindexing):
+    """Record the chunks of ids to index for `reindexing`."""
+    chunks = [ReindexingChunk(reindexing=reindexing, first_id=min(ids),
+                              last_id=max(ids))
+              for ids in chunked(list(WebappIndexer.get_indexable()),
+                                 CHUNK_SIZE)]
+    ReindexingChunk.objects.bulk_create(chunks)
+
+
+# The results are what tells the chord the chunks are all done.
+@task(ignore_result=False, time_limit=time_limits['hard'],
+      soft_time_limit=time_limits['soft'])
+def index_chunk(index, chunk_id):
+    """Index the apps of a chunk and record how it went."""
+    chunk = ReindexingChunk.objects.get(pk=chunk_id)
+    ids = list(WebappIndexer.get_indexable()
+               .filter(id__gte=chunk.first_id, id__lte=chunk.last_id))
+    try:
+        index_webapp(ids, index=index)
+    except Exception as e:
+        logger.exception('Failed to index apps %s to %s.'
+                         % (chunk.first_id, chunk.last_id))
+        ReindexingChunk.objects.filter(pk=chunk_id).update(
+            status=ReindexingChunk.FAILED, error=unicode(e))
+    else:
+        ReindexingChunk.objects.filter(pk=chunk_id).update(
+            status=ReindexingChunk.DONE, error=None)
 
 
-@task(time_limit=time_limits['hard'], soft_time_limit=time_limits['soft'])
-def run_indexing(index):
-    """Index the objects.
+@task
+def run_indexing(index, callback):
+    """Index the objects, then run `callback`.
 
     - index: name of the index
+    - callback: the tasks that finish the reindexing
 
-    Note: Our ES doc sizes are about 5k in size. Chunking by 100 sends ~500kb
-    of data to ES at a time.
-
-    TODO: Use celery chords here to parallelize these indexing chunks. This
-          requires celery 3 (bug 825938).
+    Every chunk that isn't done yet is indexed in parallel. The first time
+    around that's all of them.
 
     """
     sys.stdout.write('Indexing apps into index: %s' % index)
 
-    qs = WebappIndexer.get_indexable()
-    for chunk in chunked(list(qs), 100):
-        index_webapp(chunk, index=index)
+    reindexing = Reindexing.objects.get(site='mkt', new_index=index)
+    if not reindexing.chunks.exists():
+        plan_chunks(reindexing)
+    chunks = list(reindexing.chunks.exclude(status=ReindexingChunk.DONE)
+                  .values_list('id', flat=True))
+    if chunks:
+        chord(index_chunk.si(index, chunk_id)
+              for chunk_id in chunks)(callback)
+    else:
+        callback.apply_async()
+
+
+@task
+def check_chunks(index):
+    """Stop the reindexing before the alias is switched if a chunk failed."""
+    failed = (ReindexingChunk.objects.filter(reindexing__new_index=index)
+              .exclude(status=ReindexingChunk.DONE))
+    if failed.exists():
+        raise CommandError('%s chunks failed to index into %s, run '
+                           'reindex_mkt --resume to retry them.'
+                           % (failed.count(), index))
 
 
 @task
@@ -167,6 +224,9 @@ def update_alias(new_index, old_index, alias, settings):
         )
     ES.update_aliases(dict(actions=actions))
 
+    # Searches cached against the old index are stale.
+    bump_generation()
+
 
 @task
 def output_summary():
@@ -185,6 +245,10 @@ class Command(BaseCommand):
                     help=('Bypass the database flag that says '
                           'another indexation is ongoing'),
                     default=False),
+        make_option('--resume', action='store_true',
+                    help=('Finish the ongoing indexation, only indexing the '
+                          'chunks that failed or never ran'),
+                    default=False),
     )
 
     def handle(self, *args, **kwargs):
@@ -199,10 +263,14 @@ class Command(BaseCommand):
 
         force = kwargs.get('force', False)
         prefix = kwargs.get('prefix', '')
+        resume = kwargs.get('resume', False)
 
-        if is_reindexing_mkt() and not force:
+        if resume:
+            if not is_reindexing_mkt():
+                raise CommandError('No indexation to resume')
+        elif is_reindexing_mkt() and not force:
             raise CommandError('Indexation already occuring - use --force to '
-                               'bypass')
+                               'bypass or --resume to finish it')
         elif force:
             unflag_database()
 
@@ -212,8 +280,13 @@ class Command(BaseCommand):
         except pyelasticsearch.exceptions.ElasticHttpNotFoundError:
             aliases = []
         old_index = aliases[0] if aliases else None
-        # Create a new index, using the index name with a timestamp.
-        new_index = timestamp_index(prefix + ALIAS)
+        if resume:
+            # Carry on with the indexes of the ongoing indexation.
+            reindexing = Reindexing.objects.get(site='mkt')
+            new_index, old_index = reindexing.new_index, reindexing.old_index
+        else:
+            # Create a new index, using the index name with a timestamp.
+            new_index = timestamp_index(prefix + ALIAS)
 
         # See how the index is currently configured.
         if old_index:
@@ -229,37 +302,42 @@ class Command(BaseCommand):
                              settings.ES_DEFAULT_NUM_REPLICAS)
         num_shards = s.get('number_of_shards', settings.ES_DEFAULT_NUM_SHARDS)
 
-        # Flag the database.
-        chain = flag_database.si(new_index, old_index, ALIAS)
-
-        # Create the index and mapping.
-        #
-        # Note: We set num_replicas=0 here to decrease load while re-indexing.
-        # In a later step we increase it which results in a more efficient bulk
-        # copy in Elasticsearch.
-        # For ES < 0.90 we manually enable compression.
-        chain |= create_index.si(new_index, ALIAS, {
-            'analysis': WebappIndexer.get_analysis(),
-            'number_of_replicas': 0, 'number_of_shards': num_shards,
-            'store.compress.tv': True, 'store.compress.stored': True,
-            'refresh_interval': '-1'})
-
-        # Index all the things!
-        chain |= run_indexing.si(new_index)
-
         # After indexing we optimize the index, adjust settings, and point the
-        # alias to the new index.
-        chain |= update_alias.si(new_index, old_index, ALIAS, {
+        # alias to the new index, unless some chunks failed.
+        finish = check_chunks.si(new_index)
+        finish |= update_alias.si(new_index, old_index, ALIAS, {
             'number_of_replicas': num_replicas, 'refresh_interval': '5s'})
 
         # Unflag the database.
-        chain |= unflag_database.si()
+        finish |= unflag_database.si()
 
         # Delete the old index, if any.
         if old_index:
-            chain |= delete_index.si(old_index)
+            finish |= delete_index.si(old_index)
 
-        chain |= output_summary.si()
+        finish |= output_summary.si()
+
+        if resume:
+            # The index and the flag are already there.
+            chain = run_indexing.si(new_index, finish)
+        else:
+            # Flag the database.
+            chain = flag_database.si(new_index, old_index, ALIAS)
+
+            # Create the index and mapping.
+            #
+            # Note: We set num_replicas=0 here to decrease load while
+            # re-indexing. In a later step we increase it which results in a
+            # more efficient bulk copy in Elasticsearch.
+            # For ES < 0.90 we manually enable compression.
+            chain |= create_index.si(new_index, ALIAS, {
+                'analysis': WebappIndexer.get_analysis(),
+                'number_of_replicas': 0, 'number_of_shards': num_shards,
+                'store.compress.tv': True, 'store.compress.stored': True,
+                'refresh_interval': '-1'})
+
+            # Index all the things!
+            chain |= run_indexing.si(new_index, finish)
 
         self.stdout.write('\nNew index and indexing tasks all queued up.\n')
         os.environ['FORCE_INDEXING'] = '1'
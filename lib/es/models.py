@@ -77,3 +77,28 @@ class Reindexing(models.Model):
 
     class Meta:
         db_table = 'zadmin_reindexing'
+
+
+class ReindexingChunk(models.Model):
+    """
+    A range of ids indexed by one task of a reindexing, so that a reindexing
+    that failed or was interrupted can pick up where it left off.
+    """
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    reindexing = models.ForeignKey(Reindexing, related_name='chunks')
+    first_id = models.PositiveIntegerField()
+    last_id = models.PositiveIntegerField()
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES,
+                              default=PENDING)
+    error = models.TextField(null=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'zadmin_reindexing_chunk'
@@ -1,12 +1,15 @@
 import StringIO
 import threading
 
+import mock
 from nose.exc import SkipTest
-from nose.tools import eq_
-from pyelasticsearch.exceptions import ElasticHttpNotFoundError
+from nose.tools import eq_, ok_
+from pyelasticsearch.exceptions import (ElasticHttpError,
+                                        ElasticHttpNotFoundError)
 
 from django.conf import settings
 from django.core import management
+from django.core.management.base import CommandError
 from django.db import connection
 
 import amo.search
@@ -15,7 +18,10 @@ from amo.urlresolvers import reverse
 from amo.utils import urlparams
 from es.management.commands.reindex import call_es
 from es.management.commands.fixup_mkt_index import Command as FixupCommand
-from lib.es.utils import is_reindexing_amo, unflag_reindexing_amo
+from lib.es.management.commands import reindex_mkt
+from lib.es.models import Reindexing, ReindexingChunk
+from lib.es.utils import (is_reindexing_amo, is_reindexing_mkt,
+                          unflag_reindexing_amo)
 
 from mkt.site.fixtures import fixture
 from mkt.webapps.models import Webapp, WebappIndexer
@@ -175,3 +181,146 @@ class TestFixupCommand(amo.tests.ESTestCase):
 
         with self.assertRaises(ElasticHttpNotFoundError):
             self.es.get(self.index, self.doctype, self.app.id, fields='id')
+
+
+class FakeES(object):
+    """
+    Keeps what it's sent in memory, and fails the bulk requests that have any
+    of the ids in `fail`.
+    """
+
+    def __init__(self):
+        self.fail = set()
+        self.docs = {}
+        self.bulk_requests = 0
+        self.indexes = {}
+        self.created = {}
+        self.alias_map = {}
+
+    def bulk_index(self, index, doc_type, docs, id_field='id'):
+        self.bulk_requests += 1
+        if self.fail.intersection(doc[id_field] for doc in docs):
+            raise ElasticHttpError(500, 'Failed on purpose.')
+        for doc in docs:
+            self.docs.setdefault(index, {})[doc[id_field]] = doc
+
+    def aliases(self, alias):
+        return dict((index, {'aliases': {alias: {}}})
+                    for index, name in self.alias_map.items() if name == alias)
+
+    def get_settings(self, index):
+        return {index: {'settings': self.indexes[index]}}
+
+    def create_index(self, index, settings):
+        self.indexes[index] = dict(settings['settings'])
+        self.created[index] = dict(settings['settings'])
+
+    def update_settings(self, index, settings):
+        self.indexes[index].update(settings)
+
+    def update_aliases(self, actions):
+        for action in actions['actions']:
+            if 'add' in action:
+                self.alias_map[action['add']['index']] = action['add']['alias']
+            else:
+                del self.alias_map[action['remove']['index']]
+
+    def delete_index(self, index):
+        del self.indexes[index]
+
+    def health(self, *args, **kw):
+        pass
+
+    def optimize(self, index):
+        pass
+
+
+class TestReindexMkt(amo.tests.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        if not settings.MARKETPLACE:
+            raise SkipTest('Only a marketplace management command')
+        super(TestReindexMkt, cls).setUpClass()
+
+    def setUp(self):
+        self.apps = [amo.tests.app_factory() for x in range(5)]
+        self.es = FakeES()
+        patches = [mock.patch.object(reindex_mkt, 'ES', self.es),
+                   mock.patch.object(reindex_mkt, 'CHUNK_SIZE', 2),
+                   mock.patch.object(reindex_mkt.time, 'sleep')]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def reindex(self, **kw):
+        management.call_command('reindex_mkt', stdout=StringIO.StringIO(),
+                                **kw)
+
+    def aliased(self):
+        return [index for index, alias in self.es.alias_map.items()
+                if alias == reindex_mkt.ALIAS]
+
+    def test_reindex(self):
+        self.reindex()
+        index, = self.aliased()
+        eq_(sorted(self.es.docs[index]), sorted(a.pk for a in self.apps))
+        # One bulk request per chunk.
+        eq_(self.es.bulk_requests, 3)
+        # Indexed without refreshes or replicas, then put back.
+        eq_(self.es.created[index]['refresh_interval'], '-1')
+        eq_(self.es.created[index]['number_of_replicas'], 0)
+        eq_(self.es.indexes[index]['refresh_interval'], '5s')
+        ok_(not is_reindexing_mkt())
+        # The chunks go with the flag.
+        eq_(ReindexingChunk.objects.count(), 0)
+
+    def test_failed_chunk(self):
+        self.es.fail.add(self.apps[0].pk)
+        with self.assertRaises(CommandError):
+            self.reindex()
+        # The alias is left alone and the indexation is still ongoing.
+        eq_(self.aliased(), [])
+        ok_(is_reindexing_mkt())
+        failed, = ReindexingChunk.objects.filter(
+            status=ReindexingChunk.FAILED)
+        ok_(failed.first_id <= self.apps[0].pk <= failed.last_id)
+        ok_('Failed on purpose' in failed.error)
+        eq_(ReindexingChunk.objects.filter(
+            status=ReindexingChunk.DONE).count(), 2)
+
+    def test_resume(self):
+        self.es.fail.add(self.apps[0].pk)
+        with self.assertRaises(CommandError):
+            self.reindex()
+        new_index = Reindexing.objects.get(site='mkt').new_index
+
+        self.es.fail.clear()
+        self.es.bulk_requests = 0
+        self.reindex(resume=True)
+        # Only the failed chunk was indexed again.
+        eq_(self.es.bulk_requests, 1)
+        eq_(self.aliased(), [new_index])
+        eq_(sorted(self.es.docs[new_index]), sorted(a.pk for a in self.apps))
+        ok_(not is_reindexing_mkt())
+
+    def test_resume_pending(self):
+        # Like after a crash, with one chunk done and the others never ran.
+        reindexing = Reindexing.objects.flag_reindexing_mkt(
+            new_index='new', old_index=None, alias=reindex_mkt.ALIAS)
+        self.es.create_index('new', {'settings': {}})
+        reindex_mkt.plan_chunks(reindexing)
+        done = reindexing.chunks.order_by('id')[0]
+        ReindexingChunk.objects.filter(pk=done.pk).update(
+            status=ReindexingChunk.DONE)
+
+        self.reindex(resume=True)
+        eq_(self.es.bulk_requests, 2)
+        eq_(self.aliased(), ['new'])
+        eq_(sorted(self.es.docs['new']),
+            sorted(a.pk for a in self.apps
+                   if not done.first_id <= a.pk <= done.last_id))
+
+    def test_resume_nothing(self):
+        with self.assertRaises(CommandError):
+            self.reindex(resume=True)
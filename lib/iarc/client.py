@@ -2,6 +2,7 @@
 import base64
 import functools
 import os
+import threading
 
 from django.conf import settings
 
@@ -21,6 +22,19 @@ wsdl = {
 # Add in the whitelist of supported methods here.
 services = ['Get_App_Info', 'Set_Storefront_Data', 'Get_Rating_Changes']
 
+# Building a suds client reads and parses the whole WSDL, so keep one per WSDL
+# around. suds clients hold on to the last request, so one per thread too.
+_local = threading.local()
+
+
+def get_suds_client(wsdl_name):
+    clients = getattr(_local, 'clients', None)
+    if clients is None:
+        clients = _local.clients = {}
+    if wsdl_name not in clients:
+        clients[wsdl_name] = sudsclient.Client(wsdl[wsdl_name], cache=None)
+    return clients[wsdl_name]
+
 
 class Client(object):
     """
@@ -49,7 +63,7 @@ class Client(object):
         log.info('IARC client call: {0} from wsdl: {1}'.format(name, wsdl))
 
         if self.client is None:
-            self.client = sudsclient.Client(wsdl[self.wsdl_name], cache=None)
+            self.client = get_suds_client(self.wsdl_name)
 
         # IARC requires messages be base64 encoded and base64 requires
         # byte-strings.
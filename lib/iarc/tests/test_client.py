@@ -1,6 +1,11 @@
+import base64
+
+import mock
 import test_utils
+from nose.tools import eq_
 
-from ..client import Client, MockClient, get_iarc_client
+from .. import client
+from ..client import Client, MockClient, get_iarc_client, get_suds_client
 
 
 class TestClient(test_utils.TestCase):
@@ -37,3 +42,24 @@ class TestRightClient(test_utils.TestCase):
     def test_mock(self):
         with self.settings(IARC_MOCK=True):
             assert isinstance(get_iarc_client('services'), MockClient)
+
+
+@mock.patch('lib.iarc.client.sudsclient.Client')
+class TestSudsClient(test_utils.TestCase):
+
+    def setUp(self):
+        client._local.clients = {}
+
+    def tearDown(self):
+        client._local.clients = {}
+
+    def test_memoized(self, suds):
+        eq_(get_suds_client('services'), get_suds_client('services'))
+        eq_(suds.call_count, 1)
+
+    def test_shared_between_clients(self, suds):
+        suds.return_value.service.Get_App_Info.return_value = (
+            base64.b64encode('<xml/>'))
+        eq_(Client('services').Get_App_Info(XMLString='foo'), '<xml/>')
+        eq_(Client('services').Get_App_Info(XMLString='foo'), '<xml/>')
+        eq_(suds.call_count, 1)
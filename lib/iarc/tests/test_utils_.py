@@ -4,12 +4,13 @@ import datetime
 
 from django.test.utils import override_settings
 
+import mock
 from nose.tools import eq_
 
 import amo.tests
 
-from lib.iarc.client import get_iarc_client
-from lib.iarc.utils import IARC_XML_Parser, render_xml
+from lib.iarc.client import get_iarc_client, MOCK_GET_APP_INFO
+from lib.iarc.utils import get_app_info, IARC_XML_Parser, render_xml
 
 from mkt.constants import ratingsbodies
 
@@ -169,3 +170,29 @@ class TestXMLParser(amo.tests.TestCase):
         eq_(row['rating_system'], ratingsbodies.USK)
         eq_(row['change_reason'],
             'Discrimination found to be within German law.')
+
+
+@mock.patch('lib.iarc.client.MockClient.call')
+class TestGetAppInfo(amo.tests.TestCase):
+
+    def test_cached(self, call):
+        call.return_value = MOCK_GET_APP_INFO
+        data = get_app_info(52, 'FZ32CU8')
+        eq_(data['rows'][0]['submission_id'], 52)
+        eq_(get_app_info(52, 'FZ32CU8'), data)
+        eq_(call.call_count, 1)
+
+        get_app_info(52, 'ZZ32CU8')
+        eq_(call.call_count, 2)
+
+    def test_not_found_not_cached(self, call):
+        call.return_value = '''<?xml version="1.0" encoding="utf-16"?>
+            <WEBSERVICE SERVICE_NAME="GET_APP_INFO" TYPE="RESPONSE">
+            <ROW>
+            <FIELD NAME="rowId" TYPE="int" VALUE="1" />
+            <FIELD NAME="ActionStatus" TYPE="string" VALUE="No records" />
+            </ROW>
+            </WEBSERVICE>'''
+        get_app_info(52, 'FZ32CU8')
+        get_app_info(52, 'FZ32CU8')
+        eq_(call.call_count, 2)
@@ -1,7 +1,9 @@
+import hashlib
 import os
 import StringIO
 
 from django.conf import settings
+from django.core.cache import cache
 
 from jinja2 import Environment, FileSystemLoader
 from rest_framework.compat import etree, six
@@ -10,6 +12,7 @@ from rest_framework.parsers import JSONParser, XMLParser
 
 import amo.utils
 from amo.helpers import strip_controls
+from lib.iarc.client import get_iarc_client
 
 from mkt.constants import ratingsbodies
 
@@ -44,6 +47,44 @@ def get_iarc_app_title(app):
     return unicode(delocalized_app.name)
 
 
+def app_info_cache_key(submission_id, security_code):
+    code = hashlib.md5(unicode(security_code).encode('utf-8')).hexdigest()
+    return 'iarc:app-info:%s:%s' % (submission_id, code)
+
+
+def get_app_info(submission_id, security_code):
+    """
+    Calls Get_App_Info and returns the parsed response. Responses that found
+    the submission are cached on its id and security code, see
+    `process_iarc_changes` for what clears them.
+    """
+    key = app_info_cache_key(submission_id, security_code)
+    data = cache.get(key)
+    if data is None:
+        xml = render_xml('get_app_info.xml', {'submission_id': submission_id,
+                                              'security_code': security_code})
+        resp = get_iarc_client('services').Get_App_Info(XMLString=xml)
+        data = IARC_XML_Parser().parse_string(resp)
+        rows = data.get('rows')
+        if rows and 'submission_id' in rows[0]:
+            cache.set(key, data, settings.IARC_APP_INFO_CACHE_TIMEOUT)
+    return data
+
+
+# The ratings body of each 'rating_' or 'descriptors_' key, by key.
+_key_bodies = {}
+
+
+def key_ratings_body(key):
+    """The ratings body for a key like 'rating_PEGI', GENERIC by default."""
+    try:
+        return _key_bodies[key]
+    except KeyError:
+        body = _key_bodies[key] = RATINGS_BODY_MAPPING.get(
+            key.split('_')[-1].lower(), ratingsbodies.GENERIC)
+        return body
+
+
 class IARC_Parser(object):
     """
     Base class for IARC XML and JSON parsers.
@@ -65,10 +106,6 @@ class IARC_Parser(object):
             interactives = []
 
             for k, v in row.items():
-                # Get ratings body constant.
-                ratings_body = RATINGS_BODY_MAPPING.get(
-                    k.split('_')[-1].lower(), ratingsbodies.GENERIC)
-
                 if k == 'rating_system':
                     # This key is used in the Get_Rating_Changes API.
                     d[k] = RATINGS_BODY_MAPPING.get(v.lower(),
@@ -78,9 +115,11 @@ class IARC_Parser(object):
                                     filter(None, [s.strip()
                                                   for s in v.split(',')])]
                 elif k.startswith('rating_'):
+                    ratings_body = key_ratings_body(k)
                     ratings[ratings_body] = RATINGS_MAPPING[ratings_body].get(
                         v, RATINGS_MAPPING[ratings_body]['default'])
                 elif k.startswith('descriptors_'):
+                    ratings_body = key_ratings_body(k)
                     native_descs = filter(None,
                                           [s.strip() for s in v.split(',')])
                     descriptors.extend(
@@ -108,6 +147,9 @@ class IARC_XML_Parser(XMLParser, IARC_Parser):
     a dict using the "NAME" and "VALUE" attributes.
     """
 
+    def __init__(self):
+        self._converted = {}
+
     # TODO: Remove this `parse` method once this PR is merged and released:
     # https://github.com/tomchristie/django-rest-framework/pull/1211
     def parse(self, stream, media_type=None, parser_context=None):
@@ -123,6 +165,7 @@ class IARC_XML_Parser(XMLParser, IARC_Parser):
             tree = etree.parse(stream, parser=parser, forbid_dtd=True)
         except (etree.ParseError, ValueError) as exc:
             raise ParseError('XML parse error - %s' % six.text_type(exc))
+        self._converted = {}
         data = self._xml_convert(tree.getroot())
 
         # Process ratings, descriptors, interactives.
@@ -151,19 +194,32 @@ class IARC_XML_Parser(XMLParser, IARC_Parser):
 
         if len(children) == 0:
             return self._type_convert(element.get('VALUE', ''))
-        else:
-            if children[0].tag == 'ROW':
-                data = []
-                for child in children:
-                    data.append(self._xml_convert(child))
+        elif children[0].tag == 'ROW':
+            return [self._xml_convert(child) for child in children]
+
+        # Fields have no children of their own, so convert their values
+        # here rather than going through `_xml_convert` for each of them.
+        data = {}
+        for child in children:
+            if len(child):
+                value = self._xml_convert(child)
             else:
-                data = {}
-                for child in children:
-                    data[child.get('NAME',
-                                   child.tag)] = self._xml_convert(child)
-
+                value = self._type_convert(child.get('VALUE', ''))
+            data[child.get('NAME', child.tag)] = value
         return data
 
+    def _type_convert(self, value):
+        """
+        Like XMLParser, which tries each type in turn. Responses repeat the
+        same few values a lot, so each is only converted once per parse.
+        """
+        try:
+            return self._converted[value]
+        except KeyError:
+            converted = self._converted[value] = super(
+                IARC_XML_Parser, self)._type_convert(value)
+            return converted
+
 
 class IARC_JSON_Parser(JSONParser, IARC_Parser):
     """
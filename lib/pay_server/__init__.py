@@ -59,7 +59,7 @@ class ZamboniClient(Client):
         Checks to see if the buyer exists in solitude. If not we'll create
         it so that solitude can store the pre-approval data for that buyer.
         """
-        res = self.get_buyer(filters={'uuid': buyer})
+        res = self.get_buyer(filters={'uuid': buyer}, cache=False)
         if res['meta']['total_count'] == 0:
             self.post_buyer(data={'uuid': buyer})
 
@@ -77,7 +77,7 @@ class ZamboniClient(Client):
         it doesn't it will create a paypal record. It will then return the
         paypal pk, so we can do calls to it.
         """
-        res = self.get_seller(filters={'uuid': seller})
+        res = self.get_seller(filters={'uuid': seller}, cache=False)
         count = res['meta']['total_count']
         if count == 0:
             # There's no seller data, so create the seller objects.
@@ -162,7 +162,11 @@ def get_client():
             'server': settings.SOLITUDE_HOSTS[0],
             'key': settings.SOLITUDE_KEY,
             'secret': settings.SOLITUDE_SECRET,
-            'timeout': settings.SOLITUDE_TIMEOUT
+            'timeout': settings.SOLITUDE_TIMEOUT,
+            'timeouts': settings.SOLITUDE_TIMEOUTS,
+            'retries': settings.SOLITUDE_RETRIES,
+            'pool_size': settings.SOLITUDE_POOL_SIZE,
+            'cache_timeout': settings.SOLITUDE_CACHE_TIMEOUT,
         }
         client = ZamboniClient(config)
         client.encoder = ZamboniEncoder
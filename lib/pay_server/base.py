@@ -1,15 +1,19 @@
 import datetime
 import decimal
 from functools import partial
+import hashlib
 import json
 import logging
+import time
 import urllib
 
 from django.conf import settings
+from django.core.cache import cache
 
 from curling.lib import API
 from django_statsd.clients import statsd
 import requests
+from requests.adapters import HTTPAdapter
 
 from tower import ugettext_lazy as _
 
@@ -61,6 +65,15 @@ mapping = {
 }
 
 
+# Read-only lookups that are safe to cache for a short while. Any write to an
+# endpoint with the same name, in any context, drops the cached results.
+cached = set([('generic', 'seller'), ('generic', 'product'),
+              ('generic', 'buyer')])
+
+# Methods we can safely send again if the connection fails or times out.
+idempotent = set(['get', 'put', 'delete'])
+
+
 date_format = '%Y-%m-%d'
 time_format = '%H:%M:%S'
 
@@ -83,6 +96,52 @@ class Encoder(json.JSONEncoder):
 general_error = _('Oops, we had an error processing that.')
 
 
+class LookupCache(object):
+    """
+    GET results kept in the shared cache for `ttl` seconds, so every process
+    sees them. Keys include a generation per endpoint name that any write to
+    that name bumps, so a write made in one process is seen by all of them.
+    Lookups that found nothing aren't kept: another process could create
+    what they looked for.
+    """
+    prefix = 'solitude:lookup'
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+
+    def generation_key(self, name):
+        return '%s:generation:%s' % (self.prefix, name)
+
+    def key(self, name, url):
+        generation = cache.get(self.generation_key(name))
+        if generation is None:
+            # Start from the time, so that a generation lost from the cache
+            # isn't reused while its results are still around.
+            generation = int(time.time() * 1000)
+            cache.add(self.generation_key(name), generation,
+                      60 * 60 * 24 * 30)
+        return '%s:%s:%s:%s' % (self.prefix, name, generation,
+                                hashlib.md5(url).hexdigest())
+
+    def get(self, name, url):
+        return cache.get(self.key(name, url))
+
+    def set(self, name, url, result):
+        if not self.ttl or not result:
+            return
+        if (isinstance(result, dict) and
+                result.get('meta', {}).get('total_count') == 0):
+            return
+        cache.set(self.key(name, url), result, self.ttl)
+
+    def invalidate(self, name):
+        try:
+            cache.incr(self.generation_key(name))
+        except ValueError:
+            # Nothing was cached under this name.
+            pass
+
+
 class Client(object):
 
     def __init__(self, config=None):
@@ -92,6 +151,14 @@ class Client(object):
                                 settings.SOLITUDE_OAUTH.get('secret'))
         self.encoder = None
         self.filter_encoder = urllib.urlencode
+        # Keep connections to solitude alive between calls instead of doing
+        # a new TCP and TLS handshake for every one.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.config['pool_size'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.cache = LookupCache(ttl=self.config['cache_timeout'])
 
     def call_uri(self, uri, method='get', data=None):
         """If you were given a URI by Solitude, pass it here and get that
@@ -110,12 +177,25 @@ class Client(object):
 
     def parse(self, config=None):
         config = {
-            'server': config.get('server')
+            'server': config.get('server'),
+            'timeout': config.get('timeout', 10),
+            # Per endpoint timeouts, keyed on "context.name", eg: "paypal.pay".
+            'timeouts': config.get('timeouts', {}),
+            'retries': config.get('retries', 2),
+            'backoff': config.get('backoff', 0.1),
+            'pool_size': config.get('pool_size', 10),
+            'cache_timeout': config.get('cache_timeout', 60),
             # TODO: add in OAuth stuff.
         }
         return config
 
-    def call(self, url, method_name, data=None):
+    def timeout(self, target=None):
+        if target:
+            key = '%s.%s' % tuple(target[:2])
+            return self.config['timeouts'].get(key, self.config['timeout'])
+        return self.config['timeout']
+
+    def call(self, url, method_name, data=None, timeout=None):
         log.info('Deprecated, please use curling: %s, %s' % (url, method_name))
         if data and method_name.lower() == 'get':
             raise TypeError('You cannot use data in a GET request. '
@@ -123,20 +203,31 @@ class Client(object):
 
         data = (json.dumps(data, cls=self.encoder or Encoder)
                 if data else json.dumps({}))
-        method = getattr(requests, method_name)
+        method = getattr(self.session, method_name)
+        timeout = timeout or self.config['timeout']
+        retries = (self.config['retries']
+                   if method_name.lower() in idempotent else 0)
 
-        try:
-            with statsd.timer('solitude.call.%s' % method_name):
-                result = method(url, data=data,
-                                headers={'content-type': 'application/json'},
-                                timeout=self.config.get('timeout', 10))
-        except requests.ConnectionError:
-            log.error('Solitude not accessible')
-            raise SolitudeOffline(general_error)
-        except requests.Timeout:
-            log.error('Solitude timed out, limit %s'
-                      % self.config.get('timeout', 10))
-            raise SolitudeTimeout(general_error)
+        attempt = 0
+        while True:
+            try:
+                with statsd.timer('solitude.call.%s' % method_name):
+                    result = method(url, data=data,
+                                    headers={'content-type':
+                                             'application/json'},
+                                    timeout=timeout)
+                break
+            except (requests.ConnectionError, requests.Timeout), error:
+                if attempt < retries:
+                    statsd.incr('solitude.call.retry')
+                    time.sleep(self.config['backoff'] * 2 ** attempt)
+                    attempt += 1
+                    continue
+                if isinstance(error, requests.Timeout):
+                    log.error('Solitude timed out, limit %s' % timeout)
+                    raise SolitudeTimeout(general_error)
+                log.error('Solitude not accessible')
+                raise SolitudeOffline(general_error)
 
         if result.status_code in (200, 201, 202, 204):
             return json.loads(result.text) if result.text else {}
@@ -159,7 +250,10 @@ class Client(object):
 
         """
         lookup_data = dict((k, v) for k, v in params.items() if k in lookup_by)
-        existing = self.__getattr__('get_%s' % method)(filters=lookup_data)
+        # Straight from solitude, a cached lookup could miss what another
+        # process just created and we'd create it twice.
+        existing = self.__getattr__('get_%s' % method)(filters=lookup_data,
+                                                       cache=False)
         if existing['meta']['total_count']:
             return existing['objects'][0]
 
@@ -181,8 +275,20 @@ class Client(object):
         return partial(self.wrapped, **{'target': target, 'method': method})
 
     def wrapped(self, target=None, method=None, data=None, pk=None,
-                filters=None):
+                filters=None, cache=True):
         url = self._url(*target[:2], pk=pk)
         if filters:
             url = '%s?%s' % (url, self.filter_encoder(filters))
-        return self.call(url, method, data=data)
+
+        if method == 'get' and cache and tuple(target[:2]) in cached:
+            result = self.cache.get(target[1], url)
+            if result is not None:
+                statsd.incr('solitude.cache.hit')
+                return result
+            result = self.call(url, method, timeout=self.timeout(target))
+            self.cache.set(target[1], url, result)
+            return result
+
+        if method != 'get':
+            self.cache.invalidate(target[1])
+        return self.call(url, method, data=data, timeout=self.timeout(target))
@@ -2,17 +2,20 @@ import datetime
 import json
 
 from django.conf import settings
+from django.core.cache import cache
 
-from mock import patch
+from mock import Mock, patch
 from nose import SkipTest
 from nose.tools import eq_
+import requests
 import test_utils
 
 from addons.models import Addon
 import amo
 from users.models import UserProfile
 from lib.pay_server import (client, filter_encoder, model_to_uid,
-                            ZamboniEncoder)
+                            ZamboniClient, ZamboniEncoder)
+from lib.pay_server.base import LookupCache, SolitudeOffline
 from lib.pay_server.errors import codes, lookup
 
 
@@ -207,6 +210,117 @@ class TestPay(test_utils.TestCase):
         assert 'uuid' in post_pay.call_args[1]['data']['return_url']
 
 
+class TestClient(test_utils.TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = ZamboniClient({'server': 'http://localhost',
+                                     'timeouts': {'paypal.pay': 30},
+                                     'backoff': 0})
+        self.session = Mock()
+        self.session.get.return_value = self.response('{"meta": {}}')
+        self.session.post.return_value = self.response('{}', 201)
+        self.client.session = self.session
+
+    def response(self, text, status_code=200):
+        return Mock(text=text, status_code=status_code)
+
+    def test_session_reused(self):
+        self.client.get_package(pk=1)
+        self.client.get_package(pk=2)
+        eq_(self.session.get.call_count, 2)
+
+    def test_lookup_cached(self):
+        self.client.get_seller(filters={'uuid': 'foo'})
+        eq_(self.client.get_seller(filters={'uuid': 'foo'}), {'meta': {}})
+        eq_(self.session.get.call_count, 1)
+        self.client.get_seller(filters={'uuid': 'bar'})
+        eq_(self.session.get.call_count, 2)
+
+    def test_lookup_not_shared(self):
+        self.client.get_seller(filters={'uuid': 'foo'})['meta']['x'] = 1
+        eq_(self.client.get_seller(filters={'uuid': 'foo'}), {'meta': {}})
+
+    def test_write_invalidates(self):
+        self.client.get_seller(filters={'uuid': 'foo'})
+        self.client.post_seller_paypal(data={'seller': 'foo'})
+        self.client.get_seller(filters={'uuid': 'foo'})
+        eq_(self.session.get.call_count, 2)
+
+    def test_empty_not_cached(self):
+        self.session.get.return_value = self.response(
+            '{"meta": {"total_count": 0}, "objects": []}')
+        self.client.get_seller(filters={'uuid': 'foo'})
+        self.client.get_seller(filters={'uuid': 'foo'})
+        eq_(self.session.get.call_count, 2)
+
+    def test_upsert_not_cached(self):
+        self.session.get.return_value = self.response(
+            '{"meta": {"total_count": 1}, "objects": [{"uuid": "foo"}]}')
+        self.client.get_seller(filters={'uuid': 'foo'})
+        eq_(self.client.upsert('seller', {'uuid': 'foo'}, ['uuid']),
+            {'uuid': 'foo'})
+        eq_(self.session.get.call_count, 2)
+        assert not self.session.post.called
+
+    def test_write_invalidates_other_clients(self):
+        other = ZamboniClient({'server': 'http://localhost'})
+        other.session = Mock()
+        self.client.get_seller(filters={'uuid': 'foo'})
+        other.post_seller(data={'uuid': 'foo'})
+        self.client.get_seller(filters={'uuid': 'foo'})
+        eq_(self.session.get.call_count, 2)
+
+    def test_not_cached(self):
+        self.client.get_package(pk=1)
+        self.client.get_package(pk=1)
+        eq_(self.session.get.call_count, 2)
+
+    def test_timeouts(self):
+        self.client.post_pay(data={'foo': 'bar'})
+        eq_(self.session.post.call_args[1]['timeout'], 30)
+        self.client.post_refund(data={'foo': 'bar'})
+        eq_(self.session.post.call_args[1]['timeout'], 10)
+
+    def test_retry_get(self):
+        self.session.get.side_effect = [requests.ConnectionError,
+                                        requests.Timeout,
+                                        self.response('{}')]
+        eq_(self.client.get_package(pk=1), {})
+        eq_(self.session.get.call_count, 3)
+
+    def test_retry_gives_up(self):
+        self.session.get.side_effect = requests.ConnectionError
+        with self.assertRaises(SolitudeOffline):
+            self.client.get_package(pk=1)
+        eq_(self.session.get.call_count, 3)
+
+    def test_no_retry_post(self):
+        self.session.post.side_effect = requests.ConnectionError
+        with self.assertRaises(SolitudeOffline):
+            self.client.post_pay(data={'foo': 'bar'})
+        eq_(self.session.post.call_count, 1)
+
+
+class TestLookupCache(test_utils.TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cache = LookupCache(ttl=10)
+
+    def test_get(self):
+        self.cache.set('seller', '/seller/', {'uuid': 'foo'})
+        eq_(self.cache.get('seller', '/seller/'), {'uuid': 'foo'})
+        eq_(self.cache.get('product', '/seller/'), None)
+
+    def test_invalidate(self):
+        self.cache.set('seller', '/seller/', {'uuid': 'foo'})
+        self.cache.set('product', '/product/', {'uuid': 'foo'})
+        LookupCache().invalidate('seller')
+        eq_(self.cache.get('seller', '/seller/'), None)
+        eq_(self.cache.get('product', '/product/'), {'uuid': 'foo'})
+
+
 def test_lookup():
     eq_(lookup(0, {}), codes['0'])
     assert 'foo@bar.com' in lookup(100001, {'email': 'foo@bar.com'})
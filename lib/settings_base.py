@@ -279,6 +279,11 @@ DUMPED_USERS_PATH = NETAPP_STORAGE + '/dumped-users'
 # Tarballs in DUMPED_USERS_PATH deleted 30 days after they have been written.
 DUMPED_USERS_DAYS_DELETE = 3600 * 24 * 30
 
+# Where the prefix index search suggestions come from is written, and how
+# often processes look for a new one, in seconds.
+SEARCH_SUGGESTIONS_PATH = NETAPP_STORAGE + '/search-suggestions.pickle'
+SEARCH_SUGGESTIONS_RELOAD = 60
+
 # paths that don't require an app prefix
 SUPPORTED_NONAPPS = ('about', 'admin', 'apps', 'blocklist', 'credits',
                      'developer_agreement', 'developer_faq', 'developers',
@@ -370,6 +375,8 @@ MIDDLEWARE_CLASSES = (
     # AMO URL middleware comes first so everyone else sees nice URLs.
     'django_statsd.middleware.GraphiteRequestTimingMiddleware',
     'django_statsd.middleware.GraphiteMiddleware',
+    # Comes early so its response runs after everything that saves.
+    'amo.middleware.CoalesceInvalidationMiddleware',
     'amo.middleware.LocaleAndAppURLMiddleware',
     # Mobile detection should happen in Zeus.
     'mobility.middleware.DetectMobileMiddleware',
@@ -1077,6 +1084,12 @@ EMAIL_BLACKLIST = (
     'nobody@mozilla.org',
 )
 
+# Bulk mail (eg: emailing all developers) is sent this many messages at a time
+# over one SMTP connection, with each admin_email task handling
+# BULK_MAIL_TASK_SIZE recipients.
+BULK_MAIL_BATCH_SIZE = 100
+BULK_MAIL_TASK_SIZE = 1000
+
 # URL for Add-on Validation FAQ.
 VALIDATION_FAQ_URL = ('https://wiki.mozilla.org/AMO:Editors/EditorGuide/'
                       'AddonReviews#Step_2:_Automatic_validation')
@@ -1191,6 +1204,12 @@ HERA = [{'USERNAME': '',
         'LOCATION': '',
        }]
 
+# Front end purges are spooled and flushed every minute, this many URLs at a
+# time, or as soon as some have been waiting FRONT_END_PURGE_MAX_DELAY
+# seconds.
+FRONT_END_PURGE_BATCH_SIZE = 500
+FRONT_END_PURGE_MAX_DELAY = 5 * 60
+
 # Logging
 LOG_LEVEL = logging.DEBUG
 HAS_SYSLOG = True  # syslog is used if HAS_SYSLOG and NOT DEBUG.
@@ -1394,6 +1413,9 @@ BLOCKLIST_COOKIE = 'BLOCKLIST_v1'
 FILE_VIEWER_SIZE_LIMIT = 1048576
 # The maximum file size that you can have inside a zip file.
 FILE_UNZIP_SIZE_LIMIT = 104857600
+# How many bytes of packages the file viewer keeps in TMP_PATH before the least
+# recently used ones are removed.
+FILE_VIEWER_CACHE_SIZE = 5 * 1024 * 1024 * 1024
 
 # How long to delay tasks relying on file system to cope with NFS lag.
 NFS_LAG_DELAY = 3
@@ -1418,11 +1440,14 @@ ES_HOSTS = ['127.0.0.1:9200']
 ES_URLS = ['http://%s' % h for h in ES_HOSTS]
 ES_INDEXES = {'default': 'addons',
               'webapp': 'apps',
-              'update_counts': 'addons_stats',
-              'download_counts': 'addons_stats',
+              'update_counts': 'addons_counts',
+              'download_counts': 'addons_counts',
               'stats_contributions': 'addons_stats',
               'stats_collections_counts': 'addons_stats',
               'users_install': 'addons_stats'}
+# These are split into one index per month behind their ES_INDEXES alias so a
+# backfill only rewrites the months it touches, see stats.search.month_index.
+ES_MONTHLY_INDEXES = ('update_counts', 'download_counts')
 ES_TIMEOUT = 30
 ES_DEFAULT_NUM_REPLICAS = 2
 ES_DEFAULT_NUM_SHARDS = 5
@@ -1442,6 +1467,12 @@ STATSD_PREFIX = 'amo'
 # The django statsd client to use, see django-statsd for more.
 STATSD_CLIENT = 'django_statsd.clients.normal'
 
+# The fraction of requests that QueryProfilerMiddleware records query counts,
+# db time, cache-machine hits and ES time for.
+QUERY_PROFILER_SAMPLE = 0.01
+# Log requests that run the same query more often than this.
+QUERY_PROFILER_DUPLICATES = 5
+
 GRAPHITE_HOST = 'localhost'
 GRAPHITE_PORT = 2003
 GRAPHITE_PREFIX = 'amo'
@@ -1498,6 +1529,12 @@ FFMPEG_BINARY = 'ffmpeg'
 TOTEM_BINARIES = {'thumbnailer': 'totem-video-thumbnailer',
                   'indexer': 'totem-video-indexer'}
 VIDEO_LIBRARIES = ['lib.video.totem', 'lib.video.ffmpeg']
+# How many videos a host transcodes at once, shared by all its workers through
+# locks on files in VIDEO_TRANSCODE_LOCK_DIR. Tasks wait for a free slot for
+# up to VIDEO_TRANSCODE_WAIT seconds before they are retried.
+VIDEO_TRANSCODE_SLOTS = 2
+VIDEO_TRANSCODE_LOCK_DIR = os.path.join(TMP_PATH, 'video-slots')
+VIDEO_TRANSCODE_WAIT = 60
 
 # Turn on/off the use of the signing server and all the related things. This
 # is a temporary flag that we will remove.
@@ -1525,6 +1562,16 @@ SOLITUDE_KEY = ''
 SOLITUDE_SECRET = ''
 # The timeout we'll give solitude.
 SOLITUDE_TIMEOUT = 10
+# Timeouts for specific solitude endpoints, keyed on "context.name", eg:
+# {'paypal.pay': 30}. Anything not listed here uses SOLITUDE_TIMEOUT.
+SOLITUDE_TIMEOUTS = {}
+# How many times idempotent solitude calls are retried on connection errors.
+SOLITUDE_RETRIES = 2
+# The number of keep-alive connections to solitude kept open per process.
+SOLITUDE_POOL_SIZE = 10
+# How long, in seconds, read-only seller, product and buyer lookups are kept
+# in the shared cache.
+SOLITUDE_CACHE_TIMEOUT = 60
 
 # The OAuth keys to connect to the solitude host specified above.
 SOLITUDE_OAUTH = {'key': '', 'secret': ''}
@@ -1621,6 +1668,11 @@ API_THROTTLE = True
 # Cache timeout on the /search/featured API.
 CACHE_SEARCH_FEATURED_API_TIMEOUT = 60 * 60  # 1 hour.
 
+# Cache timeouts of the ids and totals of search API results without a free
+# text query, and of the app documents they're rehydrated from.
+CACHE_SEARCH_API_TIMEOUT = 60
+CACHE_SEARCH_DOC_TIMEOUT = 60 * 60
+
 # Whitelist IP addresses of the allowed clients that can post email
 # through the API.
 WHITELISTED_CLIENTS_EMAIL_API = []
@@ -1649,6 +1701,9 @@ IARC_STOREFRONT_ID = 4
 IARC_SUBMISSION_ENDPOINT = ''
 IARC_PRIVACY_URL = 'https://www.globalratings.com/IARCPRODClient/privacypolicy.aspx'
 IARC_TOS_URL = 'https://www.globalratings.com/IARCPRODClient/termsofuse.aspx'
+# How long parsed Get_App_Info responses are cached for, in seconds. Rating
+# changes from IARC clear them sooner.
+IARC_APP_INFO_CACHE_TIMEOUT = 60 * 60
 
 # The payment providers supported.
 PAYMENT_PROVIDERS = []
@@ -1,4 +1,5 @@
 import logging
+import os
 import re
 import tempfile
 
@@ -105,6 +106,31 @@ class Video(VideoBase):
                    dest)
         return dest
 
+    def get_encoded_and_screenshot(self, encode_size, screenshot_size):
+        """
+        `get_encoded` and `get_screenshot` in one ffmpeg run with two
+        outputs, so the video is only read and decoded once.
+        """
+        assert self.is_valid()
+        assert self.meta.get('duration')
+        halfway = int(self.meta['duration'] / 2)
+        video = tempfile.mkstemp(suffix='.webm')[1]
+        screenshot = tempfile.mkstemp(suffix='.png')[1]
+        try:
+            self._call('encode_screenshot',
+                       False,
+                       '-s', '%sx%s' % encode_size,  # Size of video.
+                       video,
+                       '-vframes', '1',  # Only grab one frame.
+                       '-ss', str(halfway),  # Start half way through.
+                       '-s', '%sx%s' % screenshot_size,  # Size of image.
+                       screenshot)
+        except Exception:
+            for path in (video, screenshot):
+                os.remove(path)
+            raise
+        return video, screenshot
+
     def is_valid(self):
         assert self.meta is not None
         self.errors = []
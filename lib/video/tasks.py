@@ -9,6 +9,7 @@ from celeryutils import task
 import amo
 from amo.decorators import set_modified_on
 from lib.video import library
+from lib.video.utils import transcode_slot, TranscodeBusy
 import waffle
 
 log = logging.getLogger('z.devhub.task')
@@ -17,11 +18,29 @@ time_limits = settings.CELERY_TIME_LIMITS['lib.video.tasks.resize_video']
 
 # Video decoding can take a while, so let's increase these limits.
 @task(time_limit=time_limits['hard'], soft_time_limit=time_limits['soft'])
-@set_modified_on
 def resize_video(src, instance, user=None, **kw):
     """Try and resize a video and cope if it fails."""
+    try:
+        return _resize(src, instance, user=user, **kw)
+    except TranscodeBusy, err:
+        if resize_video.request.retries >= resize_video.max_retries:
+            log.error('Giving up on video %s: %s' % (instance.pk, err))
+            _resize_error(src, instance, user)
+            return
+        # This host is busy with other videos, try again later rather than
+        # losing the preview. `kw` still holds set_modified_on here.
+        log.info('Retrying video %s: %s' % (instance.pk, err))
+        kw['user'] = user
+        return resize_video.retry(args=[src, instance], kwargs=kw, exc=err,
+                                  countdown=60)
+
+
+@set_modified_on
+def _resize(src, instance, user=None, **kw):
     try:
         result = _resize_video(src, instance, **kw)
+    except TranscodeBusy:
+        raise
     except Exception, err:
         log.error('Error on processing video: %s' % err)
         _resize_error(src, instance, user)
@@ -53,31 +72,28 @@ def _resize_video(src, instance, **kw):
         return
 
     video = lib(src)
-    video.get_meta()
+    video.probe()
     if not video.is_valid():
         log.info('Video is not valid for %s' % instance.pk)
         return
 
-    if waffle.switch_is_active('video-encode'):
-        # Do the video encoding.
-        try:
-            video_file = video.get_encoded(amo.ADDON_PREVIEW_SIZES[1])
-        except Exception:
-            log.info('Error encoding video for %s, %s' %
-                     (instance.pk, video.meta), exc_info=True)
-            return
-
-    # Do the thumbnail next, this will be the signal that the
-    # encoding has finished.
+    encode = waffle.switch_is_active('video-encode')
     try:
-        thumbnail_file = video.get_screenshot(amo.ADDON_PREVIEW_SIZES[0])
+        with transcode_slot():
+            if encode:
+                # Do the video encoding and the thumbnail together.
+                video_file, thumbnail_file = video.get_encoded_and_screenshot(
+                    amo.ADDON_PREVIEW_SIZES[1], amo.ADDON_PREVIEW_SIZES[0])
+            else:
+                thumbnail_file = video.get_screenshot(
+                    amo.ADDON_PREVIEW_SIZES[0])
+    except TranscodeBusy:
+        raise
     except Exception:
-        # We'll have this file floating around because the video
-        # encoded successfully, or something has gone wrong in which case
-        # we don't want the file around anyway.
-        if waffle.switch_is_active('video-encode'):
-            os.remove(video_file)
-        log.info('Error making thumbnail for %s' % instance.pk, exc_info=True)
+        # get_encoded_and_screenshot removes its temporary files when it
+        # fails, we don't want them around anyway.
+        log.info('Error encoding video for %s, %s' %
+                 (instance.pk, video.meta), exc_info=True)
         return
 
     for path in (instance.thumbnail_path, instance.image_path):
@@ -86,7 +102,7 @@ def _resize_video(src, instance, **kw):
             os.makedirs(dirs)
 
     shutil.move(thumbnail_file, instance.thumbnail_path)
-    if waffle.switch_is_active('video-encode'):
+    if encode:
         # Move the file over, removing the temp file.
         shutil.move(video_file, instance.image_path)
     else:
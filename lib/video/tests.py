@@ -1,4 +1,5 @@
 import os
+import shutil
 import stat
 import tempfile
 
@@ -15,7 +16,8 @@ from amo.tests.test_helpers import get_image_path
 from devhub.models import UserLog
 from lib.video import get_library
 from lib.video import ffmpeg, totem
-from lib.video.tasks import resize_video
+from lib.video.tasks import _resize_video, resize_video
+from lib.video.utils import transcode_slot, TranscodeBusy
 from users.models import UserProfile
 
 files = {
@@ -56,6 +58,24 @@ TOTEM_INFO_HAS_VIDEO=False
 TOTEM_INFO_HAS_AUDIO=False
 """
 
+# Stands in for ffmpeg: records its arguments, writes something to each
+# output and prints what ffmpeg would about the input.
+fake_ffmpeg = """#!/bin/sh
+echo "$@" >> %(log)s
+prev=
+for arg in "$@"; do
+    if [ "$prev" != "-i" ]; then
+        case "$arg" in
+            *.png|*.webm) echo output > "$arg" ;;
+        esac
+    fi
+    prev="$arg"
+done
+cat <<'EOF'
+%(output)s
+EOF
+"""
+
 
 class TestFFmpegVideo(amo.tests.TestCase):
 
@@ -212,6 +232,30 @@ class TestTask(amo.tests.TestCase):
         resize_video(files['good'], self.mock, user=user)
         assert self.mock.delete.called
 
+    @patch('lib.video.tasks.resize_video.retry')
+    @patch('lib.video.tasks._resize_video')
+    def test_resize_busy(self, _resize_video, retry):
+        _resize_video.side_effect = TranscodeBusy
+        resize_video(files['good'], self.mock)
+        assert retry.called
+        assert not self.mock.delete.called
+
+    @patch('lib.video.tasks.resize_video.retry')
+    @patch('lib.video.tasks._resize_video')
+    def test_resize_busy_keeps_modified_on(self, _resize_video, retry):
+        _resize_video.side_effect = TranscodeBusy
+        resize_video(files['good'], self.mock, set_modified_on=[self.mock])
+        eq_(retry.call_args[1]['kwargs']['set_modified_on'], [self.mock])
+
+    @patch.object(resize_video, 'max_retries', 0)
+    @patch('lib.video.tasks.resize_video.retry')
+    @patch('lib.video.tasks._resize_video')
+    def test_resize_busy_gives_up(self, _resize_video, retry):
+        _resize_video.side_effect = TranscodeBusy
+        resize_video(files['good'], self.mock)
+        assert not retry.called
+        assert self.mock.delete.called
+
     @patch('lib.video.ffmpeg.Video.get_encoded')
     def test_resize_video_no_encode(self, get_encoded):
         raise SkipTest
@@ -232,3 +276,94 @@ class TestTask(amo.tests.TestCase):
         resize_video(files['bad'], self.mock)
         assert not isinstance(self.mock.sizes, dict)
         assert not self.mock.save.called
+
+
+class TestTranscodeSlot(amo.tests.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.patches = [
+            patch.object(settings, 'VIDEO_TRANSCODE_LOCK_DIR', self.dir),
+            patch.object(settings, 'VIDEO_TRANSCODE_SLOTS', 2)]
+        for patcher in self.patches:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+        shutil.rmtree(self.dir)
+
+    def test_busy(self):
+        with transcode_slot():
+            with transcode_slot():
+                with self.assertRaises(TranscodeBusy):
+                    with transcode_slot(wait=0):
+                        pass
+            # One came free.
+            with transcode_slot(wait=0):
+                pass
+
+
+class TestFakeFFmpeg(amo.tests.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.log = os.path.join(self.dir, 'calls')
+        binary = os.path.join(self.dir, 'ffmpeg')
+        with open(binary, 'w') as fobj:
+            fobj.write(fake_ffmpeg % {'log': self.log,
+                                      'output': older_output})
+        os.chmod(binary, 0755)
+        self.patches = [
+            patch.object(ffmpeg.Video, 'name', binary),
+            patch('lib.video.tasks.library', ffmpeg.Video),
+            patch.object(settings, 'VIDEO_TRANSCODE_LOCK_DIR',
+                         os.path.join(self.dir, 'slots'))]
+        for patcher in self.patches:
+            patcher.start()
+        self.switch = waffle.models.Switch.objects.create(
+            name='video-encode', active=True)
+        self.instance = Mock()
+        self.instance.pk = 1
+        self.instance.thumbnail_path = os.path.join(self.dir, 'thumbs',
+                                                    '1.png')
+        self.instance.image_path = os.path.join(self.dir, 'full', '1.webm')
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+        shutil.rmtree(self.dir)
+
+    def calls(self):
+        return [line.split() for line in open(self.log)]
+
+    def outputs(self, call):
+        # Everything written, the input is the first .webm.
+        return [arg for arg in call if arg.endswith(('.webm', '.png'))][1:]
+
+    def test_probe_once(self):
+        ffmpeg.Video(files['good']).probe()
+        video = ffmpeg.Video(files['good'])
+        video.probe()
+        eq_(self.calls(), [['-y', '-i', files['good']]])
+        eq_(video.meta['duration'], 10.0)
+
+    def test_resize(self):
+        assert _resize_video(files['good'], self.instance)
+        probe, transcode = self.calls()
+        eq_(probe, ['-y', '-i', files['good']])
+        video, screenshot = self.outputs(transcode)
+        assert video.endswith('.webm')
+        assert screenshot.endswith('.png')
+        assert os.path.exists(self.instance.thumbnail_path)
+        assert os.path.exists(self.instance.image_path)
+        assert not os.path.exists(video)
+        assert not os.path.exists(screenshot)
+        assert self.instance.save.called
+
+    def test_resize_no_encode(self):
+        self.switch.update(active=False)
+        assert _resize_video(files['good'], self.instance)
+        probe, screenshot = self.calls()
+        eq_(len(self.outputs(screenshot)), 1)
+        assert self.instance.save.called
@@ -1,4 +1,13 @@
+import contextlib
+import errno
+import fcntl
+import hashlib
+import os
 import subprocess
+import time
+
+from django.conf import settings
+from django.core.cache import cache
 
 
 def check_output(*popenargs, **kwargs):
@@ -20,6 +29,57 @@ def check_output(*popenargs, **kwargs):
     return output
 
 
+class TranscodeBusy(Exception):
+    """No transcode slot came free in time."""
+
+
+@contextlib.contextmanager
+def transcode_slot(wait=None):
+    """
+    Holds one of the `VIDEO_TRANSCODE_SLOTS` transcode slots of this host,
+    waiting up to `wait` seconds for one to come free.
+
+    Slots are locks on files in `VIDEO_TRANSCODE_LOCK_DIR`, so every worker
+    process on the host shares them and the kernel drops the lock of a
+    process that dies.
+    """
+    if wait is None:
+        wait = settings.VIDEO_TRANSCODE_WAIT
+    root = settings.VIDEO_TRANSCODE_LOCK_DIR
+    if not os.path.exists(root):
+        try:
+            os.makedirs(root)
+        except OSError:
+            # Another worker made it first.
+            pass
+
+    deadline = time.time() + wait
+    slot = None
+    while slot is None:
+        for num in range(settings.VIDEO_TRANSCODE_SLOTS):
+            fobj = open(os.path.join(root, 'slot-%s' % num), 'a')
+            try:
+                fcntl.flock(fobj, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError, e:
+                fobj.close()
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+            else:
+                slot = fobj
+                break
+        else:
+            if time.time() >= deadline:
+                raise TranscodeBusy('No transcode slot free after %ss.'
+                                    % wait)
+            time.sleep(0.5)
+
+    try:
+        yield
+    finally:
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        slot.close()
+
+
 class VideoBase(object):
 
     def __init__(self, filename):
@@ -30,12 +90,44 @@ class VideoBase(object):
     def _call(self):
         raise NotImplementedError
 
+    def probe(self):
+        """
+        Fills in `meta` with `get_meta` for all the steps to use. It's cached
+        on the file's path, size and modification time, so a retried task
+        doesn't probe the same file again.
+        """
+        if self.meta is not None:
+            return
+        stat = os.stat(self.filename)
+        key = 'video:meta:%s' % hashlib.md5('%s:%s:%s:%s' % (
+            self.__class__.__module__, self.filename, stat.st_size,
+            stat.st_mtime)).hexdigest()
+        meta = cache.get(key)
+        if meta is None:
+            self.get_meta()
+            if self.meta is not None:
+                cache.set(key, self.meta)
+        else:
+            self.meta = meta
+
     def get_encoded(self, size):
         raise NotImplementedError
 
     def get_screenshot(self, size):
         raise NotImplementedError
 
+    def get_encoded_and_screenshot(self, encode_size, screenshot_size):
+        """
+        Both `get_encoded` and `get_screenshot`, returns the two temporary
+        files. Libraries that can make both in one go override this.
+        """
+        video = self.get_encoded(encode_size)
+        try:
+            return video, self.get_screenshot(screenshot_size)
+        except Exception:
+            os.remove(video)
+            raise
+
     def get_meta(self):
         pass
 
@@ -0,0 +1,2 @@
+ALTER TABLE `file_uploads` ADD COLUMN `size` int(11) unsigned NULL,
+                           ADD COLUMN `manifest` longtext NULL;
@@ -0,0 +1,31 @@
+CREATE TABLE `editor_queue` (
+    `id` int(11) unsigned NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    `queue` varchar(20) NOT NULL,
+    `addon_id` int(11) unsigned NOT NULL,
+    `version_id` int(11) unsigned NOT NULL,
+    `addon_name` varchar(255),
+    `addon_slug` varchar(30),
+    `addon_status` integer NOT NULL,
+    `addon_type_id` integer NOT NULL,
+    `admin_review` bool NOT NULL,
+    `is_site_specific` bool NOT NULL,
+    `external_software` bool NOT NULL,
+    `binary` bool NOT NULL,
+    `binary_components` bool NOT NULL,
+    `premium_type` integer NOT NULL,
+    `is_restartless` bool NOT NULL,
+    `is_jetpack` bool NOT NULL,
+    `latest_version` varchar(255) NOT NULL,
+    `has_info_request` bool NOT NULL,
+    `has_editor_comment` bool NOT NULL,
+    `file_platform_ids` varchar(255),
+    `application_ids` varchar(255),
+    `waiting_since` datetime,
+    UNIQUE KEY `queue_addon` (`queue`, `addon_id`),
+    -- Paging and counting by waiting time only needs the index.
+    KEY `queue_waiting` (`queue`, `waiting_since`, `addon_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+ALTER TABLE `editor_queue`
+    ADD CONSTRAINT FOREIGN KEY (`addon_id`) REFERENCES `addons` (`id`) ON DELETE CASCADE,
+    ADD CONSTRAINT FOREIGN KEY (`version_id`) REFERENCES `versions` (`id`) ON DELETE CASCADE;
@@ -0,0 +1,7 @@
+#!/usr/bin/env python
+from editors.models import EditorQueue
+
+
+def run():
+    """Fill editor_queue from the queue queries."""
+    EditorQueue.reconcile()
@@ -0,0 +1,12 @@
+CREATE TABLE `zadmin_reindexing_chunk` (
+    `id` int(11) NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    `reindexing_id` int(11) NOT NULL,
+    `first_id` int(11) unsigned NOT NULL,
+    `last_id` int(11) unsigned NOT NULL,
+    `status` varchar(7) NOT NULL,
+    `error` longtext,
+    `modified` datetime NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+ALTER TABLE `zadmin_reindexing_chunk`
+    ADD CONSTRAINT FOREIGN KEY (`reindexing_id`) REFERENCES `zadmin_reindexing` (`id`) ON DELETE CASCADE;
@@ -0,0 +1,13 @@
+#!/usr/bin/env python
+from stats import search
+from stats.models import DownloadCount, UpdateCount
+
+
+def run():
+    """
+    Fill the monthly update and download count indices, which the stats
+    pages read from instead of addons_stats.
+    """
+    search.setup_indexes()
+    for model in UpdateCount, DownloadCount:
+        search.bulk_index(model)
@@ -1,5 +1,6 @@
 import hashlib
 import hmac
+import random
 import re
 import time
 from urllib import urlencode
@@ -18,6 +19,7 @@ from multidb.pinning import (pin_this_thread, this_thread_is_pinned,
                              unpin_this_thread)
 from multidb.middleware import PinningRouterMiddleware
 
+from mkt.api import profiler
 from mkt.api.models import Access, ACCESS_TOKEN, Token
 from mkt.api.oauth import OAuthServer
 from mkt.carriers import get_carrier
@@ -165,20 +167,27 @@ class RestSharedSecretMiddleware(object):
 
 
 class APITransactionMiddleware(TransactionMiddleware):
-    """Wrap the transaction middleware so we can use it in the API only."""
+    """
+    Wrap the transaction middleware so we can use it in the API only. Lean
+    requests are read-only so they don't need it either.
+    """
+
+    def is_transactional(self, request):
+        return (getattr(request, 'API', False) and
+                not getattr(request, 'LEAN', False))
 
     def process_request(self, request):
-        if getattr(request, 'API', False):
+        if self.is_transactional(request):
             return (super(APITransactionMiddleware, self)
                     .process_request(request))
 
     def process_exception(self, request, exception):
-        if getattr(request, 'API', False):
+        if self.is_transactional(request):
             return (super(APITransactionMiddleware, self)
                     .process_exception(request, exception))
 
     def process_response(self, request, response):
-        if getattr(request, 'API', False):
+        if self.is_transactional(request):
             return (super(APITransactionMiddleware, self)
                     .process_response(request, response))
         return response
@@ -211,6 +220,11 @@ class APIPinningMiddleware(PinningRouterMiddleware):
         if not getattr(request, 'API', False):
             return super(APIPinningMiddleware, self).process_request(request)
 
+        if getattr(request, 'LEAN', False):
+            # Anonymous reads are never pinned.
+            unpin_this_thread()
+            return
+
         if (request.amo_user and not request.amo_user.is_anonymous() and
                 (cache.get(self.cache_key(request)) or
                  request.method in ['DELETE', 'PATCH', 'POST', 'PUT'])):
@@ -338,3 +352,60 @@ class TimingMiddleware(GraphiteRequestTimingMiddleware):
             statsd.timing('{pre}.{module}.{name}.{method}'.format(**data), ms)
             statsd.timing('{pre}.{module}.{method}'.format(**data), ms)
             statsd.timing('{pre}.{method}'.format(**data), ms)
+
+
+class QueryProfilerMiddleware(object):
+    """
+    Records the number of queries, time spent in the db, repeated queries,
+    cache-machine hits and misses and elasticsearch time for a sample of
+    requests, as set by `QUERY_PROFILER_SAMPLE`.
+
+    Numbers are sent to statsd per view and requests that repeat the same
+    query more than `QUERY_PROFILER_DUPLICATES` times are logged, since that
+    is usually an N+1 in a serializer.
+
+    It is the first middleware, so that the queries of all the others are
+    counted too.
+    """
+
+    def process_request(self, request):
+        if random.random() < settings.QUERY_PROFILER_SAMPLE:
+            request._profile = profiler.start_request()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._profile_view = '%s.%s' % (
+            view_func.__module__, getattr(view_func, '__name__', 'unknown'))
+
+    def process_exception(self, request, exception):
+        self._stop(request)
+
+    def process_response(self, request, response):
+        profile = self._stop(request)
+        view = getattr(request, '_profile_view', None)
+        if not profile or not view:
+            return response
+
+        pre = 'profile.api' if getattr(request, 'API', False) else 'profile'
+        key = '%s.%s' % (pre, view)
+        statsd.timing('%s.queries' % key, profile.query_count)
+        statsd.timing('%s.db' % key, int(profile.db_time * 1000))
+        statsd.timing('%s.es' % key, int(profile.es_time * 1000))
+        statsd.incr('%s.cache.hit' % key, profile.cache_hits)
+        statsd.incr('%s.cache.miss' % key, profile.cache_misses)
+
+        duplicates = profile.duplicates()
+        worst = max(duplicates.values()) if duplicates else 0
+        if worst > settings.QUERY_PROFILER_DUPLICATES:
+            statsd.incr('%s.duplicates' % key)
+            log.warning(u'%s ran %s queries, repeated: %s'
+                        % (view, profile.query_count,
+                           ', '.join('%s x %s' % (n, sig) for sig, n
+                                     in sorted(duplicates.items(),
+                                               key=lambda d: -d[1]))))
+        return response
+
+    def _stop(self, request):
+        profile = getattr(request, '_profile', None)
+        if profile:
+            profiler.stop_request()
+        return profile
@@ -0,0 +1,186 @@
+"""
+Per request accounting of database queries, cache-machine hits and
+elasticsearch calls.
+
+`install()` hooks the debug cursor, cache-machine and pyelasticsearch once per
+process. Nothing is recorded unless a `Profile` is active in the current
+thread, which is what `QueryProfilerMiddleware` and `profile()` do.
+"""
+import collections
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends import util
+
+import caching.base
+import pyelasticsearch
+
+
+_local = threading.local()
+_installed = []
+
+# Only this many queries are kept, on a profile and on the connection, so a
+# long running task doesn't grow without bounds. All of them are counted.
+MAX_QUERIES = 1000
+
+# Used to turn SQL into a signature that is the same for every set of
+# parameters, so repeated queries with different ids are spotted.
+_numbers = re.compile(r'\b\d+\b')
+_strings = re.compile(r"'(?:[^'\\]|\\.)*'")
+_in_lists = re.compile(r'IN \([^)]*\)', re.I)
+_whitespace = re.compile(r'\s+')
+
+
+def signature(sql):
+    sql = _strings.sub('?', sql)
+    sql = _numbers.sub('?', sql)
+    sql = _in_lists.sub('IN (...)', sql)
+    return _whitespace.sub(' ', sql).strip()
+
+
+class Profile(object):
+
+    def __init__(self):
+        self.queries = []
+        self.query_count = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.es_calls = 0
+        self.es_time = 0.0
+
+    def add_query(self, sql, seconds):
+        self.query_count += 1
+        self.db_time += seconds
+        if len(self.queries) < MAX_QUERIES:
+            self.queries.append((sql, seconds))
+
+    def duplicates(self):
+        """Returns {signature: count} for queries that were run repeatedly."""
+        counts = collections.Counter(signature(sql) for sql, t in self.queries)
+        return dict((sig, n) for sig, n in counts.items() if n > 1)
+
+
+def active():
+    return getattr(_local, 'profiles', [])
+
+
+def start():
+    install()
+    profile = Profile()
+    if not active():
+        _local.profiles = []
+        _local.debug_cursors = dict((c.alias, c.use_debug_cursor)
+                                    for c in connections.all())
+        for connection in connections.all():
+            connection.use_debug_cursor = True
+    _local.profiles.append(profile)
+    return profile
+
+
+def stop(profile):
+    profiles = active()
+    if profile in profiles:
+        profiles.remove(profile)
+    if not profiles:
+        for connection in connections.all():
+            connection.use_debug_cursor = _local.debug_cursors.get(
+                connection.alias)
+
+
+@contextmanager
+def profile():
+    """Record everything that happens in the block, eg: in tests."""
+    p = start()
+    try:
+        yield p
+    finally:
+        stop(p)
+
+
+def start_request():
+    """Start profiling the current request, see QueryProfilerMiddleware."""
+    stop_request()
+    _local.request_profile = start()
+    return _local.request_profile
+
+
+def stop_request(**kwargs):
+    """
+    Stop profiling the current request. This is also run on the request
+    signals, so the debug cursor is switched off again even when an
+    exception kept QueryProfilerMiddleware from seeing the response.
+    """
+    profile = getattr(_local, 'request_profile', None)
+    _local.request_profile = None
+    if profile:
+        stop(profile)
+    return profile
+
+
+request_started.connect(stop_request, dispatch_uid='profiler_request_started')
+request_finished.connect(stop_request,
+                         dispatch_uid='profiler_request_finished')
+
+
+def _record_query(sql, seconds):
+    for p in active():
+        p.add_query(sql, seconds)
+
+
+def _wrap_execute(func):
+    def wrapper(self, sql, *args, **kw):
+        start = time.time()
+        try:
+            return func(self, sql, *args, **kw)
+        finally:
+            _record_query(sql, time.time() - start)
+            # The debug cursor keeps every query on the connection as well.
+            if len(self.db.queries) > MAX_QUERIES:
+                del self.db.queries[:-MAX_QUERIES]
+    return wrapper
+
+
+def _wrap_cache_iter(func):
+    def wrapper(self):
+        first = True
+        for obj in func(self):
+            if first:
+                first = False
+                hit = getattr(obj, 'from_cache', False)
+                for p in active():
+                    if hit:
+                        p.cache_hits += 1
+                    else:
+                        p.cache_misses += 1
+            yield obj
+    return wrapper
+
+
+def _wrap_es_request(func):
+    def wrapper(self, *args, **kw):
+        start = time.time()
+        try:
+            return func(self, *args, **kw)
+        finally:
+            for p in active():
+                p.es_calls += 1
+                p.es_time += time.time() - start
+    return wrapper
+
+
+def install():
+    if _installed:
+        return
+    _installed.append(True)
+    cursor = util.CursorDebugWrapper
+    cursor.execute = _wrap_execute(cursor.execute)
+    cursor.executemany = _wrap_execute(cursor.executemany)
+    machine = caching.base.CacheMachine
+    machine.__iter__ = _wrap_cache_iter(machine.__iter__)
+    es = pyelasticsearch.ElasticSearch
+    es.send_request = _wrap_es_request(es.send_request)
@@ -22,6 +22,7 @@ from tags.models import AddonTag, Tag
 from users.models import UserProfile
 
 import mkt
+from mkt.api import profiler
 from mkt.api.models import Access, generate
 from mkt.api.tests.test_oauth import RestOAuthClient, RestOAuth
 from mkt.constants import ratingsbodies, regions
@@ -689,6 +690,19 @@ class TestAppDetail(RestOAuth):
         data = json.loads(res.content)
         eq_(data['tags'], ['example1', 'example2'])
 
+    def test_tags_queries(self):
+        tag = Tag.objects.create(tag_text='example1')
+        AddonTag.objects.create(tag=tag, addon=self.app)
+        with profiler.profile() as p:
+            self.client.get(self.get_url)
+        for text in ('example2', 'example3'):
+            AddonTag.objects.create(tag=Tag.objects.create(tag_text=text),
+                                    addon=self.app)
+        # More tags shouldn't cost more queries.
+        with self.assertMaxQueries(p.query_count):
+            res = self.client.get(self.get_url)
+        eq_(len(res.json['tags']), 3)
+
     def test_banner_message(self):
         geodata = self.app.geodata
         geodata.banner_regions = [mkt.regions.BR.id, mkt.regions.AR.id]
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection
+from django.http import HttpResponse
+
+import mock
+from nose.tools import eq_, ok_
+from test_utils import RequestFactory
+
+import amo.tests
+from mkt.api import profiler
+from mkt.api.middleware import QueryProfilerMiddleware
+from users.models import UserProfile
+
+
+class TestSignature(amo.tests.TestCase):
+
+    def test_params(self):
+        eq_(profiler.signature("SELECT * FROM users WHERE id = 4 AND "
+                               "email = 'a@b.com'"),
+            'SELECT * FROM users WHERE id = ? AND email = ?')
+
+    def test_in(self):
+        eq_(profiler.signature('SELECT * FROM users WHERE id IN (1, 2, 3)'),
+            profiler.signature('SELECT * FROM users WHERE id IN (4)'))
+
+
+class TestProfile(amo.tests.TestCase):
+
+    def test_queries(self):
+        with profiler.profile() as p:
+            UserProfile.objects.no_cache().filter(pk=1).count()
+            UserProfile.objects.no_cache().filter(pk=2).count()
+        eq_(p.query_count, 2)
+        eq_(p.duplicates().values(), [2])
+
+    def test_nested(self):
+        with profiler.profile() as outer:
+            UserProfile.objects.no_cache().count()
+            with profiler.profile() as inner:
+                UserProfile.objects.no_cache().count()
+        eq_(outer.query_count, 2)
+        eq_(inner.query_count, 1)
+
+    def test_stopped(self):
+        with profiler.profile() as p:
+            pass
+        UserProfile.objects.no_cache().count()
+        eq_(p.query_count, 0)
+
+    @mock.patch.object(profiler, 'MAX_QUERIES', 2)
+    def test_max_queries_kept(self):
+        with profiler.profile() as p:
+            for pk in range(3):
+                UserProfile.objects.no_cache().filter(pk=pk).count()
+        eq_(p.query_count, 3)
+        eq_(len(p.queries), 2)
+        ok_(len(connection.queries) <= 2)
+
+    def test_cache_machine(self):
+        UserProfile.objects.create(username='foo')
+        with profiler.profile() as p:
+            list(UserProfile.objects.filter(username='foo'))
+            list(UserProfile.objects.filter(username='foo'))
+        eq_(p.cache_misses, 1)
+        eq_(p.cache_hits, 1)
+
+    def test_max_queries(self):
+        with self.assertMaxQueries(1):
+            UserProfile.objects.no_cache().count()
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(1):
+                UserProfile.objects.no_cache().count()
+                UserProfile.objects.no_cache().count()
+
+
+class TestQueryProfilerMiddleware(amo.tests.TestCase):
+
+    def setUp(self):
+        self.mware = QueryProfilerMiddleware()
+        self.req = RequestFactory().get('/api/v1/apps/search/')
+        self.req.API = True
+
+    def view(self, request):
+        for pk in range(7):
+            UserProfile.objects.no_cache().filter(pk=pk).count()
+        return HttpResponse()
+
+    def call(self):
+        self.mware.process_request(self.req)
+        self.mware.process_view(self.req, self.view, (), {})
+        return self.mware.process_response(self.req, self.view(self.req))
+
+    @mock.patch('mkt.api.middleware.statsd')
+    def test_statsd(self, statsd):
+        self.call()
+        key = 'profile.api.%s.view' % __name__
+        statsd.timing.assert_any_call('%s.queries' % key, 7)
+        statsd.incr.assert_any_call('%s.duplicates' % key)
+
+    @mock.patch('mkt.api.middleware.log')
+    def test_logs_repeated(self, log):
+        self.call()
+        ok_(log.warning.called)
+
+    @mock.patch.object(settings, 'QUERY_PROFILER_DUPLICATES', 10)
+    @mock.patch('mkt.api.middleware.log')
+    def test_under_threshold(self, log):
+        self.call()
+        ok_(not log.warning.called)
+
+    def test_response_skipped(self):
+        debug = connection.use_debug_cursor
+        self.mware.process_request(self.req)
+        ok_(profiler.active())
+        # An exception in another middleware can skip process_response.
+        request_finished.send(sender=self.__class__)
+        eq_(profiler.active(), [])
+        eq_(connection.use_debug_cursor, debug)
+
+    @mock.patch.object(settings, 'QUERY_PROFILER_SAMPLE', 0)
+    @mock.patch('mkt.api.middleware.statsd')
+    def test_not_sampled(self, statsd):
+        self.call()
+        ok_(not statsd.timing.called)
@@ -26,3 +26,15 @@ def mark_thread_read(thread, user, **kwargs):
         object_list.append(CommunicationNoteRead(note=note, user=user))
 
     CommunicationNoteRead.objects.bulk_create(object_list)
+
+
+@task
+def send_note_emails(subject, context, reply_to, **kwargs):
+    """
+    Send the email for a note to everyone in `reply_to`, a dict of
+    {email: headers}, over one connection.
+    """
+    from mkt.reviewers.utils import send_mail
+    send_mail(subject, 'reviewers/emails/decisions/post.txt', context,
+              reply_to.keys(), perm_setting='app_reviewed',
+              recipient_headers=reply_to)
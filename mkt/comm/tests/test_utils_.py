@@ -1,17 +1,21 @@
 import os.path
 
 from django.conf import settings
+from django.core import mail
 
 import mock
 from nose.tools import eq_
 
 import amo
+from access.models import Group, GroupUser
+from addons.models import AddonUser
 from amo.tests import app_factory, TestCase, user_factory
 from users.models import UserProfile
 
 from mkt.comm.models import CommunicationThread, CommunicationThreadToken
 from mkt.comm.utils import (CommEmailParser, create_comm_note,
-                            save_from_email_reply)
+                            get_recipients, save_from_email_reply,
+                            send_mail_comm)
 from mkt.constants import comm
 from mkt.site.fixtures import fixture
 
@@ -146,3 +150,86 @@ class TestCreateCommNote(TestCase):
             'senior_reviewer': True, 'mozilla_contact': True, 'staff': True}
         for perm, has_perm in expected.items():
             eq_(getattr(thread, 'read_permission_%s' % perm), has_perm, perm)
+
+
+class TestGetRecipients(TestCase):
+
+    def setUp(self):
+        self.create_switch('comm-dashboard')
+        self.app = app_factory()
+        self.developer = user_factory(username='dev')
+        AddonUser.objects.create(addon=self.app, user=self.developer)
+        self.author = user_factory(username='author')
+        self.thread = CommunicationThread.objects.create(
+            addon=self.app, version=self.app.current_version)
+        self.thread.join_thread(self.developer)
+        self.thread.join_thread(self.author)
+
+    def note(self, **kw):
+        kw.setdefault('note_type', comm.NO_ACTION)
+        return self.thread.notes.create(author=self.author, body='hi', **kw)
+
+    def cc(self, count):
+        users = [user_factory() for i in range(count)]
+        for user in users:
+            self.thread.join_thread(user)
+        return users
+
+    def emails(self, recipients):
+        return sorted(email for email, tok in recipients)
+
+    def test_recipients(self):
+        reviewer, = self.cc(1)
+        eq_(self.emails(get_recipients(self.note())),
+            sorted([self.developer.email, reviewer.email]))
+
+    def test_exclude_developer(self):
+        reviewer, = self.cc(1)
+        note = self.note(read_permission_developer=False)
+        eq_(self.emails(get_recipients(note)), [reviewer.email])
+
+    def test_escalation(self):
+        senior = user_factory(username='senior')
+        group = Group.objects.create(name='Senior App Reviewers')
+        GroupUser.objects.create(group=group, user=senior)
+        GroupUser.objects.create(group=group, user=self.author)
+        self.cc(1)
+        note = self.note(note_type=comm.ESCALATION,
+                         read_permission_developer=False)
+        eq_(self.emails(get_recipients(note)), [senior.email])
+
+    def test_tokens(self):
+        reviewer, = self.cc(1)
+        tok = CommunicationThreadToken.objects.create(
+            thread=self.thread, user=self.developer, use_count=5)
+        recipients = dict(get_recipients(self.note()))
+        eq_(recipients[self.developer.email], tok.uuid)
+        eq_(CommunicationThreadToken.objects.get(pk=tok.pk).use_count, 0)
+        new = CommunicationThreadToken.objects.get(thread=self.thread,
+                                                   user=reviewer)
+        eq_(recipients[reviewer.email], new.uuid)
+        eq_(CommunicationThreadToken.objects.count(), 2)
+
+    def test_num_queries(self):
+        # Finding the recipients, finding their tokens, resetting the ones
+        # that exist and creating the others, however many there are.
+        CommunicationThreadToken.objects.create(thread=self.thread,
+                                                user=self.developer)
+        self.cc(2)
+        note = self.note()
+        with self.assertNumQueries(4):
+            eq_(len(get_recipients(note)), 3)
+        self.cc(20)
+        with self.assertNumQueries(4):
+            eq_(len(get_recipients(note)), 23)
+
+    def test_send_mail_comm(self):
+        self.cc(2)
+        send_mail_comm(self.note())
+        eq_(len(mail.outbox), 3)
+        tokens = dict(CommunicationThreadToken.objects.filter(
+            thread=self.thread).values_list('user__email', 'uuid'))
+        for msg in mail.outbox:
+            eq_(msg.extra_headers['Reply-To'],
+                '%s%s@%s' % (comm.REPLY_TO_PREFIX, tokens[msg.to[0]],
+                             settings.POSTFIX_DOMAIN))
@@ -7,8 +7,8 @@ from django.core.files.storage import get_storage_class
 import commonware.log
 import waffle
 from email_reply_parser import EmailReplyParser
+from uuidfield.fields import UUIDField
 
-from access.models import Group
 from users.models import UserProfile
 
 from mkt.comm.models import (CommunicationNote, CommunicationNoteRead,
@@ -101,6 +101,36 @@ def get_reply_token(thread, user_id):
     return tok
 
 
+def get_reply_tokens(thread, user_ids):
+    """
+    Like `get_reply_token` for a bunch of users, in a fixed number of queries.
+    Returns a dict of {user_id: uuid}.
+    """
+    existing = list(CommunicationThreadToken.objects.no_cache().filter(
+        thread=thread, user__in=user_ids))
+    if existing:
+        # Reset `use_count` of the tokens we're handing out again.
+        (CommunicationThreadToken.objects
+         .filter(id__in=[tok.id for tok in existing]).update(use_count=0))
+        CommunicationThreadToken.objects.invalidate(*existing)
+    uuids = dict((tok.user_id, tok.uuid) for tok in existing)
+
+    created = []
+    for user_id in user_ids:
+        if user_id not in uuids:
+            # bulk_create doesn't run the field's pre_save, so set the uuid.
+            tok = CommunicationThreadToken(
+                thread=thread, user_id=user_id,
+                uuid=UUIDField()._create_uuid().hex)
+            created.append(tok)
+            uuids[user_id] = tok.uuid
+            log.info('Created token with UUID %s for user_id: %s.' %
+                     (tok.uuid, user_id))
+    if created:
+        CommunicationThreadToken.objects.bulk_create(created)
+    return uuids
+
+
 def get_recipients(note):
     """
     Determine email recipients based on a new note based on those who are on
@@ -108,38 +138,29 @@ def get_recipients(note):
     Returns reply-to-tokenized emails.
     """
     thread = note.thread
-    recipients = []
 
     # Whitelist: include recipients.
     if note.note_type == comm.ESCALATION:
         # Email only senior reviewers on escalations.
-        seniors = Group.objects.get(name='Senior App Reviewers')
-        recipients = seniors.users.values_list('id', 'email')
+        users = UserProfile.objects.filter(groups__name='Senior App Reviewers')
     else:
         # Get recipients via the CommunicationThreadCC table, which is usually
         # populated with the developer, the Mozilla contact, and anyone that
         # posts to and reviews the app.
-        recipients = set(thread.thread_cc.values_list(
-            'user__id', 'user__email'))
+        users = UserProfile.objects.filter(comm_thread_cc__thread=thread)
 
     # Blacklist: exclude certain people from receiving the email based on
     # permission.
-    excludes = []
     if not note.read_permission_developer:
         # Exclude developer.
-        excludes += thread.addon.authors.values_list('id', 'email')
+        users = users.exclude(addons=thread.addon_id)
     # Exclude note author.
-    excludes.append((note.author.id, note.author.email))
-    # Remove excluded people from the recipients.
-    recipients = [r for r in recipients if r not in excludes]
+    users = users.exclude(id=note.author_id)
+    recipients = dict(users.values_list('id', 'email'))
 
     # Build reply-to-tokenized email addresses.
-    new_recipients_list = []
-    for user_id, user_email in recipients:
-        tok = get_reply_token(note.thread, user_id)
-        new_recipients_list.append((user_email, tok.uuid))
-
-    return new_recipients_list
+    uuids = get_reply_tokens(thread, recipients.keys())
+    return [(email, uuids[user_id]) for user_id, email in recipients.items()]
 
 
 def send_mail_comm(note):
@@ -148,16 +169,16 @@ def send_mail_comm(note):
     Given a note (its actions and permissions), recipients are determined and
     emails are sent to appropriate people.
     """
-    from mkt.reviewers.utils import send_mail
+    from mkt.comm.tasks import send_note_emails
 
     if not waffle.switch_is_active('comm-dashboard'):
         return
 
     recipients = get_recipients(note)
-    name = note.thread.addon.name
+    name = unicode(note.thread.addon.name)
     data = {
         'name': name,
-        'sender': note.author.name,
+        'sender': unicode(note.author.name),
         'comments': note.body,
         'thread_id': str(note.thread.id)
     }
@@ -166,12 +187,15 @@ def send_mail_comm(note):
         comm.ESCALATION: u'Escalated Review Requested: %s' % name,
     }.get(note.note_type, u'Submission Update: %s' % name)
 
+    # Everyone gets the same email but for their own reply-to address.
+    reply_to = dict(
+        (email, {'Reply-To': '{0}{1}@{2}'.format(
+            comm.REPLY_TO_PREFIX, tok, settings.POSTFIX_DOMAIN)})
+        for email, tok in recipients)
+
     log.info(u'Sending emails for %s' % note.thread.addon)
-    for email, tok in recipients:
-        reply_to = '{0}{1}@{2}'.format(comm.REPLY_TO_PREFIX, tok,
-                                       settings.POSTFIX_DOMAIN)
-        send_mail(subject, 'reviewers/emails/decisions/post.txt', data,
-                  [email], perm_setting='app_reviewed', reply_to=reply_to)
+    if reply_to:
+        send_note_emails.delay(subject, data, reply_to)
 
 
 def create_comm_note(app, version, author, body, note_type=comm.NO_ACTION,
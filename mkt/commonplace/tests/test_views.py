@@ -1,8 +1,13 @@
+import datetime
+
+from django.conf import settings
+
 import mock
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 import amo.tests
 from amo.utils import reverse
+from mkt.commonplace.views import artefacts, get_build_id, get_imgurls
 
 
 class TestCommonplace(amo.tests.TestCase):
@@ -45,3 +50,79 @@ class TestAppcacheManifest(amo.tests.TestCase):
         assert '# BUILD_ID p00p' in res.content
         img = img.replace('/media/', '/media/fireplace/')
         assert img + '\n' in res.content
+
+
+@mock.patch('mkt.commonplace.views.storage')
+class TestBuildArtefacts(amo.tests.TestCase):
+
+    def setUp(self):
+        artefacts.reload()
+
+    def tearDown(self):
+        artefacts.reload()
+
+    def setup_storage(self, storage, content='abc'):
+        storage.modified_time.return_value = datetime.datetime(2014, 1, 1)
+        storage.open.return_value = mock.MagicMock()
+        fh = storage.open.return_value.__enter__.return_value
+        fh.read.return_value = content
+        fh.readlines.return_value = [content]
+        return fh
+
+    def test_build_id_cached(self, storage):
+        self.setup_storage(storage)
+        eq_(get_build_id('fireplace'), 'abc')
+        eq_(get_build_id('fireplace'), 'abc')
+        eq_(storage.open.call_count, 1)
+
+    @mock.patch('mkt.commonplace.views.importlib.import_module')
+    def test_build_module_cached(self, import_module, storage):
+        self.setup_storage(storage)
+        import_module.side_effect = ImportError
+        eq_(get_build_id('fireplace'), 'abc')
+        eq_(get_build_id('fireplace'), 'abc')
+        eq_(import_module.call_count, 1)
+
+    @mock.patch.object(settings, 'COMMONPLACE_BUILD_CHECK_INTERVAL', 0)
+    @mock.patch('mkt.commonplace.views.reload', create=True)
+    @mock.patch('mkt.commonplace.views.os.path.getmtime')
+    @mock.patch('mkt.commonplace.views.importlib.import_module')
+    def test_build_module_changed(self, import_module, getmtime, reload_,
+                                  storage):
+        import_module.return_value = mock.Mock(BUILD_ID='abc',
+                                               __file__='build_fireplace.pyc')
+        getmtime.return_value = 1
+        eq_(get_build_id('fireplace'), 'abc')
+        eq_(get_build_id('fireplace'), 'abc')
+        ok_(not reload_.called)
+
+        # A deploy wrote a new build_fireplace.py.
+        getmtime.return_value = 2
+        reload_.return_value = mock.Mock(BUILD_ID='def')
+        eq_(get_build_id('fireplace'), 'def')
+        getmtime.assert_called_with('build_fireplace.py')
+
+    def test_imgurls_cached(self, storage):
+        self.setup_storage(storage)
+        eq_(get_imgurls('fireplace'), ['abc'])
+        eq_(get_imgurls('fireplace'), ['abc'])
+        eq_(storage.open.call_count, 1)
+
+    @mock.patch.object(settings, 'COMMONPLACE_BUILD_CHECK_INTERVAL', 0)
+    def test_mtime_changed(self, storage):
+        fh = self.setup_storage(storage)
+        eq_(get_build_id('fireplace'), 'abc')
+        eq_(get_build_id('fireplace'), 'abc')
+        eq_(storage.open.call_count, 1)
+
+        storage.modified_time.return_value = datetime.datetime(2014, 1, 2)
+        fh.read.return_value = 'def'
+        eq_(get_build_id('fireplace'), 'def')
+        eq_(storage.open.call_count, 2)
+
+    def test_reload(self, storage):
+        fh = self.setup_storage(storage)
+        eq_(get_build_id('fireplace'), 'abc')
+        fh.read.return_value = 'def'
+        artefacts.reload()
+        eq_(get_build_id('fireplace'), 'def')
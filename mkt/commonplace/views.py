@@ -1,6 +1,8 @@
 import datetime
 import importlib
 import os
+import threading
+import time
 from urlparse import urlparse
 
 from django.conf import settings
@@ -14,36 +16,117 @@ import jinja2
 from cache_nuggets.lib import memoize
 
 
-def get_build_id(repo):
+class BuildArtefacts(object):
+    """
+    A per-process cache of the files Commonplace repos write on deploy.
+
+    The shell is served for every Fireplace page load so we don't want to go
+    to storage each time. Values are kept until the file's mtime changes,
+    which is checked at most every `COMMONPLACE_BUILD_CHECK_INTERVAL`
+    seconds, and the same goes for each repo's `build_{repo}.py`. So a deploy
+    is picked up without restarting. Call `reload()` to drop everything
+    straight away.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.modules = {}
+        self.lock = threading.Lock()
+
+    def module_build_id(self, repo):
+        """
+        The `BUILD_ID` of `build_{repo}.py`, or None. The module is imported
+        again when its file changes, and a missing one is looked for again,
+        at most every `COMMONPLACE_BUILD_CHECK_INTERVAL` seconds.
+        """
+        now = time.time()
+        entry = self.modules.get(repo)
+        if (entry and
+            now - entry['checked'] < settings.COMMONPLACE_BUILD_CHECK_INTERVAL):
+            return entry['value']
+
+        with self.lock:
+            value, mtime = None, None
+            try:
+                # This is where the `build_{repo}.py` files get written to
+                # after compiling and minifying our assets.
+                module = importlib.import_module('build_%s' % repo)
+                mtime = os.path.getmtime(
+                    os.path.splitext(module.__file__)[0] + '.py')
+                if entry and entry['mtime'] not in (None, mtime):
+                    module = reload(module)
+                value = module.BUILD_ID
+            except (ImportError, AttributeError, OSError):
+                pass
+            self.modules[repo] = {'value': value, 'mtime': mtime,
+                                  'checked': now}
+            return value
+
+    def get(self, path, loader):
+        now = time.time()
+        entry = self.data.get(path)
+        if (entry and
+            now - entry['checked'] < settings.COMMONPLACE_BUILD_CHECK_INTERVAL):
+            return entry['value']
+
+        try:
+            mtime = storage.modified_time(path)
+        except (OSError, NotImplementedError):
+            mtime = None
+
+        with self.lock:
+            if entry and entry['mtime'] == mtime:
+                entry['checked'] = now
+                return entry['value']
+            value = loader(path)
+            self.data[path] = {'value': value, 'mtime': mtime,
+                               'checked': now}
+            return value
+
+    def reload(self):
+        with self.lock:
+            self.data.clear()
+            self.modules.clear()
+
+
+artefacts = BuildArtefacts()
+
+
+def _read_build_id(build_id_fn):
     try:
-        # This is where the `build_{repo}.py` files get written to after
-        # compiling and minifying our assets.
-        # Get the `BUILD_ID` from `build_{repo}.py` and use that to
-        # cache-bust the assets for this repo's CSS/JS minified bundles.
-        module = 'build_%s' % repo
-        return importlib.import_module(module).BUILD_ID
-    except (ImportError, AttributeError):
+        with storage.open(build_id_fn) as fh:
+            return fh.read()
+    except:
+        # Either `build_{repo}.py` does not exist or `build_{repo}.py`
+        # exists but does not contain `BUILD_ID`. Fall back to
+        # `BUILD_ID_JS` which is written to `build.py` by jingo-minify.
         try:
-            build_id_fn = os.path.join(settings.MEDIA_ROOT, repo, 'build_id.txt')
-            with storage.open(build_id_fn) as fh:
-                return fh.read()
-        except:
-            # Either `build_{repo}.py` does not exist or `build_{repo}.py`
-            # exists but does not contain `BUILD_ID`. Fall back to
-            # `BUILD_ID_JS` which is written to `build.py` by jingo-minify.
-            try:
-                from build import BUILD_ID_CSS
-                return BUILD_ID_CSS
-            except ImportError:
-                return 'dev'
+            from build import BUILD_ID_CSS
+            return BUILD_ID_CSS
+        except ImportError:
+            return 'dev'
 
 
-def get_imgurls(repo):
-    imgurls_fn = os.path.join(settings.MEDIA_ROOT, repo, 'imgurls.txt')
+def _read_imgurls(imgurls_fn):
     with storage.open(imgurls_fn) as fh:
         return fh.readlines()
 
 
+def get_build_id(repo):
+    # Get the `BUILD_ID` from `build_{repo}.py` and use that to cache-bust
+    # the assets for this repo's CSS/JS minified bundles.
+    build_id = artefacts.module_build_id(repo)
+    if build_id is None:
+        build_id_fn = os.path.join(settings.MEDIA_ROOT, repo, 'build_id.txt')
+        build_id = artefacts.get(build_id_fn, _read_build_id)
+    return build_id
+
+
+def get_imgurls(repo):
+    imgurls_fn = os.path.join(settings.MEDIA_ROOT, repo, 'imgurls.txt')
+    return artefacts.get(imgurls_fn, _read_imgurls)
+
+
 def commonplace(request, repo, **kwargs):
     if repo not in settings.COMMONPLACE_REPOS:
         return HttpResponseNotFound
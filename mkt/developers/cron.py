@@ -1,6 +1,8 @@
 import datetime
 import logging
 
+from django.core.cache import cache
+
 import cronjobs
 from celery.task.sets import TaskSet
 from tower import ugettext as _
@@ -10,10 +12,13 @@ from amo.utils import chunked
 from editors.models import RereviewQueue
 
 import lib.iarc
-
 from lib.iarc.utils import DESC_MAPPING, RATINGS_MAPPING
+
+import mkt
 from mkt.developers.tasks import region_email, region_exclude
-from mkt.webapps.models import AddonExcludedRegion, Webapp
+from mkt.webapps.models import (AddonExcludedRegion, ContentRating, IARCInfo,
+                                RatingDescriptors, Webapp)
+from mkt.webapps.tasks import index_webapps
 
 
 log = logging.getLogger('z.mkt.developers.cron')
@@ -78,15 +83,42 @@ def process_iarc_changes(date=None):
     resp = client.Get_Rating_Changes(XMLString=xml)
     data = lib.iarc.utils.IARC_XML_Parser().parse_string(resp)
 
+    rows = []
     for row in data.get('rows', []):
-        iarc_id = row.get('submission_id')
-        if not iarc_id:
+        if not row.get('submission_id'):
             log.debug('IARC changes contained no submission ID: %s' % row)
             continue
+        rows.append(row)
+
+    for chunk in chunked(rows, 100):
+        _process_iarc_changes(chunk)
+
 
-        try:
-            app = Webapp.objects.get(iarc_info__submission_id=iarc_id)
-        except Webapp.DoesNotExist:
+def _process_iarc_changes(rows):
+    """
+    Saves a chunk of rating changes. The apps, their current ratings and
+    their descriptors are read and written for the whole chunk at once.
+    """
+    # Cached Get_App_Info responses would have the old ratings.
+    cache.delete_many([
+        lib.iarc.utils.app_info_cache_key(row['submission_id'],
+                                          row.get('security_code'))
+        for row in rows])
+
+    app_ids = dict(IARCInfo.objects.filter(
+        submission_id__in=[row['submission_id'] for row in rows])
+        .values_list('submission_id', 'addon'))
+    apps = dict((app.id, app) for app in
+                Webapp.objects.no_cache().filter(id__in=app_ids.values()))
+    old_ratings = dict(((cr.addon_id, cr.ratings_body), cr) for cr in
+                       ContentRating.objects.no_cache()
+                       .filter(addon__in=apps.keys()))
+
+    descriptors = {}
+    for row in rows:
+        iarc_id = row['submission_id']
+        app = apps.get(app_ids.get(iarc_id))
+        if not app:
             log.debug('Could not find app associated with IARC submission ID: '
                       '%s' % iarc_id)
             continue
@@ -96,17 +128,23 @@ def process_iarc_changes(date=None):
             ratings_body = row.get('rating_system')
             rating = RATINGS_MAPPING[ratings_body].get(row['new_rating'])
 
-            _flag_rereview_adult(app, ratings_body, rating)
+            old_rating = old_ratings.get((app.id, ratings_body.id))
+            if old_rating:
+                _flag_rereview_adult(app, ratings_body, rating,
+                                     old_rating=old_rating)
 
-            # Save new rating.
-            app.set_content_ratings({ratings_body: rating})
+            # Save new rating, the apps are reindexed once at the end.
+            app.set_content_ratings({ratings_body: rating}, index=False)
+            old_ratings[(app.id, ratings_body.id)] = ContentRating(
+                addon_id=app.id, ratings_body=ratings_body.id,
+                rating=rating.id)
 
             # Process 'new_descriptors'.
             native_descs = filter(None, [
                 s.strip() for s in row.get('new_descriptors', '').split(',')])
-            descriptors = filter(None, [DESC_MAPPING[ratings_body].get(desc)
-                                        for desc in native_descs])
-            app.set_descriptors(descriptors)
+            descriptors[app.id] = filter(
+                None, [DESC_MAPPING[ratings_body].get(desc)
+                       for desc in native_descs])
 
             # Log change reason.
             reason = row.get('change_reason')
@@ -119,14 +157,49 @@ def process_iarc_changes(date=None):
             log.debug('Exception: %s' % e)
             continue
 
+    _set_descriptors(descriptors)
+    if descriptors:
+        index_webapps.delay(descriptors.keys())
+
 
-def _flag_rereview_adult(app, ratings_body, rating):
+def _set_descriptors(descriptors):
+    """
+    Like `Webapp.set_descriptors` for a dict of {app id: descriptors}, with
+    one update for each distinct set of descriptors.
+    """
+    existing = dict((rd.addon_id, rd) for rd in
+                    RatingDescriptors.objects.no_cache()
+                    .filter(addon__in=descriptors.keys()))
+
+    updates, created = {}, []
+    for app_id, descs in descriptors.items():
+        fields = {}
+        for desc in mkt.ratingdescriptors.RATING_DESCS.keys():
+            has_desc_attr = 'has_%s' % desc.lower()
+            fields[has_desc_attr] = has_desc_attr in descs
+        if app_id in existing:
+            key = tuple(sorted(fields.items()))
+            updates.setdefault(key, []).append(existing[app_id])
+        else:
+            created.append(RatingDescriptors(addon_id=app_id, **fields))
+
+    for key, rds in updates.items():
+        (RatingDescriptors.objects.filter(id__in=[rd.id for rd in rds])
+         .update(**dict(key)))
+        RatingDescriptors.objects.invalidate(*rds)
+    if created:
+        RatingDescriptors.objects.bulk_create(created)
+
+
+def _flag_rereview_adult(app, ratings_body, rating, old_rating=None):
     """Flag app for rereview if it receives an Adult content rating."""
-    old_rating = app.content_ratings.filter(ratings_body=ratings_body.id)
-    if not old_rating.exists():
-        return
+    if old_rating is None:
+        old_rating = app.content_ratings.filter(ratings_body=ratings_body.id)
+        if not old_rating.exists():
+            return
+        old_rating = old_rating[0]
 
-    if rating.adult and not old_rating[0].get_rating().adult:
+    if rating.adult and not old_rating.get_rating().adult:
         RereviewQueue.flag(
             app, amo.LOG.CONTENT_RATING_TO_ADULT,
             message=_('Content rating changed to Adult.'))
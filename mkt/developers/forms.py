@@ -1055,17 +1055,8 @@ class IARCGetAppInfoForm(happyforms.Form):
         iarc_id = self.cleaned_data['submission_id']
         iarc_code = self.cleaned_data['security_code']
 
-        # Generate XML.
-        xml = lib.iarc.utils.render_xml(
-            'get_app_info.xml',
-            {'submission_id': iarc_id, 'security_code': iarc_code})
-
         # Process that shizzle.
-        client = lib.iarc.client.get_iarc_client('services')
-        resp = client.Get_App_Info(XMLString=xml)
-
-        # Handle response.
-        data = lib.iarc.utils.IARC_XML_Parser().parse_string(resp)
+        data = lib.iarc.utils.get_app_info(iarc_id, iarc_code)
 
         if data.get('rows'):
             row = data['rows'][0]
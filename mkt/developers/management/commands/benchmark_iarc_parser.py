@@ -0,0 +1,76 @@
+"""
+Measures how fast IARC responses are parsed, on a Get_Rating_Changes
+response made from the mock client's canned rows.
+
+    ./manage.py benchmark_iarc_parser --rows=5000 --runs=10
+
+`etree` is only the XML parsing, the floor for `parser`, which is the whole
+of `IARC_XML_Parser.parse_string`.
+"""
+import json
+import re
+import StringIO
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.compat import etree
+
+from lib.iarc.client import MOCK_GET_RATING_CHANGES
+from lib.iarc.utils import IARC_XML_Parser
+
+
+def rating_changes(count):
+    """A Get_Rating_Changes response with `count` rows."""
+    rows = re.findall(r'<ROW>.*?</ROW>', MOCK_GET_RATING_CHANGES, re.S)
+    head, tail = MOCK_GET_RATING_CHANGES.split(rows[0], 1)
+    tail = tail.split(rows[-1], 1)[1]
+    body = [rows[i % len(rows)] for i in range(count)]
+    return head + '\n  '.join(body) + tail
+
+
+class Command(BaseCommand):
+    help = 'Measure the throughput of the IARC XML parser.'
+    option_list = BaseCommand.option_list + (
+        make_option('--rows', action='store', type='int', default=5000,
+                    help='Number of rows in the response.'),
+        make_option('--runs', action='store', type='int', default=10,
+                    help='Number of times the response is parsed.'),
+        make_option('--output', action='store',
+                    help='Write the JSON results here instead of stdout.'),
+    )
+
+    def handle(self, *args, **kw):
+        xml = rating_changes(kw['rows'])
+        utf8 = xml.replace('encoding="utf-16"', 'encoding="utf-8"')
+
+        def parse_etree():
+            parser = etree.DefusedXMLParser(encoding='utf-8')
+            etree.parse(StringIO.StringIO(utf8), parser=parser,
+                        forbid_dtd=True)
+
+        def parse():
+            data = IARC_XML_Parser().parse_string(xml)
+            assert len(data['rows']) == kw['rows']
+
+        results = {}
+        for name, func in (('etree', parse_etree), ('parser', parse)):
+            start = time.time()
+            for x in range(kw['runs']):
+                func()
+            took = time.time() - start
+            rows = kw['rows'] * kw['runs']
+            results[name] = {'seconds': round(took, 3),
+                             'rows_per_second': int(rows / took),
+                             'us_per_row': round(took * 1e6 / rows, 1)}
+
+        output = json.dumps({'rows': kw['rows'],
+                             'runs': kw['runs'],
+                             'bytes': len(xml),
+                             'results': results}, indent=2, sort_keys=True)
+        if kw['output']:
+            with open(kw['output'], 'w') as fh:
+                fh.write(output)
+        else:
+            self.stdout.write(output + '\n')
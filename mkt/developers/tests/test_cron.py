@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 import datetime
+
+from django.core.cache import cache
+
 import mock
 from nose.tools import eq_
 
 import amo.tests
 from devhub.models import ActivityLog
+from lib.iarc.utils import app_info_cache_key
 
 import mkt
 import mkt.constants
@@ -112,6 +116,38 @@ class TestIARCChangesCron(amo.tests.TestCase):
              'has_classind_drugs', 'has_classind_lang', 'has_classind_nudity',
              'has_classind_violence_extreme'])
 
+    @mock.patch('mkt.developers.cron.index_webapps')
+    def test_processing_batch(self, index_webapps):
+        amo.set_user(amo.tests.user_factory())
+        app = amo.tests.app_factory()
+        IARCInfo.objects.create(addon=app, submission_id=52,
+                                security_code='FZ32CU8')
+        other = amo.tests.app_factory()
+        IARCInfo.objects.create(addon=other, submission_id=68,
+                                security_code='GZ32CU8')
+        other.set_descriptors(['has_usk_lang'])
+
+        process_iarc_changes()
+
+        eq_(other.reload().content_ratings.get(
+            ratings_body=mkt.ratingsbodies.USK.id).rating,
+            mkt.ratingsbodies.USK_12.id)
+        eq_(other.rating_descriptors.to_keys(), ['has_usk_violence'])
+        eq_(app.reload().content_ratings.get(
+            ratings_body=mkt.ratingsbodies.CLASSIND.id).rating,
+            mkt.ratingsbodies.CLASSIND_18.id)
+        assert app.rating_descriptors.has_classind_nudity
+        # Both apps are reindexed together.
+        eq_(index_webapps.delay.call_count, 1)
+        eq_(sorted(index_webapps.delay.call_args[0][0]),
+            sorted([app.id, other.id]))
+
+    def test_clears_app_info_cache(self):
+        key = app_info_cache_key(52, 'FZ32CU8')
+        cache.set(key, {'rows': []})
+        process_iarc_changes()
+        eq_(cache.get(key), None)
+
     def test_rereview_flag_adult(self):
         amo.set_user(amo.tests.user_factory())
         app = amo.tests.app_factory()
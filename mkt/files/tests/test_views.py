@@ -16,6 +16,7 @@ from pyquery import PyQuery as pq
 import amo
 import amo.tests
 from amo.urlresolvers import reverse
+from files.archive import evict
 from files.helpers import FileViewer, DiffHelper
 from files.models import File
 from mkt.webapps.models import Webapp
@@ -65,7 +66,8 @@ class FilesBase(object):
         self.create_switch(name='delay-file-viewer')
 
     def tearDown(self):
-        self.file_viewer.cleanup()
+        # Packages are shared, so cleanup() leaves them to evict().
+        evict(0)
 
     def files_redirect(self, file):
         return reverse('mkt.files.redirect', args=[self.file.pk, file])
@@ -351,7 +353,8 @@ class TestFileViewer(FilesBase, amo.tests.WebappTestCase):
         self.add_file('file.php', '<script>alert("foo")</script>')
         res = self.client.get(self.file_url('file.php'))
         eq_(res.status_code, 200)
-        assert self.file_viewer.get_files()['file.php']['md5'] in res.content
+        self.file_viewer.select('file.php')
+        assert self.file_viewer.selected['md5'] in res.content
 
     def test_tree_no_file(self):
         self.file_viewer.extract()
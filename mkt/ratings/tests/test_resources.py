@@ -17,6 +17,7 @@ from reviews.models import Review, ReviewFlag
 from users.models import UserProfile
 
 import mkt.regions
+from mkt.api import profiler
 from mkt.api.tests.test_oauth import RestOAuth
 from mkt.site.fixtures import fixture
 from mkt.webapps.models import AddonExcludedRegion, Webapp
@@ -621,6 +622,20 @@ class TestRatingResourcePagination(RestOAuth, amo.tests.AMOPaths):
         eq_(data['meta']['offset'], 2)
         eq_(data['meta']['next'], None)
 
+    def test_queries(self):
+        version = self.app.current_version
+        Review.objects.create(addon=self.app, user=self.user, version=version,
+                              body=u'I häte this app', rating=0)
+        with profiler.profile() as p:
+            self.client.get(self.url)
+        for user in (self.user2, self.user3):
+            Review.objects.create(addon=self.app, user=user, version=version,
+                                  body=u'Blurp.', rating=3)
+        # More ratings shouldn't cost more queries.
+        with self.assertMaxQueries(p.query_count):
+            res = self.client.get(self.url)
+        eq_(len(res.json['objects']), 3)
+
     def test_total_count(self):
         self.app.update(total_reviews=10)
         res = self.client.get(self.url)
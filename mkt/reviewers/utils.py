@@ -30,7 +30,7 @@ log = commonware.log.getLogger('z.mailer')
 
 
 def send_mail(subject, template, context, emails, perm_setting=None, cc=None,
-              attachments=None, reply_to=None):
+              attachments=None, reply_to=None, recipient_headers=None):
     if not reply_to:
         reply_to = settings.MKT_REVIEWERS_EMAIL
 
@@ -40,7 +40,8 @@ def send_mail(subject, template, context, emails, perm_setting=None, cc=None,
                     from_email=settings.MKT_REVIEWERS_EMAIL,
                     use_blacklist=False, perm_setting=perm_setting,
                     manage_url=manage_url, headers={'Reply-To': reply_to},
-                    cc=cc, attachments=attachments)
+                    cc=cc, attachments=attachments,
+                    recipient_headers=recipient_headers)
 
 
 class ReviewBase(object):
@@ -1,5 +1,6 @@
 import json
 
+import waffle
 from rest_framework.permissions import AllowAny
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
@@ -25,7 +26,8 @@ from mkt.features.utils import get_feature_profile
 from mkt.search.views import _filter_search
 from mkt.search.forms import ApiSearchForm
 from mkt.search.serializers import ESAppSerializer, SuggestionsESAppSerializer
-from mkt.webapps.models import Webapp
+from mkt.search.utils import CachedSearch, search_cache_key
+from mkt.webapps.models import Webapp, WebappIndexer
 
 
 class SearchView(CORSMixin, MarketplaceView, GenericAPIView):
@@ -75,15 +77,50 @@ class SearchView(CORSMixin, MarketplaceView, GenericAPIView):
         form_data = self.get_search_data(request)
         query = form_data.get('q', '')
         base_filters = {'type': form_data['type']}
+        region = self.get_region(request)
 
         qs = self.get_query(request, base_filters=base_filters,
-                            region=self.get_region(request))
+                            region=region)
         profile = get_feature_profile(request)
         qs = self.apply_filters(request, qs, data=form_data,
                                 profile=profile)
-        page = self.paginate_queryset(qs.values_dict())
+        qs = qs.values_dict()
+        key = self.get_cache_key(request, form_data, region, profile)
+        if key:
+            qs = CachedSearch(qs, key, WebappIndexer)
+        page = self.paginate_queryset(qs)
         return self.get_pagination_serializer(page), query
 
+    def get_cache_key(self, request, form_data, region, profile):
+        """
+        The key the results of this search are cached under, or None if they
+        aren't. Only searches without a free text query are cached, those
+        are the few filter combinations most of the traffic asks for.
+        """
+        if form_data.get('q'):
+            return None
+
+        filters = {}
+        for name, value in form_data.items():
+            if name == 'limit' or value in (None, '', []):
+                continue
+            if name in ('app_type', 'premium_types'):
+                value = sorted(set(value))
+            elif name == 'languages':
+                value = sorted(set(lang.strip() for lang in value.split(',')))
+            filters[name] = value
+
+        return search_cache_key({
+            'filters': filters,
+            'region': region.id if region else None,
+            'profile': profile.to_signature() if profile else None,
+            'gaia': request.GAIA,
+            'mobile': request.MOBILE,
+            'tablet': request.TABLET,
+            'override-region-exclusion': waffle.flag_is_active(
+                request, 'override-region-exclusion'),
+        })
+
     def get(self, request, *args, **kwargs):
         serializer, _ = self.search(request)
         return Response(serializer.data)
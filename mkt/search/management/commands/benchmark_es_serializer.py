@@ -0,0 +1,117 @@
+"""
+Measures how long search results take to serialize per hit, through fake apps
+built from the ES data against the compiled serializer.
+
+    ./manage.py benchmark_es_serializer --apps=25 --runs=200
+
+The apps are seeded in a throwaway test database and their ES documents built
+in memory, so no ES is needed and the numbers only cover the serializers.
+"""
+import copy
+import json
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+import amo
+import amo.tests
+import mkt
+from mkt.search.serializers import ESAppSerializer
+from mkt.webapps.models import WebappIndexer
+
+
+class Hit(object):
+    """Looks enough like an ES result for the serializers."""
+
+    def __init__(self, source):
+        self._source = source
+
+
+def request(lang=None):
+    request = RequestFactory().get('/', {'lang': lang} if lang else {})
+    request.REGION = mkt.regions.US
+    request.amo_user = None
+    return request
+
+
+class Benchmark(object):
+
+    def __init__(self, apps=25, runs=200):
+        self.num_apps = apps
+        self.runs = runs
+
+    def seed(self):
+        apps = [amo.tests.app_factory(complete=True, rated=True)
+                for x in range(self.num_apps)]
+        self.docs = [WebappIndexer.extract_document(app.pk, app)
+                     for app in apps]
+
+    def measure(self, lang=None):
+        results = {}
+        for name in ('fake_app', 'compiled'):
+            serializer = ESAppSerializer(context={'request': request(lang)})
+            if name == 'fake_app':
+                serialize = serializer.to_native_from_app
+            else:
+                serialize = lambda hit: serializer.compiled(hit._source)
+            took = 0
+            for x in range(self.runs):
+                # The fake app path changes the documents it's given.
+                hits = [Hit(copy.deepcopy(doc)) for doc in self.docs]
+                start = time.time()
+                for hit in hits:
+                    serialize(hit)
+                took += time.time() - start
+            hits = self.runs * len(self.docs)
+            results[name] = {'hits': hits,
+                             'seconds': round(took, 3),
+                             'us_per_hit': round(took * 1e6 / hits, 1)}
+        return results
+
+    def run(self):
+        self.seed()
+        return {'all_languages': self.measure(),
+                'lang': self.measure('en-US')}
+
+
+class Command(BaseCommand):
+    help = 'Measure the cost per hit of serializing search results.'
+    option_list = BaseCommand.option_list + (
+        make_option('--apps', action='store', type='int', default=25,
+                    help='Number of apps to seed, one page of results.'),
+        make_option('--runs', action='store', type='int', default=200,
+                    help='Number of times each page is serialized.'),
+        make_option('--output', action='store',
+                    help='Write the JSON results here instead of stdout.'),
+    )
+
+    def handle(self, *args, **kw):
+        import settings_test
+        overrides = dict((k, getattr(settings_test, k))
+                         for k in dir(settings_test) if k.isupper())
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        with override_settings(**overrides):
+            connection.creation.create_test_db(verbosity=0)
+            amo.tests.start_es_mock()
+            try:
+                results = Benchmark(apps=kw['apps'], runs=kw['runs']).run()
+            finally:
+                amo.tests.stop_es_mock()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+        output = json.dumps({'apps': kw['apps'],
+                             'runs': kw['runs'],
+                             'results': results}, indent=2, sort_keys=True)
+        if kw['output']:
+            with open(kw['output'], 'w') as fh:
+                fh.write(output)
+        else:
+            self.stdout.write(output + '\n')
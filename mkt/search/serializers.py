@@ -1,3 +1,8 @@
+import time
+
+from django.conf import settings
+from django.utils.encoding import iri_to_uri
+
 from rest_framework import serializers
 
 import amo
@@ -15,7 +20,8 @@ from mkt.webapps.models import Geodata, Webapp
 from mkt.webapps.utils import (
     dehydrate_content_ratings, dehydrate_descriptors, dehydrate_interactives,
     filter_content_ratings_by_region)
-from mkt.webapps.api import AppSerializer, SimpleAppSerializer
+from mkt.webapps.api import (AppSerializer, RegionSerializer,
+                             SimpleAppSerializer)
 
 
 class ESAppSerializer(AppSerializer):
@@ -80,7 +86,27 @@ class ESAppSerializer(AppSerializer):
         # object list.
         return [self.to_native(item) for item in obj.object_list]
 
+    @property
+    def compiled(self):
+        """
+        The CompiledESAppSerializer for this serializer's request, or None if
+        it can't produce every field we have.
+        """
+        if not hasattr(self, '_compiled'):
+            self._compiled = None
+            if CompiledESAppSerializer.supports(self):
+                self._compiled = CompiledESAppSerializer(self)
+        return self._compiled
+
     def to_native(self, obj):
+        if self.compiled:
+            data = self.compiled(obj._source)
+            if data is not None:
+                return data
+        return self.to_native_from_app(obj)
+
+    def to_native_from_app(self, obj):
+        """Serialize `obj` through a fake app built from its ES data."""
         request = self.context['request']
 
         if request and request.method == 'GET' and 'lang' in request.GET:
@@ -199,3 +225,296 @@ class SimpleESAppSerializer(ESAppSerializer):
 class SuggestionsESAppSerializer(ESAppSerializer):
     class Meta(ESAppSerializer.Meta):
         fields = ['name', 'description', 'absolute_url', 'icons']
+
+
+class CompiledESAppSerializer(object):
+    """
+    Turns the `_source` of an ES hit straight into the dict ESAppSerializer
+    would give for it, without building a fake app first.
+
+    Everything that only depends on the request (the language, the region,
+    the serialized regions and the URL prefixes) is worked out once when it's
+    created, so each hit only costs a few dict lookups per field. Hits that
+    need the database, premium or deleted apps, give None and are left to
+    the serializer.
+    """
+    # Stands in for the pk or slug when building URLs once per request.
+    PLACEHOLDER = 1234567890
+
+    # Fields we know how to serialize without the database.
+    FIELDS = ('absolute_url', 'app_type', 'author', 'banner_message',
+              'banner_regions', 'categories', 'content_ratings', 'created',
+              'current_version', 'default_locale', 'description',
+              'device_types', 'homepage', 'icons', 'id', 'is_offline',
+              'is_packaged', 'manifest_url', 'name', 'payment_account',
+              'payment_required', 'premium_type', 'previews', 'price',
+              'price_locale', 'privacy_policy', 'public_stats', 'ratings',
+              'regions', 'release_notes', 'resource_uri', 'reviewed', 'slug',
+              'status', 'support_email', 'support_url', 'supported_locales',
+              'upsell', 'user', 'versions', 'weekly_downloads')
+
+    @classmethod
+    def supports(cls, serializer):
+        request = serializer.context.get('request')
+        if not request or not set(serializer.fields).issubset(cls.FIELDS):
+            return False
+        # The user field needs to look at what the user owns and bought.
+        return not ('user' in serializer.fields and
+                    getattr(request, 'amo_user', None))
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.request = serializer.context['request']
+        self.lang = None
+        if self.request.method == 'GET' and 'lang' in self.request.GET:
+            self.lang = self.request.GET['lang']
+        self.getters = [(name, getattr(self, 'compile_%s' % name)())
+                        for name in serializer.fields]
+
+    def __call__(self, data):
+        if (data.get('premium_type') in amo.ADDON_PREMIUMS or
+                data.get('status') == amo.STATUS_DELETED):
+            return None
+        return dict((name, get(data)) for name, get in self.getters)
+
+    def url_template(self, url):
+        """Split `url`, built for PLACEHOLDER, around the placeholder."""
+        prefix, suffix = url.split(str(self.PLACEHOLDER), 1)
+        return lambda value: u'%s%s%s' % (prefix, value, suffix)
+
+    def field_url(self, name):
+        """The URL the `name` field gives, as a template."""
+        field = self.serializer.fields[name]
+        field.initialize(parent=self.serializer, field_name=name)
+        return self.url_template(
+            field.field_to_native(Webapp(id=self.PLACEHOLDER), name))
+
+    def get(self, key, default=None):
+        return lambda data: data.get(key, default)
+
+    def constant(self, value):
+        return lambda data: value
+
+    def translations(self, name):
+        key = '%s_translations' % name
+        lang = self.lang
+
+        def get(data):
+            translations = dict((t.get('lang', ''), t.get('string', ''))
+                                for t in data.get(key) or {})
+            if lang is None:
+                return translations or None
+            return (translations.get(lang) or
+                    translations.get(data.get('default_locale')) or
+                    translations.get(settings.LANGUAGE_CODE) or None)
+        return get
+
+    def compile_absolute_url(self):
+        url = self.url_template(absolutify(
+            Webapp(app_slug=str(self.PLACEHOLDER)).get_absolute_url()))
+        return lambda data: url(iri_to_uri(data['app_slug']))
+
+    def compile_app_type(self):
+        return lambda data: amo.ADDON_WEBAPP_TYPES[data['app_type']]
+
+    def compile_author(self):
+        return self.get('author')
+
+    def compile_banner_message(self):
+        return self.translations('banner_message')
+
+    def compile_banner_regions(self):
+        # Search results never had the banner regions.
+        return lambda data: []
+
+    def compile_categories(self):
+        return lambda data: list(data['category'])
+
+    def compile_content_ratings(self):
+        region = self.request.REGION.slug
+        bodies = mkt.regions.REGION_TO_RATINGS_BODY()
+
+        def get(data):
+            # Copy the ratings, dehydrating them changes them in place.
+            ratings = data.get('content_ratings', {})
+            return filter_content_ratings_by_region({
+                'ratings': dehydrate_content_ratings(
+                    dict(ratings) if ratings else ratings),
+                'descriptors': dehydrate_descriptors(
+                    data.get('content_descriptors', {})),
+                'interactive_elements': dehydrate_interactives(
+                    data.get('interactive_elements', [])),
+                'regions': bodies
+            }, region=region)
+        return get
+
+    def compile_created(self):
+        return self.get('created')
+
+    def compile_current_version(self):
+        return self.get('current_version')
+
+    def compile_default_locale(self):
+        return self.get('default_locale')
+
+    def compile_description(self):
+        return self.translations('description')
+
+    def compile_device_types(self):
+        names = dict((k, v.api_name) for k, v in DEVICE_TYPES.items())
+        return lambda data: [names[d] for d in data['device']]
+
+    def compile_homepage(self):
+        return self.translations('homepage')
+
+    def compile_icons(self):
+        sizes = []
+        for size in (16, 48, 64, 128):
+            # Same rounding as Addon.get_icon_url().
+            if size < amo.ADDON_ICON_SIZES[0]:
+                closest = amo.ADDON_ICON_SIZES[0]
+            else:
+                closest = [s for s in amo.ADDON_ICON_SIZES if s <= size][-1]
+            sizes.append((size, closest))
+        url = settings.ADDON_ICON_URL
+
+        def get(data):
+            pk = data['id']
+            modified = int(time.mktime(data['modified'].timetuple()))
+            return dict((size, url % (pk / 1000, pk, closest, modified))
+                        for size, closest in sizes)
+        return get
+
+    def compile_id(self):
+        return lambda data: data['id']
+
+    def compile_is_offline(self):
+        return self.get('is_offline')
+
+    def compile_is_packaged(self):
+        return lambda data: data['app_type'] != amo.ADDON_WEBAPP_HOSTED
+
+    def compile_manifest_url(self):
+        return self.get('manifest_url')
+
+    def compile_name(self):
+        return self.translations('name')
+
+    def compile_payment_account(self):
+        return self.constant(None)
+
+    def compile_payment_required(self):
+        return self.constant(False)
+
+    def compile_premium_type(self):
+        return lambda data: amo.ADDON_PREMIUM_API.get(data.get('premium_type'))
+
+    def compile_previews(self):
+        templates = [(key, template, '.png' not in template) for key, template
+                     in (('image_url', settings.PREVIEW_FULL_URL),
+                         ('thumbnail_url', settings.PREVIEW_THUMBNAIL_URL))]
+
+        def url(preview, template, extension):
+            # Same as Preview._image_url().
+            modified = preview['modified']
+            modified = (int(time.mktime(modified.timetuple()))
+                        if modified is not None else 0)
+            args = [preview['id'] / 1000, preview['id'], modified]
+            if extension:
+                filetype = preview['filetype']
+                args.insert(2, filetype.split('/')[1] if filetype else 'png')
+            return template % tuple(args)
+
+        return lambda data: [
+            dict((key, url(preview, template, extension))
+                 for key, template, extension in templates)
+            for preview in data['previews']]
+
+    def compile_price(self):
+        return self.constant(None)
+
+    def compile_price_locale(self):
+        return self.constant(None)
+
+    def compile_privacy_policy(self):
+        url = self.field_url('privacy_policy')
+        return lambda data: url(data['id'])
+
+    def compile_public_stats(self):
+        return lambda data: data['has_public_stats']
+
+    def compile_ratings(self):
+        return self.get('ratings', {})
+
+    def compile_regions(self):
+        regions = sorted(mkt.regions.REGIONS_CHOICES_ID_DICT.values(),
+                         key=lambda region: region.slug)
+        regions = zip([region.id for region in regions],
+                      RegionSerializer(regions, many=True).data)
+
+        def get(data):
+            excluded = set(data['region_exclusions'] or [])
+            return [dict(region) for pk, region in regions
+                    if pk not in excluded]
+        return get
+
+    def compile_release_notes(self):
+        return self.translations('release_notes')
+
+    def compile_resource_uri(self):
+        url = self.field_url('resource_uri')
+        return lambda data: url(data['id'])
+
+    def compile_reviewed(self):
+        return self.get('reviewed')
+
+    def compile_slug(self):
+        return lambda data: data['app_slug']
+
+    def compile_status(self):
+        return self.get('status')
+
+    def compile_support_email(self):
+        return self.translations('support_email')
+
+    def compile_support_url(self):
+        return self.translations('support_url')
+
+    def compile_supported_locales(self):
+        def get(data):
+            locales = data['supported_locales']
+            if not locales:
+                return []
+            if isinstance(locales, basestring):
+                return locales.split(',')
+            return locales
+        return get
+
+    def compile_upsell(self):
+        region = self.request.REGION.id
+        url = self.url_template(
+            reverse('app-detail', kwargs={'pk': self.PLACEHOLDER}))
+
+        def get(data):
+            upsell = data.get('upsell', False)
+            if not upsell:
+                return upsell
+            exclusions = upsell.get('region_exclusions')
+            if exclusions is None or region in exclusions:
+                return False
+            upsell = dict(upsell)
+            upsell['resource_uri'] = url(upsell['id'])
+            return upsell
+        return get
+
+    def compile_user(self):
+        # Only compiled without a user, see supports().
+        return self.constant(None)
+
+    def compile_versions(self):
+        return lambda data: dict((v['version'], v['resource_uri'])
+                                 for v in data['versions'])
+
+    def compile_weekly_downloads(self):
+        return lambda data: (data.get('weekly_downloads')
+                             if data['has_public_stats'] else None)
@@ -3,6 +3,8 @@ import json
 from urlparse import urlparse
 
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.http import QueryDict
 from django.test.client import RequestFactory
 
@@ -23,6 +25,7 @@ from translations.helpers import truncate
 from users.models import UserProfile
 
 import mkt.regions
+from mkt.api import profiler
 from mkt.api.tests.test_oauth import RestOAuth, RestOAuthClient
 from mkt.collections.constants import (COLLECTIONS_TYPE_BASIC,
                                        COLLECTIONS_TYPE_FEATURED,
@@ -30,11 +33,13 @@ from mkt.collections.constants import (COLLECTIONS_TYPE_BASIC,
 from mkt.collections.models import Collection
 from mkt.constants import regions
 from mkt.constants.features import FeatureProfile
+from mkt.features.utils import get_feature_profile
 from mkt.regions.middleware import RegionMiddleware
 from mkt.search.api import SearchView
 from mkt.search.serializers import SimpleESAppSerializer
 from mkt.search.forms import DEVICE_CHOICES_IDS
-from mkt.search.utils import S
+from mkt.search.utils import (bump_generation, doc_cache_key, get_generation,
+                              S)
 from mkt.search.views import DEFAULT_SORTING
 from mkt.site.fixtures import fixture
 from mkt.webapps.models import Installed, Webapp, WebappIndexer
@@ -361,6 +366,18 @@ class TestApi(RestOAuth, ESTestCase):
 
         es.search = orig_search
 
+    def test_hits_queries(self):
+        with profiler.profile() as p:
+            res = self.client.get(self.url)
+        eq_(len(res.json['objects']), 1)
+        app_factory()
+        app_factory()
+        self.refresh('webapp')
+        # Hits are serialized from ES, so more of them cost no queries.
+        with self.assertMaxQueries(p.query_count):
+            res = self.client.get(self.url)
+        eq_(len(res.json['objects']), 3)
+
     def test_q_exact(self):
         app1 = app_factory(name='test app test11')
         app2 = app_factory(name='test app test21')
@@ -679,6 +696,112 @@ class TestApi(RestOAuth, ESTestCase):
         ok_(not res.json['objects'])
 
 
+@patch('versions.models.Version.is_privileged', False)
+class TestSearchCache(RestOAuth, ESTestCase):
+    fixtures = fixture('webapp_337141')
+
+    def setUp(self):
+        self.client = RestOAuthClient(None)
+        self.url = reverse('search-api')
+        self.webapp = Webapp.objects.get(pk=337141)
+        self.category = Category.objects.create(name='test', slug='test',
+                                                type=amo.ADDON_WEBAPP)
+        self.webapp.save()
+        self.refresh('webapp')
+
+    def tearDown(self):
+        unindex_webapps(list(Webapp.with_deleted.values_list('id', flat=True)))
+        Webapp.objects.all().delete()
+        super(TestSearchCache, self).tearDown()
+
+    def key(self, data, region=regions.US):
+        request = RequestFactory().get('/', data)
+        request.user = AnonymousUser()
+        request.GAIA = request.MOBILE = request.TABLET = False
+        view = SearchView()
+        return view.get_cache_key(request, view.get_search_data(request),
+                                  region, get_feature_profile(request))
+
+    def test_key_permuted(self):
+        data = [('cat', 'test'), ('device', 'firefoxos'),
+                ('premium_types', 'free'), ('premium_types', 'premium'),
+                ('languages', 'en-US, fr'), ('sort', 'rating')]
+        key = self.key(data)
+        eq_(self.key(list(reversed(data))), key)
+        eq_(self.key(data[:2] + [('premium_types', 'premium'),
+                                 ('premium_types', 'free'),
+                                 ('languages', 'fr,en-US'),
+                                 ('sort', 'rating'), ('limit', 5)]), key)
+
+    def test_key_differs(self):
+        key = self.key({'cat': 'test'})
+        ok_(self.key({'cat': 'test', 'sort': 'rating'}) != key)
+        ok_(self.key({'cat': 'test'}, region=regions.BR) != key)
+        ok_(self.key({'cat': 'test', 'dev': 'firefoxos',
+                      'pro': FeatureProfile(apps=True).to_signature()})
+            != key)
+        bump_generation()
+        ok_(self.key({'cat': 'test'}) != key)
+
+    def test_no_key_for_query(self):
+        eq_(self.key({'q': 'something'}), None)
+
+    def test_cached(self):
+        res = self.client.get(self.url)
+        eq_(res.status_code, 200)
+        with patch.object(S, 'raw') as raw:
+            cached = self.client.get(self.url)
+            ok_(not raw.called)
+        eq_(cached.json, res.json)
+        eq_(cached.json['meta']['total_count'], 1)
+
+    def test_rehydrate_missing_doc(self):
+        res = self.client.get(self.url)
+        cache.delete(doc_cache_key(self.webapp.pk))
+        cached = self.client.get(self.url)
+        eq_(cached.json, res.json)
+        ok_(cache.get(doc_cache_key(self.webapp.pk)))
+
+    def test_app_update_busts(self):
+        res = self.client.get(self.url)
+        eq_(len(res.json['objects']), 1)
+        self.webapp.disabled_by_user = True
+        self.webapp.save()
+        self.refresh('webapp')
+        res = self.client.get(self.url)
+        eq_(len(res.json['objects']), 0)
+
+    def test_flash_update_busts(self):
+        res = self.client.get(self.url, data={'dev': 'firefoxos'})
+        eq_(len(res.json['objects']), 1)
+        generation = get_generation()
+        f = self.webapp.get_latest_file()
+        f.uses_flash = True
+        f.save()
+        self.webapp.save()
+        self.refresh('webapp')
+        ok_(get_generation() != generation)
+        res = self.client.get(self.url, data={'dev': 'firefoxos'})
+        eq_(len(res.json['objects']), 0)
+
+    def test_content_update_keeps_cache(self):
+        res = self.client.get(self.url)
+        generation = get_generation()
+        self.webapp.name = u'Renamed'
+        self.webapp.save()
+        self.refresh('webapp')
+        # The page stays cached and its document is fetched again.
+        eq_(get_generation(), generation)
+        res = self.client.get(self.url)
+        eq_(res.json['objects'][0]['name'], u'Renamed')
+
+    @patch('mkt.search.api.CachedSearch')
+    def test_query_not_cached(self, cached_search):
+        res = self.client.get(self.url, data={'q': 'something'})
+        eq_(res.status_code, 200)
+        ok_(not cached_search.called)
+
+
 class TestApiFeatures(RestOAuth, ESTestCase):
     fixtures = fixture('webapp_337141')
 
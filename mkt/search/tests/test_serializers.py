@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import json
+
+from django.test.client import RequestFactory
+
+import mock
+from nose.tools import eq_, ok_
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+import amo
+import amo.tests
+import mkt
+from addons.models import AddonCategory, AddonUpsell, Category, Preview
+from users.models import UserProfile
+
+from mkt.constants import ratingsbodies
+from mkt.search.serializers import (CompiledESAppSerializer, ESAppSerializer,
+                                    SimpleESAppSerializer,
+                                    SuggestionsESAppSerializer)
+from mkt.search.utils import S
+from mkt.site.fixtures import fixture
+from mkt.webapps.models import Webapp, WebappIndexer
+
+
+@mock.patch('versions.models.Version.is_privileged', False)
+class TestCompiledESAppSerializer(amo.tests.ESTestCase):
+    fixtures = fixture('user_2519', 'webapp_337141')
+
+    def setUp(self):
+        self.create_switch('iarc')
+        self.app = Webapp.objects.get(pk=337141)
+        category = Category.objects.create(name='cattest', slug='testcat',
+                                           type=amo.ADDON_WEBAPP)
+        AddonCategory.objects.create(addon=self.app, category=category)
+        Preview.objects.create(filetype='image/png', addon=self.app,
+                               position=0)
+        Preview.objects.create(filetype='video/webm', addon=self.app,
+                               position=1)
+        self.app.description = {'en-US': u'Description',
+                                'fr': u'Déscriptîon in frènch'}
+        self.app.set_content_ratings({
+            ratingsbodies.CLASSIND: ratingsbodies.CLASSIND_18,
+            ratingsbodies.GENERIC: ratingsbodies.GENERIC_18,
+        })
+        self.app.set_descriptors(['has_esrb_blood', 'has_pegi_scary'])
+        self.app.set_interactives(['has_shares_info'])
+        self.app.save()
+
+        self.packaged = amo.tests.app_factory(is_packaged=True, rated=True)
+        self.packaged.addonexcludedregion.create(region=mkt.regions.BR.id)
+        upsell = amo.tests.app_factory(premium_type=amo.ADDON_PREMIUM)
+        AddonUpsell.objects.create(free=self.packaged, premium=upsell)
+        self.packaged.save()
+        self.refresh('webapp')
+
+    def request(self, url='/', region=mkt.regions.US):
+        request = RequestFactory().get(url)
+        request.REGION = region
+        request.amo_user = None
+        return request
+
+    def hit(self, app):
+        # A fresh hit every time, the fake app path changes its _source.
+        return S(WebappIndexer).filter(id=app.pk).execute().objects[0]
+
+    def render(self, data):
+        return json.loads(JSONRenderer().render(data))
+
+    def check(self, serializer_class, request, app):
+        serializer = serializer_class(context={'request': request})
+        ok_(serializer.compiled)
+        compiled = serializer.compiled(self.hit(app)._source)
+        ok_(compiled is not None)
+        expected = serializer.to_native_from_app(self.hit(app))
+        eq_(self.render(compiled), self.render(expected))
+
+    def test_parity(self):
+        requests = [self.request(), self.request('/?lang=es'),
+                    self.request('/?lang=fr', region=mkt.regions.BR),
+                    self.request(region=mkt.regions.RESTOFWORLD)]
+        for serializer_class in (ESAppSerializer, SimpleESAppSerializer,
+                                 SuggestionsESAppSerializer):
+            for request in requests:
+                for app in (self.app, self.packaged):
+                    self.check(serializer_class, request, app)
+
+    def test_source_unchanged(self):
+        hit = self.hit(self.app)
+        source = json.dumps(hit._source, sort_keys=True, default=str)
+        serializer = ESAppSerializer(context={'request': self.request()})
+        serializer.compiled(hit._source)
+        eq_(json.dumps(hit._source, sort_keys=True, default=str), source)
+
+    def test_premium_not_compiled(self):
+        self.make_premium(self.app)
+        self.refresh('webapp')
+        serializer = ESAppSerializer(self.hit(self.app),
+                                     context={'request': self.request()})
+        eq_(serializer.compiled(self.hit(self.app)._source), None)
+        eq_(serializer.data['premium_type'], 'premium')
+
+    def test_user_not_compiled(self):
+        request = self.request()
+        request.amo_user = UserProfile.objects.get(pk=2519)
+        serializer = ESAppSerializer(self.hit(self.app),
+                                     context={'request': request})
+        eq_(serializer.compiled, None)
+        eq_(serializer.data['user']['developed'], False)
+
+    def test_unknown_fields_not_compiled(self):
+        class Serializer(ESAppSerializer):
+            latest_version = serializers.Field(
+                source='es_data.latest_version')
+
+            class Meta(ESAppSerializer.Meta):
+                fields = ['id', 'latest_version']
+
+        serializer = Serializer(context={'request': self.request()})
+        eq_(serializer.compiled, None)
+
+    def test_supports(self):
+        ok_(CompiledESAppSerializer.supports(
+            ESAppSerializer(context={'request': self.request()})))
+        ok_(not CompiledESAppSerializer.supports(
+            ESAppSerializer(context={'request': None})))
@@ -1,3 +1,10 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
 from elasticutils.contrib.django import S as eu_S
 from statsd import statsd
 
@@ -9,3 +16,166 @@ class S(eu_S):
             hits = super(S, self).raw()
             statsd.timing('search.took', hits['took'])
             return hits
+
+
+GENERATION_KEY = 'mkt:search:generation'
+
+# Document fields that decide which apps a search matches. A change to any
+# other field only changes what a hit looks like, and deleting the app's
+# cached document is enough for that.
+MATCH_FIELDS = ('app_type', 'category', 'device', 'features', 'is_disabled',
+                'is_offline', 'manifest_url', 'premium_type', 'price_tier',
+                'region_exclusions', 'status', 'supported_locales', 'type',
+                'uses_flash')
+
+
+def get_generation():
+    """
+    The current generation of the search index. Cached search results are
+    keyed on it, so bumping it makes them all stale at once.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Start from the time in milliseconds, so that a generation lost
+        # from the cache isn't reused while its results are still cached.
+        generation = int(time.time() * 1000)
+        cache.add(GENERATION_KEY, generation, 60 * 60 * 24 * 30)
+    return generation
+
+
+def bump_generation():
+    """
+    Call when apps are unindexed, when an indexed app changes in a way that
+    alters which searches match it, or when the index is replaced.
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, int(time.time() * 1000), 60 * 60 * 24 * 30)
+
+
+def match_cache_key(id_):
+    return 'mkt:search:match:%s' % id_
+
+
+def match_changed(docs):
+    """
+    Remembers the fields of the ES `docs` that searches filter on, and
+    returns whether they changed for any app since it was last indexed. Apps
+    we have nothing remembered for count as changed.
+    """
+    hashes = dict((match_cache_key(doc['id']),
+                   hashlib.md5(json.dumps([doc.get(f) for f in MATCH_FIELDS],
+                                          sort_keys=True)).hexdigest())
+                  for doc in docs)
+    cached = cache.get_many(hashes.keys())
+    changed = dict((k, v) for k, v in hashes.items() if cached.get(k) != v)
+    if changed:
+        cache.set_many(changed, 60 * 60 * 24 * 30)
+    return bool(changed)
+
+
+def search_cache_key(filters):
+    """
+    The cache key for the results of a search with `filters`, a dict of
+    plain values. Equal filters give equal keys whatever order they came in.
+    """
+    filters = json.dumps(filters, sort_keys=True)
+    return 'mkt:search:%s:%s' % (get_generation(),
+                                 hashlib.md5(filters).hexdigest())
+
+
+def doc_cache_key(id_):
+    return 'mkt:search:doc:%s' % id_
+
+
+def cache_docs(docs):
+    """Keep the ES `docs` of apps around to rehydrate cached searches."""
+    cache.set_many(dict((doc_cache_key(doc['id']), doc) for doc in docs),
+                   settings.CACHE_SEARCH_DOC_TIMEOUT)
+
+
+def delete_docs(ids, matches=False):
+    keys = [doc_cache_key(id_) for id_ in ids]
+    if matches:
+        keys += [match_cache_key(id_) for id_ in ids]
+    cache.delete_many(keys)
+
+
+class CachedHit(dict):
+    """A hit rehydrated from the document cache, like a values_dict() hit."""
+
+    def __init__(self, source):
+        super(CachedHit, self).__init__(source)
+        self._id = source['id']
+        self._source = source
+
+
+class CachedSearch(object):
+    """
+    Stands in for a values_dict() S in ESPaginator. The ids and total of
+    each page are kept under `key`, and hits come back from the document
+    cache, going to ES only for the documents that aren't in it.
+    """
+
+    def __init__(self, search, key, mapping_type, bounds=(None, None)):
+        self.search = search
+        self.key = key
+        self.mapping_type = mapping_type
+        self.bounds = bounds
+        self._objects = None
+        self._total = None
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice):
+            raise TypeError('Only slices of a CachedSearch are supported.')
+        return CachedSearch(self.search[k], self.key, self.mapping_type,
+                            bounds=(k.start, k.stop))
+
+    def __iter__(self):
+        return iter(self.execute()._objects)
+
+    def __len__(self):
+        return len(self.execute()._objects)
+
+    def count(self):
+        return self.execute()._total
+
+    @property
+    def page_key(self):
+        return '%s:%s-%s' % ((self.key,) + self.bounds)
+
+    def execute(self):
+        if self._objects is not None:
+            return self
+
+        cached = cache.get(self.page_key)
+        if cached is not None:
+            ids, total = cached
+            objects = self.get_hits(ids)
+            if len(objects) == len(ids):
+                statsd.incr('search.cache.hit')
+                self._objects, self._total = objects, total
+                return self
+
+        statsd.incr('search.cache.miss')
+        results = self.search.execute()
+        self._objects = list(results)
+        self._total = int(results.count)
+        cache_docs(obj._source for obj in self._objects)
+        cache.set(self.page_key,
+                  ([obj._source['id'] for obj in self._objects], self._total),
+                  settings.CACHE_SEARCH_API_TIMEOUT)
+        return self
+
+    def get_hits(self, ids):
+        """The hits for `ids`, in order, leaving out apps no longer in ES."""
+        docs = cache.get_many([doc_cache_key(id_) for id_ in ids])
+        docs = dict((doc['id'], doc) for doc in docs.values())
+        missing = [id_ for id_ in ids if id_ not in docs]
+        if missing:
+            fetched = list(S(self.mapping_type).filter(id__in=missing)
+                           .values_dict()[:len(missing)])
+            cache_docs(obj._source for obj in fetched)
+            docs.update((obj._source['id'], obj._source) for obj in fetched)
+        return [CachedHit(docs[id_]) for id_ in ids if id_ in docs]
@@ -86,6 +86,8 @@ MIDDLEWARE_CLASSES.remove('mobility.middleware.DetectMobileMiddleware')
 MIDDLEWARE_CLASSES.remove('mobility.middleware.XMobileMiddleware')
 MIDDLEWARE_CLASSES.remove('amo.middleware.LocaleAndAppURLMiddleware')
 MIDDLEWARE_CLASSES = [
+    # First, so that the queries of every other middleware are profiled.
+    'mkt.api.middleware.QueryProfilerMiddleware',
     'mkt.site.middleware.CacheHeadersMiddleware'
 ] + MIDDLEWARE_CLASSES
 MIDDLEWARE_CLASSES.append('mkt.site.middleware.RequestCookiesMiddleware')
@@ -314,10 +316,23 @@ API_LIMIT_PER_PAGE = 25
 # Developer Hub instead of to Fireplace.
 LOGOUT_REDIRECT_URL = '/developers/'
 
+# Anonymous GET requests to these API paths skip the middleware work that is
+# of no use to them: DNT stats, device cookies, db pinning and transactions.
+API_LEAN_PATHS = (
+    r'^/api/(v\d+/)?apps/search/',
+    r'^/api/(v\d+/)?fireplace/search/',
+    r'^/api/(v\d+/)?(apps|fireplace)/app/[^/]+/$',
+    r'^/api/(v\d+/)?apps/rating/$',
+    r'^/api/(v\d+/)?apps/category/',
+)
+
 # Name of our Commonplace repositories on GitHub.
 COMMONPLACE_REPOS = ['commbadge', 'fireplace', 'marketplace-stats',
                      'rocketfuel']
 COMMONPLACE_REPOS_APPCACHED = ['fireplace']
+# How often, in seconds, each process checks the mtime of the build_id.txt
+# and imgurls.txt files that the Commonplace repos write on deploy.
+COMMONPLACE_BUILD_CHECK_INTERVAL = 60
 
 # A list of the payment providers supported by the marketplace. Currently there
 # can be only one value, however we expect this to change in the future.
@@ -0,0 +1,211 @@
+"""
+Seeds a synthetic catalogue in a throwaway test database and measures
+throughput and latency of the consumer API hot paths.
+
+    ./manage.py benchmark_api --apps=200 --requests=200 --output=before.json
+
+Elasticsearch is replaced by a stub that answers every search with the seeded
+apps' documents and monolith stats are dropped, so the numbers only cover
+our own code and the database. Compare two JSON outputs to see the effect of
+a change.
+"""
+import calendar
+import json
+import time
+from optparse import make_option
+from urllib import urlencode
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.client import Client
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+import mock
+
+import amo
+import amo.tests
+from amo.urlresolvers import reverse
+from mkt.api import profiler
+from mkt.webapps.models import Installed, WebappIndexer
+from reviews.models import Review
+from users.models import UserProfile
+
+
+SCENARIOS = ('search', 'featured_search', 'app_retrieve', 'rating_list',
+             'update', 'verify')
+
+
+class FakeES(object):
+    """Answers every search with a page of the seeded apps' documents."""
+
+    def __init__(self, apps):
+        self.docs = [WebappIndexer.extract_document(app.pk, app)
+                     for app in apps]
+
+    def raw(self, s):
+        start = getattr(s, 'start', 0) or 0
+        stop = getattr(s, 'stop', None)
+        stop = start + 25 if stop is None else stop
+        hits = [{'_id': doc['id'], '_type': 'webapp', '_score': 1.0,
+                 '_source': doc} for doc in self.docs[start:stop]]
+        return {'took': 1, 'timed_out': False,
+                'hits': {'total': len(self.docs), 'max_score': 1.0,
+                         'hits': hits}}
+
+
+def percentile(times, pct):
+    return times[min(len(times) - 1, int(len(times) * pct / 100.0))]
+
+
+class Benchmark(object):
+
+    def __init__(self, apps=200, reviews=10, requests=200, warmup=5):
+        self.num_apps = apps
+        self.num_reviews = reviews
+        self.requests = requests
+        self.warmup = warmup
+        self.client = Client()
+
+    def seed(self):
+        self.user = UserProfile.objects.create(username='benchmark',
+                                               email='benchmark@mozilla.com')
+        self.apps = [amo.tests.app_factory(complete=True, rated=True)
+                     for x in range(self.num_apps)]
+        self.app = self.apps[0]
+        for x in range(self.num_reviews):
+            user = UserProfile.objects.create(username='reviewer-%s' % x)
+            Review.objects.create(addon=self.app, user=user, rating=4,
+                                  body='Benchmark review %s' % x)
+        Installed.objects.create(addon=self.app, user=self.user,
+                                 uuid='benchmark-uuid')
+        self.addon = amo.tests.addon_factory(version_kw={'version': '1.0'})
+        amo.tests.version_factory(addon=self.addon, version='2.0')
+        self.addon.update_version()
+        self.es = FakeES(self.apps)
+
+    def api(self, url, **params):
+        res = self.client.get(url, params)
+        assert res.status_code == 200, '%s gave %s' % (url, res.status_code)
+
+    def search(self):
+        self.api(reverse('search-api'))
+
+    def featured_search(self):
+        self.api(reverse('featured-search-api'))
+
+    def app_retrieve(self):
+        self.api(reverse('app-detail', kwargs={'pk': self.app.pk}))
+
+    def rating_list(self):
+        self.api(reverse('ratings-list'), app=self.app.pk)
+
+    def update(self):
+        # The services configure their own environment on import, so only
+        # pull them in when the scenario runs.
+        from services import update
+        up = update.Update({'id': self.addon.guid, 'version': '1.0',
+                            'reqVersion': 1, 'appID': amo.FIREFOX.guid,
+                            'appVersion': '4.0'})
+        up.cursor = connection.cursor()
+        up.get_rdf()
+
+    def verify(self):
+        from services import verify
+        receipt = {'user': {'type': 'directed-identifier',
+                            'value': 'benchmark-uuid'},
+                   'product': {'url': self.app.origin or 'http://f.com',
+                               'storedata': urlencode({'id': self.app.pk})},
+                   'verify': 'https://foo.com/verifyme/',
+                   'exp': calendar.timegm(time.gmtime()) + 1000,
+                   'typ': 'purchase-receipt'}
+        with mock.patch.object(verify, 'decode_receipt') as decode:
+            decode.return_value = receipt
+            v = verify.Verify('', {'REMOTE_ADDR': '127.0.0.1'})
+            v.cursor = connection.cursor()
+            v.check_full()
+
+    def measure(self, name):
+        func = getattr(self, name)
+        for x in range(self.warmup):
+            func()
+        times, queries = [], 0
+        for x in range(self.requests):
+            with profiler.profile() as p:
+                start = time.time()
+                func()
+                times.append(time.time() - start)
+            queries += p.query_count
+        total = sum(times)
+        times.sort()
+        ms = lambda t: round(t * 1000, 3)
+        return {
+            'requests': self.requests,
+            'total': round(total, 3),
+            'rps': round(self.requests / total, 1) if total else None,
+            'mean': ms(total / self.requests),
+            'min': ms(times[0]),
+            'p50': ms(percentile(times, 50)),
+            'p90': ms(percentile(times, 90)),
+            'p99': ms(percentile(times, 99)),
+            'max': ms(times[-1]),
+            'queries': round(float(queries) / self.requests, 2),
+        }
+
+    def run(self, scenarios=SCENARIOS):
+        self.seed()
+        results = {}
+        with mock.patch('mkt.search.utils.S.raw',
+                        new=lambda s: self.es.raw(s)):
+            with mock.patch('lib.metrics.record_stat'):
+                for name in scenarios:
+                    results[name] = self.measure(name)
+        return results
+
+
+class Command(BaseCommand):
+    help = 'Measure the consumer API hot paths against a synthetic catalogue.'
+    option_list = BaseCommand.option_list + (
+        make_option('--apps', action='store', type='int', default=200,
+                    help='Number of apps to seed.'),
+        make_option('--reviews', action='store', type='int', default=10,
+                    help='Number of reviews to seed on the rated app.'),
+        make_option('--requests', action='store', type='int', default=200,
+                    help='Number of timed requests per scenario.'),
+        make_option('--scenario', action='append', dest='scenarios',
+                    choices=SCENARIOS,
+                    help='Only run this scenario, can be repeated.'),
+        make_option('--label', action='store', default='',
+                    help='Stored with the results, eg: a commit id.'),
+        make_option('--output', action='store',
+                    help='Write the JSON results here instead of stdout.'),
+    )
+
+    def handle(self, *args, **kw):
+        import settings_test
+        overrides = dict((k, getattr(settings_test, k))
+                         for k in dir(settings_test) if k.isupper())
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        with override_settings(**overrides):
+            connection.creation.create_test_db(verbosity=0)
+            amo.tests.start_es_mock()
+            try:
+                bench = Benchmark(apps=kw['apps'], reviews=kw['reviews'],
+                                  requests=kw['requests'])
+                results = bench.run(kw['scenarios'] or SCENARIOS)
+            finally:
+                amo.tests.stop_es_mock()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+        output = json.dumps({'label': kw['label'],
+                             'time': int(time.time()),
+                             'apps': kw['apps'],
+                             'results': results}, indent=2, sort_keys=True)
+        if kw['output']:
+            with open(kw['output'], 'w') as fh:
+                fh.write(output)
+        else:
+            self.stdout.write(output + '\n')
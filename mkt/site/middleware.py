@@ -1,3 +1,4 @@
+import re
 from types import MethodType
 
 from django import http
@@ -108,6 +109,7 @@ class RedirectPrefixedURIMiddleware(object):
         if region == 'api':
             # API isn't a region, its a sign that you are using the api.
             request.API = True
+        request.LEAN = is_lean(request)
 
         if region in mkt.regions.REGION_LOOKUP:
             # Strip /<region> from URL.
@@ -122,6 +124,28 @@ class RedirectPrefixedURIMiddleware(object):
             return http.HttpResponseRedirect(urlparams(new_path, **new_qs))
 
 
+_lean_paths = []
+
+
+def is_lean(request):
+    """
+    Anonymous, read-only requests to the API paths in `API_LEAN_PATHS` don't
+    need the cookie, stats and db pinning work the rest of the middleware
+    does, so they are flagged to skip it.
+    """
+    if (not getattr(request, 'API', False) or
+        request.method not in ('GET', 'HEAD', 'OPTIONS') or
+        'HTTP_AUTHORIZATION' in request.META or
+        settings.SESSION_COOKIE_NAME in request.COOKIES or
+        '_user' in request.GET or
+        # OAuth can come in the query string as well as in the header.
+        any(k.startswith('oauth_') for k in request.GET)):
+        return False
+    if not _lean_paths:
+        _lean_paths.extend(re.compile(p) for p in settings.API_LEAN_PATHS)
+    return any(p.match(request.path_info) for p in _lean_paths)
+
+
 def get_accept_language(request):
     a_l = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
     return lang_from_accept_header(a_l)
@@ -132,6 +156,15 @@ class LocaleMiddleware(object):
 
     def process_request(self, request):
         a_l = get_accept_language(request)
+        if getattr(request, 'LEAN', False):
+            # Nothing is remembered for lean requests, so the cookie and the
+            # user's language don't matter.
+            if 'lang' in request.GET:
+                a_l = Prefixer(request).get_language()
+            request.LANG = a_l
+            tower.activate(a_l)
+            return
+
         lang, ov_lang = a_l, ''
         stored_lang, stored_ov_lang = '', ''
 
@@ -215,6 +248,9 @@ class DeviceDetectionMiddleware(object):
             setattr(request, device.upper(), False)
 
     def process_response(self, request, response):
+        if getattr(request, 'LEAN', False):
+            return response
+
         for device in self.devices:
             active = getattr(request, device.upper(), False)
             cookie = request.COOKIES.get(device, False)
@@ -233,6 +269,9 @@ class DoNotTrackTrackingMiddleware(object):
     """A small middleware to record DNT counts."""
 
     def process_request(self, request):
+        if getattr(request, 'LEAN', False):
+            return
+
         if 'HTTP_DNT' not in request.META:
             statsd.incr('z.mkt.dnt.unset')
         elif request.META.get('HTTP_DNT') == '1':
@@ -0,0 +1,25 @@
+from nose.tools import eq_
+
+import amo.tests
+from mkt.site.management.commands.benchmark_api import Benchmark
+
+
+class TestBenchmark(amo.tests.TestCase):
+
+    def setUp(self):
+        self.bench = Benchmark(apps=2, reviews=2, requests=3, warmup=1)
+
+    def test_results(self):
+        results = self.bench.run(['search', 'app_retrieve', 'rating_list'])
+        eq_(sorted(results), ['app_retrieve', 'rating_list', 'search'])
+        for result in results.values():
+            eq_(result['requests'], 3)
+            assert result['min'] <= result['p50'] <= result['max']
+            assert result['queries'] > 0
+
+    def test_fake_es(self):
+        self.bench.seed()
+        res = self.bench.es.raw(object())
+        eq_(res['hits']['total'], 2)
+        eq_(sorted(h['_id'] for h in res['hits']['hits']),
+            sorted(app.pk for app in self.bench.apps))
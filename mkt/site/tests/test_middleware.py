@@ -1,6 +1,7 @@
 import datetime
 
 from django.conf import settings
+from django.core.cache import cache
 from django.test.utils import override_settings
 
 import mock
@@ -8,9 +9,12 @@ from nose.tools import eq_, ok_
 from test_utils import RequestFactory
 
 import amo.tests
+from amo.urlresolvers import reverse
 from users.models import UserProfile
 
-from mkt.site.middleware import DeviceDetectionMiddleware
+from mkt.api import profiler
+from mkt.site.middleware import (DeviceDetectionMiddleware, is_lean,
+                                  LocaleMiddleware)
 from mkt.site.fixtures import fixture
 
 _langs = ['cs', 'de', 'en-US', 'es', 'fr', 'pt-BR', 'pt-PT']
@@ -399,3 +403,85 @@ class TestCacheHeadersMiddleware(amo.tests.TestCase):
         for method in ('get', 'head', 'options'):
             res = getattr(self.client, method)('/robots.txt?cache=1')
             self._test_headers_set(res)
+
+
+no_hits = {'took': 1, 'hits': {'total': 0, 'max_score': 0, 'hits': []}}
+
+
+@mock.patch('mkt.search.utils.S.raw', lambda s: no_hits)
+class TestLeanAPI(amo.tests.TestCase):
+
+    def setUp(self):
+        self.url = reverse('search-api')
+
+    def req(self, url=None, method='get', **kw):
+        req = getattr(RequestFactory(), method)(url or self.url, **kw)
+        req.API = True
+        return req
+
+    def test_is_lean(self):
+        ok_(is_lean(self.req()))
+        ok_(is_lean(self.req(reverse('ratings-list'))))
+
+    def test_not_lean(self):
+        ok_(not is_lean(self.req(method='post')))
+        ok_(not is_lean(self.req(HTTP_AUTHORIZATION='OAuth foo')))
+        ok_(not is_lean(self.req(data={'_user': 'foo'})))
+        ok_(not is_lean(self.req(data={'oauth_token': 'foo'})))
+        # Two-legged OAuth in the query string.
+        ok_(not is_lean(self.req(data={'oauth_consumer_key': 'foo',
+                                       'oauth_signature': 'bar'})))
+        ok_(not is_lean(self.req(data={'oauth_signature': 'bar'})))
+        ok_(not is_lean(self.req('/api/v1/account/settings/mine/')))
+
+        req = self.req()
+        req.COOKIES[settings.SESSION_COOKIE_NAME] = 'foo'
+        ok_(not is_lean(req))
+
+        req = self.req()
+        req.API = False
+        ok_(not is_lean(req))
+
+    def search(self, lean):
+        with mock.patch('mkt.site.middleware.is_lean', return_value=lean):
+            with mock.patch('mkt.site.middleware.statsd') as statsd:
+                with mock.patch.object(cache, 'get',
+                                       wraps=cache.get) as cache_get:
+                    with profiler.profile() as p:
+                        res = self.client.get(self.url)
+        eq_(res.status_code, 200)
+        return res, p.query_count, cache_get.call_count, statsd
+
+    def test_search(self):
+        full, full_queries, full_cache, full_statsd = self.search(False)
+        lean, lean_queries, lean_cache, lean_statsd = self.search(True)
+
+        # Sessions are signed cookies, so for an anonymous user what the lean
+        # path skips doesn't query the db or the cache and the counts are the
+        # same. The work skipped is checked in the other tests.
+        eq_(lean_queries, full_queries)
+        eq_(lean_cache, full_cache)
+        ok_(full_statsd.incr.called)
+        ok_(not lean_statsd.incr.called)
+        eq_(lean['API-Pinned'], 'False')
+        eq_(lean.content, full.content)
+
+    def test_locale(self):
+        req = self.req(data={'lang': 'fr'}, HTTP_ACCEPT_LANGUAGE='de')
+        req.COOKIES['lang'] = 'pt-BR,'
+        req.LEAN = True
+        req.amo_user = mock.Mock(lang='en-US')
+        LocaleMiddleware().process_request(req)
+        eq_(req.LANG, 'fr')
+        ok_(not hasattr(req, 'LANG_COOKIE'))
+        ok_(not req.amo_user.save.called)
+
+        req = self.req(HTTP_ACCEPT_LANGUAGE='de')
+        req.LEAN = True
+        LocaleMiddleware().process_request(req)
+        eq_(req.LANG, 'de')
+
+    def test_search_device_cookie(self):
+        self.client.cookies['mobile'] = 'true'
+        res, _, _, _ = self.search(True)
+        ok_('mobile' not in res.cookies)
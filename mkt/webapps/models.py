@@ -1169,7 +1169,7 @@ class Webapp(Addon):
             info.update(**data)
 
     @write
-    def set_content_ratings(self, data):
+    def set_content_ratings(self, data, index=True):
         """
         Central method for setting content ratings.
 
@@ -1178,6 +1178,8 @@ class Webapp(Addon):
 
             {<ratingsbodies class>: <rating class>, ...}
 
+        Pass `index=False` when reindexing a batch of apps afterwards.
+
         """
         from . import tasks
 
@@ -1218,7 +1220,8 @@ class Webapp(Addon):
             geodata.save()
             log.info('Un-excluding IARC-excluded app:%s from br/de')
 
-        tasks.index_webapps.delay([self.id])
+        if index:
+            tasks.index_webapps.delay([self.id])
 
     @write
     def set_descriptors(self, data):
@@ -36,6 +36,7 @@ from users.utils import get_task_user
 import mkt
 from mkt.constants.regions import RESTOFWORLD
 from mkt.developers.tasks import _fetch_manifest, fetch_icon, validator
+from mkt.search.utils import bump_generation, delete_docs, match_changed
 from mkt.webapps.models import AppManifest, Webapp, WebappIndexer
 from mkt.webapps.utils import get_locale_properties
 
@@ -303,10 +304,18 @@ def index_webapps(ids, **kw):
     es = WebappIndexer.get_es(urls=settings.ES_URLS)
     qs = Webapp.indexing_transformer(Webapp.with_deleted.no_cache().filter(
         id__in=ids))
+    docs = []
     for obj in qs:
         doc = WebappIndexer.extract_document(obj.id, obj)
         for idx in indices:
             WebappIndexer.index(doc, id_=obj.id, es=es, index=idx)
+        docs.append(doc)
+
+    # The documents cached searches are rehydrated from are stale. The
+    # searches themselves only are if the apps now match different ones.
+    delete_docs(ids)
+    if match_changed(docs):
+        bump_generation()
 
 
 @task(acks_late=True)
@@ -332,6 +341,9 @@ def unindex_webapps(ids, **kw):
                 task_log.info(
                     u'[Webapp:%s] Unindexing app but not found in index' % id_)
 
+    delete_docs(ids, matches=True)
+    bump_generation()
+
 
 @task
 def dump_app(id, **kw):
@@ -6,9 +6,15 @@ HOME=/tmp
 
 # Every minute!
 * * * * * %(z_cron)s fast_current_version
+* * * * * %(z_cron)s flush_front_end_purges
+
+# Every 5 minutes.
+*/5 * * * * %(z_cron)s process_synced_collections
 
 # Every 30 minutes.
 */30 * * * * %(z_cron)s update_addons_current_version
+*/30 * * * * %(z_cron)s reconcile_editor_queue
+*/30 * * * * %(z_cron)s build_suggestions
 
 #once per hour
 5 * * * * %(z_cron)s update_collections_subscribers
@@ -1,4 +1,3 @@
-from collections import defaultdict
 from email.Utils import formatdate
 import re
 from string import Template
@@ -59,271 +58,266 @@ xml_template = """\
 """
 
 flash_re = re.compile(r'^(Win|(PPC|Intel) Mac OS X|Linux.+(x86_64|i\d86))|SunOs', re.IGNORECASE)
-quicktime_re = re.compile(r'^(application/(sdp|x-(mpeg|rtsp|sdp))|audio/(3gpp(2)?|AMR|aiff|basic|mid(i)?|mp4|mpeg|vnd\.qcelp|wav|x-(aiff|m4(a|b|p)|midi|mpeg|wav))|image/(pict|png|tiff|x-(macpaint|pict|png|quicktime|sgi|targa|tiff))|video/(3gpp(2)?|flc|mp4|mpeg|quicktime|sd-video|x-mpeg))$')
-java_re = re.compile(r'^application/x-java-((applet|bean)(;jpi-version=1\.5|;version=(1\.(1(\.[1-3])?|(2|4)(\.[1-2])?|3(\.1)?|5)))?|vm)$')
-wmp_re = re.compile(r'^(application/(asx|x-(mplayer2|ms-wmp))|video/x-ms-(asf(-plugin)?|wm(p|v|x)?|wvx)|audio/x-ms-w(ax|ma))$')
+windows_re = re.compile(r'^Win')
+mac_re = re.compile(r'^(PPC|Intel) Mac OS X')
+win_ppc_re = re.compile(r'^(Win|PPC Mac OS X)')
+win_linux_ppc_re = re.compile(r'^(Win|Linux|PPC Mac OS X)')
+pdf_os_re = re.compile(r'^(Win|PPC Mac OS X|Linux(?! x86_64))')
+any_os_re = re.compile(r'')
+
+required = ['mimetype', 'appID', 'appVersion', 'clientOS', 'chromeLocale']
+
+# Some defaults we override depending on what we find below.
+default_plugin = dict(mimetype='-1', name='-1', guid='-1', version='',
+                      iconUrl='', XPILocation='', InstallerLocation='',
+                      InstallerHash='', InstallerShowsUI='',
+                      manualInstallationURL='', licenseURL='',
+                      needsRestart='true')
+
+# The plugins we know where to get, in the order they are checked. Each one
+# applies to a list of mimetypes and a clientOS pattern. `variants` are
+# (clientOS pattern, chromeLocale, fields) tuples on top of `fields`, the
+# first one that matches is used and a None pattern or locale matches
+# anything.
+plugins = [
+    {'mimetypes': ['application/x-shockwave-flash',
+                   'application/futuresplash'],
+     'os': flash_re,
+     'fields': dict(
+         name='Adobe Flash Player',
+         manualInstallationURL='http://www.adobe.com/go/getflashplayer'),
+     # Offer Windows users a specific flash plugin installer instead.
+     # Don't use a https URL for the license here, per request from
+     # Macromedia.
+     'variants': [(windows_re, None, dict(
+         guid='{4cfaef8a-a6c9-41a0-8e6f-967eb8f49143}',
+         XPILocation='',
+         iconUrl='http://fpdownload2.macromedia.com/pub/flashplayer/current/fp_win_installer.ico',
+         needsRestart='false',
+         InstallerShowsUI='true',
+         version='12.0.0.44',
+         InstallerHash='sha256:41f6636e383fa814b8ab5914d09a30dafbcc83265915ff34ec1896abe3880ba3',
+         InstallerLocation='http://download.macromedia.com/pub/flashplayer/pdc/fp_pl_pfs_installer.exe'))]},
+
+    {'mimetypes': ['application/x-director'],
+     'os': windows_re,
+     # Even though the shockwave installer is not a silent installer, we
+     # need to show its EULA here since we've got a slimmed down installer
+     # that doesn't do that itself.
+     'fields': dict(
+         name='Adobe Shockwave Player',
+         licenseURL='http://www.adobe.com/go/eula_shockwaveplayer',
+         guid='{45f2a22c-4029-4209-8b3d-1421b989633f}',
+         XPILocation='',
+         version='12.0.9.149',
+         InstallerHash='sha256:2c552fac768d9cbbb5b91540676ae7ad3fbe13d6e48f9a8df447ab7281758636',
+         InstallerLocation='http://fpdownload.macromedia.com/pub/shockwave/default/english/win95nt/latest/Shockwave_Installer_FF.exe',
+         manualInstallationURL='http://get.adobe.com/shockwave/otherversions',
+         needsRestart='false',
+         InstallerShowsUI='false'),
+     'variants': [(None, 'ja-JP', dict(
+         licenseURL='http://www.adobe.com/go/eula_shockwaveplayer_jp'))]},
+
+    {'mimetypes': ['audio/x-pn-realaudio-plugin', 'audio/x-pn-realaudio'],
+     'os': win_linux_ppc_re,
+     'fields': dict(
+         name='Real Player',
+         version='10.5',
+         manualInstallationURL='http://www.real.com',
+         guid='{269eb771-59de-4702-9209-ca97ce522f6d}'),
+     'variants': [(windows_re, None, dict(
+         XPILocation='http://forms.real.com/real/player/download.html?type=firefox',
+         guid='{d586351c-cb55-41a7-8e7b-4aaac5172d39}'))]},
+
+    # Well, we don't have a plugin that can handle any of those mimetypes,
+    # but the Apple Quicktime plugin can. Point the user to the Quicktime
+    # download page.
+    {'mimetypes': ['application/sdp', 'application/x-mpeg',
+                   'application/x-rtsp', 'application/x-sdp',
+                   'audio/3gpp', 'audio/3gpp2', 'audio/AMR', 'audio/aiff',
+                   'audio/basic', 'audio/mid', 'audio/midi', 'audio/mp4',
+                   'audio/mpeg', 'audio/vnd.qcelp', 'audio/wav',
+                   'audio/x-aiff', 'audio/x-m4a', 'audio/x-m4b',
+                   'audio/x-m4p', 'audio/x-midi', 'audio/x-mpeg',
+                   'audio/x-wav', 'image/pict', 'image/png', 'image/tiff',
+                   'image/x-macpaint', 'image/x-pict', 'image/x-png',
+                   'image/x-quicktime', 'image/x-sgi', 'image/x-targa',
+                   'image/x-tiff', 'video/3gpp', 'video/3gpp2', 'video/flc',
+                   'video/mp4', 'video/mpeg', 'video/quicktime',
+                   'video/sd-video', 'video/x-mpeg'],
+     'os': win_ppc_re,
+     'fields': dict(
+         name='Apple Quicktime',
+         guid='{a42bb825-7eee-420f-8ee7-834062b6fefd}',
+         InstallerShowsUI='true',
+         manualInstallationURL='http://www.apple.com/quicktime/download/')},
+
+    # We don't want to link users directly to the Java plugin because we
+    # want to warn them about ongoing security problems first. Link to SUMO.
+    {'mimetypes': ['application/x-java-vm'] + [
+        'application/x-java-%s%s' % (kind, version)
+        for kind in ('applet', 'bean')
+        for version in ('', ';jpi-version=1.5') + tuple(
+            ';version=%s' % v for v in (
+                '1.1', '1.1.1', '1.1.2', '1.1.3', '1.2', '1.2.1', '1.2.2',
+                '1.3', '1.3.1', '1.4', '1.4.1', '1.4.2', '1.5'))],
+     'os': win_linux_ppc_re,
+     'fields': dict(
+         name='Java Runtime Environment',
+         manualInstallationURL='https://support.mozilla.org/kb/use-java-plugin-to-view-interactive-content',
+         needsRestart='false',
+         guid='{fbe640ef-4375-4f45-8d79-767d60bf75b8}')},
+
+    {'mimetypes': ['application/pdf', 'application/vnd.fdf',
+                   'application/vnd.adobe.xfdf',
+                   'application/vnd.adobe.xdp+xml',
+                   'application/vnd.adobe.xfd+xml'],
+     'os': pdf_os_re,
+     'fields': dict(
+         name='Adobe Acrobat Plug-In',
+         guid='{d87cd824-67cb-4547-8587-616c70318095}',
+         manualInstallationURL='http://www.adobe.com/products/acrobat/readstep.html')},
+
+    {'mimetypes': ['application/x-mtx'],
+     'os': win_ppc_re,
+     'fields': dict(
+         name='Viewpoint Media Player',
+         guid='{03f998b2-0e00-11d3-a498-00104b6eb52e}',
+         manualInstallationURL='http://www.viewpoint.com/pub/products/vmp.html')},
+
+    # For all windows users who don't have the WMP 11 plugin, give them a
+    # link for it. For OSX users -- added Intel to this since flip4mac is a
+    # UB. Contact at MS was okay w/ this, plus MS points to this anyway.
+    # Everyone else gets the defaults.
+    {'mimetypes': ['application/asx', 'application/x-mplayer2',
+                   'application/x-ms-wmp', 'audio/x-ms-wax',
+                   'audio/x-ms-wma', 'video/x-ms-asf',
+                   'video/x-ms-asf-plugin', 'video/x-ms-wm',
+                   'video/x-ms-wmp', 'video/x-ms-wmv', 'video/x-ms-wmx',
+                   'video/x-ms-wvx'],
+     'os': any_os_re,
+     'fields': {},
+     'variants': [
+         (windows_re, None, dict(
+             name='Windows Media Player',
+             version='11',
+             guid='{cff1240a-fd24-4b9f-8183-ccd96e5300d0}',
+             manualInstallationURL='http://port25.technet.com/pages/windows-media-player-firefox-plugin-download.aspx')),
+         (mac_re, None, dict(
+             name='Flip4Mac',
+             version='2.1',
+             guid='{cff0240a-fd24-4b9f-8183-ccd96e5300d0}',
+             manualInstallationURL='http://www.flip4mac.com/wmv_download.htm'))]},
+
+    {'mimetypes': ['application/x-xstandard'],
+     'os': win_ppc_re,
+     'fields': dict(
+         name='XStandard XHTML WYSIWYG Editor',
+         guid='{3563d917-2f44-4e05-8769-47e655e92361}',
+         iconUrl='http://xstandard.com/images/xicon32x32.gif',
+         XPILocation='http://xstandard.com/download/xstandard.xpi',
+         InstallerShowsUI='false',
+         manualInstallationURL='http://xstandard.com/download/',
+         licenseURL='http://xstandard.com/license/')},
+
+    {'mimetypes': ['application/x-dnl'],
+     'os': windows_re,
+     'fields': dict(
+         name='DNL Reader',
+         guid='{ce9317a3-e2f8-49b9-9b3b-a7fb5ec55161}',
+         version='5.5',
+         iconUrl='http://digitalwebbooks.com/reader/dwb16.gif',
+         XPILocation='http://digitalwebbooks.com/reader/xpinst.xpi',
+         InstallerShowsUI='false',
+         manualInstallationURL='http://digitalwebbooks.com/reader/')},
+
+    {'mimetypes': ['application/x-videoegg-loader'],
+     'os': windows_re,
+     'fields': dict(
+         name='VideoEgg Publisher',
+         guid='{b8b881f0-2e07-11db-a98b-0800200c9a66}',
+         iconUrl='http://videoegg.com/favicon.ico',
+         XPILocation='http://update.videoegg.com/Install/Windows/Initial/VideoEggPublisher.xpi',
+         InstallerShowsUI='true',
+         manualInstallationURL='http://www.videoegg.com/')},
+
+    {'mimetypes': ['video/vnd.divx'],
+     'os': windows_re,
+     'fields': dict(
+         name='DivX Web Player',
+         guid='{a8b771f0-2e07-11db-a98b-0800200c9a66}',
+         iconUrl='http://images.divx.com/divx/player/webplayer.png',
+         XPILocation='http://download.divx.com/player/DivXWebPlayer.xpi',
+         InstallerShowsUI='false',
+         licenseURL='http://go.divx.com/plugin/license/',
+         manualInstallationURL='http://go.divx.com/plugin/download/')},
+
+    {'mimetypes': ['video/vnd.divx'],
+     'os': mac_re,
+     'fields': dict(
+         name='DivX Web Player',
+         guid='{a8b771f0-2e07-11db-a98b-0800200c9a66}',
+         iconUrl='http://images.divx.com/divx/player/webplayer.png',
+         XPILocation='http://download.divx.com/player/DivXWebPlayerMac.xpi',
+         InstallerShowsUI='false',
+         licenseURL='http://go.divx.com/plugin/license/',
+         manualInstallationURL='http://go.divx.com/plugin/download/')},
+]
+
+
+def render(mimetype, fields=None):
+    plugin = dict(default_plugin, **(fields or {}))
+    plugin['mimetype'] = jinja2.escape(mimetype) or '-1'
+    return Template(xml_template).substitute(plugin)
+
+
+def compile_plugins(plugins):
+    """
+    Returns {mimetype: (default, [(os, [(os, locale, output)])])} where every
+    output is the response already rendered for that plugin and variant.
+    Rendering the known responses up front means a request only has to look
+    up its mimetype and match clientOS against a couple of patterns.
+    """
+    table = {}
+    for plugin in plugins:
+        variants = []
+        for os_re, locale, fields in plugin.get('variants', []):
+            variants.append((os_re, locale, dict(plugin['fields'], **fields)))
+        variants.append((None, None, plugin['fields']))
+
+        for mimetype in plugin['mimetypes']:
+            default, candidates = table.setdefault(mimetype,
+                                                   (render(mimetype), []))
+            candidates.append(
+                (plugin['os'],
+                 [(os_re, locale, render(mimetype, fields))
+                  for os_re, locale, fields in variants]))
+    return table
+
+
+compiled = compile_plugins(plugins)
 
 
 def get_output(data):
-    g = defaultdict(str, [(k, jinja2.escape(v)) for k, v in data.iteritems()])
-
-    required = ['mimetype', 'appID', 'appVersion', 'clientOS', 'chromeLocale']
-
-    # Some defaults we override depending on what we find below.
-    plugin = dict(mimetype='-1', name='-1', guid='-1', version='',
-                  iconUrl='', XPILocation='', InstallerLocation='',
-                  InstallerHash='', InstallerShowsUI='',
-                  manualInstallationURL='', licenseURL='',
-                  needsRestart='true')
-
-    # Special case for mimetype if they are provided.
-    plugin['mimetype'] = g['mimetype'] or '-1'
-
-    output = Template(xml_template)
-
     for s in required:
         if s not in data:
             # A sort of 404, matching what was returned in the original PHP.
-            return output.substitute(plugin)
-
-    # Figure out what plugins we've got, and what plugins we know where
-    # to get.
-
-    # Begin our huge and embarrassing if-else statement.
-    if (g['mimetype'] in ['application/x-shockwave-flash',
-                          'application/futuresplash'] and
-        re.match(flash_re, g['clientOS'])):
-
-        # Tell the user where they can go to get the installer.
-
-        plugin.update(
-            name='Adobe Flash Player',
-            manualInstallationURL='http://www.adobe.com/go/getflashplayer')
-
-        # Offer Windows users a specific flash plugin installer instead.
-        # Don't use a https URL for the license here, per request from
-        # Macromedia.
-
-        if g['clientOS'].startswith('Win'):
-            plugin.update(
-                guid='{4cfaef8a-a6c9-41a0-8e6f-967eb8f49143}',
-                XPILocation='',
-                iconUrl='http://fpdownload2.macromedia.com/pub/flashplayer/current/fp_win_installer.ico',
-                needsRestart='false',
-                InstallerShowsUI='true',
-                version='12.0.0.44',
-                InstallerHash='sha256:41f6636e383fa814b8ab5914d09a30dafbcc83265915ff34ec1896abe3880ba3',
-                InstallerLocation='http://download.macromedia.com/pub/flashplayer/pdc/fp_pl_pfs_installer.exe')
-
-    elif (g['mimetype'] == 'application/x-director' and
-          g['clientOS'].startswith('Win')):
-        plugin.update(
-            name='Adobe Shockwave Player',
-            manualInstallationURL='http://get.adobe.com/shockwave/otherversions')
-
-        # Even though the shockwave installer is not a silent installer, we
-        # need to show its EULA here since we've got a slimmed down
-        # installer that doesn't do that itself.
-        if g['chromeLocale'] != 'ja-JP':
-            plugin.update(
-                licenseURL='http://www.adobe.com/go/eula_shockwaveplayer')
-        else:
-            plugin.update(
-                licenseURL='http://www.adobe.com/go/eula_shockwaveplayer_jp')
-        plugin.update(
-            guid='{45f2a22c-4029-4209-8b3d-1421b989633f}',
-            XPILocation='',
-            version='12.0.9.149',
-            InstallerHash='sha256:2c552fac768d9cbbb5b91540676ae7ad3fbe13d6e48f9a8df447ab7281758636',
-            InstallerLocation='http://fpdownload.macromedia.com/pub/shockwave/default/english/win95nt/latest/Shockwave_Installer_FF.exe',
-            manualInstallationURL='http://get.adobe.com/shockwave/otherversions',
-            needsRestart='false',
-            InstallerShowsUI='false')
-
-    elif (g['mimetype'] in ['audio/x-pn-realaudio-plugin',
-                            'audio/x-pn-realaudio'] and
-          re.match(r'^(Win|Linux|PPC Mac OS X)', g['clientOS'])):
-        plugin.update(
-            name='Real Player',
-            version='10.5',
-            manualInstallationURL='http://www.real.com')
-
-        if g['clientOS'].startswith('Win'):
-            plugin.update(
-                XPILocation='http://forms.real.com/real/player/download.html?type=firefox',
-                guid='{d586351c-cb55-41a7-8e7b-4aaac5172d39}')
-        else:
-            plugin.update(
-                guid='{269eb771-59de-4702-9209-ca97ce522f6d}')
-
-    elif (re.match(quicktime_re, g['mimetype']) and
-          re.match(r'^(Win|PPC Mac OS X)', g['clientOS'])):
-
-        # Well, we don't have a plugin that can handle any of those
-        # mimetypes, but the Apple Quicktime plugin can. Point the user to
-        # the Quicktime download page.
-
-        plugin.update(
-            name='Apple Quicktime',
-            guid='{a42bb825-7eee-420f-8ee7-834062b6fefd}',
-            InstallerShowsUI='true',
-            manualInstallationURL='http://www.apple.com/quicktime/download/')
-
-    elif (re.match(java_re, g['mimetype']) and
-          re.match(r'^(Win|Linux|PPC Mac OS X)', g['clientOS'])):
-
-        # We serve up the Java plugin for the following mimetypes:
-        #
-        # application/x-java-vm
-        # application/x-java-applet;jpi-version=1.5
-        # application/x-java-bean;jpi-version=1.5
-        # application/x-java-applet;version=1.3
-        # application/x-java-bean;version=1.3
-        # application/x-java-applet;version=1.2.2
-        # application/x-java-bean;version=1.2.2
-        # application/x-java-applet;version=1.2.1
-        # application/x-java-bean;version=1.2.1
-        # application/x-java-applet;version=1.4.2
-        # application/x-java-bean;version=1.4.2
-        # application/x-java-applet;version=1.5
-        # application/x-java-bean;version=1.5
-        # application/x-java-applet;version=1.3.1
-        # application/x-java-bean;version=1.3.1
-        # application/x-java-applet;version=1.4
-        # application/x-java-bean;version=1.4
-        # application/x-java-applet;version=1.4.1
-        # application/x-java-bean;version=1.4.1
-        # application/x-java-applet;version=1.2
-        # application/x-java-bean;version=1.2
-        # application/x-java-applet;version=1.1.3
-        # application/x-java-bean;version=1.1.3
-        # application/x-java-applet;version=1.1.2
-        # application/x-java-bean;version=1.1.2
-        # application/x-java-applet;version=1.1.1
-        # application/x-java-bean;version=1.1.1
-        # application/x-java-applet;version=1.1
-        # application/x-java-bean;version=1.1
-        # application/x-java-applet
-        # application/x-java-bean
-        #
-        #
-        # We don't want to link users directly to the Java plugin because
-        # we want to warn them about ongoing security problems first. Link
-        # to SUMO.
-
-        plugin.update(
-            name='Java Runtime Environment',
-            manualInstallationURL='https://support.mozilla.org/kb/use-java-plugin-to-view-interactive-content',
-            needsRestart='false',
-            guid='{fbe640ef-4375-4f45-8d79-767d60bf75b8}')
-
-    elif (g['mimetype'] in ['application/pdf', 'application/vnd.fdf',
-                            'application/vnd.adobe.xfdf',
-                            'application/vnd.adobe.xdp+xml',
-                            'application/vnd.adobe.xfd+xml'] and
-          re.match(r'^(Win|PPC Mac OS X|Linux(?! x86_64))', g['clientOS'])):
-        plugin.update(
-            name='Adobe Acrobat Plug-In',
-            guid='{d87cd824-67cb-4547-8587-616c70318095}',
-            manualInstallationURL='http://www.adobe.com/products/acrobat/readstep.html')
-
-    elif (g['mimetype'] == 'application/x-mtx' and
-          re.match(r'^(Win|PPC Mac OS X)', g['clientOS'])):
-        plugin.update(
-            name='Viewpoint Media Player',
-            guid='{03f998b2-0e00-11d3-a498-00104b6eb52e}',
-            manualInstallationURL='http://www.viewpoint.com/pub/products/vmp.html')
-
-    elif re.match(wmp_re, g['mimetype']):
-        # We serve up the Windows Media Player plugin for the following
-        # mimetypes:
-        #
-        # application/asx
-        # application/x-mplayer2
-        # audio/x-ms-wax
-        # audio/x-ms-wma
-        # video/x-ms-asf
-        # video/x-ms-asf-plugin
-        # video/x-ms-wm
-        # video/x-ms-wmp
-        # video/x-ms-wmv
-        # video/x-ms-wmx
-        # video/x-ms-wvx
-        #
-        # For all windows users who don't have the WMP 11 plugin, give them
-        # a link for it.
-        if g['clientOS'].startswith('Win'):
-            plugin.update(
-                name='Windows Media Player',
-                version='11',
-                guid='{cff1240a-fd24-4b9f-8183-ccd96e5300d0}',
-                manualInstallationURL='http://port25.technet.com/pages/windows-media-player-firefox-plugin-download.aspx')
-
-        # For OSX users -- added Intel to this since flip4mac is a UB.
-        # Contact at MS was okay w/ this, plus MS points to this anyway.
-        elif re.match(r'^(PPC|Intel) Mac OS X', g['clientOS']):
-            plugin.update(
-                name='Flip4Mac',
-                version='2.1',
-                guid='{cff0240a-fd24-4b9f-8183-ccd96e5300d0}',
-                manualInstallationURL='http://www.flip4mac.com/wmv_download.htm')
-
-    elif (g['mimetype'] == 'application/x-xstandard' and
-          re.match(r'^(Win|PPC Mac OS X)', g['clientOS'])):
-        plugin.update(
-            name='XStandard XHTML WYSIWYG Editor',
-            guid='{3563d917-2f44-4e05-8769-47e655e92361}',
-            iconUrl='http://xstandard.com/images/xicon32x32.gif',
-            XPILocation='http://xstandard.com/download/xstandard.xpi',
-            InstallerShowsUI='false',
-            manualInstallationURL='http://xstandard.com/download/',
-            licenseURL='http://xstandard.com/license/')
-
-    elif (g['mimetype'] == 'application/x-dnl' and
-          g['clientOS'].startswith('Win')):
-        plugin.update(
-            name='DNL Reader',
-            guid='{ce9317a3-e2f8-49b9-9b3b-a7fb5ec55161}',
-            version='5.5',
-            iconUrl='http://digitalwebbooks.com/reader/dwb16.gif',
-            XPILocation='http://digitalwebbooks.com/reader/xpinst.xpi',
-            InstallerShowsUI='false',
-            manualInstallationURL='http://digitalwebbooks.com/reader/')
-
-    elif (g['mimetype'] == 'application/x-videoegg-loader' and
-          g['clientOS'].startswith('Win')):
-        plugin.update(
-            name='VideoEgg Publisher',
-            guid='{b8b881f0-2e07-11db-a98b-0800200c9a66}',
-            iconUrl='http://videoegg.com/favicon.ico',
-            XPILocation='http://update.videoegg.com/Install/Windows/Initial/VideoEggPublisher.xpi',
-            InstallerShowsUI='true',
-            manualInstallationURL='http://www.videoegg.com/')
-
-    elif (g['mimetype'] == 'video/vnd.divx' and
-          g['clientOS'].startswith('Win')):
-        plugin.update(
-            name='DivX Web Player',
-            guid='{a8b771f0-2e07-11db-a98b-0800200c9a66}',
-            iconUrl='http://images.divx.com/divx/player/webplayer.png',
-            XPILocation='http://download.divx.com/player/DivXWebPlayer.xpi',
-            InstallerShowsUI='false',
-            licenseURL='http://go.divx.com/plugin/license/',
-            manualInstallationURL='http://go.divx.com/plugin/download/')
-
-    elif (g['mimetype'] == 'video/vnd.divx' and
-          re.match(r'^(PPC|Intel) Mac OS X', g['clientOS'])):
-        plugin.update(
-            name='DivX Web Player',
-            guid='{a8b771f0-2e07-11db-a98b-0800200c9a66}',
-            iconUrl='http://images.divx.com/divx/player/webplayer.png',
-            XPILocation='http://download.divx.com/player/DivXWebPlayerMac.xpi',
-            InstallerShowsUI='false',
-            licenseURL='http://go.divx.com/plugin/license/',
-            manualInstallationURL='http://go.divx.com/plugin/download/')
-
-    # End ridiculously huge and embarrassing if-else block.
-    return output.substitute(plugin)
+            return render(data.get('mimetype', ''))
+
+    if data['mimetype'] not in compiled:
+        return render(data['mimetype'])
+
+    # Match against the escaped values, like we always have.
+    client_os = jinja2.escape(data['clientOS'])
+    locale = jinja2.escape(data['chromeLocale'])
+    default, candidates = compiled[data['mimetype']]
+    for os_re, variants in candidates:
+        if os_re.match(client_os):
+            for variant_os, variant_locale, output in variants:
+                if ((variant_os is None or variant_os.match(client_os)) and
+                    (variant_locale is None or variant_locale == locale)):
+                    return output
+    return default
 
 
 def format_date(secs):
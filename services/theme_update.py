@@ -1,8 +1,12 @@
 import base64
+import hashlib
 import json
 import os
 import posixpath
 import re
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_tz, mktime_tz
 from time import time
 from wsgiref.handlers import format_date_time
 
@@ -18,9 +22,43 @@ setup_environ(settings)
 log_configure()
 
 # This has to be imported after the settings (utils).
+from django.core.cache import cache
 from django_statsd.clients import statsd
 
 
+class LRUCache(object):
+    """A small in-process cache that drops the least recently used key."""
+
+    def __init__(self, size):
+        self.size = size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.pop(key, None)
+            if value is not None:
+                self.data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = value
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+# The rendered JSON only changes when the theme's `modified` does, and that is
+# part of the key, so nothing needs to be invalidated.
+local_cache = LRUCache(getattr(settings, 'THEME_UPDATE_LRU_SIZE', 1000))
+CACHE_TIMEOUT = getattr(settings, 'THEME_UPDATE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
 class ThemeUpdate(object):
 
     def __init__(self, locale, id_, qs=None):
@@ -51,12 +89,39 @@ class ThemeUpdate(object):
                 log_exception('I/O error({0}): {1}'.format(e[0], e[1]))
             return ''
 
-    def get_headers(self, length):
-        return [('Cache-Control', 'public, max-age=3600'),
-                ('Content-Length', str(length)),
-                ('Content-Type', 'application/json'),
-                ('Expires', format_date_time(time() + 3600)),
-                ('Last-Modified', format_date_time(time()))]
+    def modified(self):
+        return int(self.data['row'].get('modified') or 0)
+
+    def etag(self, output):
+        return '"%s"' % hashlib.md5(output).hexdigest()
+
+    def get_headers(self, length, output=''):
+        headers = [('Cache-Control', 'public, max-age=3600'),
+                   ('Expires', format_date_time(time() + 3600)),
+                   ('Last-Modified', format_date_time(self.modified()))]
+        if output:
+            headers.append(('ETag', self.etag(output)))
+        if length:
+            headers += [('Content-Length', str(length)),
+                        ('Content-Type', 'application/json')]
+        return headers
+
+    def is_modified(self, environ, output):
+        """
+        Checks the conditional request headers Firefox sends with its daily
+        update pings against what we'd send back.
+        """
+        etags = environ.get('HTTP_IF_NONE_MATCH')
+        if etags:
+            return not (etags.strip() == '*' or self.etag(output) in
+                        [e.strip() for e in etags.split(',')])
+
+        since = environ.get('HTTP_IF_MODIFIED_SINCE')
+        if since:
+            since = parsedate_tz(since.split(';')[0])
+            if since:
+                return self.modified() > mktime_tz(since)
+        return True
 
     def get_update(self):
         """
@@ -78,6 +143,8 @@ class ThemeUpdate(object):
         SELECT p.persona_id, a.id, a.slug, v.version,
             t_name.localized_string AS name,
             t_desc.localized_string AS description,
+            t_name_en.localized_string AS name_en,
+            t_desc_en.localized_string AS description_en,
             p.display_username, p.header,
             p.footer, p.accentcolor, p.textcolor,
             UNIX_TIMESTAMP(a.modified) AS modified
@@ -88,6 +155,10 @@ class ThemeUpdate(object):
             ON t_name.id=a.name AND t_name.locale=%(locale)s
         LEFT JOIN translations AS t_desc
             ON t_desc.id=a.summary AND t_desc.locale=%(locale)s
+        LEFT JOIN translations AS t_name_en
+            ON t_name_en.id=a.name AND t_name_en.locale='en-US'
+        LEFT JOIN translations AS t_desc_en
+            ON t_desc_en.id=a.summary AND t_desc_en.locale='en-US'
         WHERE p.{primary_key}=%(id)s AND
             a.addontype_id=%(atype)s AND a.status=4 AND a.inactive=0
         """.format(primary_key=self.data['primary_key'])
@@ -95,34 +166,47 @@ class ThemeUpdate(object):
         self.cursor.execute(sql, self.data)
         row = self.cursor.fetchone()
 
-        row_to_dict = lambda row: dict(zip((
-            'persona_id', 'addon_id', 'slug', 'current_version', 'name',
-            'description', 'username', 'header', 'footer', 'accentcolor',
-            'textcolor', 'modified'),
-            list(row)))
-
         if row:
-            self.data['row'] = row_to_dict(row)
-
-            # Fall back to `en-US` if the name was null for our locale.
-            # TODO: Write smarter SQL and don't rerun the whole query.
-            if not self.data['row']['name']:
+            row = dict(zip((
+                'persona_id', 'addon_id', 'slug', 'current_version', 'name',
+                'description', 'name_en', 'description_en', 'username',
+                'header', 'footer', 'accentcolor', 'textcolor', 'modified'),
+                list(row)))
+
+            # Fall back to `en-US` if the name was null for our locale. Both
+            # are fetched in the query above so we don't need to run it again.
+            name_en, description_en = row.pop('name_en'), row.pop(
+                'description_en')
+            if not row['name']:
                 self.data['locale'] = 'en-US'
-                self.cursor.execute(sql, self.data)
-                row = self.cursor.fetchone()
-                if row:
-                    self.data['row'] = row_to_dict(row)
+                row['name'], row['description'] = name_en, description_en
 
+            self.data['row'] = row
             return True
 
         return False
 
-    # TODO: Cache on row['modified']
+    def cache_key(self):
+        return 'theme-update:%s:%s:%s:%s:%s' % (
+            self.data['primary_key'], self.data['id'], self.data['locale'],
+            self.modified(), int(self.from_gp))
+
     def get_json(self):
         if not self.get_update():
             # Persona not found.
             return
 
+        key = self.cache_key()
+        output = local_cache.get(key)
+        if output is None:
+            output = cache.get(key)
+            if output is None:
+                output = self.render()
+                cache.set(key, output, CACHE_TIMEOUT)
+            local_cache.set(key, output)
+        return output
+
+    def render(self):
         row = self.data['row']
         accent = row.get('accentcolor')
         text = row.get('textcolor')
@@ -220,7 +304,11 @@ def application(environ, start_response):
             if not output:
                 start_response('404 Not Found', [])
                 return ['']
-            start_response(status, update.get_headers(len(output)))
+            if not update.is_modified(environ, output):
+                start_response('304 Not Modified',
+                               update.get_headers(0, output))
+                return ['']
+            start_response(status, update.get_headers(len(output), output))
         except:
             log_exception(data)
             raise
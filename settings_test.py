@@ -42,6 +42,7 @@ COLLECTIONS_ICON_PATH = _polite_tmpdir()
 PACKAGER_PATH = _polite_tmpdir()
 REVIEWER_ATTACHMENTS_PATH = _polite_tmpdir()
 DUMPED_APPS_PATH = _polite_tmpdir()
+SEARCH_SUGGESTIONS_PATH = _polite_tmpdir() + '/search-suggestions.pickle'
 
 # We won't actually send an email.
 SEND_REAL_EMAIL = True
@@ -49,6 +50,9 @@ SEND_REAL_EMAIL = True
 # Turn off search engine indexing.
 USE_ELASTIC = False
 
+# Profile every request so tests can check query budgets.
+QUERY_PROFILER_SAMPLE = 1.0
+
 # Ensure all validation code runs in tests:
 VALIDATE_ADDONS = True
 